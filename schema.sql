@@ -130,11 +130,25 @@ CREATE TABLE IF NOT EXISTS emails (
     processed_at TIMESTAMPTZ,
     email_date TIMESTAMPTZ,
     raw_headers JSONB,
+    sender_name TEXT,
+    from_address TEXT,
     extraction_result JSONB,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     UNIQUE(account_id, gmail_id)
 );
 
+-- Column added after the table shipped; backfill matches parse_sender_name()
+ALTER TABLE emails ADD COLUMN IF NOT EXISTS sender_name TEXT;
+UPDATE emails
+SET sender_name = trim(both from trim(both '"' from trim(both from split_part(raw_headers->>'from', '<', 1))))
+WHERE sender_name IS NULL AND raw_headers->>'from' IS NOT NULL;
+
+-- Column added after the table shipped; backfill approximates parse_sender_address()
+ALTER TABLE emails ADD COLUMN IF NOT EXISTS from_address TEXT;
+UPDATE emails
+SET from_address = lower(trim(both from coalesce(substring(raw_headers->>'from' from '<([^<>]+)>'), raw_headers->>'from')))
+WHERE from_address IS NULL AND raw_headers->>'from' LIKE '%@%';
+
 -- Text messages
 CREATE TABLE IF NOT EXISTS messages (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -166,6 +180,14 @@ CREATE TABLE IF NOT EXISTS documents (
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Google Drive folder names and parents, for resolving document paths
+CREATE TABLE IF NOT EXISTS drive_folders (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    parent_id TEXT,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
 -- Junction tables
 CREATE TABLE IF NOT EXISTS project_people (
     project_id UUID REFERENCES projects(id) ON DELETE CASCADE,
@@ -180,10 +202,13 @@ CREATE TABLE IF NOT EXISTS sync_state (
     account_id UUID REFERENCES email_accounts(id) ON DELETE CASCADE,
     last_sync TIMESTAMPTZ,
     cursor TEXT,
+    cursor_overlap TEXT,
     status TEXT,
     error_message TEXT,
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
+-- Column added after the table shipped
+ALTER TABLE sync_state ADD COLUMN IF NOT EXISTS cursor_overlap TEXT;
 
 -- Raw interactions — permanent archive
 CREATE TABLE IF NOT EXISTS raw_interactions (
@@ -213,6 +238,7 @@ CREATE TABLE IF NOT EXISTS ai_conversations (
     response_content JSONB NOT NULL,
     input_tokens INTEGER,
     output_tokens INTEGER,
+    cache_read_tokens INTEGER,
     cost_usd FLOAT,
     latency_ms INTEGER,
     source_interaction_id UUID REFERENCES raw_interactions(id) ON DELETE SET NULL,
@@ -221,6 +247,21 @@ CREATE TABLE IF NOT EXISTS ai_conversations (
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Column added after the table shipped
+ALTER TABLE ai_conversations ADD COLUMN IF NOT EXISTS cache_read_tokens INTEGER;
+
+-- Cached decision extractions, keyed on transcript hash
+CREATE TABLE IF NOT EXISTS decision_cache (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    content_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    decisions JSONB NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    CONSTRAINT uq_decision_cache_key UNIQUE (content_hash, model, prompt_version)
+);
+
 -- Audit log
 CREATE TABLE IF NOT EXISTS audit_log (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -246,6 +287,7 @@ CREATE TABLE IF NOT EXISTS user_preferences (
 -- =====================================================
 
 CREATE INDEX IF NOT EXISTS idx_people_email ON people(email);
+CREATE INDEX IF NOT EXISTS idx_people_phone ON people(phone);
 CREATE INDEX IF NOT EXISTS idx_email_accounts_email ON email_accounts(email);
 CREATE INDEX IF NOT EXISTS idx_projects_status ON projects(status);
 CREATE INDEX IF NOT EXISTS idx_projects_tier ON projects(tier);
@@ -253,6 +295,7 @@ CREATE INDEX IF NOT EXISTS idx_projects_pinned ON projects(user_pinned) WHERE us
 CREATE INDEX IF NOT EXISTS idx_projects_deadline ON projects(user_deadline) WHERE user_deadline IS NOT NULL;
 CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
 CREATE INDEX IF NOT EXISTS idx_tasks_project ON tasks(project_id);
+CREATE INDEX IF NOT EXISTS idx_tasks_project_status_completed ON tasks(project_id, status, completed_at);
 CREATE INDEX IF NOT EXISTS idx_tasks_assigned ON tasks(assigned_to);
 CREATE INDEX IF NOT EXISTS idx_tasks_pinned ON tasks(user_pinned) WHERE user_pinned = TRUE;
 CREATE INDEX IF NOT EXISTS idx_tasks_due ON tasks(due_date) WHERE due_date IS NOT NULL;
@@ -262,6 +305,8 @@ CREATE INDEX IF NOT EXISTS idx_emails_classification ON emails(classification);
 CREATE INDEX IF NOT EXISTS idx_emails_needs_reply ON emails(needs_reply) WHERE needs_reply = TRUE;
 CREATE INDEX IF NOT EXISTS idx_emails_thread ON emails(thread_id);
 CREATE INDEX IF NOT EXISTS idx_emails_account ON emails(account_id);
+CREATE INDEX IF NOT EXISTS idx_emails_from_address ON emails(from_address, email_date);
+CREATE INDEX IF NOT EXISTS idx_emails_project_links ON emails USING GIN ((extraction_result -> 'project_links') jsonb_path_ops);
 CREATE INDEX IF NOT EXISTS idx_messages_chat ON messages(chat_id);
 CREATE INDEX IF NOT EXISTS idx_messages_date ON messages(message_date);
 CREATE INDEX IF NOT EXISTS idx_documents_folder ON documents(folder_path);
@@ -276,6 +321,7 @@ CREATE INDEX IF NOT EXISTS idx_raw_extraction_version ON raw_interactions(extrac
 CREATE INDEX IF NOT EXISTS idx_ai_conversations_type ON ai_conversations(session_type);
 CREATE INDEX IF NOT EXISTS idx_ai_conversations_model ON ai_conversations(model);
 CREATE INDEX IF NOT EXISTS idx_ai_conversations_date ON ai_conversations(created_at);
+CREATE INDEX IF NOT EXISTS idx_decision_cache_expires ON decision_cache(expires_at);
 
 -- =====================================================
 -- CONTEXT SYSTEM TABLES
@@ -514,6 +514,33 @@ def reindex(
     asyncio.run(_reindex())
 
 
+@app.command("train-spam-filter")
+def train_spam_filter(
+    verbose: bool = typer.Option(False, "--verbose", "-v"),
+):
+    """Train the local spam model on already-classified emails."""
+    _setup_logging(verbose)
+
+    async def _train():
+        try:
+            from src.processing.spam_filter import train_spam_model
+            from src.storage.db import get_session
+
+            with console.status("[bold green]Training spam filter..."):
+                async with get_session() as session:
+                    counts = await train_spam_model(session)
+
+            console.print(
+                f"[green]Trained on {counts['spam']} spam and {counts['ham']} other emails[/green]"
+            )
+        except ImportError:
+            console.print("[red]fasttext not installed. Run: pip install 'focus[spamfilter]'[/red]")
+        except ValueError as e:
+            console.print(f"[yellow]{e}[/yellow]")
+
+    asyncio.run(_train())
+
+
 @app.command()
 def capture(
     project: Optional[str] = typer.Option(None, "--project", "-p", help="Specific project directory to scan"),
@@ -26,6 +26,7 @@ def sync(
         from src.output.claude_md import generate_claude_md
         from src.output.vault import generate_vault
         from src.priority import expire_sprints
+        from src.processing.classifier import close_client
         from src.storage.db import get_session
 
         settings = get_settings()
@@ -71,6 +72,7 @@ def sync(
                     await generate_claude_md(session)
                     console.print("  Vault and CLAUDE.md regenerated")
 
+        await close_client()
         console.print("\n[bold green]Sync complete![/bold green]")
 
     asyncio.run(_sync())
@@ -16,6 +16,10 @@ class GeneralSettings(BaseSettings):
     db_url: str = Field(default="postgresql+asyncpg://localhost/focus")
     db_url_sync: str = Field(default="postgresql://localhost/focus")
     chroma_path: Path = Field(default=Path.home() / ".local/share/focus/chroma")
+    # Local spam model (focus train-spam-filter); emails it scores at or
+    # above spam_threshold are classified as spam without an API call
+    spam_model_path: Path = Field(default=Path.home() / ".local/share/focus/spam.ftz")
+    spam_threshold: float = 0.9
     log_level: str = "INFO"
 
 
@@ -23,6 +27,11 @@ class AnthropicSettings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="ANTHROPIC_")
     api_key: str = ""
     model: str = "claude-haiku-4-5-20251001"
+    # Send classification/extraction through the Message Batches API (half
+    # price, up to 24h turnaround) when more than batch_threshold emails
+    # are waiting to be processed
+    batch_mode: bool = False
+    batch_threshold: int = 100
 
 
 class OllamaSettings(BaseSettings):
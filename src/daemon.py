@@ -12,6 +12,7 @@ from src.ingestion.pipeline import process_unprocessed_emails, run_full_sync
 from src.output.claude_md import generate_claude_md
 from src.output.vault import generate_vault
 from src.priority import expire_sprints
+from src.processing.classifier import close_client
 from src.storage.db import close_db, get_session
 
 logger = logging.getLogger(__name__)
@@ -120,5 +121,6 @@ async def run_daemon(interval_minutes: int = 15) -> None:
             except asyncio.CancelledError:
                 break
 
+    await close_client()
     await close_db()
     console.print("\n[bold]Focus daemon stopped.[/bold]")
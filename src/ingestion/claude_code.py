@@ -3,21 +3,108 @@
 import hashlib
 import json
 import logging
-from datetime import datetime
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Any, Iterable, Iterator, Optional
 
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.storage.models import RawInteraction
-from src.storage.raw import store_raw_interaction
+from src.storage.models import DecisionCache, RawInteraction, SyncState
+from src.storage.raw import store_raw_interactions
+
+try:
+    import msgspec
+except ImportError:  # optional: schema-specialized JSONL decoding
+    msgspec = None
 
 logger = logging.getLogger(__name__)
 
 # Default location for Claude Code session files
 CLAUDE_SESSIONS_DIR = Path.home() / ".claude" / "projects"
 
+# SyncState id prefix for per-directory mtime watermarks from the last session scan
+SCAN_WATERMARK_PREFIX = "claude_code_scan:"
+
+
+def _may_be_message_line(line: str) -> bool:
+    """Cheap substring prefilter run before json.loads.
+
+    Every user/assistant record carries its type as a JSON string value, so
+    lines containing neither literal (progress, snapshots, system records)
+    can be dropped without decoding them.
+    """
+    return '"user"' in line or '"assistant"' in line
+
+
+if msgspec is not None:
+
+    class _SessionRecord(msgspec.Struct):
+        """Fields of a session JSONL record that the parsers read.
+
+        msgspec builds a decoder specialized to these keys and skips every
+        other key (tool results, snapshots, usage) without materializing it.
+        Types are left loose so filtering matches the json.loads path.
+        """
+
+        type: Any = None
+        message: Any = msgspec.field(default_factory=dict)
+        isSidechain: Any = False  # noqa: N815
+        isMeta: Any = False  # noqa: N815
+        timestamp: Any = ""
+        sessionId: Any = ""  # noqa: N815
+
+    _RECORD_DECODER = msgspec.json.Decoder(_SessionRecord)
+else:
+    _RECORD_DECODER = None
+
+
+def _decode_session_line(line: str) -> Optional[tuple[dict, str, str]]:
+    """Decode one JSONL line and apply the shared message filters.
+
+    Keeps only non-sidechain, non-meta user/assistant records whose
+    ``message`` is an object. Uses the msgspec decoder when installed,
+    json.loads otherwise.
+
+    Returns:
+        (message, timestamp, session_id), or None if the line is skipped.
+    """
+    if _RECORD_DECODER is not None:
+        try:
+            rec = _RECORD_DECODER.decode(line)
+        except msgspec.DecodeError:
+            return None
+        msg_type, message = rec.type, rec.message
+        if msg_type not in ("user", "assistant") or rec.isSidechain or rec.isMeta:
+            return None
+        timestamp, session_id = rec.timestamp, rec.sessionId
+    else:
+        try:
+            obj = json.loads(line)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(obj, dict):
+            return None
+        # Skip sidechain (subagent) and meta (system/command) messages
+        if obj.get("type") not in ("user", "assistant") or obj.get("isSidechain") or obj.get("isMeta"):
+            return None
+        message = obj.get("message", {})
+        timestamp, session_id = obj.get("timestamp", ""), obj.get("sessionId", "")
+
+    if not isinstance(message, dict):
+        return None
+    return message, timestamp, session_id
+
+
+# Leading markers of slash-command messages, which carry no conversation
+_COMMAND_PREFIXES = ("<command-name>", "<local-command")
+
+# Transcript budget and per-message truncation length for session summaries
+_SUMMARY_MAX_CHARS = 8000
+_SUMMARY_TURN_CHARS = 1000
+
 # Decision extraction prompt for Claude Haiku
 DECISION_EXTRACTION_SYSTEM = """You extract decisions from Claude Code session transcripts.
 
@@ -39,63 +126,88 @@ Be conservative — only extract clear decisions, not every statement.
 If there are no decisions in the transcript, return [].
 """
 
+# Bump whenever DECISION_EXTRACTION_SYSTEM changes to invalidate cached results
+DECISION_PROMPT_VERSION = "v1"
+
+# How long a cached decision extraction stays valid
+DECISION_CACHE_TTL = timedelta(days=7)
 
-def parse_session_file(path: Path) -> list[dict]:
+
+@dataclass
+class SessionTurns:
+    """Conversation turns stored as parallel lists (struct-of-arrays).
+
+    Index ``i`` across ``roles``, ``contents``, ``timestamps`` and
+    ``session_ids`` describes one turn. ``start_time``/``end_time`` are the
+    first and last non-empty timestamps, tracked as turns are appended
+    (session JSONL is written in chronological order). With
+    ``keep_contents=False`` message bodies are dropped and only the
+    metadata columns are kept.
+    """
+
+    roles: list[str] = field(default_factory=list)
+    contents: list[str] = field(default_factory=list)
+    timestamps: list[str] = field(default_factory=list)
+    session_ids: list[str] = field(default_factory=list)
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+    keep_contents: bool = field(default=True, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.roles)
+
+    def append(self, role: str, content: str, timestamp: str = "", session_id: str = "") -> None:
+        """Append a single turn to every column."""
+        self.roles.append(role)
+        if self.keep_contents:
+            self.contents.append(content)
+        self.timestamps.append(timestamp)
+        self.session_ids.append(session_id)
+        if timestamp:
+            if self.start_time is None:
+                self.start_time = timestamp
+            self.end_time = timestamp
+
+
+def parse_session_file(path: Path) -> SessionTurns:
     """Parse a Claude Code JSONL session file into conversation turns.
 
-    Returns list of dicts with keys: role, content, timestamp, type.
+    Returns a SessionTurns with parallel role/content/timestamp/session_id lists.
     Filters to meaningful user/assistant text messages only.
     """
-    turns = []
+    turns = SessionTurns()
+    for row in iter_session_turns(path):
+        turns.append(*row)
+    return turns
+
 
+def iter_session_turns(path: Path) -> Iterator[tuple[str, str, str, str]]:
+    """Stream meaningful turns from a Claude Code JSONL session file.
+
+    Yields:
+        (role, content, timestamp, session_id) tuples, one per kept
+        user/assistant text message, in file order.
+    """
     with open(path) as f:
         for line in f:
             line = line.strip()
-            if not line:
-                continue
-
-            try:
-                obj = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-
-            msg_type = obj.get("type")
-            if msg_type not in ("user", "assistant"):
+            if not line or not _may_be_message_line(line):
                 continue
 
-            # Skip sidechain (subagent) messages
-            if obj.get("isSidechain"):
-                continue
-
-            # Skip meta messages (system/command)
-            if obj.get("isMeta"):
-                continue
-
-            message = obj.get("message", {})
-            if not isinstance(message, dict):
+            record = _decode_session_line(line)
+            if record is None:
                 continue
+            message, timestamp, session_id = record
 
             role = message.get("role", "")
-            timestamp = obj.get("timestamp", "")
             content_text = _extract_text_content(message.get("content", ""))
 
-            if not content_text or len(content_text.strip()) < 10:
-                continue
-
-            # Skip command messages
-            if content_text.strip().startswith("<command-name>"):
-                continue
-            if content_text.strip().startswith("<local-command"):
+            # Skip short and command messages
+            stripped = content_text.strip()
+            if len(stripped) < 10 or stripped.startswith(_COMMAND_PREFIXES):
                 continue
 
-            turns.append({
-                "role": role,
-                "content": content_text,
-                "timestamp": timestamp,
-                "session_id": obj.get("sessionId", ""),
-            })
-
-    return turns
+            yield role, content_text, timestamp, session_id
 
 
 def _extract_text_content(content) -> str:
@@ -117,33 +229,43 @@ def _extract_text_content(content) -> str:
     return ""
 
 
-def build_session_summary(turns: list[dict], max_chars: int = 8000) -> str:
+def build_session_summary(turns: Iterable[tuple[str, str]], max_chars: int = _SUMMARY_MAX_CHARS) -> str:
     """Build a condensed transcript from conversation turns.
 
     Truncates to max_chars to fit within LLM context for decision extraction.
+    Consumes ``turns`` lazily and stops pulling once the budget is reached.
+
+    Args:
+        turns: (role, content) pairs, e.g. ``zip(t.roles, t.contents)``.
+        max_chars: Character budget for the transcript.
     """
     parts = []
     total = 0
 
-    for turn in turns:
-        role = turn["role"].upper()
-        content = turn["content"]
-
-        # Truncate individual messages
-        if len(content) > 1000:
-            content = content[:1000] + "..."
-
-        entry = f"[{role}]: {content}"
-        if total + len(entry) > max_chars:
+    for role, content in turns:
+        # Size the entry before building it so we stop without formatting
+        # turns that would be thrown away.
+        entry_len = _summary_entry_len(role, content)
+        if total + entry_len > max_chars:
             break
 
-        parts.append(entry)
-        total += len(entry)
+        if len(content) > _SUMMARY_TURN_CHARS:
+            parts.append(f"[{role.upper()}]: {content[:_SUMMARY_TURN_CHARS]}...")
+        else:
+            parts.append(f"[{role.upper()}]: {content}")
+        total += entry_len
 
     return "\n\n".join(parts)
 
 
-def get_session_metadata(path: Path, turns: list[dict]) -> dict:
+def _summary_entry_len(role: str, content: str) -> int:
+    """Length of a formatted summary entry: "[ROLE]: " plus truncated content."""
+    if len(content) > _SUMMARY_TURN_CHARS:
+        return len(role) + 4 + _SUMMARY_TURN_CHARS + 3
+    return len(role) + 4 + len(content)
+
+
+def get_session_metadata(path: Path, turns: SessionTurns) -> dict:
     """Extract metadata from a session file and its turns."""
     session_id = path.stem  # UUID filename without .jsonl
 
@@ -151,19 +273,14 @@ def get_session_metadata(path: Path, turns: list[dict]) -> dict:
     # Format: ~/.claude/projects/-home-user-projectname/session.jsonl
     project_dir = path.parent.name
 
-    # Extract timestamps
-    timestamps = [t["timestamp"] for t in turns if t.get("timestamp")]
-    start_time = min(timestamps) if timestamps else None
-    end_time = max(timestamps) if timestamps else None
-
     return {
         "session_id": session_id,
         "project_dir": project_dir,
         "turn_count": len(turns),
-        "user_turns": sum(1 for t in turns if t["role"] == "user"),
-        "assistant_turns": sum(1 for t in turns if t["role"] == "assistant"),
-        "start_time": start_time,
-        "end_time": end_time,
+        "user_turns": turns.roles.count("user"),
+        "assistant_turns": turns.roles.count("assistant"),
+        "start_time": turns.start_time,
+        "end_time": turns.end_time,
     }
 
 
@@ -187,6 +304,12 @@ async def extract_decisions(
         import anthropic
         import time
 
+        content_hash = hashlib.sha256(transcript.encode()).hexdigest()
+        cached = await _get_cached_decisions(session, content_hash, settings.anthropic.model)
+        if cached is not None:
+            logger.debug("Decision cache hit: %s", content_hash[:12])
+            return cached
+
         client = anthropic.Anthropic(api_key=settings.anthropic.api_key)
 
         start_time = time.time()
@@ -212,6 +335,7 @@ async def extract_decisions(
                 session=session,
                 session_type="claude_code_decision_extraction",
                 model=settings.anthropic.model,
+                prompt_version=DECISION_PROMPT_VERSION,
                 request_messages=[
                     {"role": "system", "content": DECISION_EXTRACTION_SYSTEM},
                     {"role": "user", "content": f"[transcript: {len(transcript)} chars]"},
@@ -223,15 +347,78 @@ async def extract_decisions(
                 latency_ms=latency_ms,
             )
 
-        return _parse_decisions(raw_text)
+        decisions = _parse_decisions(raw_text)
+        if decisions is None:
+            # Don't cache a malformed response; the next run asks again
+            return []
+        await _store_cached_decisions(session, content_hash, settings.anthropic.model, decisions)
+        return decisions
 
     except Exception as e:
         logger.error("Decision extraction failed: %s", e)
         return []
 
 
-def _parse_decisions(raw_text: str) -> list[dict]:
-    """Parse the JSON decision list from Claude's response."""
+async def _get_cached_decisions(
+    session: AsyncSession,
+    content_hash: str,
+    model: str,
+) -> Optional[list[dict]]:
+    """Look up unexpired cached decisions for a transcript.
+
+    Args:
+        session: Database session.
+        content_hash: SHA-256 hex digest of the transcript.
+        model: Model that produced the cached result.
+
+    Returns:
+        Cached decision list, or None on a miss.
+    """
+    result = await session.execute(
+        select(DecisionCache.decisions).where(
+            DecisionCache.content_hash == content_hash,
+            DecisionCache.model == model,
+            DecisionCache.prompt_version == DECISION_PROMPT_VERSION,
+            DecisionCache.expires_at > datetime.now(timezone.utc),
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+async def _store_cached_decisions(
+    session: AsyncSession,
+    content_hash: str,
+    model: str,
+    decisions: list[dict],
+) -> None:
+    """Insert or refresh the cached decisions for a transcript.
+
+    Args:
+        session: Database session.
+        content_hash: SHA-256 hex digest of the transcript.
+        model: Model that produced the result.
+        decisions: Parsed decision list to cache.
+    """
+    expires_at = datetime.now(timezone.utc) + DECISION_CACHE_TTL
+    stmt = pg_insert(DecisionCache).values(
+        content_hash=content_hash,
+        model=model,
+        prompt_version=DECISION_PROMPT_VERSION,
+        decisions=decisions,
+        expires_at=expires_at,
+    ).on_conflict_do_update(
+        constraint="uq_decision_cache_key",
+        set_={"decisions": decisions, "expires_at": expires_at},
+    )
+    await session.execute(stmt)
+
+
+def _parse_decisions(raw_text: str) -> Optional[list[dict]]:
+    """Parse the JSON decision list from Claude's response.
+
+    Returns None if the response isn't a JSON array, so callers can tell a
+    malformed response from one with no decisions.
+    """
     try:
         text = raw_text.strip()
 
@@ -247,7 +434,7 @@ def _parse_decisions(raw_text: str) -> list[dict]:
         decisions = json.loads(text[start:end])
 
         if not isinstance(decisions, list):
-            return []
+            return None
 
         # Validate each decision has required fields
         valid = []
@@ -264,7 +451,7 @@ def _parse_decisions(raw_text: str) -> list[dict]:
 
     except (json.JSONDecodeError, ValueError):
         logger.warning("Failed to parse decisions JSON: %s", raw_text[:200])
-        return []
+        return None
 
 
 async def ingest_session(
@@ -282,41 +469,50 @@ async def ingest_session(
     Returns:
         Dict with session_id, turns, decisions_count.
     """
-    turns = parse_session_file(path)
+    # Single streaming pass: the summary keeps only what fits its budget and
+    # the metadata columns drop message bodies, so content is never
+    # materialized for the whole file.
+    turns = SessionTurns(keep_contents=False)
+    summary_parts: list[tuple[str, str]] = []
+    summary_chars = 0
+    for role, content, timestamp, session_id in iter_session_turns(path):
+        turns.append(role, content, timestamp, session_id)
+        if summary_chars <= _SUMMARY_MAX_CHARS:
+            summary_parts.append((role, content))
+            summary_chars += _summary_entry_len(role, content)
     if not turns:
         return {"session_id": path.stem, "turns": 0, "decisions_count": 0}
 
     metadata = get_session_metadata(path, turns)
-    transcript = build_session_summary(turns)
-
-    # Store raw interaction
-    await store_raw_interaction(
-        session=session,
-        source_type="claude_code_session",
-        raw_content=transcript,
-        source_id=metadata["session_id"],
-        raw_metadata=metadata,
-        interaction_date=_parse_timestamp(metadata.get("start_time")),
-    )
+    transcript = build_session_summary(summary_parts)
 
     # Extract decisions
     decisions = []
     if extract and len(turns) >= 3:  # Only extract from substantial sessions
         decisions = await extract_decisions(session, transcript)
 
-        if decisions:
-            # Store decisions as a separate raw interaction for the archive
-            await store_raw_interaction(
-                session=session,
-                source_type="claude_code_decisions",
-                raw_content=json.dumps(decisions, indent=2),
-                source_id=f"{metadata['session_id']}_decisions",
-                raw_metadata={
-                    **metadata,
-                    "decision_count": len(decisions),
-                },
-                interaction_date=_parse_timestamp(metadata.get("end_time")),
-            )
+    # Store the transcript, plus decisions for the archive, in one round-trip.
+    # Both share the caller's session, so they are batched rather than
+    # gathered concurrently (see P-001).
+    writes = [{
+        "source_type": "claude_code_session",
+        "raw_content": transcript,
+        "source_id": metadata["session_id"],
+        "raw_metadata": metadata,
+        "interaction_date": _parse_timestamp(metadata.get("start_time")),
+    }]
+    if decisions:
+        writes.append({
+            "source_type": "claude_code_decisions",
+            "raw_content": json.dumps(decisions, indent=2),
+            "source_id": f"{metadata['session_id']}_decisions",
+            "raw_metadata": {
+                **metadata,
+                "decision_count": len(decisions),
+            },
+            "interaction_date": _parse_timestamp(metadata.get("end_time")),
+        })
+    await store_raw_interactions(session, writes)
 
     logger.info(
         "Ingested session %s: %d turns, %d decisions",
@@ -362,23 +558,47 @@ async def scan_sessions(
     else:
         search_dirs = [d for d in base_dir.iterdir() if d.is_dir()]
 
+    watermarks = await _read_scan_watermarks(session)
+    advanced: dict[str, int] = {}
+
     for dir_path in search_dirs:
         if not dir_path.exists():
             continue
 
+        dir_key = str(dir_path)
+        watermark = watermarks.get(dir_key, 0)
+        high_mark = watermark
+        failed_mark: Optional[int] = None
+
+        # Files untouched since the last scan were already handled — skip
+        # them without a DB round-trip.
+        candidates: list[tuple[Path, int]] = []
         for jsonl_file in sorted(dir_path.glob("*.jsonl")):
             summary["sessions_found"] += 1
-            session_id = jsonl_file.stem
+            mtime_ns = jsonl_file.stat().st_mtime_ns
+            if mtime_ns <= watermark:
+                summary["sessions_skipped"] += 1
+                continue
+            candidates.append((jsonl_file, mtime_ns))
 
-            # Check if already ingested (by source_id)
-            existing = await session.execute(
-                select(RawInteraction).where(
-                    RawInteraction.source_type == "claude_code_session",
-                    RawInteraction.source_id == session_id,
-                )
+        if not candidates:
+            continue
+
+        # Check which candidates are already ingested (by source_id)
+        existing = await session.execute(
+            select(RawInteraction.source_id).where(
+                RawInteraction.source_type == "claude_code_session",
+                RawInteraction.source_id.in_([f.stem for f, _ in candidates]),
             )
-            if existing.scalar_one_or_none():
+        )
+        ingested_ids = set(existing.scalars().all())
+
+        for jsonl_file, mtime_ns in candidates:
+            session_id = jsonl_file.stem
+
+            if session_id in ingested_ids:
                 summary["sessions_skipped"] += 1
+                high_mark = max(high_mark, mtime_ns)
                 continue
 
             try:
@@ -388,8 +608,20 @@ async def scan_sessions(
                     summary["total_decisions"] += result["decisions_count"]
                 else:
                     summary["sessions_skipped"] += 1
+                high_mark = max(high_mark, mtime_ns)
             except Exception as e:
                 logger.error("Failed to ingest session %s: %s", session_id[:12], e)
+                failed_mark = mtime_ns if failed_mark is None else min(failed_mark, mtime_ns)
+
+        # Never advance past a failed file, so it is retried next scan
+        if failed_mark is not None:
+            high_mark = min(high_mark, failed_mark - 1)
+        if high_mark > watermark:
+            advanced[dir_key] = high_mark
+
+    # Written in the caller's transaction, so the watermark only moves
+    # forward if the ingested sessions are committed with it
+    await _write_scan_watermarks(session, advanced)
 
     logger.info(
         "Session scan: %d found, %d ingested, %d skipped, %d decisions",
@@ -401,12 +633,55 @@ async def scan_sessions(
     return summary
 
 
+async def _read_scan_watermarks(session: AsyncSession) -> dict[str, int]:
+    """Read per-directory mtime watermarks from the last session scan.
+
+    Returns:
+        Dict mapping directory path to the highest handled st_mtime_ns.
+    """
+    result = await session.execute(
+        select(SyncState.id, SyncState.cursor).where(SyncState.id.startswith(SCAN_WATERMARK_PREFIX))
+    )
+    watermarks = {}
+    for key, cursor in result.all():
+        try:
+            watermarks[key.removeprefix(SCAN_WATERMARK_PREFIX)] = int(cursor)
+        except (TypeError, ValueError):
+            logger.warning("Ignoring malformed session scan watermark %s: %r", key, cursor)
+    return watermarks
+
+
+async def _write_scan_watermarks(session: AsyncSession, watermarks: dict[str, int]) -> None:
+    """Upsert per-directory mtime watermarks into sync_state.
+
+    Args:
+        session: Database session; the write commits with the caller's transaction.
+        watermarks: Dict mapping directory path to st_mtime_ns.
+    """
+    if not watermarks:
+        return
+    now = datetime.now(timezone.utc)
+    stmt = pg_insert(SyncState).values([
+        {"id": f"{SCAN_WATERMARK_PREFIX}{dir_key}", "cursor": str(mark), "last_sync": now, "status": "ok"}
+        for dir_key, mark in watermarks.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SyncState.id],
+        set_={"cursor": stmt.excluded.cursor, "last_sync": stmt.excluded.last_sync, "status": stmt.excluded.status},
+    )
+    await session.execute(stmt)
+
+
 def _parse_timestamp(ts: Optional[str]) -> Optional[datetime]:
-    """Parse an ISO timestamp string, returning None on failure."""
+    """Parse an ISO timestamp string, returning None on failure.
+
+    Python 3.11's C-level fromisoformat accepts the trailing "Z" used in
+    Claude JSONL timestamps directly, so no string rewrite is needed.
+    """
     if not ts:
         return None
     try:
-        return datetime.fromisoformat(ts.replace("Z", "+00:00"))
+        return datetime.fromisoformat(ts)
     except (ValueError, TypeError):
         return None
 
@@ -435,13 +710,14 @@ def _extract_tool_names(content) -> list[str]:
     if not isinstance(content, list):
         return []
 
-    tools = []
-    for block in content:
-        if isinstance(block, dict) and block.get("type") == "tool_use":
-            name = block.get("name", "")
-            if name and name not in tools:
-                tools.append(name)
-    return tools
+    # dict.fromkeys dedups in one pass while preserving first-seen order
+    return list(dict.fromkeys(
+        name
+        for block in content
+        if isinstance(block, dict) and block.get("type") == "tool_use"
+        for name in (block.get("name", ""),)
+        if name
+    ))
 
 
 def parse_session_into_turns(path: Path) -> list[dict]:
@@ -466,38 +742,27 @@ def parse_session_into_turns(path: Path) -> list[dict]:
     with open(path) as f:
         for line in f:
             line = line.strip()
-            if not line:
+            if not line or not _may_be_message_line(line):
                 continue
 
-            try:
-                obj = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-
-            msg_type = obj.get("type")
-            if msg_type not in ("user", "assistant"):
-                continue
-
-            if obj.get("isSidechain") or obj.get("isMeta"):
-                continue
-
-            message = obj.get("message", {})
-            if not isinstance(message, dict):
+            record = _decode_session_line(line)
+            if record is None:
                 continue
+            message, timestamp, _ = record
 
             role = message.get("role", "")
             content = message.get("content", "")
             text_content = _extract_text_content(content)
 
             # Skip command messages
-            if text_content and text_content.strip().startswith(("<command-name>", "<local-command")):
+            if text_content and text_content.lstrip().startswith(_COMMAND_PREFIXES):
                 continue
 
             messages.append({
                 "role": role,
                 "content": content,
                 "text": text_content,
-                "timestamp": obj.get("timestamp", ""),
+                "timestamp": timestamp,
                 "model": message.get("model", ""),
                 "raw_line": line,
             })
@@ -517,6 +782,7 @@ def parse_session_into_turns(path: Path) -> list[dict]:
                 "user_message": msg["text"],
                 "assistant_texts": [],
                 "tool_names": [],
+                "tool_names_seen": set(),
                 "model_name": None,
                 "started_at": msg["timestamp"],
                 "ended_at": msg["timestamp"],
@@ -526,9 +792,10 @@ def parse_session_into_turns(path: Path) -> list[dict]:
             # Append to current turn
             if msg["text"]:
                 current_turn["assistant_texts"].append(msg["text"])
-            tools = _extract_tool_names(msg["content"])
-            for t in tools:
-                if t not in current_turn["tool_names"]:
+            seen = current_turn["tool_names_seen"]
+            for t in _extract_tool_names(msg["content"]):
+                if t not in seen:
+                    seen.add(t)
                     current_turn["tool_names"].append(t)
             if msg["model"] and not current_turn["model_name"]:
                 current_turn["model_name"] = msg["model"]
@@ -552,6 +819,7 @@ def _finalize_turn(turn: dict, index: int) -> None:
     """
     raw_jsonl = "\n".join(turn.pop("raw_lines"))
     assistant_text = "\n".join(turn.pop("assistant_texts"))
+    turn.pop("tool_names_seen", None)
 
     turn["turn_number"] = index
     turn["assistant_text"] = assistant_text
@@ -1,16 +1,32 @@
 """Google Drive ingestion via Changes API with shared OAuth credentials."""
 
+import asyncio
 import hashlib
+import io
 import logging
+from contextlib import aclosing
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.ingestion.accounts import get_oauth_token
-from src.storage.models import Document, EmailAccount, SyncState
-from src.storage.raw import store_raw_interaction
+from src.ingestion.google_api import (
+    GOOGLE_API_RETRIES,
+    RateLimiter,
+    get_cached_client,
+    new_authorized_http,
+    response_model,
+)
+from src.storage.models import Document, DriveFolder, EmailAccount, SyncState
+from src.storage.raw import store_raw_interaction, store_raw_interactions
+
+try:
+    import blake3
+except ImportError:  # optional: faster content hashing
+    blake3 = None
 
 logger = logging.getLogger(__name__)
 
@@ -32,24 +48,74 @@ EXPORT_MIME_MAP = {
     "application/vnd.google-apps.folder": None,
 }
 
+# Workspace types with an export format, checked with one set lookup.
+_EXPORTABLE_WORKSPACE_TYPES = frozenset(k for k, v in EXPORT_MIME_MAP.items() if v)
+
 # Non-Google MIME types we can download and extract text from.
 TEXT_MIME_PREFIXES = ("text/", "application/json", "application/xml", "application/javascript")
 
 # Max file size to download for text extraction (5 MB).
 MAX_DOWNLOAD_BYTES = 5 * 1024 * 1024
 
+# Bytes requested per ranged GET when streaming a download.
+DOWNLOAD_CHUNK_BYTES = 256 * 1024
 
-def _build_drive_service(token_data: dict):
-    """Build an authenticated Google Drive API service."""
+# Rows per drive_folders upsert statement.
+FOLDER_UPSERT_CHUNK = 500
+
+# Drive IDs per bulk UPDATE when clearing removed documents.
+REMOVE_CHUNK = 500
+
+# changes.list statuses meaning the start page token is invalid or expired.
+REJECTED_TOKEN_STATUSES = frozenset({400, 404, 410})
+
+# Drive per-user quota is 12,000 queries per minute; stay under it with headroom.
+DRIVE_REQUESTS_PER_SECOND = 150
+
+# Shared by listing and extraction threads so they respect the quota together.
+DRIVE_RATE_LIMITER = RateLimiter(DRIVE_REQUESTS_PER_SECOND)
+
+# Listing pages fetched ahead of processing during sync.
+LIST_PAGES_AHEAD = 2
+
+# Files whose existing Documents are prefetched in one query during sync.
+PREFETCH_CHUNK = 500
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+
+# Files exported/downloaded at once during sync, each on its own worker thread.
+DRIVE_EXTRACT_CONCURRENCY = 8
+
+# Columns store_document needs to decide whether an existing Document changed.
+_EXISTING_DOC_COLUMNS = (Document.id, Document.content_hash, Document.last_modified)
+
+
+def _build_drive_credentials(token_data: dict):
+    """Build (and refresh if expired) Drive OAuth credentials."""
     from google.auth.transport.requests import Request
     from google.oauth2.credentials import Credentials
-    from googleapiclient.discovery import build
 
     # Use scopes from the stored token (set during OAuth), not a hardcoded subset
     creds = Credentials.from_authorized_user_info(token_data)
     if creds.expired and creds.refresh_token:
         creds.refresh(Request())
-    return build("drive", "v3", credentials=creds)
+    return creds
+
+
+def _build_drive_service(credentials):
+    """Build an authenticated Google Drive API service."""
+    from googleapiclient.discovery import build
+
+    return build("drive", "v3", credentials=credentials, model=response_model())
+
+
+def _get_drive_client(account: EmailAccount, token_data: dict) -> tuple:
+    """Get (credentials, service) for an account, reusing one built earlier."""
+    return get_cached_client(
+        ("drive", account.id, token_data.get("refresh_token")),
+        lambda: _build_drive_credentials(token_data),
+        _build_drive_service,
+    )
 
 
 def _is_google_workspace_type(mime_type: str) -> bool:
@@ -59,18 +125,17 @@ def _is_google_workspace_type(mime_type: str) -> bool:
 
 def _should_extract_text(mime_type: str) -> bool:
     """Determine if we should attempt text extraction for this MIME type."""
-    if _is_google_workspace_type(mime_type):
-        return EXPORT_MIME_MAP.get(mime_type) is not None
-    return mime_type.startswith(TEXT_MIME_PREFIXES)
+    return mime_type in _EXPORTABLE_WORKSPACE_TYPES or mime_type.startswith(TEXT_MIME_PREFIXES)
 
 
-def _export_google_doc(service, file_id: str, mime_type: str) -> str:
+def _export_google_doc(service, file_id: str, mime_type: str, http=None) -> str:
     """Export a Google Workspace document as plain text.
 
     Args:
         service: Google Drive API service.
         file_id: The Drive file ID.
         mime_type: The Google Workspace MIME type.
+        http: Transport to use instead of the service's (one per worker thread).
 
     Returns:
         Exported text content, or empty string on failure.
@@ -83,7 +148,7 @@ def _export_google_doc(service, file_id: str, mime_type: str) -> str:
         response = service.files().export(
             fileId=file_id,
             mimeType=export_mime,
-        ).execute()
+        ).execute(http=http, num_retries=GOOGLE_API_RETRIES)
         if isinstance(response, bytes):
             return response.decode("utf-8", errors="replace")
         return str(response)
@@ -92,65 +157,149 @@ def _export_google_doc(service, file_id: str, mime_type: str) -> str:
         return ""
 
 
-def _download_file_text(service, file_id: str, size: int) -> str:
+def _download_file_text(service, file_id: str, size: int, http=None) -> str:
     """Download a non-Google file and return its text content.
 
-    Only downloads files under MAX_DOWNLOAD_BYTES to avoid memory issues.
+    Only downloads files under MAX_DOWNLOAD_BYTES to avoid memory issues. The
+    body is streamed in DOWNLOAD_CHUNK_BYTES pieces and abandoned as soon as
+    it passes the cap, since the reported size can be missing.
     """
+    from googleapiclient.http import MediaIoBaseDownload
+
     if size > MAX_DOWNLOAD_BYTES:
         logger.debug("Skipping large file %s (%d bytes)", file_id, size)
         return ""
 
     try:
-        response = service.files().get_media(fileId=file_id).execute()
-        if isinstance(response, bytes):
-            return response.decode("utf-8", errors="replace")
-        return str(response)
+        buf = io.BytesIO()
+        request = service.files().get_media(fileId=file_id)
+        if http is not None:
+            request.http = http
+        downloader = MediaIoBaseDownload(buf, request, chunksize=DOWNLOAD_CHUNK_BYTES)
+        done = False
+        while not done:
+            _, done = downloader.next_chunk(num_retries=GOOGLE_API_RETRIES)
+            if buf.tell() > MAX_DOWNLOAD_BYTES:
+                logger.debug("Aborting download of %s past %d bytes", file_id, MAX_DOWNLOAD_BYTES)
+                return ""
+        return buf.getvalue().decode("utf-8", errors="replace")
     except Exception as e:
         logger.warning("Failed to download file %s: %s", file_id, e)
         return ""
 
 
+def _extract_text(service, file_data: dict, http=None) -> str:
+    """Export or download the text of a Drive file (blocking HTTP)."""
+    mime_type = file_data.get("mimeType", "")
+    if mime_type in _EXPORTABLE_WORKSPACE_TYPES or mime_type.startswith(TEXT_MIME_PREFIXES):
+        DRIVE_RATE_LIMITER.acquire()
+    if mime_type in _EXPORTABLE_WORKSPACE_TYPES:
+        return _export_google_doc(service, file_data["id"], mime_type, http)
+    if mime_type.startswith(TEXT_MIME_PREFIXES):
+        return _download_file_text(service, file_data["id"], int(file_data.get("size", 0)), http)
+    return ""
+
+
+async def _extract_texts(service, credentials, files: list[dict]) -> dict[str, str]:
+    """Extract text for many files on a pool of worker threads.
+
+    Up to DRIVE_EXTRACT_CONCURRENCY workers pull files from a shared iterator;
+    each owns an authorized transport since httplib2 is not thread-safe. No
+    database access happens here, so the caller's session stays on one coroutine.
+
+    Returns:
+        {drive_id: text} for every file in files.
+    """
+    texts: dict[str, str] = {}
+    pending = iter(files)
+
+    async def _worker() -> None:
+        http = new_authorized_http(credentials)
+        for file_data in pending:
+            texts[file_data["id"]] = await asyncio.to_thread(_extract_text, service, file_data, http)
+
+    await asyncio.gather(*(_worker() for _ in range(min(DRIVE_EXTRACT_CONCURRENCY, len(files)))))
+    return texts
+
+
 def _build_folder_path(service, parents: list[str], cache: dict) -> str:
     """Resolve the folder path from parent IDs.
 
-    Uses a cache to avoid redundant API calls for the same folder.
-    Returns a path like "My Drive/Projects/Docs".
+    Walks ancestors through ``cache`` ({folder_id: (name, parent_id)}) and
+    only calls the API for folders missing from it, recording them in the
+    cache. Returns a path like "My Drive/Projects/Docs".
     """
     if not parents:
         return ""
 
-    parent_id = parents[0]  # Drive files have at most one parent
     parts = []
-    current = parent_id
-
-    # Walk up the tree, caching as we go
-    while current:
-        if current in cache:
-            parts.append(cache[current])
-            break
-
-        try:
-            folder = service.files().get(
-                fileId=current,
-                fields="id,name,parents",
-            ).execute()
-            name = folder.get("name", "")
-            cache[current] = name
-            parts.append(name)
+    current = parents[0]  # Drive files have at most one parent
+    seen = set()
+
+    while current and current not in seen:
+        seen.add(current)
+        if current not in cache:
+            try:
+                folder = service.files().get(
+                    fileId=current,
+                    fields="id,name,parents",
+                ).execute(num_retries=GOOGLE_API_RETRIES)
+            except Exception:
+                # Root or inaccessible — stop
+                break
             folder_parents = folder.get("parents", [])
-            current = folder_parents[0] if folder_parents else None
-        except Exception:
-            # Root or inaccessible — stop
-            break
+            cache[current] = (folder.get("name", ""), folder_parents[0] if folder_parents else None)
+
+        name, current = cache[current]
+        parts.append(name)
 
     parts.reverse()
     return "/".join(parts)
 
 
+async def _load_folder_cache(session: AsyncSession) -> dict[str, tuple[str, Optional[str]]]:
+    """Load all known Drive folders as {folder_id: (name, parent_id)}."""
+    result = await session.execute(select(DriveFolder.id, DriveFolder.name, DriveFolder.parent_id))
+    return {row.id: (row.name, row.parent_id) for row in result}
+
+
+async def _save_folder_cache(
+    session: AsyncSession,
+    cache: dict[str, tuple[str, Optional[str]]],
+    persisted: dict[str, tuple[str, Optional[str]]],
+) -> None:
+    """Upsert folders that are new or changed since the cache was loaded.
+
+    Args:
+        session: Database session.
+        cache: Folder cache after syncing.
+        persisted: Folder cache as loaded from the database.
+    """
+    rows = [
+        {"id": folder_id, "name": name, "parent_id": parent_id}
+        for folder_id, (name, parent_id) in cache.items()
+        if persisted.get(folder_id) != (name, parent_id)
+    ]
+    for start in range(0, len(rows), FOLDER_UPSERT_CHUNK):
+        stmt = pg_insert(DriveFolder).values(rows[start:start + FOLDER_UPSERT_CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_={"name": stmt.excluded.name, "parent_id": stmt.excluded.parent_id},
+        )
+        await session.execute(stmt)
+
+
 def _content_hash(text: str) -> str:
-    """Compute SHA-256 hash of text content for dedup."""
-    return hashlib.sha256(text.encode()).hexdigest()
+    """Compute a 64-hex-char hash of text content for dedup.
+
+    Uses BLAKE3 when installed, otherwise SHA-256. Both fit the content_hash
+    column; switching between them only makes each document's next changed
+    sync rewrite its row once.
+    """
+    data = text.encode()
+    if blake3 is not None:
+        return blake3.blake3(data).hexdigest()
+    return hashlib.sha256(data, usedforsecurity=False).hexdigest()
 
 
 # Fields we request from the Drive API for each file.
@@ -159,52 +308,95 @@ FILES_LIST_FIELDS = f"nextPageToken,files({FILE_FIELDS})"
 CHANGES_LIST_FIELDS = f"nextPageToken,newStartPageToken,changes(fileId,removed,file({FILE_FIELDS}))"
 
 
+async def _iter_pages(fetch_page: Callable[[Optional[str]], dict], page_token: Optional[str] = None):
+    """Yield list-API pages while the following pages are fetched in the background.
+
+    A producer task calls the blocking fetch_page(page_token) in a worker
+    thread and queues up to LIST_PAGES_AHEAD pages, so page round-trips
+    overlap with whatever the caller does between iterations. The producer
+    only does HTTP; the caller keeps sole use of the database session.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=LIST_PAGES_AHEAD)
+
+    async def _produce() -> None:
+        token = page_token
+        try:
+            while True:
+                result = await asyncio.to_thread(fetch_page, token)
+                await queue.put(result)
+                token = result.get("nextPageToken")
+                if not token:
+                    break
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(None)
+
+    producer = asyncio.create_task(_produce())
+    try:
+        while (item := await queue.get()) is not None:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        producer.cancel()
+
+
 async def fetch_files_full(
     session: AsyncSession,
     account: EmailAccount,
     max_results: int = 1000,
+    on_files: Optional[Callable[[list[dict]], Awaitable[None]]] = None,
 ) -> list[dict]:
     """Full sync — list all files in Drive for initial onboarding.
 
+    ``on_files`` is awaited with each page of files as it arrives, while the
+    next pages are fetched, so callers can process during listing.
+
     Returns list of raw file metadata dicts from the Drive API.
     """
     token_data = await get_oauth_token(session, account.id)
     if not token_data:
         raise ValueError(f"No OAuth token for account {account.name}")
 
-    service = _build_drive_service(token_data)
-    files = []
-    page_token = None
+    credentials, service = _get_drive_client(account, token_data)
+    http = new_authorized_http(credentials)
 
-    while len(files) < max_results:
-        page_size = min(100, max_results - len(files))
-        result = service.files().list(
-            pageSize=page_size,
+    # Take the start token before listing so changes made meanwhile are not lost
+    start_token = service.changes().getStartPageToken().execute()
+
+    def _fetch_page(page_token: Optional[str]) -> dict:
+        DRIVE_RATE_LIMITER.acquire()
+        return service.files().list(
+            pageSize=100,
             pageToken=page_token,
             fields=FILES_LIST_FIELDS,
             q="trashed = false",
             orderBy="modifiedTime desc",
-        ).execute()
+        ).execute(http=http)
 
-        batch = result.get("files", [])
-        if not batch:
-            break
-        files.extend(batch)
-
-        page_token = result.get("nextPageToken")
-        if not page_token:
-            break
+    files = []
+    async with aclosing(_iter_pages(_fetch_page)) as pages:
+        async for result in pages:
+            batch = result.get("files", [])[:max_results - len(files)]
+            if not batch:
+                break
+            files.extend(batch)
+            if on_files:
+                await on_files(batch)
+            if len(files) >= max_results:
+                break
 
     logger.info("Full Drive sync: fetched %d files for account %s", len(files), account.name)
 
-    # Get a start page token for future incremental syncs
-    start_token = service.changes().getStartPageToken().execute()
+    # Record the start page token for future incremental syncs
     sync_key = f"drive:{account.name}"
     sync_state = await session.get(SyncState, sync_key)
     if sync_state is None:
         sync_state = SyncState(id=sync_key, account_id=account.id)
         session.add(sync_state)
     sync_state.cursor = start_token.get("startPageToken")
+    sync_state.cursor_overlap = None
     sync_state.last_sync = datetime.now(timezone.utc)
     sync_state.status = "ok"
     await session.flush()
@@ -212,12 +404,72 @@ async def fetch_files_full(
     return files
 
 
+def _is_rejected_page_token(exc: BaseException) -> bool:
+    """Check if a changes.list error means the start page token is invalid."""
+    from googleapiclient.errors import HttpError
+
+    return isinstance(exc, HttpError) and exc.resp.status in REJECTED_TOKEN_STATUSES
+
+
+async def _list_changes(
+    service,
+    credentials,
+    page_token: str,
+    on_files: Optional[Callable[[list[dict]], Awaitable[None]]] = None,
+) -> tuple[list[dict], list[str], Optional[str]]:
+    """Page through the Changes API from page_token.
+
+    ``on_files`` is awaited with each page's changed files as it arrives.
+
+    Returns:
+        (changed_files, removed_file_ids, new_start_page_token).
+    """
+    http = new_authorized_http(credentials)
+
+    def _fetch_page(token: Optional[str]) -> dict:
+        DRIVE_RATE_LIMITER.acquire()
+        return service.changes().list(
+            pageToken=token,
+            spaces="drive",
+            includeRemoved=True,
+            fields=CHANGES_LIST_FIELDS,
+            pageSize=100,
+        ).execute(http=http)
+
+    changed_files = []
+    removed_ids = []
+    new_start_token = None
+
+    async with aclosing(_iter_pages(_fetch_page, page_token)) as pages:
+        async for result in pages:
+            page_files = []
+            for change in result.get("changes", []):
+                if change.get("removed"):
+                    removed_ids.append(change["fileId"])
+                elif change.get("file"):
+                    file_data = change["file"]
+                    if not file_data.get("trashed"):
+                        page_files.append(file_data)
+            changed_files.extend(page_files)
+            if on_files and page_files:
+                await on_files(page_files)
+
+            # newStartPageToken comes on the last page, once all changes are consumed
+            if "newStartPageToken" in result:
+                new_start_token = result["newStartPageToken"]
+
+    return changed_files, removed_ids, new_start_token
+
+
 async def fetch_files_incremental(
     session: AsyncSession,
     account: EmailAccount,
+    on_files: Optional[Callable[[list[dict]], Awaitable[None]]] = None,
 ) -> tuple[list[dict], list[str]]:
     """Incremental sync using the Changes API.
 
+    ``on_files`` is awaited with each page of changed files as it arrives.
+
     Returns:
         (changed_files, removed_file_ids) — files that changed and IDs that were removed.
     """
@@ -230,38 +482,35 @@ async def fetch_files_incremental(
 
     if not sync_state or not sync_state.cursor:
         logger.info("No Drive sync cursor for %s, falling back to full sync", account.name)
-        files = await fetch_files_full(session, account, max_results=500)
+        files = await fetch_files_full(session, account, max_results=500, on_files=on_files)
         return files, []
 
-    service = _build_drive_service(token_data)
-    changed_files = []
-    removed_ids = []
-    page_token = sync_state.cursor
+    credentials, service = _get_drive_client(account, token_data)
 
-    while page_token:
-        result = service.changes().list(
-            pageToken=page_token,
-            spaces="drive",
-            includeRemoved=True,
-            fields=CHANGES_LIST_FIELDS,
-            pageSize=100,
-        ).execute()
-
-        for change in result.get("changes", []):
-            if change.get("removed"):
-                removed_ids.append(change["fileId"])
-            elif change.get("file"):
-                file_data = change["file"]
-                if not file_data.get("trashed"):
-                    changed_files.append(file_data)
-
-        # newStartPageToken means we've consumed all changes
-        if "newStartPageToken" in result:
-            page_token = None
-            sync_state.cursor = result["newStartPageToken"]
-        else:
-            page_token = result.get("nextPageToken")
+    # Try the cursor, then the overlap cursor (one sync earlier) if Drive
+    # rejects it; replayed changes are skipped by store_document's mtime check
+    start_tokens = [sync_state.cursor]
+    if sync_state.cursor_overlap and sync_state.cursor_overlap != sync_state.cursor:
+        start_tokens.append(sync_state.cursor_overlap)
+
+    for start_token in start_tokens:
+        try:
+            changed_files, removed_ids, new_start_token = await _list_changes(
+                service, credentials, start_token, on_files,
+            )
+            break
+        except Exception as e:
+            if not _is_rejected_page_token(e):
+                raise
+            logger.warning("Drive page token rejected for %s: %s", account.name, e)
+    else:
+        logger.info("No usable Drive cursor for %s, falling back to full sync", account.name)
+        files = await fetch_files_full(session, account, max_results=500, on_files=on_files)
+        return files, []
 
+    if new_start_token and new_start_token != start_token:
+        sync_state.cursor_overlap = start_token
+        sync_state.cursor = new_start_token
     sync_state.last_sync = datetime.now(timezone.utc)
     sync_state.status = "ok"
     await session.flush()
@@ -273,15 +522,45 @@ async def fetch_files_incremental(
     return changed_files, removed_ids
 
 
+def _parse_modified_time(file_data: dict) -> Optional[datetime]:
+    """Parse a Drive file's modifiedTime, or None if missing/invalid."""
+    if not file_data.get("modifiedTime"):
+        return None
+    try:
+        # Python 3.11+ parses the trailing "Z" natively
+        return datetime.fromisoformat(file_data["modifiedTime"])
+    except (ValueError, TypeError):
+        return None
+
+
+def _is_unchanged(existing, last_modified: Optional[datetime]) -> bool:
+    """Check if a stored document's text is current for this modifiedTime."""
+    return bool(
+        existing and existing.content_hash and last_modified
+        and existing.last_modified == last_modified
+    )
+
+
 async def store_document(
     session: AsyncSession,
     account: EmailAccount,
     file_data: dict,
     service,
     folder_cache: dict,
+    existing_docs: Optional[dict] = None,
+    extracted_texts: Optional[dict[str, str]] = None,
+    raw_items: Optional[list[dict]] = None,
 ) -> Optional[Document]:
     """Process a Drive file and store/update it in the database.
 
+    ``existing_docs`` is a prefetched {drive_id: (id, content_hash, last_modified)}
+    map from _prefetch_documents covering this file; when omitted the document
+    is looked up individually. The full Document is only loaded when it changed.
+    ``extracted_texts`` holds text already fetched by _extract_texts; files
+    missing from it are exported/downloaded here. When ``raw_items`` is given,
+    the raw interaction is appended to it and nothing is flushed, so the
+    caller can store and flush a whole batch with store_raw_interactions.
+
     Returns the Document if created/updated, None if skipped (no change or unsupported).
     """
     drive_id = file_data["id"]
@@ -289,17 +568,29 @@ async def store_document(
     title = file_data.get("name", "")
 
     # Skip folders and unsupported Workspace types
-    if mime_type == "application/vnd.google-apps.folder":
+    if mime_type == FOLDER_MIME_TYPE:
+        return None
+
+    last_modified = _parse_modified_time(file_data)
+
+    # Check for existing document, reading only the columns the skip needs
+    if existing_docs is not None:
+        existing = existing_docs.get(drive_id)
+    else:
+        result = await session.execute(
+            select(*_EXISTING_DOC_COLUMNS).where(Document.drive_id == drive_id)
+        )
+        existing = result.first()
+
+    # Unmodified since we stored its text — skip the download and hash
+    if _is_unchanged(existing, last_modified):
         return None
 
-    # Extract text content
-    text_content = ""
-    if _should_extract_text(mime_type):
-        if _is_google_workspace_type(mime_type):
-            text_content = _export_google_doc(service, drive_id, mime_type)
-        else:
-            file_size = int(file_data.get("size", 0))
-            text_content = _download_file_text(service, drive_id, file_size)
+    # Extract text content (blocking HTTP, kept off the event loop)
+    if extracted_texts is not None and drive_id in extracted_texts:
+        text_content = extracted_texts[drive_id]
+    else:
+        text_content = await asyncio.to_thread(_extract_text, service, file_data)
 
     # Compute content hash for dedup
     new_hash = _content_hash(text_content) if text_content else None
@@ -308,28 +599,18 @@ async def store_document(
     parents = file_data.get("parents", [])
     folder_path = _build_folder_path(service, parents, folder_cache) if parents else ""
 
-    # Parse modification time
-    last_modified = None
-    if file_data.get("modifiedTime"):
-        try:
-            last_modified = datetime.fromisoformat(
-                file_data["modifiedTime"].replace("Z", "+00:00")
-            )
-        except (ValueError, TypeError):
-            pass
-
-    # Check for existing document
-    existing = await session.execute(
-        select(Document).where(Document.drive_id == drive_id)
-    )
-    doc = existing.scalar_one_or_none()
-
-    if doc:
-        # Content hasn't changed — skip
-        if new_hash and doc.content_hash == new_hash:
+    if existing:
+        # Content hasn't changed — record the new mtime so the next sync can
+        # skip the export, without loading the full row
+        if new_hash and existing.content_hash == new_hash:
+            if last_modified and existing.last_modified != last_modified:
+                await session.execute(
+                    update(Document).where(Document.id == existing.id).values(last_modified=last_modified)
+                )
             return None
 
         # Update existing document
+        doc = await session.get(Document, existing.id)
         doc.title = title
         doc.mime_type = mime_type
         doc.folder_path = folder_path
@@ -350,30 +631,50 @@ async def store_document(
         )
         session.add(doc)
 
-    await session.flush()
-
     # Store raw interaction for permanent archive
+    raw_item = None
     if text_content:
-        raw_content = f"Title: {title}\nPath: {folder_path}\nType: {mime_type}\n\n{text_content}"
-        await store_raw_interaction(
-            session=session,
-            source_type="drive",
-            raw_content=raw_content,
-            source_id=drive_id,
-            account_id=account.id,
-            raw_metadata={
+        raw_item = {
+            "source_type": "drive",
+            "raw_content": f"Title: {title}\nPath: {folder_path}\nType: {mime_type}\n\n{text_content}",
+            "source_id": drive_id,
+            "account_id": account.id,
+            "raw_metadata": {
                 "title": title,
                 "mime_type": mime_type,
                 "folder_path": folder_path,
                 "modified_time": file_data.get("modifiedTime"),
             },
-            interaction_date=last_modified,
-        )
+            "interaction_date": last_modified,
+        }
+
+    if raw_items is not None:
+        if raw_item:
+            raw_items.append(raw_item)
+    else:
+        await session.flush()
+        if raw_item:
+            await store_raw_interaction(session=session, **raw_item)
 
     logger.debug("Stored document: %s (%s)", title, drive_id)
     return doc
 
 
+async def _prefetch_documents(session: AsyncSession, drive_ids: list[str]) -> dict:
+    """Look up existing Documents for a batch of Drive IDs in one query.
+
+    Returns:
+        {drive_id: row} with only the id, content_hash and last_modified columns,
+        so extracted_text is never transferred for unchanged files.
+    """
+    if not drive_ids:
+        return {}
+    result = await session.execute(
+        select(Document.drive_id, *_EXISTING_DOC_COLUMNS).where(Document.drive_id.in_(drive_ids))
+    )
+    return {row.drive_id: row for row in result.all()}
+
+
 async def remove_documents(
     session: AsyncSession,
     removed_ids: list[str],
@@ -385,22 +686,70 @@ async def remove_documents(
     Returns count of documents updated.
     """
     count = 0
-    for drive_id in removed_ids:
+    for start in range(0, len(removed_ids), REMOVE_CHUNK):
         result = await session.execute(
-            select(Document).where(Document.drive_id == drive_id)
+            update(Document)
+            .where(Document.drive_id.in_(removed_ids[start:start + REMOVE_CHUNK]))
+            .values(extracted_text=None, content_hash=None)
+            .returning(Document.id)
         )
-        doc = result.scalar_one_or_none()
-        if doc:
-            doc.extracted_text = None
-            doc.content_hash = None
-            count += 1
+        count += len(result.all())
 
     if count:
-        await session.flush()
         logger.info("Marked %d documents as removed", count)
     return count
 
 
+def _refresh_folder_cache(folder_cache: dict, files: list[dict]) -> None:
+    """Update the folder cache from listed folders, which carry fresh names/parents."""
+    for file_data in files:
+        if file_data.get("mimeType") == FOLDER_MIME_TYPE:
+            parents = file_data.get("parents", [])
+            folder_cache[file_data["id"]] = (file_data.get("name", ""), parents[0] if parents else None)
+
+
+async def _store_chunk(
+    session: AsyncSession,
+    account: EmailAccount,
+    service,
+    credentials,
+    folder_cache: dict,
+    chunk: list[dict],
+    summary: dict,
+) -> None:
+    """Store a chunk of listed files, updating summary counts.
+
+    Prefetches existing documents, extracts changed files' text concurrently,
+    then writes sequentially on the session with one raw-archive pass and flush.
+    """
+    existing_docs = await _prefetch_documents(session, [f["id"] for f in chunk])
+    to_extract = [
+        f for f in chunk
+        if _should_extract_text(f.get("mimeType", ""))
+        and not _is_unchanged(existing_docs.get(f["id"]), _parse_modified_time(f))
+    ]
+    extracted_texts = await _extract_texts(service, credentials, to_extract)
+    raw_items: list[dict] = []
+
+    for file_data in chunk:
+        try:
+            doc = await store_document(
+                session, account, file_data, service, folder_cache,
+                existing_docs, extracted_texts, raw_items,
+            )
+            if doc:
+                summary["files_synced"] += 1
+            else:
+                summary["files_skipped"] += 1
+        except Exception as e:
+            logger.error("Failed to process Drive file %s: %s", file_data.get("id"), e)
+            summary["errors"] += 1
+
+    # One dedup query and one flush for the whole chunk
+    await store_raw_interactions(session, raw_items)
+    await session.flush()
+
+
 async def sync_drive(
     session: AsyncSession,
     account: EmailAccount,
@@ -421,36 +770,40 @@ async def sync_drive(
         return summary
 
     try:
-        service = _build_drive_service(token_data)
+        credentials, service = _get_drive_client(account, token_data)
     except Exception as e:
         logger.error("Failed to build Drive service for %s: %s", account.name, e)
         summary["errors"] += 1
         return summary
 
-    folder_cache: dict[str, str] = {}
+    folder_cache = await _load_folder_cache(session)
+    persisted_folders = dict(folder_cache)
     removed_ids: list[str] = []
+    pending: list[dict] = []
+
+    # Process listed files in chunks as pages arrive; the next pages are
+    # fetched in the background meanwhile
+    async def _on_files(batch: list[dict]) -> None:
+        _refresh_folder_cache(folder_cache, batch)
+        pending.extend(batch)
+        while len(pending) >= PREFETCH_CHUNK:
+            chunk = pending[:PREFETCH_CHUNK]
+            del pending[:PREFETCH_CHUNK]
+            await _store_chunk(session, account, service, credentials, folder_cache, chunk, summary)
 
     if full:
-        file_list = await fetch_files_full(session, account)
+        await fetch_files_full(session, account, on_files=_on_files)
     else:
-        file_list, removed_ids = await fetch_files_incremental(session, account)
-
-    # Process changed files
-    for file_data in file_list:
-        try:
-            doc = await store_document(session, account, file_data, service, folder_cache)
-            if doc:
-                summary["files_synced"] += 1
-            else:
-                summary["files_skipped"] += 1
-        except Exception as e:
-            logger.error("Failed to process Drive file %s: %s", file_data.get("id"), e)
-            summary["errors"] += 1
+        _, removed_ids = await fetch_files_incremental(session, account, on_files=_on_files)
+    if pending:
+        await _store_chunk(session, account, service, credentials, folder_cache, pending, summary)
 
     # Handle removals
     if removed_ids:
         summary["files_removed"] = await remove_documents(session, removed_ids)
 
+    await _save_folder_cache(session, folder_cache, persisted_folders)
+
     logger.info(
         "Drive sync for %s: %d synced, %d removed, %d skipped, %d errors",
         account.name,
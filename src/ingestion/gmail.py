@@ -1,9 +1,11 @@
 """Gmail ingestion via Google OAuth 2.0 and Gmail API."""
 
+import asyncio
 import base64
 import logging
-from datetime import datetime, timezone
-from email.utils import parsedate_to_datetime
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import parseaddr, parsedate_to_datetime
 from typing import Optional
 from uuid import UUID
 
@@ -12,12 +14,23 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.config import get_settings
 from src.ingestion.accounts import get_oauth_token, store_oauth_token, update_sync_cursor
+from src.ingestion.google_api import (
+    GOOGLE_API_RETRIES,
+    RateLimiter,
+    backoff_delay,
+    get_cached_client,
+    is_retryable_error,
+    new_authorized_http,
+    response_model,
+    retry_after_seconds,
+)
 from src.storage.models import Email, EmailAccount, SyncState
-from src.storage.raw import store_raw_interaction
+from src.storage.raw import store_raw_interaction, store_raw_interactions
 
 logger = logging.getLogger(__name__)
 
@@ -29,13 +42,50 @@ SCOPES = [
 
 CREDENTIALS_PATH = "~/.config/focus/google_credentials.json"
 
+# Sub-requests per Gmail batch HTTP request. The API accepts up to 100, but
+# Gmail rate-limits batches larger than 50.
+GMAIL_BATCH_SIZE = 50
 
-def _build_gmail_service(token_data: dict):
-    """Build an authenticated Gmail API service."""
+# Message IDs checked against the DB, and emails inserted, per statement during sync.
+PREFETCH_CHUNK = 500
+
+# How far before the last sync to re-list when the history cursor has expired.
+GMAIL_RESYNC_OVERLAP = timedelta(days=1)
+
+# Gmail per-user quota: 250 units/second; messages.get costs 5 units.
+GMAIL_QUOTA_UNITS_PER_SECOND = 250
+GMAIL_GET_QUOTA_UNITS = 5
+
+# Shared across fetch threads so concurrent batches respect the quota together.
+GMAIL_RATE_LIMITER = RateLimiter(GMAIL_QUOTA_UNITS_PER_SECOND)
+
+# Batch requests in flight at once, each on its own worker thread.
+GMAIL_FETCH_CONCURRENCY = 4
+
+# Rounds of retrying sub-requests that hit rate limits or 5xx errors.
+GMAIL_BATCH_RETRIES = 3
+
+
+def _build_gmail_credentials(token_data: dict) -> Credentials:
+    """Build (and refresh if expired) Gmail OAuth credentials."""
     creds = Credentials.from_authorized_user_info(token_data, SCOPES)
     if creds.expired and creds.refresh_token:
         creds.refresh(Request())
-    return build("gmail", "v1", credentials=creds)
+    return creds
+
+
+def _build_gmail_service(credentials: Credentials):
+    """Build an authenticated Gmail API service."""
+    return build("gmail", "v1", credentials=credentials, model=response_model())
+
+
+def _get_gmail_client(account: EmailAccount, token_data: dict) -> tuple[Credentials, object]:
+    """Get (credentials, service) for an account, reusing one built earlier."""
+    return get_cached_client(
+        ("gmail", account.id, token_data.get("refresh_token")),
+        lambda: _build_gmail_credentials(token_data),
+        _build_gmail_service,
+    )
 
 
 def run_oauth_flow(credentials_path: Optional[str] = None) -> dict:
@@ -55,82 +105,238 @@ def run_oauth_flow(credentials_path: Optional[str] = None) -> dict:
     }
 
 
+# Lowercased header name -> key in the parsed headers dict. Keys are
+# normalized here once, so consumers of Email.raw_headers never need to
+# try several spellings of a header name.
+_WANTED_HEADERS = {
+    "from": "from",
+    "to": "to",
+    "subject": "subject",
+    "date": "date",
+    "message-id": "message_id",
+    "reply-to": "reply_to",
+    "cc": "cc",
+    "list-unsubscribe": "list_unsubscribe",
+    "precedence": "precedence",
+}
+
+
 def _parse_email_headers(headers: list[dict]) -> dict:
-    """Extract useful headers from Gmail message headers."""
-    result = {}
-    header_map = {h["name"].lower(): h["value"] for h in headers}
-    result["from"] = header_map.get("from", "")
-    result["to"] = header_map.get("to", "")
-    result["subject"] = header_map.get("subject", "")
-    result["date"] = header_map.get("date", "")
-    result["message_id"] = header_map.get("message-id", "")
-    result["reply_to"] = header_map.get("reply-to", "")
-    result["cc"] = header_map.get("cc", "")
+    """Extract useful headers from Gmail message headers.
+
+    Single pass that keeps the first occurrence of each wanted header and
+    stops once all have been seen.
+    """
+    result = dict.fromkeys(_WANTED_HEADERS.values(), "")
+    remaining = dict(_WANTED_HEADERS)
+    pop = remaining.pop
+    for header in headers:
+        name = header["name"]
+        # islower() is a cheap check that skips allocating a lowercased copy
+        key = pop(name if name.islower() else name.lower(), None)
+        if key is not None:
+            result[key] = header["value"]
+            if not remaining:
+                break
     return result
 
 
+def _parse_internal_date(value) -> Optional[datetime]:
+    """Convert Gmail's internalDate (epoch milliseconds, as a string) to a UTC datetime."""
+    if not value:
+        return None
+    try:
+        return datetime.fromtimestamp(int(value) / 1000, tz=timezone.utc)
+    except (ValueError, TypeError, OverflowError, OSError):
+        return None
+
+
 def _extract_body(payload: dict) -> str:
-    """Recursively extract the text body from a Gmail message payload."""
-    if payload.get("mimeType") == "text/plain" and payload.get("body", {}).get("data"):
-        return base64.urlsafe_b64decode(payload["body"]["data"]).decode("utf-8", errors="replace")
+    """Extract the text body from a Gmail message payload.
+
+    Walks the MIME tree iteratively in document order, returning the first
+    text/plain part; the first text/html part is used only if the whole tree
+    has no plain text.
+    """
+    html_data = None
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        mime_type = part.get("mimeType", "")
+        data = part.get("body", {}).get("data")
+        if data:
+            if mime_type == "text/plain":
+                return base64.urlsafe_b64decode(data).decode("utf-8", errors="replace")
+            if mime_type == "text/html" and html_data is None:
+                html_data = data
+        elif mime_type.startswith("multipart/"):
+            stack.extend(reversed(part.get("parts", ())))
+
+    if html_data:
+        return base64.urlsafe_b64decode(html_data).decode("utf-8", errors="replace")
+    return ""
+
+
+def _batch_get_messages(service, msg_ids: list[str], fmt: str = "full", http=None) -> list[dict]:
+    """Fetch messages with batched HTTP requests instead of one call per ID.
+
+    Batches are paced by GMAIL_RATE_LIMITER to stay within the per-user
+    quota. Sub-requests that fail with a rate limit or 5xx error are retried
+    with exponential backoff (at least any Retry-After the server sent); other
+    failures are logged and dropped.
+
+    Args:
+        service: Gmail API service.
+        msg_ids: Message IDs to fetch.
+        fmt: Gmail message format ("full", "metadata", "minimal").
+        http: Transport to execute on. Required when called off the main
+            thread, since the service's own transport is not thread-safe.
+
+    Returns:
+        Fetched messages in the order of msg_ids.
+    """
+    results: dict[str, dict] = {}
+    retry_ids: list[str] = []
+
+    retry_after: list[float] = []
+
+    def _callback(request_id: str, response: dict, exception: Exception) -> None:
+        if exception is None:
+            results[request_id] = response
+        elif is_retryable_error(exception):
+            retry_ids.append(request_id)
+            if (seconds := retry_after_seconds(exception)) is not None:
+                retry_after.append(seconds)
+        else:
+            logger.warning("Failed to fetch message %s: %s", request_id, exception)
+
+    pending = msg_ids
+    for attempt in range(GMAIL_BATCH_RETRIES + 1):
+        for start in range(0, len(pending), GMAIL_BATCH_SIZE):
+            chunk = pending[start:start + GMAIL_BATCH_SIZE]
+            batch = service.new_batch_http_request(callback=_callback)
+            for msg_id in chunk:
+                batch.add(
+                    service.users().messages().get(userId="me", id=msg_id, format=fmt),
+                    request_id=msg_id,
+                )
+            GMAIL_RATE_LIMITER.acquire(GMAIL_GET_QUOTA_UNITS * len(chunk))
+            batch.execute(http=http)
+
+        if not retry_ids:
+            break
+        if attempt == GMAIL_BATCH_RETRIES:
+            logger.warning("Giving up on %d rate-limited messages", len(retry_ids))
+            break
+        time.sleep(backoff_delay(attempt, max(retry_after, default=None)))
+        pending, retry_ids, retry_after = retry_ids, [], []
 
-    if payload.get("mimeType", "").startswith("multipart/"):
-        for part in payload.get("parts", []):
-            body = _extract_body(part)
-            if body:
-                return body
+    return [results[msg_id] for msg_id in msg_ids if msg_id in results]
 
-    # Fallback: try HTML
-    if payload.get("mimeType") == "text/html" and payload.get("body", {}).get("data"):
-        return base64.urlsafe_b64decode(payload["body"]["data"]).decode("utf-8", errors="replace")
 
-    return ""
+async def _fetch_messages(service, credentials, msg_ids: list[str], fmt: str = "full") -> list[dict]:
+    """Fetch messages concurrently, one batch request per worker thread.
+
+    At most GMAIL_FETCH_CONCURRENCY batches are in flight; each thread gets
+    its own authorized transport.
+
+    Returns:
+        Fetched messages in the order of msg_ids.
+    """
+    sem = asyncio.Semaphore(GMAIL_FETCH_CONCURRENCY)
+
+    async def _fetch_chunk(chunk: list[str]) -> list[dict]:
+        async with sem:
+            http = new_authorized_http(credentials)
+            return await asyncio.to_thread(_batch_get_messages, service, chunk, fmt, http)
+
+    chunks = [msg_ids[i:i + GMAIL_BATCH_SIZE] for i in range(0, len(msg_ids), GMAIL_BATCH_SIZE)]
+    fetched = await asyncio.gather(*(_fetch_chunk(chunk) for chunk in chunks))
+    return [msg for chunk_msgs in fetched for msg in chunk_msgs]
+
+
+async def _prefetch_gmail_ids(
+    session: AsyncSession,
+    account: EmailAccount,
+    gmail_ids: list[str],
+) -> set[str]:
+    """Return which of gmail_ids are already stored for the account, in one query."""
+    if not gmail_ids:
+        return set()
+    result = await session.execute(
+        select(Email.gmail_id).where(
+            Email.account_id == account.id,
+            Email.gmail_id.in_(gmail_ids),
+        )
+    )
+    return set(result.scalars().all())
+
+
+async def _filter_unknown_ids(
+    session: AsyncSession,
+    account: EmailAccount,
+    msg_ids: list[str],
+) -> list[str]:
+    """Drop IDs already stored for the account, so only new messages are fetched in full."""
+    unknown: list[str] = []
+    for start in range(0, len(msg_ids), PREFETCH_CHUNK):
+        chunk = msg_ids[start:start + PREFETCH_CHUNK]
+        known = await _prefetch_gmail_ids(session, account, chunk)
+        unknown.extend(msg_id for msg_id in chunk if msg_id not in known)
+    return unknown
 
 
 async def fetch_emails_full(
     session: AsyncSession,
     account: EmailAccount,
     max_results: int = 0,
+    query: Optional[str] = None,
 ) -> list[dict]:
-    """Full sync — fetch all emails. Set max_results=0 for unlimited."""
+    """Full sync — fetch all emails. Set max_results=0 for unlimited.
+
+    ``query`` is a Gmail search expression (e.g. "after:1767225600") that
+    limits the listing, used to recover from an expired history cursor.
+    """
     token_data = await get_oauth_token(session, account.id)
     if not token_data:
         raise ValueError(f"No OAuth token for account {account.name}")
 
-    service = _build_gmail_service(token_data)
-    messages = []
+    credentials, service = _get_gmail_client(account, token_data)
+    msg_ids: list[str] = []
     page_token = None
 
-    while max_results == 0 or len(messages) < max_results:
-        batch_size = 100 if max_results == 0 else min(100, max_results - len(messages))
+    # Capture the mailbox history point before listing so the cursor no longer
+    # depends on which messages end up being fetched
+    profile = service.users().getProfile(userId="me").execute(num_retries=GOOGLE_API_RETRIES)
+
+    # List all IDs first so bodies can be fetched concurrently across pages
+    while max_results == 0 or len(msg_ids) < max_results:
+        batch_size = 100 if max_results == 0 else min(100, max_results - len(msg_ids))
         result = service.users().messages().list(
             userId="me",
             maxResults=batch_size,
             pageToken=page_token,
-        ).execute()
+            q=query,
+        ).execute(num_retries=GOOGLE_API_RETRIES)
 
         msg_refs = result.get("messages", [])
         if not msg_refs:
             break
-
-        for ref in msg_refs:
-            msg = service.users().messages().get(
-                userId="me",
-                id=ref["id"],
-                format="full",
-            ).execute()
-            messages.append(msg)
+        msg_ids.extend(ref["id"] for ref in msg_refs)
 
         page_token = result.get("nextPageToken")
         if not page_token:
             break
 
-    logger.info("Fetched %d emails for account %s", len(messages), account.name)
+    new_ids = await _filter_unknown_ids(session, account, msg_ids)
+    messages = await _fetch_messages(service, credentials, new_ids)
+    logger.info(
+        "Fetched %d emails for account %s (%d already stored)",
+        len(messages), account.name, len(msg_ids) - len(new_ids),
+    )
 
-    # Update sync cursor to latest historyId
-    if messages:
-        latest_history = max(int(m.get("historyId", 0)) for m in messages)
-        await update_sync_cursor(session, account.id, str(latest_history))
+    if profile.get("historyId"):
+        await update_sync_cursor(session, account.id, str(profile["historyId"]))
 
     return messages
 
@@ -148,28 +354,30 @@ async def fetch_emails_incremental(
         logger.info("No sync cursor for %s, falling back to full sync", account.name)
         return await fetch_emails_full(session, account)
 
-    service = _build_gmail_service(token_data)
+    credentials, service = _get_gmail_client(account, token_data)
     messages = []
 
     try:
-        history = service.users().history().list(
-            userId="me",
-            startHistoryId=account.sync_cursor,
-            historyTypes=["messageAdded"],
-        ).execute()
-
         new_msg_ids = set()
-        for record in history.get("history", []):
-            for msg_added in record.get("messagesAdded", []):
-                new_msg_ids.add(msg_added["message"]["id"])
-
-        for msg_id in new_msg_ids:
-            msg = service.users().messages().get(
+        page_token = None
+        while True:
+            history = service.users().history().list(
                 userId="me",
-                id=msg_id,
-                format="full",
-            ).execute()
-            messages.append(msg)
+                startHistoryId=account.sync_cursor,
+                historyTypes=["messageAdded"],
+                pageToken=page_token,
+            ).execute(num_retries=GOOGLE_API_RETRIES)
+
+            for record in history.get("history", []):
+                for msg_added in record.get("messagesAdded", []):
+                    new_msg_ids.add(msg_added["message"]["id"])
+
+            page_token = history.get("nextPageToken")
+            if not page_token:
+                break
+
+        unknown_ids = await _filter_unknown_ids(session, account, list(new_msg_ids))
+        messages.extend(await _fetch_messages(service, credentials, unknown_ids))
 
         # Update cursor
         new_history_id = history.get("historyId", account.sync_cursor)
@@ -177,6 +385,15 @@ async def fetch_emails_incremental(
 
     except Exception as e:
         if "404" in str(e) or "historyId" in str(e).lower():
+            if account.last_sync:
+                # Re-list only what arrived since the last sync, with an
+                # overlap buffer; already-stored messages are not re-fetched
+                since = account.last_sync - GMAIL_RESYNC_OVERLAP
+                logger.warning(
+                    "History expired for %s, re-syncing messages since %s",
+                    account.name, since.isoformat(),
+                )
+                return await fetch_emails_full(session, account, query=f"after:{int(since.timestamp())}")
             logger.warning("History expired for %s, doing full sync", account.name)
             return await fetch_emails_full(session, account)
         raise
@@ -185,68 +402,122 @@ async def fetch_emails_incremental(
     return messages
 
 
-async def store_email(
-    session: AsyncSession,
-    account: EmailAccount,
-    gmail_message: dict,
-) -> Optional[Email]:
-    """Process a raw Gmail message and store it in the database."""
-    gmail_id = gmail_message["id"]
-    thread_id = gmail_message.get("threadId")
+def parse_sender_name(from_header: str) -> str:
+    """Extract the display name from a From header ('"Ann" <a@x.com>' -> 'Ann')."""
+    return from_header.split("<")[0].strip().strip('"').strip()
+
+
+def parse_sender_address(from_header: str) -> Optional[str]:
+    """Extract the lowercased address from a From header, or None if there is none."""
+    address = parseaddr(from_header)[1].strip().lower()
+    return address if "@" in address else None
 
-    # Check for duplicate
-    existing = await session.execute(
-        select(Email).where(
-            Email.account_id == account.id,
-            Email.gmail_id == gmail_id,
-        )
-    )
-    if existing.scalar_one_or_none():
-        return None
 
+def _build_email_row(account: EmailAccount, gmail_message: dict) -> tuple[dict, dict]:
+    """Parse a raw Gmail message into emails column values and a raw interaction.
+
+    Returns:
+        (email_values, raw_item) — raw_item holds store_raw_interaction kwargs.
+    """
+    gmail_id = gmail_message["id"]
     payload = gmail_message.get("payload", {})
     headers = _parse_email_headers(payload.get("headers", []))
     body = _extract_body(payload)
-    snippet = gmail_message.get("snippet", "")
-    labels = gmail_message.get("labelIds", [])
 
-    # Parse date
-    email_date = None
-    if headers.get("date"):
+    # Parse date: internalDate (epoch ms) avoids RFC 2822 parsing; the Date
+    # header is only consulted when it is missing
+    email_date = _parse_internal_date(gmail_message.get("internalDate"))
+    if email_date is None and headers.get("date"):
         try:
             email_date = parsedate_to_datetime(headers["date"])
         except Exception:
             pass
 
-    # Store raw interaction first
-    raw_content = f"Subject: {headers.get('subject', '')}\nFrom: {headers.get('from', '')}\n\n{body}"
-    await store_raw_interaction(
-        session=session,
-        source_type="email",
-        raw_content=raw_content,
-        source_id=gmail_id,
-        account_id=account.id,
-        raw_metadata=headers,
-        interaction_date=email_date,
-    )
+    email_values = {
+        "account_id": account.id,
+        "gmail_id": gmail_id,
+        "thread_id": gmail_message.get("threadId"),
+        "subject": headers.get("subject"),
+        "snippet": gmail_message.get("snippet", ""),
+        "full_body": body,
+        "labels": gmail_message.get("labelIds", []),
+        "email_date": email_date,
+        "raw_headers": headers,
+        "sender_name": parse_sender_name(headers["from"]),
+        "from_address": parse_sender_address(headers["from"]),
+    }
+    raw_item = {
+        "source_type": "email",
+        "raw_content": f"Subject: {headers.get('subject', '')}\nFrom: {headers.get('from', '')}\n\n{body}",
+        "source_id": gmail_id,
+        "account_id": account.id,
+        "raw_metadata": headers,
+        "interaction_date": email_date,
+    }
+    return email_values, raw_item
+
 
-    # Store processed email
-    email = Email(
-        account_id=account.id,
-        gmail_id=gmail_id,
-        thread_id=thread_id,
-        subject=headers.get("subject"),
-        snippet=snippet,
-        full_body=body,
-        labels=labels,
-        email_date=email_date,
-        raw_headers=headers,
+def _insert_emails_stmt(rows: list[dict]):
+    """INSERT ... ON CONFLICT (account_id, gmail_id) DO NOTHING for email rows."""
+    return pg_insert(Email).values(rows).on_conflict_do_nothing(
+        index_elements=["account_id", "gmail_id"],
     )
-    session.add(email)
-    await session.flush()
+
+
+async def store_email(
+    session: AsyncSession,
+    account: EmailAccount,
+    gmail_message: dict,
+) -> Optional[Email]:
+    """Process a raw Gmail message and store it in the database.
+
+    The duplicate check and insert are one race-safe statement; returns None
+    if the message was already stored for this account.
+    """
+    email_values, raw_item = _build_email_row(account, gmail_message)
+
+    result = await session.scalars(_insert_emails_stmt([email_values]).returning(Email))
+    email = result.first()
+    if email is None:
+        return None
+
+    await store_raw_interaction(session=session, **raw_item)
     return email
 
 
+async def store_emails(
+    session: AsyncSession,
+    account: EmailAccount,
+    gmail_messages: list[dict],
+) -> int:
+    """Store a batch of raw Gmail messages with one INSERT and one raw-archive pass.
+
+    Messages already stored for the account are skipped by ON CONFLICT, and
+    only newly inserted ones are archived as raw interactions.
+
+    Returns:
+        Number of emails inserted.
+    """
+    if not gmail_messages:
+        return 0
+
+    parsed = [_build_email_row(account, msg) for msg in gmail_messages]
+    result = await session.execute(
+        _insert_emails_stmt([values for values, _ in parsed]).returning(Email.gmail_id)
+    )
+    inserted = set(result.scalars().all())
+    if not inserted:
+        return 0
+
+    raw_items = []
+    for values, raw_item in parsed:
+        if values["gmail_id"] in inserted:
+            raw_items.append(raw_item)
+            inserted.discard(values["gmail_id"])  # archive in-batch repeats once
+    await store_raw_interactions(session, raw_items)
+    return len(raw_items)
+
+
 async def sync_account(
     session: AsyncSession,
     account: EmailAccount,
@@ -259,10 +530,14 @@ async def sync_account(
         raw_messages = await fetch_emails_incremental(session, account)
 
     stored = 0
-    for msg in raw_messages:
-        email = await store_email(session, account, msg)
-        if email:
-            stored += 1
+    for start in range(0, len(raw_messages), PREFETCH_CHUNK):
+        stored += await store_emails(session, account, raw_messages[start:start + PREFETCH_CHUNK])
+
+    # fetch_emails_* store the new history ID with a Core update in this
+    # session; account may belong to another session, so read it back here
+    cursor = await session.scalar(
+        select(EmailAccount.sync_cursor).where(EmailAccount.id == account.id)
+    )
 
     # Update sync state
     sync_key = f"gmail:{account.name}"
@@ -275,7 +550,7 @@ async def sync_account(
         )
         session.add(sync_state)
     sync_state.last_sync = datetime.now(timezone.utc)
-    sync_state.cursor = account.sync_cursor
+    sync_state.cursor = cursor
     sync_state.status = "ok"
     await session.flush()
 
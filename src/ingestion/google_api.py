@@ -0,0 +1,152 @@
+"""Shared helpers for Google API (Gmail, Drive) requests."""
+
+import random
+import threading
+import time
+from typing import Any, Callable, Hashable, Optional
+
+try:
+    import msgspec
+except ImportError:  # optional: faster JSON response decoding
+    msgspec = None
+
+# HTTP statuses worth retrying: rate limiting and transient server errors.
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Retries for single requests, passed to googleapiclient's execute(num_retries=...),
+# which applies its own exponential backoff.
+GOOGLE_API_RETRIES = 5
+
+# Base delay for our own backoff (batch sub-requests are not retried by the client).
+BACKOFF_BASE_SECONDS = 1.0
+
+# Upper bound on a single backoff sleep.
+MAX_BACKOFF_SECONDS = 60.0
+
+# Built (credentials, service) pairs, reused across syncs in a long-running
+# process so the discovery document is parsed once and the service's
+# transport keeps its keep-alive connections.
+_client_cache: dict[Hashable, tuple[Any, Any]] = {}
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """Check if a Google API error is a rate limit or transient server error."""
+    from googleapiclient.errors import HttpError
+
+    return isinstance(exc, HttpError) and exc.resp.status in RETRYABLE_STATUSES
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Exponential backoff with jitter for the given zero-based attempt.
+
+    A server-provided Retry-After (seconds) is honored as a lower bound.
+    """
+    delay = BACKOFF_BASE_SECONDS * (2 ** attempt) + random.uniform(0, 1)
+    if retry_after:
+        delay = max(delay, retry_after)
+    return min(delay, MAX_BACKOFF_SECONDS)
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Read the Retry-After header (in seconds) from a Google API error, if any."""
+    resp = getattr(exc, "resp", None)  # httplib2.Response, a dict of headers
+    value = resp.get("retry-after") if isinstance(resp, dict) else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """Thread-safe token bucket limiting request cost per second.
+
+    Requests run on worker threads (asyncio.to_thread), so acquire() blocks
+    the calling thread rather than the event loop.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """Create a limiter.
+
+        Args:
+            rate: Tokens added per second.
+            capacity: Bucket size (max burst); defaults to one second of rate.
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, cost: float = 1.0) -> None:
+        """Block until cost tokens are available, then take them."""
+        cost = min(cost, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= cost:
+                    self._tokens -= cost
+                    return
+                wait = (cost - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def new_authorized_http(credentials):
+    """Build a fresh authorized HTTP transport.
+
+    httplib2.Http is not thread-safe, so each worker thread issuing requests
+    needs its own transport rather than sharing the service's.
+    """
+    import google_auth_httplib2
+    import httplib2
+
+    return google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+
+
+def get_cached_client(
+    cache_key: Hashable,
+    build_credentials: Callable[[], Any],
+    build_service: Callable[[Any], Any],
+) -> tuple[Any, Any]:
+    """Return (credentials, service) for cache_key, building them on first use.
+
+    Cached credentials refresh themselves through the authorized transport
+    when they expire, so a client stays usable across syncs. Include anything
+    that identifies the grant (e.g. the refresh token) in cache_key so a
+    re-authorized account gets a fresh client.
+    """
+    client = _client_cache.get(cache_key)
+    if client is None:
+        credentials = build_credentials()
+        client = (credentials, build_service(credentials))
+        _client_cache[cache_key] = client
+    return client
+
+
+def clear_client_cache() -> None:
+    """Drop all cached Google API clients."""
+    _client_cache.clear()
+
+
+def response_model() -> Optional[Any]:
+    """Build a googleapiclient model that decodes JSON responses with msgspec.
+
+    Pass as build(..., model=response_model()). Large Gmail format=full
+    responses make stdlib json decoding a noticeable per-message cost. Returns
+    None (the client's default JsonModel) when msgspec is not installed.
+    """
+    if msgspec is None:
+        return None
+
+    from googleapiclient.model import JsonModel
+
+    class _MsgspecJsonModel(JsonModel):
+        def deserialize(self, content):
+            try:
+                return msgspec.json.decode(content)
+            except msgspec.DecodeError:
+                # Non-JSON bodies: defer to the stock handling
+                return super().deserialize(content)
+
+    return _MsgspecJsonModel()
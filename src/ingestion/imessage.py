@@ -4,47 +4,73 @@ import logging
 import platform
 import sqlite3
 from datetime import datetime, timezone
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
-from sqlalchemy import select
+from sqlalchemy import or_, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.storage.models import Message, Person
-from src.storage.raw import store_raw_interaction
+from src.storage.raw import store_raw_interactions
 
 logger = logging.getLogger(__name__)
 
 # Apple's CoreData epoch: 2001-01-01 00:00:00 UTC
 APPLE_EPOCH = datetime(2001, 1, 1, tzinfo=timezone.utc)
+_APPLE_EPOCH_SECONDS: float = APPLE_EPOCH.timestamp()
+
+# Timestamps at or above this are nanoseconds (macOS 10.13+), below are seconds
+_NANO_THRESHOLD = 1_000_000_000_000
+
+# Max guids/handles per IN (...) lookup
+LOOKUP_CHUNK = 500
+
+# Messages per bulk INSERT statement
+INSERT_CHUNK = 1000
+
+# Rows fetched from chat.db per fetchmany() call
+FETCH_CHUNK = 500
+
+# chat.db is only read: keep temp sort data in memory and mmap the (large) file
+SQLITE_READ_PRAGMAS = (
+    "query_only=ON",
+    "temp_store=MEMORY",
+    "mmap_size=268435456",
+    "cache_size=-65536",
+)
 
 # Default path to iMessage database
 DEFAULT_DB_PATH = Path.home() / "Library" / "Messages" / "chat.db"
 
-# Query to extract messages with chat info
+# Query to extract messages with chat info. unix_date converts the Apple
+# timestamp to Unix seconds in SQLite, sparing a per-row conversion in Python.
 MESSAGES_QUERY = """
 SELECT
     m.ROWID,
     m.guid,
     m.text,
     m.is_from_me,
-    m.date,
+    CASE WHEN m.date >= :nano_threshold THEN m.date / 1e9 ELSE m.date END
+        + :epoch_seconds AS unix_date,
     m.handle_id,
     m.cache_has_attachments,
     h.id AS handle_id_str,
-    c.chat_identifier,
-    c.display_name AS chat_display_name
+    cmj.chat_id AS chat_rowid
 FROM message m
 LEFT JOIN handle h ON m.handle_id = h.ROWID
 LEFT JOIN chat_message_join cmj ON m.ROWID = cmj.message_id
-LEFT JOIN chat c ON cmj.chat_id = c.ROWID
 WHERE m.text IS NOT NULL
   AND m.text != ''
-  AND m.date > ?
+  AND m.date > :since
 ORDER BY m.date ASC
-LIMIT ?
+LIMIT :limit
 """
 
+# Chat names, looked up once per distinct chat rather than joined onto every message
+CHATS_QUERY = "SELECT ROWID, chat_identifier, display_name FROM chat WHERE ROWID IN ({placeholders})"
+
 
 def is_macos() -> bool:
     """Check if running on macOS."""
@@ -58,59 +84,110 @@ def apple_time_to_datetime(apple_timestamp: int) -> datetime:
     """
     if apple_timestamp is None:
         return datetime.now(timezone.utc)
-    # Timestamps after ~2017 are in nanoseconds
-    if apple_timestamp >= 1_000_000_000_000:
-        seconds = apple_timestamp / 1_000_000_000
-    else:
-        seconds = apple_timestamp
-    return datetime.fromtimestamp(
-        APPLE_EPOCH.timestamp() + seconds, tz=timezone.utc
-    )
+    seconds = apple_timestamp / 1_000_000_000 if apple_timestamp >= _NANO_THRESHOLD else apple_timestamp
+    return datetime.fromtimestamp(_APPLE_EPOCH_SECONDS + seconds, tz=timezone.utc)
 
 
 def datetime_to_apple_time(dt: datetime) -> int:
     """Convert Python datetime to Apple CoreData timestamp (nanoseconds)."""
-    return int((dt.timestamp() - APPLE_EPOCH.timestamp()) * 1_000_000_000)
+    return int((dt.timestamp() - _APPLE_EPOCH_SECONDS) * 1_000_000_000)
 
 
-def read_messages(
+def _connect_readonly(db_path: Path) -> sqlite3.Connection:
+    """Open chat.db read-only, tuned for one large sequential scan.
+
+    Not immutable=1: Messages keeps writing the WAL, and immutable would skip
+    messages not yet checkpointed into the main file.
+    """
+    conn = sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    for pragma in SQLITE_READ_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma}")
+    return conn
+
+
+def _read_chats(conn: sqlite3.Connection, chat_rowids: set[int]) -> dict[int, tuple[str, str]]:
+    """Map chat ROWIDs to (chat_identifier, display_name)."""
+    rowids = list(chat_rowids)
+    chats = {}
+    for i in range(0, len(rowids), LOOKUP_CHUNK):
+        chunk = rowids[i:i + LOOKUP_CHUNK]
+        query = CHATS_QUERY.format(placeholders=", ".join("?" * len(chunk)))
+        for rowid, identifier, display_name in conn.execute(query, chunk):
+            chats[rowid] = (identifier, display_name)
+    return chats
+
+
+def iter_messages(
     db_path: Path = DEFAULT_DB_PATH,
     since: Optional[datetime] = None,
     limit: int = 1000,
-) -> list[dict]:
-    """Read messages from the iMessage SQLite database.
+) -> Iterator[dict]:
+    """Stream messages from the iMessage SQLite database.
 
-    Returns a list of message dicts with normalized fields.
+    Rows are fetched FETCH_CHUNK at a time, so only one chunk is held in
+    memory. The database connection stays open until the generator is
+    exhausted or closed.
+
+    Yields:
+        Message dicts with normalized fields.
     """
     if not db_path.exists():
         logger.warning("iMessage database not found: %s", db_path)
-        return []
+        return
 
     since_apple = datetime_to_apple_time(since) if since else 0
 
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
+    conn = _connect_readonly(db_path)
     try:
-        cursor = conn.execute(MESSAGES_QUERY, (since_apple, limit))
-        messages = []
-        for row in cursor:
-            msg = {
-                "rowid": row["ROWID"],
-                "guid": row["guid"],
-                "text": row["text"],
-                "is_from_me": bool(row["is_from_me"]),
-                "date": apple_time_to_datetime(row["date"]),
-                "handle_id": row["handle_id_str"],
-                "chat_id": row["chat_identifier"],
-                "chat_name": row["chat_display_name"],
-                "has_attachment": bool(row["cache_has_attachments"]),
-            }
-            messages.append(msg)
-        return messages
+        cursor = conn.execute(MESSAGES_QUERY, {
+            "since": since_apple,
+            "limit": limit,
+            "nano_threshold": _NANO_THRESHOLD,
+            "epoch_seconds": _APPLE_EPOCH_SECONDS,
+        })
+        chats: dict[int, tuple[str, str]] = {}
+        while rows := cursor.fetchmany(FETCH_CHUNK):
+            unseen = {row["chat_rowid"] for row in rows if row["chat_rowid"] is not None} - chats.keys()
+            if unseen:
+                chats.update(_read_chats(conn, unseen))
+
+            for row in rows:
+                chat_id, chat_name = chats.get(row["chat_rowid"], (None, None))
+                yield {
+                    "rowid": row["ROWID"],
+                    "guid": row["guid"],
+                    "text": row["text"],
+                    "is_from_me": bool(row["is_from_me"]),
+                    "date": datetime.fromtimestamp(row["unix_date"], tz=timezone.utc),
+                    "handle_id": row["handle_id_str"],
+                    "chat_id": chat_id,
+                    "chat_name": chat_name,
+                    "has_attachment": bool(row["cache_has_attachments"]),
+                }
     finally:
         conn.close()
 
 
+def read_messages(
+    db_path: Path = DEFAULT_DB_PATH,
+    since: Optional[datetime] = None,
+    limit: int = 1000,
+) -> list[dict]:
+    """Read messages from the iMessage SQLite database.
+
+    Returns a list of message dicts with normalized fields.
+    """
+    return list(iter_messages(db_path=db_path, since=since, limit=limit))
+
+
+def _batched(items: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    """Split an iterable into lists of up to size items (itertools.batched is 3.12+)."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
 async def resolve_message_sender(
     session: AsyncSession,
     handle_id: Optional[str],
@@ -122,21 +199,114 @@ async def resolve_message_sender(
     if not handle_id:
         return None
 
-    # Try matching by phone
+    # One query for both; a phone match sorts ahead of an email match
     result = await session.execute(
-        select(Person).where(Person.phone == handle_id)
+        select(Person)
+        .where(or_(Person.phone == handle_id, Person.email == handle_id))
+        .order_by((Person.phone == handle_id).desc())
+        .limit(1)
     )
-    if person := result.scalar_one_or_none():
-        return person
+    return result.scalar_one_or_none()
+
+
+async def _existing_source_ids(session: AsyncSession, guids: list[str]) -> set[str]:
+    """Return which of the given message guids are already stored."""
+    existing: set[str] = set()
+    for i in range(0, len(guids), LOOKUP_CHUNK):
+        result = await session.execute(
+            select(Message.source_id).where(Message.source_id.in_(guids[i:i + LOOKUP_CHUNK]))
+        )
+        existing.update(result.scalars().all())
+    return existing
+
+
+async def _resolve_senders(session: AsyncSession, handles: set[str]) -> dict[str, Person]:
+    """Resolve many iMessage handles to people at once.
+
+    Same matching as resolve_message_sender: a phone match wins over an
+    email match.
+
+    Returns:
+        Mapping of handle to person, for handles that matched.
+    """
+    handle_list = sorted(h for h in handles if h)
+    by_phone: dict[str, Person] = {}
+    by_email: dict[str, Person] = {}
+    for i in range(0, len(handle_list), LOOKUP_CHUNK):
+        chunk = handle_list[i:i + LOOKUP_CHUNK]
+        result = await session.execute(
+            select(Person).where(or_(Person.phone.in_(chunk), Person.email.in_(chunk)))
+        )
+        for person in result.scalars().all():
+            if person.phone:
+                by_phone.setdefault(person.phone, person)
+            if person.email:
+                by_email.setdefault(person.email, person)
+
+    senders = {}
+    for handle in handle_list:
+        person = by_phone.get(handle) or by_email.get(handle)
+        if person:
+            senders[handle] = person
+    return senders
+
+
+async def _store_messages(
+    session: AsyncSession,
+    messages: list[dict],
+    senders: dict[str, Person],
+) -> int:
+    """Insert messages and their raw interactions in bulk.
+
+    Guids stored concurrently since the existence check are skipped by
+    ON CONFLICT, and only newly inserted messages are archived.
+
+    Returns:
+        Number of messages inserted.
+    """
+    rows = []
+    for msg in messages:
+        sender = None
+        if not msg["is_from_me"] and msg["handle_id"]:
+            sender = senders.get(msg["handle_id"])
+        rows.append({
+            "source_id": msg["guid"],
+            "sender_id": sender.id if sender else None,
+            "content": msg["text"],
+            "is_from_me": msg["is_from_me"],
+            "chat_id": msg["chat_id"],
+            "message_date": msg["date"],
+            "has_attachment": msg["has_attachment"],
+        })
 
-    # Try matching by email
     result = await session.execute(
-        select(Person).where(Person.email == handle_id)
+        pg_insert(Message)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["source_id"])
+        .returning(Message.source_id)
     )
-    if person := result.scalar_one_or_none():
-        return person
-
-    return None
+    inserted = set(result.scalars().all())
+    if not inserted:
+        return 0
+
+    raw_items = []
+    for msg in messages:
+        if msg["guid"] in inserted:
+            inserted.discard(msg["guid"])  # archive in-batch repeats once
+            raw_items.append({
+                "source_type": "imessage",
+                "raw_content": msg["text"],
+                "source_id": msg["guid"],
+                "raw_metadata": {
+                    "handle_id": msg["handle_id"],
+                    "chat_id": msg["chat_id"],
+                    "chat_name": msg["chat_name"],
+                    "is_from_me": msg["is_from_me"],
+                },
+                "interaction_date": msg["date"],
+            })
+    await store_raw_interactions(session, raw_items)
+    return len(raw_items)
 
 
 async def sync_imessages(
@@ -147,6 +317,9 @@ async def sync_imessages(
 ) -> dict:
     """Sync messages from iMessage database into Focus.
 
+    Writes happen in the session's current transaction with
+    synchronous_commit off; run it in a session of its own.
+
     Returns a summary dict with counts.
     """
     summary = {"messages_read": 0, "messages_stored": 0, "errors": 0}
@@ -155,57 +328,33 @@ async def sync_imessages(
         logger.info("iMessage sync skipped — not macOS")
         return summary
 
-    raw_messages = read_messages(db_path=db_path, since=since, limit=limit)
-    summary["messages_read"] = len(raw_messages)
-
-    for msg in raw_messages:
+    senders: dict[str, Person] = {}
+    looked_up: set[str] = set()
+    relaxed_commit = False
+    messages = iter_messages(db_path=db_path, since=since, limit=limit)
+    for chunk in _batched(messages, INSERT_CHUNK):
+        summary["messages_read"] += len(chunk)
+
+        # One existence check and one sender lookup per chunk instead of per message
+        existing = await _existing_source_ids(session, [msg["guid"] for msg in chunk])
+        new_messages = [msg for msg in chunk if msg["guid"] not in existing]
+        handles = {msg["handle_id"] for msg in new_messages if not msg["is_from_me"] and msg["handle_id"]}
+        senders.update(await _resolve_senders(session, handles - looked_up))
+        looked_up |= handles
+
+        if not new_messages:
+            continue
+        if not relaxed_commit:
+            # Everything written here can be re-read from chat.db, so skip
+            # waiting on the WAL flush at commit; a crash loses at most the
+            # last moments of this sync, never consistency.
+            await session.execute(text("SET LOCAL synchronous_commit TO OFF"))
+            relaxed_commit = True
         try:
-            # Check if already stored
-            existing = await session.execute(
-                select(Message).where(Message.source_id == msg["guid"])
-            )
-            if existing.scalar_one_or_none():
-                continue
-
-            # Resolve sender
-            sender = None
-            if not msg["is_from_me"] and msg["handle_id"]:
-                sender = await resolve_message_sender(session, msg["handle_id"])
-
-            # Store message
-            message = Message(
-                source_id=msg["guid"],
-                sender_id=sender.id if sender else None,
-                content=msg["text"],
-                is_from_me=msg["is_from_me"],
-                chat_id=msg["chat_id"],
-                message_date=msg["date"],
-                has_attachment=msg["has_attachment"],
-            )
-            session.add(message)
-
-            # Store raw interaction
-            await store_raw_interaction(
-                session=session,
-                source_type="imessage",
-                raw_content=msg["text"],
-                source_id=msg["guid"],
-                raw_metadata={
-                    "handle_id": msg["handle_id"],
-                    "chat_id": msg["chat_id"],
-                    "chat_name": msg["chat_name"],
-                    "is_from_me": msg["is_from_me"],
-                },
-                interaction_date=msg["date"],
-            )
-
-            summary["messages_stored"] += 1
-
+            summary["messages_stored"] += await _store_messages(session, new_messages, senders)
         except Exception as e:
-            logger.error("Failed to store message %s: %s", msg["guid"], e)
-            summary["errors"] += 1
-
-    await session.flush()
+            logger.error("Failed to store %d messages: %s", len(new_messages), e)
+            summary["errors"] += len(new_messages)
 
     logger.info(
         "iMessage sync: %d read, %d stored, %d errors",
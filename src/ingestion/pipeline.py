@@ -2,7 +2,9 @@
 
 import asyncio
 import logging
-from typing import Optional
+from collections import Counter
+from datetime import date
+from typing import AsyncIterator, Optional
 
 from uuid import UUID
 
@@ -11,9 +13,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.config import get_settings
 from src.ingestion.accounts import get_account_by_name, list_accounts
+from src.ingestion.drive import sync_drive
 from src.ingestion.gmail import sync_account
-from src.processing.classifier import classify_and_update
-from src.processing.extractor import extract_and_update
+from src.ingestion.imessage import sync_imessages
+from src.processing.classifier import batch_classify_emails, classify_and_update, pre_classify
+from src.processing.extractor import batch_extract_emails, extract_and_update
 from src.processing.regex_parser import parse_and_update
 from src.processing.resolver import resolve_extraction
 from src.storage.db import get_session
@@ -24,6 +28,25 @@ logger = logging.getLogger(__name__)
 # Max concurrent API calls (Haiku classification + extraction)
 MAX_CONCURRENCY = 10
 
+# Max emails processed in one inner session/transaction
+PROCESS_BATCH_SIZE = 50
+
+# Max emails loaded per query when feeding the Message Batches API; keeps
+# the IN list well under asyncpg's bind parameter limit
+LLM_BATCH_LOAD_SIZE = 1000
+
+# Max processed emails waiting for vector indexing before workers wait on it
+INDEX_QUEUE_SIZE = 1000
+
+# Max emails embedded and written to the vector store in one call
+INDEX_BATCH_SIZE = 64
+
+
+async def _in_own_session(sync, *args):
+    """Run a sync coroutine function in a fresh session, committed when it finishes."""
+    async with get_session() as session:
+        return await sync(session, *args)
+
 
 async def run_full_sync(session: AsyncSession, account_name: Optional[str] = None) -> dict:
     """Run a full sync across all (or a specific) account(s).
@@ -48,42 +71,44 @@ async def run_full_sync(session: AsyncSession, account_name: Optional[str] = Non
     else:
         accounts = await list_accounts(session, enabled_only=True)
 
+    # Gmail, Drive and iMessage syncs share no state, so run them all at once,
+    # each in its own session (sessions can't be shared between tasks)
+    jobs: list[tuple[str, Optional[EmailAccount]]] = []
+    coros = []
     for account in accounts:
         summary["accounts"] += 1
-
-        # Gmail sync
-        try:
-            count = await sync_account(session, account)
-            summary["emails_fetched"] += count
-            logger.info("Synced %s: %d new emails", account.name, count)
-        except Exception as e:
-            logger.error("Failed to sync Gmail for %s: %s", account.name, e)
-
-        # Drive sync (shared OAuth)
+        jobs.append(("gmail", account))
+        coros.append(_in_own_session(sync_account, account))
         if settings.sync.drive_enabled:
-            try:
-                from src.ingestion.drive import sync_drive
-
-                drive_summary = await sync_drive(session, account)
-                summary["drive_files_synced"] += drive_summary["files_synced"]
-                if drive_summary["files_synced"] > 0:
-                    logger.info(
-                        "Drive sync for %s: %d files",
-                        account.name,
-                        drive_summary["files_synced"],
-                    )
-            except Exception as e:
-                logger.error("Failed to sync Drive for %s: %s", account.name, e)
-
-    # iMessage sync
+            jobs.append(("drive", account))
+            coros.append(_in_own_session(sync_drive, account))
     if settings.sync.imessage_enabled:
-        try:
-            from src.ingestion.imessage import sync_imessages
-
-            imsg_summary = await sync_imessages(session)
-            summary["messages_synced"] = imsg_summary["messages_stored"]
-        except Exception as e:
-            logger.error("Failed to sync iMessages: %s", e)
+        jobs.append(("imessage", None))
+        coros.append(_in_own_session(sync_imessages))
+
+    results = await asyncio.gather(*coros, return_exceptions=True)
+
+    for (kind, account), result in zip(jobs, results):
+        if kind == "gmail":
+            if isinstance(result, BaseException):
+                logger.error("Failed to sync Gmail for %s: %s", account.name, result)
+                continue
+            summary["emails_fetched"] += result
+            logger.info("Synced %s: %d new emails", account.name, result)
+
+        elif kind == "drive":
+            if isinstance(result, BaseException):
+                logger.error("Failed to sync Drive for %s: %s", account.name, result)
+                continue
+            summary["drive_files_synced"] += result["files_synced"]
+            if result["files_synced"] > 0:
+                logger.info("Drive sync for %s: %d files", account.name, result["files_synced"])
+
+        else:
+            if isinstance(result, BaseException):
+                logger.error("Failed to sync iMessages: %s", result)
+                continue
+            summary["messages_synced"] = result["messages_stored"]
 
     return summary
 
@@ -91,8 +116,12 @@ async def run_full_sync(session: AsyncSession, account_name: Optional[str] = Non
 async def process_unprocessed_emails(session: AsyncSession, limit: int = 0) -> dict:
     """Process all unprocessed emails through the classification/extraction pipeline.
 
-    Runs up to MAX_CONCURRENCY emails concurrently for speed.
-    Each email gets its own DB session to avoid concurrent flush conflicts.
+    Emails are split into batches that each share one DB session and
+    transaction, processed one email at a time within the batch; up to
+    MAX_CONCURRENCY batches run concurrently. Sessions are never shared
+    between concurrent tasks. Each email runs in a savepoint so one failure
+    doesn't roll back the rest of its batch. Processed emails are indexed for
+    semantic search by a background worker, drained before returning.
     Set limit=0 (default) for unlimited.
     Returns a summary dict.
     """
@@ -114,80 +143,198 @@ async def process_unprocessed_emails(session: AsyncSession, limit: int = 0) -> d
     # Commit so inner sessions (separate transactions) can see the emails
     await session.commit()
 
+    # A large backlog goes through the (half-price) Message Batches API up
+    # front; the per-email workers below then apply the precomputed results
+    classifications: dict = {}
+    extractions: dict = {}
+    settings = get_settings()
+    if settings.anthropic.batch_mode and len(email_ids) > settings.anthropic.batch_threshold:
+        try:
+            classifications, extractions = await _run_llm_batches(email_ids)
+        except Exception as e:
+            logger.error("Batch API processing failed, falling back to per-email calls: %s", e)
+    # One date for every prompt in the run, rather than a clock read per email
+    today = date.today().isoformat()
+
     semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
 
-    async def _process_one(email_id: UUID) -> dict:
+    async def _process_one(inner_session: AsyncSession, email: Email, local: Counter) -> None:
         """Process a single email through classify → extract → resolve."""
-        local = {"classified": 0, "deep_extracted": 0, "regex_parsed": 0, "skipped": 0, "errors": 0}
+        # Stage 1: Classify
+        classification = await classify_and_update(
+            inner_session, email, classifications.get(email.id), today=today
+        )
+        local["classified"] += 1
+
+        route = classification.get("route_to", "skip")
+        still_relevant = classification.get("still_relevant", True)
+
+        # Stage 2: Route to appropriate handler
+        if route == "deep_analysis" and still_relevant:
+            extraction = await extract_and_update(
+                inner_session, email, extractions.get(email.id), today=today
+            )
+            local["deep_extracted"] += 1
+
+            # Stage 3: Entity resolution
+            if extraction.get("tasks") or extraction.get("commitments") or extraction.get("people_mentioned") or extraction.get("project_links"):
+                await resolve_extraction(inner_session, email, extraction)
+
+        elif route == "deep_analysis" and not still_relevant:
+            # Human but stale — record the classification but skip extraction
+            local["skipped"] += 1
+
+        elif route == "regex_parse":
+            await parse_and_update(inner_session, email)
+            local["regex_parsed"] += 1
+
+        else:
+            local["skipped"] += 1
+
+    async def _process_batch(batch: list[UUID]) -> Counter:
+        """Process a batch of emails in one session, committed once at the end."""
+        local: Counter = Counter()
+        payloads: list[tuple[str, str, dict]] = []
         async with semaphore:
             async with get_session() as inner_session:
-                try:
-                    email = await inner_session.get(Email, email_id)
-                    if not email:
+                # Load the whole batch in one query rather than one get() per email
+                result = await inner_session.execute(select(Email).where(Email.id.in_(batch)))
+                emails = {email.id: email for email in result.scalars().all()}
+
+                for email_id in batch:
+                    email = emails.get(email_id)
+                    if email is None:
+                        # Deleted since the outer query
                         local["errors"] += 1
-                        return local
-
-                    # Stage 1: Classify
-                    classification = await classify_and_update(inner_session, email)
-                    local["classified"] += 1
+                        continue
+
+                    counts: Counter = Counter()
+                    try:
+                        async with inner_session.begin_nested():
+                            await _process_one(inner_session, email, counts)
+                    except Exception as e:
+                        logger.error("Failed to process email %s: %s", email_id, e)
+                        local.update(errors=1)
+                        continue
+                    local.update(counts)
+
+                    if (payload := _email_index_payload(email)) is not None:
+                        payloads.append(payload)
+
+            # Stage 4: Index for semantic search, off the processing path. Queued
+            # only once the batch has committed, so a failed commit indexes nothing.
+            for payload in payloads:
+                await index_queue.put(payload)
 
-                    route = classification.get("route_to", "skip")
-                    still_relevant = classification.get("still_relevant", True)
-
-                    # Stage 2: Route to appropriate handler
-                    if route == "deep_analysis" and still_relevant:
-                        extraction = await extract_and_update(inner_session, email)
-                        local["deep_extracted"] += 1
-
-                        # Stage 3: Entity resolution
-                        if extraction.get("tasks") or extraction.get("commitments") or extraction.get("people_mentioned") or extraction.get("project_links"):
-                            await resolve_extraction(inner_session, email, extraction)
-
-                    elif route == "deep_analysis" and not still_relevant:
-                        # Human but stale — record the classification but skip extraction
-                        local["skipped"] += 1
-
-                    elif route == "regex_parse":
-                        await parse_and_update(inner_session, email)
-                        local["regex_parsed"] += 1
+        return local
 
-                    else:
-                        local["skipped"] += 1
+    # Small runs use smaller batches so they still spread across MAX_CONCURRENCY workers
+    batch_size = min(PROCESS_BATCH_SIZE, -(-len(email_ids) // MAX_CONCURRENCY))
+    batches = [email_ids[i:i + batch_size] for i in range(0, len(email_ids), batch_size)]
+    index_queue: asyncio.Queue = asyncio.Queue(maxsize=INDEX_QUEUE_SIZE)
+    indexer = asyncio.create_task(_run_indexer(index_queue))
+    try:
+        results = await asyncio.gather(*[_process_batch(batch) for batch in batches])
+    finally:
+        # Let the indexer drain what's queued, then stop
+        await index_queue.put(None)
+        await indexer
 
-                    # Stage 4: Index for semantic search
-                    _try_index_email(email)
+    totals: Counter = Counter()
+    for r in results:
+        totals.update(r)
+    summary.update(totals)
 
-                except Exception as e:
-                    logger.error("Failed to process email %s: %s", email_id, e)
-                    local["errors"] += 1
+    return summary
 
-        return local
 
-    results = await asyncio.gather(*[_process_one(eid) for eid in email_ids])
+async def _load_emails(email_ids: list[UUID]) -> AsyncIterator[Email]:
+    """Yield emails loaded LLM_BATCH_LOAD_SIZE at a time, each chunk in its own short session.
 
-    for r in results:
-        for k in summary:
-            summary[k] += r[k]
+    Only one chunk is held in memory at a time, and no session stays open
+    while the consumer works.
+    """
+    for start in range(0, len(email_ids), LLM_BATCH_LOAD_SIZE):
+        async with get_session() as session:
+            chunk = email_ids[start:start + LLM_BATCH_LOAD_SIZE]
+            result = await session.execute(select(Email).where(Email.id.in_(chunk)))
+            emails = result.scalars().all()
+        for email in emails:
+            yield email
 
-    return summary
 
+async def _run_llm_batches(email_ids: list[UUID]) -> tuple[dict, dict]:
+    """Classify, then extract, a backlog of emails through the Message Batches API.
 
-def _try_index_email(email: Email) -> None:
-    """Index an email for semantic search. Silently skips if chromadb unavailable."""
+    Emails the zero-cost heuristics can classify are left out of the batch.
+    Returns (classifications, extractions), each keyed by email ID; emails
+    missing from either fall back to a per-email API call.
+    """
+    classifications: dict = {}
+
+    async def _needs_llm() -> AsyncIterator[Email]:
+        async for email in _load_emails(email_ids):
+            heuristic = pre_classify(email)
+            if heuristic is None:
+                yield email
+            else:
+                classifications[email.id] = heuristic
+
+    classifications.update(await batch_classify_emails(_needs_llm()))
+
+    to_extract = [
+        email_id for email_id in email_ids
+        if email_id in classifications
+        and classifications[email_id].get("route_to") == "deep_analysis"
+        and classifications[email_id].get("still_relevant", True)
+    ]
+    extractions = await batch_extract_emails(_load_emails(to_extract))
+
+    return classifications, extractions
+
+
+def _email_index_payload(email: Email) -> Optional[tuple[str, str, dict]]:
+    """Build the (id, text, metadata) to index for an email, or None if it has no text."""
+    text = f"{email.subject or ''}\n{email.full_body or email.snippet or ''}".strip()
+    if not text:
+        return None
+    meta = {"classification": email.classification or "unknown", "needs_reply": email.needs_reply}
+    if email.email_date:
+        meta["date"] = email.email_date.isoformat()
+    return str(email.id), text, meta
+
+
+def _index_emails(payloads: list[tuple[str, str, dict]]) -> None:
+    """Index emails for semantic search in one batch. Silently skips if chromadb unavailable."""
     try:
         from src.storage.vectors import get_vector_store
 
-        text = f"{email.subject or ''}\n{email.full_body or email.snippet or ''}".strip()
-        if not text:
-            return
-        meta = {"classification": email.classification or "unknown", "needs_reply": email.needs_reply}
-        if email.email_date:
-            meta["date"] = email.email_date.isoformat()
-        get_vector_store().add_email(str(email.id), text, meta)
+        get_vector_store().add_emails(payloads)
     except ImportError:
         pass
     except Exception as e:
-        logger.debug("Vector indexing skipped for email %s: %s", email.gmail_id, e)
+        logger.debug("Vector indexing skipped for %d emails: %s", len(payloads), e)
+
+
+async def _run_indexer(queue: asyncio.Queue) -> None:
+    """Index queued emails on a worker thread until a None sentinel arrives.
+
+    Whatever has queued up while the previous batch was embedding is taken
+    together, up to INDEX_BATCH_SIZE, so embeddings are computed in batches.
+    """
+    done = False
+    while not done:
+        payload = await queue.get()
+        if payload is None:
+            break
+        batch = [payload]
+        while len(batch) < INDEX_BATCH_SIZE and not queue.empty():
+            payload = queue.get_nowait()
+            if payload is None:
+                done = True
+                break
+            batch.append(payload)
+        await asyncio.to_thread(_index_emails, batch)
 
 
 async def sync_and_process(
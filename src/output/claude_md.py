@@ -29,7 +29,7 @@ def _read_doc_file(path: Path) -> str:
     if not path.exists():
         logger.debug("Doc file not found: %s", path)
         return ""
-    return path.read_text().strip()
+    return path.read_text(encoding="utf-8").strip()
 
 
 def _get_pitfall_count(pitfalls_path: Path) -> tuple[int, str]:
@@ -104,7 +104,7 @@ async def generate_claude_md(
     sections.append("")
     sections.append(f"> Auto-generated by Focus. Last updated: {now.strftime('%Y-%m-%dT%H:%M:%SZ')}")
     if project:
-        sections.append(f"> Source: vault/Projects/{project.name.replace(' ', '-')}/")
+        sections.append(f"> Source: vault/Projects/{project.safe_name}/")
     sections.append("")
 
     # Project section
@@ -146,7 +146,7 @@ async def generate_claude_md(
     if output_path is None:
         output_path = Path.cwd() / "CLAUDE.md"
     output_path = Path(output_path)
-    output_path.write_text(content)
+    output_path.write_text(content, encoding="utf-8")
     logger.info("Generated CLAUDE.md at %s", output_path)
 
     return content
@@ -369,7 +369,7 @@ def _add_deep_context_section(
     sections.append("## Deep Context (read these files if you need more)")
     sections.append("")
     if project:
-        proj_path = f"vault/Projects/{project.name.replace(' ', '-')}"
+        proj_path = f"vault/Projects/{project.safe_name}"
         sections.append(f"- Full task backlog: {proj_path}/KANBAN.md")
         sections.append(f"- All decisions: {proj_path}/DECISIONS.md")
         sections.append(f"- Project history: {proj_path}/TIMELINE.md")
@@ -449,7 +449,7 @@ async def generate_project_docs(
     for filename, content in templates.items():
         filepath = project_dir / filename
         if not filepath.exists():
-            filepath.write_text(content)
+            filepath.write_text(content, encoding="utf-8")
             logger.info("Created project doc: %s", filepath)
 
     return project_dir
@@ -1,17 +1,20 @@
 """Daily note generation for the Obsidian vault."""
 
+import asyncio
 import logging
 from datetime import date, datetime, timedelta, timezone
+from itertools import groupby
 from pathlib import Path
 from typing import Optional
 
-from sqlalchemy import select, and_
+from sqlalchemy import and_, literal, null, select, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
+from src.storage.db import get_session
 from src.storage.models import (
     Commitment,
     Email,
-    EmailAccount,
     Project,
     Sprint,
     Task,
@@ -25,27 +28,31 @@ async def generate_daily_note(
     vault_path: Path,
     target_date: Optional[date] = None,
 ) -> None:
-    """Generate the daily note for a given date."""
+    """Generate the daily note for a given date.
+
+    The sections' queries run concurrently. The sprint section reads through
+    the given session; the others each open their own, since a session can't
+    be shared between concurrent tasks. The given session is committed first
+    so those sessions see its writes.
+    """
     today = target_date or date.today()
     daily_dir = vault_path / "Daily"
     daily_dir.mkdir(parents=True, exist_ok=True)
 
-    lines = [f"# {today.isoformat()}", ""]
-
-    # Active sprint section
-    await _add_sprint_section(session, lines, today)
-
-    # Due this week
-    await _add_due_this_week(session, lines, today)
+    # Commit so the sections' own sessions (separate transactions) see our writes
+    await session.commit()
 
-    # Pinned projects
-    await _add_pinned_projects(session, lines)
-
-    # Needs reply
-    await _add_needs_reply(session, lines)
+    sections = await asyncio.gather(
+        _sprint_section(session, today),
+        _in_own_session(_due_this_week_section, today),
+        _in_own_session(_pinned_projects_section),
+        _in_own_session(_needs_reply_section),
+        _in_own_session(_commitments_due_section, today),
+    )
 
-    # Open commitments due soon
-    await _add_commitments_due(session, lines, today)
+    lines = [f"# {today.isoformat()}", ""]
+    for section in sections:
+        lines.extend(section)
 
     # Completed today section (placeholder)
     lines.extend([
@@ -54,75 +61,93 @@ async def generate_daily_note(
         "",
     ])
 
-    (daily_dir / f"{today.isoformat()}.md").write_text("\n".join(lines) + "\n")
+    (daily_dir / f"{today.isoformat()}.md").write_text("\n".join(lines) + "\n", encoding="utf-8")
     logger.info("Generated daily note for %s", today)
 
 
-async def _add_sprint_section(session: AsyncSession, lines: list[str], today: date) -> None:
-    """Add active sprint info to daily note."""
+async def _in_own_session(section, *args) -> list[str]:
+    """Build a section in a fresh session so it can run alongside the others."""
+    async with get_session() as session:
+        return await section(session, *args)
+
+
+async def _sprint_section(session: AsyncSession, today: date) -> list[str]:
+    """Build the active sprint section of the daily note."""
+    lines: list[str] = []
     now = datetime.now(timezone.utc)
+    # Sprints and their open tasks in one query; the outer join keeps sprints with none
     result = await session.execute(
-        select(Sprint).where(
+        select(Sprint, Task)
+        .outerjoin(Task, and_(
+            Task.project_id == Sprint.project_id,
+            Task.status.in_(["backlog", "in_progress"]),
+        ))
+        .where(
             Sprint.is_active.is_(True),
             Sprint.starts_at <= now,
             Sprint.ends_at >= now,
         )
+        .order_by(Sprint.starts_at.asc(), Sprint.id, Task.priority.asc())
     )
-    sprints = result.scalars().all()
 
-    for sprint in sprints:
+    for sprint, rows in groupby(result.all(), key=lambda row: row[0]):
         days_left = (sprint.ends_at.date() - today).days
         lines.append(f"## Active Sprint: {sprint.name} ({days_left} days left)")
-
-        # Get tasks for this sprint's project
-        if sprint.project_id:
-            result = await session.execute(
-                select(Task).where(
-                    Task.project_id == sprint.project_id,
-                    Task.status.in_(["backlog", "in_progress"]),
-                ).order_by(Task.priority.asc())
-            )
-            tasks = result.scalars().all()
-            for task in tasks:
+        for _, task in rows:
+            if task is not None:
                 lines.append(f"- [ ] {task.title}")
-
         lines.append("")
 
+    return lines
+
 
-async def _add_due_this_week(session: AsyncSession, lines: list[str], today: date) -> None:
-    """Add tasks and projects due this week."""
+async def _due_this_week_section(session: AsyncSession, today: date) -> list[str]:
+    """Build the section of tasks and projects due this week."""
+    lines: list[str] = []
     end_of_week = today + timedelta(days=(6 - today.weekday()))
 
-    result = await session.execute(
-        select(Task).where(
-            Task.due_date.isnot(None),
-            Task.due_date <= end_of_week,
-            Task.status != "done",
-        ).order_by(Task.due_date.asc())
+    # Tasks then projects, each by due date, in one round trip
+    tasks_due = select(
+        literal(0).label("kind"),
+        Task.title.label("title"),
+        Task.due_date.label("due"),
+        null().label("note"),
+    ).where(
+        Task.due_date.isnot(None),
+        Task.due_date <= end_of_week,
+        Task.status != "done",
     )
-    tasks = result.scalars().all()
-
-    result2 = await session.execute(
-        select(Project).where(
-            Project.user_deadline.isnot(None),
-            Project.user_deadline <= end_of_week,
-            Project.status == "active",
-        ).order_by(Project.user_deadline.asc())
+    projects_due = select(
+        literal(1),
+        Project.name,
+        Project.user_deadline,
+        Project.user_deadline_note,
+    ).where(
+        Project.user_deadline.isnot(None),
+        Project.user_deadline <= end_of_week,
+        Project.status == "active",
     )
-    projects = result2.scalars().all()
+    result = await session.execute(
+        union_all(tasks_due, projects_due).order_by("kind", "due")
+    )
+    rows = result.all()
 
-    if tasks or projects:
+    if rows:
         lines.append("## Due This Week")
-        for task in tasks:
-            lines.append(f"- [ ] {task.title} — due {task.due_date}")
-        for project in projects:
-            note = f" — {project.user_deadline_note}" if project.user_deadline_note else ""
-            lines.append(f"- [ ] **{project.name}** — due {project.user_deadline}{note}")
+        for kind, title, due, note in rows:
+            if kind == 0:
+                lines.append(f"- [ ] {title} — due {due}")
+            else:
+                note = f" — {note}" if note else ""
+                lines.append(f"- [ ] **{title}** — due {due}{note}")
         lines.append("")
 
+    return lines
 
-async def _add_pinned_projects(session: AsyncSession, lines: list[str]) -> None:
-    """Add pinned projects to daily note."""
+
+async def _pinned_projects_section(session: AsyncSession) -> list[str]:
+    """Build the pinned projects section of the daily note."""
+    lines: list[str] = []
     result = await session.execute(
         select(Project).where(
             Project.user_pinned.is_(True),
@@ -135,28 +160,33 @@ async def _add_pinned_projects(session: AsyncSession, lines: list[str]) -> None:
         lines.append("## Pinned Projects")
         for project in pinned:
             desc = f" — {project.description[:80]}" if project.description else ""
-            lines.append(f"- [[{project.name.replace(' ', '-')}]]{desc}")
+            lines.append(f"- [[{project.safe_name}]]{desc}")
         lines.append("")
 
+    return lines
+
 
-async def _add_needs_reply(session: AsyncSession, lines: list[str]) -> None:
-    """Add emails needing reply, sorted by priority."""
+async def _needs_reply_section(session: AsyncSession) -> list[str]:
+    """Build the section of emails needing reply, sorted by priority."""
+    lines: list[str] = []
     result = await session.execute(
-        select(Email, EmailAccount)
-        .outerjoin(EmailAccount, Email.account_id == EmailAccount.id)
+        select(Email)
+        .options(selectinload(Email.account))
         .where(Email.needs_reply.is_(True), Email.reply_sent.is_(False))
         .order_by(Email.urgency.asc(), Email.email_date.asc())
         .limit(10)
     )
-    rows = result.all()
+    emails = result.scalars().all()
 
-    if rows:
+    if emails:
         lines.append("## Needs Reply (by priority)")
-        for email, account in rows:
-            sender = (email.raw_headers or {}).get("from", "unknown")
-            # Extract just the name part
-            name = sender.split("<")[0].strip().strip('"')
-            account_label = f"[{account.name}] " if account else ""
+        for email in emails:
+            name = email.sender_name
+            if name is None:
+                # Not parsed at ingestion; extract just the name part
+                sender = (email.raw_headers or {}).get("from", "unknown")
+                name = sender.split("<")[0].strip().strip('"')
+            account_label = f"[{email.account.name}] " if email.account else ""
             urgency_label = email.urgency.upper() if email.urgency else "NORMAL"
 
             days_ago = ""
@@ -167,9 +197,12 @@ async def _add_needs_reply(session: AsyncSession, lines: list[str]) -> None:
             lines.append(f"- {account_label}{name} — {email.subject or '(no subject)'} ({days_ago}{urgency_label})")
         lines.append("")
 
+    return lines
+
 
-async def _add_commitments_due(session: AsyncSession, lines: list[str], today: date) -> None:
-    """Add commitments due in the next 7 days."""
+async def _commitments_due_section(session: AsyncSession, today: date) -> list[str]:
+    """Build the section of commitments due in the next 7 days."""
+    lines: list[str] = []
     next_week = today + timedelta(days=7)
     result = await session.execute(
         select(Commitment).where(
@@ -186,3 +219,5 @@ async def _add_commitments_due(session: AsyncSession, lines: list[str], today: d
             direction = "I promised" if c.direction == "from_me" else "Promised to me"
             lines.append(f"- [ ] {direction}: {c.description} (due: {c.deadline})")
         lines.append("")
+
+    return lines
@@ -6,8 +6,9 @@ from pathlib import Path
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from src.storage.models import Email, EmailAccount
+from src.storage.models import Email
 
 logger = logging.getLogger(__name__)
 
@@ -18,8 +19,8 @@ async def generate_drafts(
 ) -> None:
     """Generate EMAIL-DRAFTS.md with suggested replies."""
     result = await session.execute(
-        select(Email, EmailAccount)
-        .outerjoin(EmailAccount, Email.account_id == EmailAccount.id)
+        select(Email)
+        .options(selectinload(Email.account))
         .where(
             Email.needs_reply.is_(True),
             Email.reply_sent.is_(False),
@@ -27,41 +28,44 @@ async def generate_drafts(
         )
         .order_by(Email.urgency.asc(), Email.email_date.asc())
     )
-    rows = result.all()
+    emails = result.scalars().all()
 
     lines = ["# Suggested Emails", ""]
 
     # Split by urgency
-    urgent = [(e, a) for e, a in rows if e.urgency == "urgent"]
-    normal = [(e, a) for e, a in rows if e.urgency != "urgent"]
+    urgent = [e for e in emails if e.urgency == "urgent"]
+    normal = [e for e in emails if e.urgency != "urgent"]
 
     if urgent:
         lines.append("## High Priority")
         lines.append("")
-        for email, account in urgent:
-            _format_draft(lines, email, account)
+        for email in urgent:
+            _format_draft(lines, email)
 
     if normal:
         lines.append("## Normal Priority")
         lines.append("")
-        for email, account in normal:
-            _format_draft(lines, email, account)
+        for email in normal:
+            _format_draft(lines, email)
 
-    if not rows:
+    if not emails:
         lines.append("_No suggested replies at this time._")
 
     inbox_dir = vault_path / "Inbox"
     inbox_dir.mkdir(parents=True, exist_ok=True)
-    (inbox_dir / "EMAIL-DRAFTS.md").write_text("\n".join(lines) + "\n")
-    logger.info("Generated EMAIL-DRAFTS.md with %d drafts", len(rows))
+    (inbox_dir / "EMAIL-DRAFTS.md").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    logger.info("Generated EMAIL-DRAFTS.md with %d drafts", len(emails))
 
 
-def _format_draft(lines: list[str], email: Email, account: EmailAccount | None) -> None:
-    """Format a single email draft entry."""
-    sender = (email.raw_headers or {}).get("from", "unknown")
-    name = sender.split("<")[0].strip().strip('"')
+def _format_draft(lines: list[str], email: Email) -> None:
+    """Format a single email draft entry (email.account must be loaded)."""
+    name = email.sender_name
+    if name is None:
+        # Not parsed at ingestion
+        sender = (email.raw_headers or {}).get("from", "unknown")
+        name = sender.split("<")[0].strip().strip('"')
     subject = email.subject or "(no subject)"
-    account_label = f"[{account.name}] " if account else ""
+    account_label = f"[{email.account.name}] " if email.account else ""
 
     days_waiting = ""
     if email.email_date:
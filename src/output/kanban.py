@@ -1,10 +1,10 @@
 """Per-project Kanban board generation."""
 
 import logging
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
-from sqlalchemy import select
+from sqlalchemy import or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.storage.models import Person, Project, Task
@@ -18,24 +18,24 @@ async def generate_kanban(
     output_dir: Path,
 ) -> None:
     """Generate KANBAN.md for a project."""
+    # Only recent done items are shown (last 2 weeks); older ones stay in the DB
+    cutoff = datetime.now(timezone.utc) - timedelta(days=14)
     result = await session.execute(
         select(Task)
-        .where(Task.project_id == project.id)
+        .where(
+            Task.project_id == project.id,
+            or_(Task.status != "done", Task.completed_at > cutoff),
+        )
         .order_by(Task.created_at.asc())
     )
     tasks = result.scalars().all()
 
-    backlog = [t for t in tasks if t.status == "backlog"]
-    in_progress = [t for t in tasks if t.status == "in_progress"]
-    waiting = [t for t in tasks if t.status == "waiting"]
-    done = [t for t in tasks if t.status == "done"]
-
-    # Only show recent done items (last 2 weeks)
-    cutoff = datetime.now(timezone.utc).timestamp() - (14 * 86400)
-    recent_done = [
-        t for t in done
-        if t.completed_at and t.completed_at.timestamp() > cutoff
-    ]
+    # One pass: bucket by status
+    backlog, in_progress, waiting, recent_done = [], [], [], []
+    buckets = {"backlog": backlog, "in_progress": in_progress, "waiting": waiting, "done": recent_done}
+    for task in tasks:
+        if (bucket := buckets.get(task.status)) is not None:
+            bucket.append(task)
 
     lines = [f"# Tasks: {project.name}", ""]
 
@@ -54,7 +54,7 @@ async def generate_kanban(
         for task in in_progress:
             started = ""
             if task.created_at:
-                started = f" — Started: {task.created_at.strftime('%Y-%m-%d')}"
+                started = f" — Started: {task.created_at.date().isoformat()}"
             lines.append(f"{_format_task(task)}{started}")
     else:
         lines.append("_Nothing in progress_")
@@ -79,12 +79,12 @@ async def generate_kanban(
     lines.append("## Done (Recent)")
     if recent_done:
         for task in recent_done:
-            done_date = task.completed_at.strftime("%Y-%m-%d") if task.completed_at else "?"
+            done_date = task.completed_at.date().isoformat() if task.completed_at else "?"
             lines.append(f"- [x] {task.title} — done {done_date}")
     else:
         lines.append("_No recent completions_")
 
-    (output_dir / "KANBAN.md").write_text("\n".join(lines) + "\n")
+    (output_dir / "KANBAN.md").write_text("\n".join(lines) + "\n", encoding="utf-8")
 
 
 def _format_task(task: Task) -> str:
@@ -1,15 +1,23 @@
 """Obsidian vault generator — radically simple, focused on what matters now."""
 
+import asyncio
+import hashlib
+import io
+import json
 import logging
+import re
 from datetime import datetime, date, timedelta, timezone
 from pathlib import Path
 from typing import Optional
+from uuid import UUID
 
-from sqlalchemy import select, func, and_
+from sqlalchemy import Row, select, func, and_, or_, literal_column
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from src.config import get_settings
+from src.storage.db import get_session
 from src.storage.models import (
     Commitment,
     Email,
@@ -23,42 +31,178 @@ from src.storage.models import (
 
 logger = logging.getLogger(__name__)
 
+# Done tasks stay on project pages this many days after completion
+RECENT_DONE_DAYS = 14
+
+# Rows fetched per round-trip when streaming project and person pages
+STREAM_BATCH_SIZE = 200
+
+# Rendered pages as (path, content) pairs; sections return these and
+# generate_vault writes them
+PageFiles = list[tuple[Path, str]]
+
+# Sidecar in the vault root recording what each generated page last held
+VAULT_INDEX = ".vault_index.json"
+
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+# Columns _sender_name reads, for queries that select rows instead of Emails
+_SENDER_COLUMNS = (Email.id, Email.sender_name, Email.raw_headers)
+
+# Display name of a From header: the text before "<", minus surrounding
+# quotes and whitespace, captured in one scan
+_DISPLAY_NAME_RE = re.compile(r'\s*"*\s*(.*?)\s*"*\s*(?:<|\Z)', re.DOTALL)
+
+# Emails listed under "Reply to" on TODAY.md
+TODAY_REPLY_LIMIT = 10
+
+# Per-pass memos for values formatted by several sections; cleared at the
+# start of each generate_vault call.
+_sender_cache: dict[UUID, str] = {}
+_age_cache: dict[tuple[datetime, datetime], str] = {}
+
 
 def _ensure_dir(path: Path) -> Path:
     path.mkdir(parents=True, exist_ok=True)
     return path
 
 
+def _content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _load_index(vault: Path) -> dict:
+    try:
+        return json.loads((vault / VAULT_INDEX).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _sync_files(vault: Path, files: PageFiles) -> int:
+    """Write rendered pages whose content changed since the last pass.
+
+    The sidecar index records each page's content hash plus the mtime and
+    size it had after writing. A page is skipped only if its hash matches
+    and the file on disk is untouched since, so hand edits and deleted
+    files are still regenerated.
+
+    Returns:
+        Number of files written.
+    """
+    old_index = _load_index(vault)
+    new_index = {}
+    written = 0
+    for path, content in files:
+        key = path.relative_to(vault).as_posix()
+        data = content.encode("utf-8")  # encoded once for both hashing and writing
+        digest = _content_hash(data)
+        entry = old_index.get(key)
+        try:
+            stat = path.stat()
+        except OSError:
+            stat = None
+        if not (
+            entry and stat
+            and entry["hash"] == digest
+            and entry["mtime_ns"] == stat.st_mtime_ns
+            and entry["size"] == stat.st_size
+        ):
+            path.write_bytes(data)
+            stat = path.stat()
+            written += 1
+        new_index[key] = {"hash": digest, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+    if new_index != old_index:
+        (vault / VAULT_INDEX).write_text(json.dumps(new_index, sort_keys=True), encoding="utf-8")
+    return written
+
+
 async def generate_vault(session: AsyncSession, vault_path: Optional[Path] = None) -> None:
     """Generate the full Obsidian vault from current DB state."""
     settings = get_settings()
     vault = Path(vault_path or settings.general.vault_path).expanduser()
 
     logger.info("Generating vault at %s", vault)
+    _sender_cache.clear()
+    _age_cache.clear()
 
     _ensure_dir(vault)
     _ensure_dir(vault / "Projects")
     _ensure_dir(vault / "People")
     _ensure_dir(vault / "Daily")
 
-    await _generate_today(session, vault)
-    await _generate_inbox(session, vault)
-    await _generate_drafts(session, vault)
-    await _generate_projects(session, vault)
-    await _generate_people(session, vault)
-    await _generate_commitments(session, vault)
+    # One clock read for the whole pass keeps ages and cutoffs consistent
+    now = datetime.now(timezone.utc)
+
+    # Commit so the sections' own sessions (separate transactions) see
+    # this run's writes
+    await session.commit()
+
+    # TODAY and DRAFTS both list emails awaiting a reply; fetch them once
+    pending = await _pending_replies(session)
+
+    # Sections render separate files, so they run concurrently; each one
+    # beyond the first gets its own session (an AsyncSession is not safe
+    # for concurrent use).
+    sections = await asyncio.gather(
+        _generate_today(session, vault, now, pending),
+        _in_own_session(_generate_inbox, vault, now),
+        _in_own_session(_generate_projects, vault, now),
+        _in_own_session(_generate_people, vault),
+        _in_own_session(_generate_commitments, vault),
+    )
+    files = [page for section in sections for page in section]
+    files.extend(_generate_drafts(vault, now, pending))
+
+    # Write off the event loop, skipping pages that have not changed
+    written = await asyncio.to_thread(_sync_files, vault, files)
+
+    logger.info("Vault generation complete (%d of %d files changed)", written, len(files))
+
+
+async def _in_own_session(section, *args) -> PageFiles:
+    """Render a section in a fresh session so it can run alongside the others."""
+    async with get_session() as session:
+        return await section(session, *args)
 
-    logger.info("Vault generation complete")
+
+async def _pending_replies(session: AsyncSession) -> list[Row]:
+    """Human emails awaiting a reply, most urgent then oldest first.
+
+    Plain rows of the columns TODAY and DRAFTS render (including
+    _SENDER_COLUMNS), shared by both sections.
+    """
+    result = await session.execute(
+        select(
+            *_SENDER_COLUMNS,
+            Email.subject,
+            Email.email_date,
+            Email.urgency,
+            Email.reply_suggested,
+        )
+        .where(
+            Email.needs_reply.is_(True),
+            Email.reply_sent.is_(False),
+            Email.classification == "human",
+        )
+        .order_by(Email.urgency.asc(), Email.email_date.asc())
+    )
+    return result.all()
 
 
 # ---------------------------------------------------------------------------
 # TODAY.md — the single most important file
 # ---------------------------------------------------------------------------
 
-async def _generate_today(session: AsyncSession, vault: Path) -> None:
-    """Generate TODAY.md — what matters right now."""
+async def _generate_today(
+    session: AsyncSession, vault: Path, now: datetime, pending: list[Row]
+) -> PageFiles:
+    """Generate TODAY.md — what matters right now.
+
+    Args:
+        pending: Emails awaiting a reply, from _pending_replies.
+    """
     today = date.today()
-    now = datetime.now(timezone.utc)
     lines = [f"# {today.strftime('%A, %B %d')}", ""]
 
     # Active sprints
@@ -75,23 +219,12 @@ async def _generate_today(session: AsyncSession, vault: Path) -> None:
         lines.append("")
 
     # Urgent emails needing reply
-    result = await session.execute(
-        select(Email)
-        .options(selectinload(Email.account))
-        .where(
-            Email.needs_reply.is_(True),
-            Email.reply_sent.is_(False),
-            Email.classification == "human",
-        )
-        .order_by(Email.urgency.asc(), Email.email_date.asc())
-        .limit(10)
-    )
-    reply_emails = result.scalars().all()
+    reply_emails = pending[:TODAY_REPLY_LIMIT]
     if reply_emails:
         lines.append("## Reply to")
         for email in reply_emails:
             sender = _sender_name(email)
-            age = _age_str(email.email_date)
+            age = _age_str(email.email_date, now)
             urgency = " **URGENT**" if email.urgency == "urgent" else ""
             lines.append(f"- {sender} — {email.subject or '(no subject)'}{urgency} ({age})")
         lines.append("")
@@ -158,29 +291,38 @@ async def _generate_today(session: AsyncSession, vault: Path) -> None:
             lines.append(f"- {task.title}{days}")
         lines.append("")
 
-    # Only write if there's actual content beyond the header
-    if len(lines) > 2:
-        (vault / "TODAY.md").write_text("\n".join(lines) + "\n")
-    else:
+    # Nothing beyond the header
+    if len(lines) <= 2:
         lines.append("Nothing pressing. Good day to do deep work.")
         lines.append("")
-        (vault / "TODAY.md").write_text("\n".join(lines) + "\n")
+    content = "\n".join(lines) + "\n"
 
-    # Also write to Daily archive
-    daily_dir = vault / "Daily"
-    daily_dir.mkdir(parents=True, exist_ok=True)
-    (daily_dir / f"{today.isoformat()}.md").write_text("\n".join(lines) + "\n")
+    # Also write to Daily archive (created by generate_vault)
+    return [
+        (vault / "TODAY.md", content),
+        (vault / "Daily" / f"{today.isoformat()}.md", content),
+    ]
 
 
 # ---------------------------------------------------------------------------
 # INBOX.md — only human emails that need attention
 # ---------------------------------------------------------------------------
 
-async def _generate_inbox(session: AsyncSession, vault: Path) -> None:
+async def _generate_inbox(session: AsyncSession, vault: Path, now: datetime) -> PageFiles:
     """Generate INBOX.md — only actionable human emails."""
+    # Plain rows of just the rendered columns; no ORM instances are built
     result = await session.execute(
-        select(Email)
-        .options(selectinload(Email.account))
+        select(
+            *_SENDER_COLUMNS,
+            Email.subject,
+            Email.snippet,
+            Email.email_date,
+            Email.urgency,
+            Email.needs_reply,
+            Email.reply_sent,
+            Email.reply_suggested,
+            Email.extraction_result,
+        )
         .where(
             Email.classification == "human",
             Email.extraction_result.isnot(None),
@@ -188,9 +330,9 @@ async def _generate_inbox(session: AsyncSession, vault: Path) -> None:
         .order_by(Email.email_date.desc())
         .limit(30)
     )
-    emails = result.scalars().all()
+    emails = result.all()
     if not emails:
-        return
+        return []
 
     lines = ["# Inbox", ""]
 
@@ -200,20 +342,20 @@ async def _generate_inbox(session: AsyncSession, vault: Path) -> None:
     if needs_reply:
         lines.append("## Needs reply")
         for email in needs_reply:
-            _format_inbox_email(lines, email)
+            _format_inbox_email(lines, email, now)
 
     if rest:
         lines.append("## Recent")
         for email in rest[:15]:
-            _format_inbox_email(lines, email)
+            _format_inbox_email(lines, email, now)
 
-    (vault / "INBOX.md").write_text("\n".join(lines) + "\n")
+    return [(vault / "INBOX.md", "\n".join(lines) + "\n")]
 
 
-def _format_inbox_email(lines: list[str], email: Email) -> None:
-    """Format a single inbox email entry."""
+def _format_inbox_email(lines: list[str], email: Row, now: datetime) -> None:
+    """Format a single inbox email row (see _generate_inbox for its columns)."""
     sender = _sender_name(email)
-    age = _age_str(email.email_date)
+    age = _age_str(email.email_date, now)
     urgency = " **URGENT**" if email.urgency == "urgent" else ""
 
     lines.append(f"### {sender} — {email.subject or '(no subject)'}{urgency}")
@@ -239,28 +381,21 @@ def _format_inbox_email(lines: list[str], email: Email) -> None:
 # DRAFTS.md — suggested replies
 # ---------------------------------------------------------------------------
 
-async def _generate_drafts(session: AsyncSession, vault: Path) -> None:
-    """Generate DRAFTS.md — suggested replies ready to send."""
-    result = await session.execute(
-        select(Email)
-        .options(selectinload(Email.account))
-        .where(
-            Email.needs_reply.is_(True),
-            Email.reply_sent.is_(False),
-            Email.reply_suggested.isnot(None),
-            Email.classification == "human",
-        )
-        .order_by(Email.urgency.asc(), Email.email_date.asc())
-    )
-    emails = result.scalars().all()
+def _generate_drafts(vault: Path, now: datetime, pending: list[Row]) -> PageFiles:
+    """Generate DRAFTS.md — suggested replies ready to send.
+
+    Args:
+        pending: Emails awaiting a reply, from _pending_replies.
+    """
+    emails = [e for e in pending if e.reply_suggested is not None]
     if not emails:
-        return
+        return []
 
     lines = ["# Drafts", ""]
 
     for email in emails:
         sender = _sender_name(email)
-        age = _age_str(email.email_date)
+        age = _age_str(email.email_date, now)
         lines.append(f"### Re: {email.subject or '(no subject)'}")
         lines.append(f"To: {sender} ({age})")
         lines.append("")
@@ -269,36 +404,101 @@ async def _generate_drafts(session: AsyncSession, vault: Path) -> None:
         lines.append("---")
         lines.append("")
 
-    (vault / "DRAFTS.md").write_text("\n".join(lines) + "\n")
+    return [(vault / "DRAFTS.md", "\n".join(lines) + "\n")]
 
 
 # ---------------------------------------------------------------------------
 # Projects — one file per project, everything on one page
 # ---------------------------------------------------------------------------
 
-async def _generate_projects(session: AsyncSession, vault: Path) -> None:
+async def _generate_projects(session: AsyncSession, vault: Path, now: datetime) -> PageFiles:
     """Generate one file per active project with tasks, people, and emails inline."""
     projects_dir = _ensure_dir(vault / "Projects")
 
-    result = await session.execute(
+    # Tasks and people (joined to their person rows) are eager-loaded with
+    # one IN query each; done tasks past the recently-done window are
+    # filtered out in SQL, never fetched
+    done_cutoff = now - timedelta(days=RECENT_DONE_DAYS)
+    result = await session.stream_scalars(
         select(Project)
+        .options(
+            selectinload(
+                Project.tasks.and_(or_(Task.status != "done", Task.completed_at > done_cutoff))
+            ),
+            selectinload(Project.people).joinedload(ProjectPeople.person),
+        )
         .where(Project.status.in_(["active", "paused"]))
         .order_by(Project.last_activity.desc().nullslast())
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
     )
-    projects = result.scalars().all()
 
-    for project in projects:
-        content = await _build_project_page(session, project)
-        safe_name = project.name.replace(" ", "-")
-        (projects_dir / f"{safe_name}.md").write_text(content)
+    # Rows arrive a batch at a time; each batch is rendered and released
+    # before the next is fetched
+    files = []
+    async for projects in result.partitions():
+        emails_by_project = await _recent_project_emails(session, [p.id for p in projects])
+        for project in projects:
+            content = _build_project_page(project, emails_by_project.get(project.id, []), now)
+            files.append((projects_dir / f"{project.safe_name}.md", content))
+    return files
+
+
+async def _recent_project_emails(
+    session: AsyncSession, project_ids: list, per_project: int = 10
+) -> dict:
+    """Load the newest human emails linked to each project in one query.
+
+    Emails are joined to projects by JSONB containment on project_links
+    (slug or name) and ranked per project with ROW_NUMBER().
+
+    Returns:
+        Dict of project id to its emails, newest first.
+    """
+    links = _project_links()
+    rank = func.row_number().over(
+        partition_by=Project.id, order_by=Email.email_date.desc()
+    ).label("rank")
+    ranked = (
+        select(Project.id.label("project_id"), Email.id.label("email_id"), rank)
+        .select_from(Project)
+        .join(
+            Email,
+            or_(
+                links.contains(func.jsonb_build_array(Project.slug)),
+                links.contains(func.jsonb_build_array(Project.name)),
+            ),
+        )
+        .where(Project.id.in_(project_ids), Email.classification == "human")
+        .subquery()
+    )
+    result = await session.execute(
+        select(ranked.c.project_id, Email)
+        .join(Email, Email.id == ranked.c.email_id)
+        .where(ranked.c.rank <= per_project)
+        .order_by(ranked.c.project_id, ranked.c.rank)
+    )
+
+    emails_by_project: dict = {}
+    for project_id, email in result.all():
+        emails_by_project.setdefault(project_id, []).append(email)
+    return emails_by_project
+
 
+def _build_project_page(project: Project, project_emails: list[Email], now: datetime) -> str:
+    """Build a single project page with everything inline.
 
-async def _build_project_page(session: AsyncSession, project: Project) -> str:
-    """Build a single project page with everything inline."""
-    lines = [f"# {project.name}"]
+    Args:
+        project: The project to render, with open and recently done tasks
+            and people eager-loaded.
+        project_emails: Recent emails linked to the project, newest first.
+        now: Current time for waiting ages.
+    """
+    buf = io.StringIO()
+    w = buf.write  # local binding: one lookup, not one per line
+    w(f"# {project.name}\n")
     if project.description:
-        lines.append(f"> {project.description}")
-    lines.append("")
+        w(f"> {project.description}\n")
+    w("\n")
 
     status = project.status.title()
     if project.user_pinned:
@@ -306,115 +506,140 @@ async def _build_project_page(session: AsyncSession, project: Project) -> str:
     if project.user_deadline:
         note = f" — {project.user_deadline_note}" if project.user_deadline_note else ""
         status += f" | Due: {project.user_deadline}{note}"
-    lines.append(f"*{status}*")
-    lines.append("")
-
-    # Tasks
-    result = await session.execute(
-        select(Task)
-        .where(Task.project_id == project.id)
-        .order_by(Task.created_at.asc())
-    )
-    tasks = result.scalars().all()
+    w(f"*{status}*\n\n")
 
-    in_progress = [t for t in tasks if t.status == "in_progress"]
-    waiting = [t for t in tasks if t.status == "waiting"]
-    backlog = [t for t in tasks if t.status == "backlog"]
-    done = [t for t in tasks if t.status == "done"]
+    # Tasks (done ones are already limited to the recent window)
+    by_status: dict[str, list[Task]] = {"in_progress": [], "waiting": [], "backlog": [], "done": []}
+    for t in sorted(project.tasks, key=lambda t: t.created_at):
+        by_status[t.status].append(t)
+    in_progress = by_status["in_progress"]
+    waiting = by_status["waiting"]
+    backlog = by_status["backlog"]
+    recent = by_status["done"]
 
     if in_progress or waiting or backlog:
-        lines.append("## Tasks")
+        w("## Tasks\n")
         if in_progress:
             for t in in_progress:
                 due = f" — due {t.due_date}" if t.due_date else ""
-                lines.append(f"- [ ] **{t.title}**{due}")
+                w(f"- [ ] **{t.title}**{due}\n")
         if waiting:
             for t in waiting:
                 days = ""
                 if t.waiting_since:
-                    d = (datetime.now(timezone.utc) - t.waiting_since).days
+                    d = (now - t.waiting_since).days
                     days = f" ({d}d waiting)"
-                lines.append(f"- [ ] {t.title} *waiting*{days}")
+                w(f"- [ ] {t.title} *waiting*{days}\n")
         if backlog:
             for t in backlog:
                 due = f" — due {t.due_date}" if t.due_date else ""
-                lines.append(f"- [ ] {t.title}{due}")
-        if done:
-            cutoff = datetime.now(timezone.utc).timestamp() - (14 * 86400)
-            recent = [t for t in done if t.completed_at and t.completed_at.timestamp() > cutoff]
-            if recent:
-                lines.append("")
-                for t in recent:
-                    lines.append(f"- [x] ~~{t.title}~~")
-        lines.append("")
+                w(f"- [ ] {t.title}{due}\n")
+        if recent:
+            w("\n")
+            for t in recent:
+                w(f"- [x] ~~{t.title}~~\n")
+        w("\n")
 
     # People
-    result = await session.execute(
-        select(Person, ProjectPeople.role)
-        .join(ProjectPeople, ProjectPeople.person_id == Person.id)
-        .where(ProjectPeople.project_id == project.id)
-    )
-    people = result.all()
-    if people:
-        lines.append("## People")
-        for person, role in people:
-            role_str = f" ({role})" if role else ""
-            lines.append(f"- [[{person.name.replace(' ', '-')}]]{role_str}")
-        lines.append("")
-
-    # Recent emails about this project
-    result = await session.execute(
-        select(Email)
-        .where(
-            Email.classification == "human",
-            Email.extraction_result.isnot(None),
-        )
-        .order_by(Email.email_date.desc())
-        .limit(50)
-    )
-    all_emails = result.scalars().all()
-    project_emails = []
-    for email in all_emails:
-        ext = email.extraction_result or {}
-        links = [l.lower() for l in ext.get("project_links", [])]
-        if project.slug.lower() in links or project.name.lower() in links:
-            project_emails.append(email)
+    if project.people:
+        w("## People\n")
+        for link in project.people:
+            role_str = f" ({link.role})" if link.role else ""
+            w(f"- [[{link.person.safe_name}]]{role_str}\n")
+        w("\n")
 
     if project_emails:
-        lines.append("## Recent emails")
-        for email in project_emails[:10]:
+        w("## Recent emails\n")
+        for email in project_emails:
             sender = _sender_name(email)
-            date_str = email.email_date.strftime("%b %d") if email.email_date else "?"
-            lines.append(f"- **{sender}** {date_str} — {email.subject or '(no subject)'}")
+            date_str = _short_date(email.email_date) if email.email_date else "?"
+            w(f"- **{sender}** {date_str} — {email.subject or '(no subject)'}\n")
             if email.snippet:
-                lines.append(f"  > {email.snippet[:150]}")
-        lines.append("")
+                w(f"  > {email.snippet[:150]}\n")
+        w("\n")
 
-    return "\n".join(lines) + "\n"
+    return buf.getvalue()
 
 
 # ---------------------------------------------------------------------------
 # People — who they are and what's happening
 # ---------------------------------------------------------------------------
 
-async def _generate_people(session: AsyncSession, vault: Path) -> None:
+async def _generate_people(session: AsyncSession, vault: Path) -> PageFiles:
     """Generate person files — only for people with actual interactions."""
     people_dir = _ensure_dir(vault / "People")
 
+    # Open commitments and project links (joined to their projects) are
+    # eager-loaded with one IN query each
+    result = await session.stream_scalars(
+        select(Person)
+        .options(
+            selectinload(Person.commitments.and_(Commitment.status == "open")),
+            selectinload(Person.project_links).joinedload(ProjectPeople.project),
+        )
+        .order_by(Person.last_contact.desc().nullslast())
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+
+    # Each streamed batch gets its recent emails in one query, so no page
+    # waits on a query of its own
+    files = []
+    async for people in result.partitions():
+        emails_by_address = await _recent_person_emails(
+            session, [p.email.lower() for p in people if p.email]
+        )
+        for person in people:
+            person_emails = emails_by_address.get(person.email.lower(), []) if person.email else []
+            content = _build_person_page(person, person_emails)
+            files.append((people_dir / f"{person.safe_name}.md", content))
+    return files
+
+
+async def _recent_person_emails(
+    session: AsyncSession, addresses: list[str], per_person: int = 5
+) -> dict:
+    """Load the newest human emails from each address in one query.
+
+    Matches on the indexed from_address column and ranks each sender's
+    emails with ROW_NUMBER().
+
+    Returns:
+        Dict of lowercased address to its emails, newest first.
+    """
+    if not addresses:
+        return {}
+    rank = func.row_number().over(
+        partition_by=Email.from_address, order_by=Email.email_date.desc()
+    ).label("rank")
+    ranked = (
+        select(Email.id.label("email_id"), rank)
+        .where(Email.classification == "human", Email.from_address.in_(addresses))
+        .subquery()
+    )
     result = await session.execute(
-        select(Person).order_by(Person.last_contact.desc().nullslast())
+        select(Email)
+        .join(ranked, Email.id == ranked.c.email_id)
+        .where(ranked.c.rank <= per_person)
+        .order_by(Email.from_address, ranked.c.rank)
     )
-    people = result.scalars().all()
 
-    for person in people:
-        content = await _build_person_page(session, person)
-        safe_name = person.name.replace(" ", "-")
-        (people_dir / f"{safe_name}.md").write_text(content)
+    emails_by_address: dict = {}
+    for email in result.scalars().all():
+        emails_by_address.setdefault(email.from_address, []).append(email)
+    return emails_by_address
+
 
+def _build_person_page(person: Person, person_emails: list[Email]) -> str:
+    """Build a person page with context about what you're doing with them.
 
-async def _build_person_page(session: AsyncSession, person: Person) -> str:
-    """Build a person page with context about what you're doing with them."""
-    lines = [f"# {person.name}"]
+    Args:
+        person: The person to render, with open commitments and project
+            links eager-loaded.
+        person_emails: Recent emails from the person, newest first.
+    """
+    buf = io.StringIO()
+    w = buf.write  # local binding: one lookup, not one per line
+    w(f"# {person.name}\n")
 
     meta = []
     if person.email:
@@ -424,85 +649,62 @@ async def _build_person_page(session: AsyncSession, person: Person) -> str:
     if person.relationship_type and person.relationship_type != "unknown":
         meta.append(person.relationship_type)
     if meta:
-        lines.append(f"*{' | '.join(meta)}*")
-    lines.append("")
+        w(f"*{' | '.join(meta)}*\n")
+    w("\n")
 
     # Shared projects
-    result = await session.execute(
-        select(Project, ProjectPeople.role)
-        .join(ProjectPeople, ProjectPeople.project_id == Project.id)
-        .where(ProjectPeople.person_id == person.id, Project.status == "active")
-    )
-    projects = result.all()
-    if projects:
-        lines.append("## Projects together")
-        for proj, role in projects:
-            role_str = f" ({role})" if role else ""
-            lines.append(f"- [[{proj.name.replace(' ', '-')}]]{role_str}")
-        lines.append("")
-
-    # Open commitments involving this person
-    result = await session.execute(
-        select(Commitment).where(
-            Commitment.person_id == person.id,
-            Commitment.status == "open",
-        ).order_by(Commitment.deadline.asc().nullslast())
+    links = [link for link in person.project_links if link.project.status == "active"]
+    if links:
+        w("## Projects together\n")
+        for link in links:
+            role_str = f" ({link.role})" if link.role else ""
+            w(f"- [[{link.project.safe_name}]]{role_str}\n")
+        w("\n")
+
+    # Open commitments involving this person, soonest deadline first
+    commitments = sorted(
+        person.commitments,
+        key=lambda c: (c.deadline is None, c.deadline or date.min),
     )
-    commitments = result.scalars().all()
     if commitments:
-        lines.append("## Open commitments")
+        w("## Open commitments\n")
         for c in commitments:
             direction = "I owe them" if c.direction == "from_me" else "They owe me"
             deadline = f" — due {c.deadline}" if c.deadline else ""
-            lines.append(f"- {direction}: {c.description}{deadline}")
-        lines.append("")
-
-    # Recent emails from/about this person
-    if person.email:
-        email_pattern = f"%{person.email}%"
-        result = await session.execute(
-            select(Email)
-            .where(Email.classification == "human")
-            .order_by(Email.email_date.desc())
-            .limit(50)
-        )
-        all_emails = result.scalars().all()
-        person_emails = [
-            e for e in all_emails
-            if person.email.lower() in (e.raw_headers or {}).get("from", "").lower()
-        ]
-        if person_emails:
-            lines.append("## Recent")
-            for email in person_emails[:5]:
-                date_str = email.email_date.strftime("%b %d") if email.email_date else "?"
-                lines.append(f"- {date_str} — {email.subject or '(no subject)'}")
-                if email.snippet:
-                    lines.append(f"  > {email.snippet[:150]}")
-            lines.append("")
+            w(f"- {direction}: {c.description}{deadline}\n")
+        w("\n")
+
+    # Recent emails from this person
+    if person_emails:
+        w("## Recent\n")
+        for email in person_emails:
+            date_str = _short_date(email.email_date) if email.email_date else "?"
+            w(f"- {date_str} — {email.subject or '(no subject)'}\n")
+            if email.snippet:
+                w(f"  > {email.snippet[:150]}\n")
+        w("\n")
 
     if person.notes:
-        lines.append("## Notes")
-        lines.append(person.notes)
-        lines.append("")
+        w("## Notes\n")
+        w(f"{person.notes}\n\n")
 
     # Contact timeline
     contact = []
     if person.first_contact:
-        contact.append(f"First: {person.first_contact.strftime('%Y-%m-%d')}")
+        contact.append(f"First: {person.first_contact.date().isoformat()}")
     if person.last_contact:
-        contact.append(f"Last: {person.last_contact.strftime('%Y-%m-%d')}")
+        contact.append(f"Last: {person.last_contact.date().isoformat()}")
     if contact:
-        lines.append(f"*{' | '.join(contact)}*")
-        lines.append("")
+        w(f"*{' | '.join(contact)}*\n\n")
 
-    return "\n".join(lines) + "\n"
+    return buf.getvalue()
 
 
 # ---------------------------------------------------------------------------
 # Commitments.md
 # ---------------------------------------------------------------------------
 
-async def _generate_commitments(session: AsyncSession, vault: Path) -> None:
+async def _generate_commitments(session: AsyncSession, vault: Path) -> PageFiles:
     """Generate Commitments.md — what you owe and what's owed to you."""
     result = await session.execute(
         select(Commitment)
@@ -512,7 +714,7 @@ async def _generate_commitments(session: AsyncSession, vault: Path) -> None:
     )
     commitments = result.scalars().all()
     if not commitments:
-        return
+        return []
 
     lines = ["# Commitments", ""]
 
@@ -535,25 +737,59 @@ async def _generate_commitments(session: AsyncSession, vault: Path) -> None:
             lines.append(f"- [ ] {c.description}{who}{deadline}")
         lines.append("")
 
-    (vault / "Commitments.md").write_text("\n".join(lines) + "\n")
+    return [(vault / "Commitments.md", "\n".join(lines) + "\n")]
 
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
-def _sender_name(email: Email) -> str:
-    """Extract just the human name from a From: header."""
+def _sender_name(email: Email | Row) -> str:
+    """Extract just the human name from a From: header, memoized per email.
+
+    Accepts an Email or any row carrying the _SENDER_COLUMNS.
+    """
+    name = _sender_cache.get(email.id)
+    if name is None:
+        name = _sender_cache[email.id] = _parse_sender_name(email)
+    return name
+
+
+def _parse_sender_name(email: Email | Row) -> str:
+    if email.sender_name:
+        return email.sender_name
     sender = (email.raw_headers or {}).get("from", "unknown")
-    name = sender.split("<")[0].strip().strip('"').strip()
+    name = _DISPLAY_NAME_RE.match(sender).group(1)
     return name or sender
 
 
-def _age_str(email_date: Optional[datetime]) -> str:
-    """Human-readable age string for an email."""
+def _project_links():
+    """The extraction_result -> 'project_links' expression, exactly as indexed.
+
+    Spelled with -> and a literal key (not a subscript or bound parameter) so
+    Postgres can match it against idx_emails_project_links.
+    """
+    return Email.extraction_result.op("->", return_type=JSONB)(literal_column("'project_links'"))
+
+
+def _short_date(value: datetime) -> str:
+    """Format as e.g. "Feb 01" without going through strftime (always English)."""
+    return f"{_MONTHS[value.month - 1]} {value.day:02d}"
+
+
+def _age_str(email_date: Optional[datetime], now: datetime) -> str:
+    """Human-readable age string for an email, relative to now (memoized)."""
     if not email_date:
         return "unknown date"
-    days = (datetime.now(timezone.utc) - email_date).days
+    key = (email_date, now)
+    age = _age_cache.get(key)
+    if age is None:
+        age = _age_cache[key] = _format_age(email_date, now)
+    return age
+
+
+def _format_age(email_date: datetime, now: datetime) -> str:
+    days = (now - email_date).days
     if days == 0:
         return "today"
     if days == 1:
@@ -563,4 +799,4 @@ def _age_str(email_date: Optional[datetime]) -> str:
     if days < 30:
         weeks = days // 7
         return f"{weeks}w ago"
-    return email_date.strftime("%b %d")
+    return _short_date(email_date)
@@ -13,6 +13,14 @@ from src.storage.models import EmailAccount, Project, Sprint, Task
 
 logger = logging.getLogger(__name__)
 
+# log(n + 1) for the mention counts most projects have; larger counts use math.log
+_LOG1P_TABLE = tuple(log(n + 1) for n in range(1024))
+
+
+def _log1p_count(n: int) -> float:
+    """log(n + 1) for a non-negative count, via table lookup when small."""
+    return _LOG1P_TABLE[n] if n < len(_LOG1P_TABLE) else log(n + 1)
+
 
 async def get_active_sprint_for(
     session: AsyncSession,
@@ -34,12 +42,47 @@ async def get_active_sprint_for(
     return result.scalar_one_or_none()
 
 
+async def get_active_sprints_by_project(
+    session: AsyncSession,
+    now: Optional[datetime] = None,
+) -> dict[UUID, Sprint]:
+    """Get all currently active sprints in one query, keyed by project id."""
+    now = now or datetime.now(timezone.utc)
+    result = await session.execute(
+        select(Sprint).where(
+            Sprint.project_id.isnot(None),
+            Sprint.is_active.is_(True),
+            Sprint.starts_at <= now,
+            Sprint.ends_at >= now,
+        )
+    )
+    return {sprint.project_id: sprint for sprint in result.scalars().all()}
+
+
+async def _active_sprint(
+    session: AsyncSession,
+    project_id: Optional[UUID],
+    now: datetime,
+    sprints: Optional[dict[UUID, Sprint]],
+) -> Optional[Sprint]:
+    """Look up the active sprint in a prefetched map, or query for it."""
+    if sprints is not None:
+        return sprints.get(project_id) if project_id else None
+    return await get_active_sprint_for(session, project_id, now)
+
+
 async def effective_priority_project(
     session: AsyncSession,
     project: Project,
     now: Optional[datetime] = None,
+    sprints: Optional[dict[UUID, Sprint]] = None,
 ) -> float:
-    """Calculate effective priority score for a project."""
+    """Calculate effective priority score for a project.
+
+    Args:
+        sprints: Active sprints by project id (see get_active_sprints_by_project);
+            when given, no sprint query is issued.
+    """
     now = now or datetime.now(timezone.utc)
     today = now.date()
     score = 0.0
@@ -66,14 +109,14 @@ async def effective_priority_project(
             score += 5
 
     # 3. Active sprint boost
-    sprint = await get_active_sprint_for(session, project.id, now)
+    sprint = await _active_sprint(session, project.id, now, sprints)
     if sprint:
         # Guarantee minimum elevation so sprints always matter, even on zero base
         score = max(score, 10.0) * sprint.priority_boost
 
     # 4. Activity signals (low weight)
     if project.mention_count > 0:
-        score += log(project.mention_count + 1) * 2
+        score += _log1p_count(project.mention_count) * 2
     score += project.source_diversity * 3
     score += project.people_count * 1.5
 
@@ -84,8 +127,15 @@ async def effective_priority_task(
     session: AsyncSession,
     task: Task,
     now: Optional[datetime] = None,
+    sprints: Optional[dict[UUID, Sprint]] = None,
+    accounts: Optional[dict[UUID, EmailAccount]] = None,
 ) -> float:
-    """Calculate effective priority score for a task."""
+    """Calculate effective priority score for a task.
+
+    Args:
+        sprints: Active sprints by project id; when given, no sprint query is issued.
+        accounts: Email accounts by id; when given, no account lookup is issued.
+    """
     now = now or datetime.now(timezone.utc)
     today = now.date()
     score = 0.0
@@ -115,13 +165,16 @@ async def effective_priority_task(
             score += 5
 
     # 4. Active sprint boost
-    sprint = await get_active_sprint_for(session, task.project_id, now)
+    sprint = await _active_sprint(session, task.project_id, now, sprints)
     if sprint:
         score = max(score, 10.0) * sprint.priority_boost
 
     # 5. Account weight
     if task.source_account_id:
-        account = await session.get(EmailAccount, task.source_account_id)
+        if accounts is not None:
+            account = accounts.get(task.source_account_id)
+        else:
+            account = await session.get(EmailAccount, task.source_account_id)
         if account:
             score *= account.priority_weight
 
@@ -146,9 +199,12 @@ async def get_priority_ranking(
     result = await session.execute(query)
     projects = result.scalars().all()
 
+    # One sprint query for all projects instead of one per project
+    sprints = await get_active_sprints_by_project(session, now)
+
     ranked = []
     for project in projects:
-        score = await effective_priority_project(session, project, now)
+        score = await effective_priority_project(session, project, now, sprints=sprints)
         ranked.append({
             "project": project,
             "score": score,
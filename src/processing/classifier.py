@@ -1,32 +1,89 @@
 """Email classification using Claude Haiku."""
 
+import asyncio
 import json
 import logging
 import re
 import time
 from datetime import date
+from typing import AsyncIterable, Optional
+from uuid import UUID
 
 import httpx
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.config import get_settings
+from src.processing.extractor import BATCH_PRICE_FACTOR, _cost_usd
+from src.processing.spam_filter import spam_probability
+from src.storage.db import get_session
 from src.storage.models import Email
 from src.storage.raw import store_ai_conversation
 
+try:
+    import h2  # noqa: F401
+except ImportError:  # optional: HTTP/2 for the shared API client
+    h2 = None
+
+try:
+    import msgspec
+except ImportError:  # optional: faster JSON decoding of model responses
+    msgspec = None
+
 logger = logging.getLogger(__name__)
 
-# Sender patterns that are never human — skip the API call entirely
-_NOREPLY_RE = re.compile(
-    r"(^|<)(no[-_]?reply|noreply|mailer[-_]?daemon|notifications?|updates?|info@|support@|news@|marketing@|digest@)",
-    re.IGNORECASE,
+ANTHROPIC_API_URL = "https://api.anthropic.com/v1"
+
+# Seconds between status checks while a message batch is processing
+BATCH_POLL_SECONDS = 30.0
+
+# Shared API client, so bursts of classifications reuse warm connections
+# instead of a TLS handshake per email. Bound to the event loop it was
+# created on (each asyncio.run gets its own).
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Sender prefixes that are never human — skip the API call entirely. Matched
+# (lowercased) at the start of the From header or right after a "<", most
+# common first; str.startswith with a tuple beats a regex alternation here.
+_NOREPLY_PREFIXES = (
+    "noreply", "no-reply", "notification", "update", "info@", "support@",
+    "news@", "marketing@", "no_reply", "mailer-daemon", "mailerdaemon",
+    "mailer_daemon", "digest@",
 )
 
 # Known bulk-mail platforms (From domain or via header)
-_BULK_DOMAINS = {
+_BULK_DOMAINS = frozenset({
     "mailchimp.com", "sendgrid.net", "constantcontact.com", "mailgun.org",
     "amazonses.com", "postmarkapp.com", "hubspot.com", "klaviyo.com",
     "brevo.com", "mailjet.com", "campaign-archive.com",
-}
+})
+
+# Domain at the end of a From header ("Name <user@domain>" or "user@domain")
+_SENDER_DOMAIN_RE = re.compile(r"@([\w.-]+)>?\s*$")
+
+
+def _is_bulk_domain(domain: str) -> bool:
+    """Check a lowercased domain, or any parent domain, against _BULK_DOMAINS."""
+    if domain in _BULK_DOMAINS:
+        return True
+    # Walk up the labels: mail.sendgrid.net -> sendgrid.net -> net
+    dot = domain.find(".")
+    while dot != -1:
+        domain = domain[dot + 1:]
+        if domain in _BULK_DOMAINS:
+            return True
+        dot = domain.find(".")
+    return False
+
+
+def _is_noreply_sender(sender: str) -> bool:
+    """Check whether a From header starts, or has an address starting, with a noreply prefix."""
+    sender = sender.lower()
+    if sender.startswith(_NOREPLY_PREFIXES):
+        return True
+    return "<" in sender and any(
+        part.startswith(_NOREPLY_PREFIXES) for part in sender.split("<")[1:]
+    )
 
 
 def pre_classify(email: Email) -> dict | None:
@@ -34,12 +91,11 @@ def pre_classify(email: Email) -> dict | None:
 
     Returns a classification dict if confident, or None to fall through to the LLM.
     """
-    sender = (email.raw_headers or {}).get("from", "")
     headers = email.raw_headers or {}
-    body = (email.full_body or email.snippet or "").lower()
+    sender = headers.get("from", "")
 
     # Check for noreply-style sender
-    if _NOREPLY_RE.search(sender):
+    if _is_noreply_sender(sender):
         return {
             "classification": "automated",
             "confidence": 0.95,
@@ -49,7 +105,7 @@ def pre_classify(email: Email) -> dict | None:
         }
 
     # Check for List-Unsubscribe header (mailing lists / newsletters)
-    if headers.get("list-unsubscribe") or headers.get("List-Unsubscribe"):
+    if headers.get("list_unsubscribe"):
         return {
             "classification": "newsletter",
             "confidence": 0.90,
@@ -59,7 +115,7 @@ def pre_classify(email: Email) -> dict | None:
         }
 
     # Check for precedence: bulk/list
-    precedence = (headers.get("precedence") or headers.get("Precedence") or "").lower()
+    precedence = (headers.get("precedence") or "").lower()
     if precedence in ("bulk", "list", "junk"):
         return {
             "classification": "newsletter",
@@ -70,22 +126,22 @@ def pre_classify(email: Email) -> dict | None:
         }
 
     # Check sender domain against known bulk platforms
-    domain_match = re.search(r"@([\w.-]+)>?\s*$", sender)
-    if domain_match:
-        domain = domain_match.group(1).lower()
-        for bulk in _BULK_DOMAINS:
-            if domain == bulk or domain.endswith("." + bulk):
-                return {
-                    "classification": "newsletter",
-                    "confidence": 0.85,
-                    "urgency": "low",
-                    "sender_type": "company",
-                    "route_to": "archive",
-                }
-
-    # Check for unsubscribe near end of body (strong newsletter signal)
+    domain_match = _SENDER_DOMAIN_RE.search(sender)
+    if domain_match and _is_bulk_domain(domain_match.group(1).lower()):
+        return {
+            "classification": "newsletter",
+            "confidence": 0.85,
+            "urgency": "low",
+            "sender_type": "company",
+            "route_to": "archive",
+        }
+
+    # Check for unsubscribe near end of body (strong newsletter signal).
+    # Only the tail is lowercased; the header checks above catch most mail
+    # without touching the body at all.
+    body = email.full_body or email.snippet or ""
     if len(body) > 200:
-        tail = body[-500:]
+        tail = body[-500:].lower()
         if "unsubscribe" in tail and ("preferences" in tail or "opt out" in tail or "opt-out" in tail or "manage" in tail):
             return {
                 "classification": "newsletter",
@@ -95,9 +151,26 @@ def pre_classify(email: Email) -> dict | None:
                 "route_to": "archive",
             }
 
+    # Local spam model, trained on earlier classifications (if available)
+    spam_prob = spam_probability(email)
+    if spam_prob is not None and spam_prob >= get_settings().general.spam_threshold:
+        return {
+            "classification": "spam",
+            "confidence": round(spam_prob, 2),
+            "urgency": "low",
+            "sender_type": "unknown",
+            "route_to": "skip",
+            "still_relevant": False,
+        }
+
     return None
 
-CLASSIFICATION_PROMPT = """Classify this email into exactly one category. Respond with JSON only, no other text.
+# Bump whenever CLASSIFICATION_SYSTEM or _build_classification_prompt's text changes
+CLASSIFICATION_PROMPT_VERSION = "v1.1"
+
+# Static rubric, sent as a cached system block so repeat calls within the
+# cache lifetime are billed at the cache-read rate
+CLASSIFICATION_SYSTEM = """Classify the email into exactly one category. Respond with JSON only, no other text.
 
 Categories (pick the FIRST match):
 - spam: Cold outreach, sales pitches, recruiter emails, SEO offers, link building requests, unsolicited intros, scams, "Hey I noticed your company..." emails. When in doubt between spam and human, pick spam.
@@ -110,16 +183,8 @@ Also assess:
 - urgency: urgent / normal / low
 - sender_type: known (colleague, friend, family) / unknown (never interacted) / company (business entity)
 
-Email:
-From: {sender}
-Date: {date}
-Subject: {subject}
-Body (first 500 chars): {body}
-
-Today's date: {today}
-
 Respond ONLY with this JSON format:
-{{"classification": "spam", "confidence": 0.94, "urgency": "low", "sender_type": "unknown", "route_to": "skip", "still_relevant": false}}
+{"classification": "spam", "confidence": 0.94, "urgency": "low", "sender_type": "unknown", "route_to": "skip", "still_relevant": false}
 
 Rules for route_to:
 - human → "deep_analysis"
@@ -131,57 +196,104 @@ Rules for route_to:
 still_relevant: Is this email still actionable TODAY? An email from 3 months ago asking "are you free Friday?" is NOT still relevant. A recent email about an ongoing project IS. Old automated emails (receipts, confirmations) are never relevant. Default to false if the email is more than 2 weeks old UNLESS it references an ongoing commitment or project.
 """
 
+_CLASSIFICATION_SYSTEM_BLOCKS = [
+    {"type": "text", "text": CLASSIFICATION_SYSTEM, "cache_control": {"type": "ephemeral"}},
+]
+
+
+def _build_classification_prompt(email: Email, today: Optional[str] = None) -> str:
+    """Build the per-email classification prompt, sent uncached after the system block.
+
+    An f-string rather than a str.format template, so the layout isn't
+    re-parsed for every email.
+
+    Args:
+        today: Today's ISO date; pass it in when building many prompts at once.
+    """
+    sender = (email.raw_headers or {}).get("from", "unknown")
+    subject = email.subject or ""
+    body = (email.full_body or "")[:500]
+    email_date = email.email_date.strftime("%Y-%m-%d") if email.email_date else "unknown"
+    if today is None:
+        today = date.today().isoformat()
+
+    return f"""Email:
+From: {sender}
+Date: {email_date}
+Subject: {subject}
+Body (first 500 chars): {body}
+
+Today's date: {today}
+"""
+
+
+def _api_headers(api_key: str) -> dict:
+    """Per-request headers for Anthropic API requests; the rest are set on the client."""
+    return {"x-api-key": api_key}
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared Anthropic API client for the running event loop."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            timeout=30.0,
+            http2=h2 is not None,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+            headers={"anthropic-version": "2023-06-01", "content-type": "application/json"},
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared API client, if one is open on this event loop."""
+    global _client, _client_loop
+    if _client is not None and _client_loop is asyncio.get_running_loop():
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
 
 async def classify_email(
     session: AsyncSession,
     email: Email,
+    today: Optional[str] = None,
 ) -> dict:
     """Classify an email using Claude Haiku via the Anthropic API.
 
+    Args:
+        today: Today's ISO date, computed once by callers classifying many
+            emails; defaults to the current date.
+
     Returns classification dict with keys:
         classification, confidence, urgency, sender_type, route_to
     """
     settings = get_settings()
-    sender = (email.raw_headers or {}).get("from", "unknown")
-    subject = email.subject or ""
-    body = (email.full_body or "")[:500]
-    email_date = email.email_date.strftime("%Y-%m-%d") if email.email_date else "unknown"
-    today = date.today().isoformat()
-
-    prompt = CLASSIFICATION_PROMPT.format(
-        sender=sender,
-        subject=subject,
-        body=body,
-        date=email_date,
-        today=today,
-    )
+    prompt = _build_classification_prompt(email, today)
 
     request_payload = {
         "model": settings.anthropic.model,
         "max_tokens": 200,
+        "system": _CLASSIFICATION_SYSTEM_BLOCKS,
         "messages": [{"role": "user", "content": prompt}],
     }
 
     start_time = time.time()
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                "https://api.anthropic.com/v1/messages",
-                headers={
-                    "x-api-key": settings.anthropic.api_key,
-                    "anthropic-version": "2023-06-01",
-                    "content-type": "application/json",
-                },
-                json=request_payload,
-            )
-            response.raise_for_status()
-            result = response.json()
+        response = await get_client().post(
+            f"{ANTHROPIC_API_URL}/messages",
+            headers=_api_headers(settings.anthropic.api_key),
+            json=request_payload,
+        )
+        response.raise_for_status()
+        result = response.json()
 
         latency_ms = int((time.time() - start_time) * 1000)
         raw_response = result.get("content", [{}])[0].get("text", "")
-        input_tokens = result.get("usage", {}).get("input_tokens", 0)
-        output_tokens = result.get("usage", {}).get("output_tokens", 0)
+        usage = result.get("usage", {})
 
         # Parse JSON from response
         classification = _parse_classification(raw_response)
@@ -192,11 +304,15 @@ async def classify_email(
                 session=session,
                 session_type="classification",
                 model=settings.anthropic.model,
-                prompt_version="v1.0",
-                request_messages=[{"role": "user", "content": prompt}],
+                prompt_version=CLASSIFICATION_PROMPT_VERSION,
+                request_messages=[
+                    {"role": "system", "content": CLASSIFICATION_SYSTEM},
+                    {"role": "user", "content": prompt},
+                ],
                 response_content={"raw": raw_response, "parsed": classification},
-                input_tokens=input_tokens,
-                output_tokens=output_tokens,
+                input_tokens=usage.get("input_tokens", 0),
+                output_tokens=usage.get("output_tokens", 0),
+                cache_read_tokens=usage.get("cache_read_input_tokens", 0),
                 latency_ms=latency_ms,
             )
 
@@ -207,6 +323,121 @@ async def classify_email(
         return _default_classification()
 
 
+async def batch_classify_emails(emails: AsyncIterable[Email]) -> dict[UUID, dict]:
+    """Classify many emails through the Anthropic Message Batches API.
+
+    Batches are billed at half the per-request price but may take up to
+    24 hours, so this is for backlog processing rather than fresh mail.
+    Blocks (polling every BATCH_POLL_SECONDS) until the batch has ended.
+
+    Each email is only read to build its prompt as it arrives, so callers
+    can stream them in from short-lived sessions. No session is held while
+    the batch runs; the AI conversation log is written in a fresh one.
+
+    Returns:
+        Classification dicts keyed by email ID. Emails whose request failed
+        (or whose result can't be read) are left out, as is everything if
+        the batch itself can't be run, so callers fall back to classify_email.
+    """
+    settings = get_settings()
+    today = date.today().isoformat()
+    prompts = {str(email.id): _build_classification_prompt(email, today) async for email in emails}
+    if not prompts:
+        return {}
+
+    headers = _api_headers(settings.anthropic.api_key)
+    requests = [
+        {
+            "custom_id": custom_id,
+            "params": {
+                "model": settings.anthropic.model,
+                "max_tokens": 200,
+                "system": _CLASSIFICATION_SYSTEM_BLOCKS,
+                "messages": [{"role": "user", "content": prompt}],
+            },
+        }
+        for custom_id, prompt in prompts.items()
+    ]
+
+    try:
+        client = get_client()
+        response = await client.post(
+            f"{ANTHROPIC_API_URL}/messages/batches",
+            headers=headers,
+            json={"requests": requests},
+            timeout=60.0,
+        )
+        response.raise_for_status()
+        batch = response.json()
+
+        while batch["processing_status"] != "ended":
+            await asyncio.sleep(BATCH_POLL_SECONDS)
+            response = await client.get(
+                f"{ANTHROPIC_API_URL}/messages/batches/{batch['id']}", headers=headers
+            )
+            response.raise_for_status()
+            batch = response.json()
+
+        response = await client.get(batch["results_url"], headers=headers, timeout=60.0)
+        response.raise_for_status()
+        lines = response.text.splitlines()
+    except Exception as e:
+        logger.error("Batch classification of %d emails failed: %s", len(prompts), e)
+        return {}
+
+    results: dict[UUID, dict] = {}
+    conversations = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+            custom_id = entry["custom_id"]
+            email_id = UUID(custom_id)
+            prompt = prompts[custom_id]
+            outcome = entry["result"]
+            if outcome["type"] != "succeeded":
+                # Left out so the pipeline classifies it with a normal API call
+                logger.warning("Batch classification for email %s %s", custom_id, outcome["type"])
+                continue
+
+            message = outcome["message"]
+            raw_response = (message.get("content") or [{}])[0].get("text", "")
+            usage = message.get("usage", {})
+        except (ValueError, KeyError, TypeError, AttributeError, IndexError) as e:
+            logger.warning("Skipping unreadable batch classification result: %s", e)
+            continue
+
+        classification = _parse_classification(raw_response)
+        results[email_id] = classification
+
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        cache_read_tokens = usage.get("cache_read_input_tokens", 0)
+        conversations.append({
+            "session_type": "classification",
+            "model": settings.anthropic.model,
+            "prompt_version": CLASSIFICATION_PROMPT_VERSION,
+            "request_messages": [
+                {"role": "system", "content": CLASSIFICATION_SYSTEM},
+                {"role": "user", "content": prompt},
+            ],
+            "response_content": {"raw": raw_response, "parsed": classification, "batch_id": batch["id"]},
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cache_read_tokens": cache_read_tokens,
+            "cost_usd": _cost_usd(input_tokens, output_tokens, cache_read_tokens) * BATCH_PRICE_FACTOR,
+        })
+
+    if settings.raw_storage.store_ai_conversations and conversations:
+        async with get_session() as session:
+            for conversation in conversations:
+                await store_ai_conversation(session=session, **conversation)
+
+    logger.info("Batch %s classified %d emails", batch["id"], len(results))
+    return results
+
+
 def _parse_classification(raw_response: str) -> dict:
     """Parse the JSON classification from the LLM response."""
     try:
@@ -219,7 +450,8 @@ def _parse_classification(raw_response: str) -> dict:
         start = text.index("{")
         end = text.rindex("}") + 1
         json_str = text[start:end]
-        result = json.loads(json_str)
+        # msgspec.DecodeError is a ValueError, so both paths land below on bad JSON
+        result = msgspec.json.decode(json_str) if msgspec is not None else json.loads(json_str)
 
         # Validate required fields
         valid_classifications = {"human", "automated", "newsletter", "spam", "system"}
@@ -269,18 +501,27 @@ def _default_classification() -> dict:
 async def classify_and_update(
     session: AsyncSession,
     email: Email,
+    classification: Optional[dict] = None,
+    today: Optional[str] = None,
 ) -> dict:
     """Classify an email and update its database record.
 
-    Tries zero-cost heuristics first; only calls the LLM if uncertain.
+    Tries zero-cost heuristics first; only calls the LLM if uncertain. The
+    changes are left pending on the session; the caller's flush (e.g. the
+    pipeline's per-email savepoint) writes them together with the email's
+    other updates.
+
+    Args:
+        classification: A result already computed for this email (e.g. by
+            batch_classify_emails); skips classifying it again.
+        today: Today's ISO date, passed through to classify_email.
     """
-    result = pre_classify(email)
+    result = classification or pre_classify(email)
     if result is None:
-        result = await classify_email(session, email)
+        result = await classify_email(session, email, today)
 
     email.classification = result["classification"]
     email.urgency = result.get("urgency", "normal")
-    await session.flush()
 
     logger.info(
         "Classified email %s as %s (confidence: %.2f)",
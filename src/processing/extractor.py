@@ -1,23 +1,51 @@
 """Deep extraction using Claude Haiku for human emails."""
 
+import asyncio
 import json
 import logging
 import time
 from datetime import date, datetime, timezone
-from typing import Optional
+from typing import AsyncIterable, Optional
 from uuid import UUID
 
 import anthropic
-from sqlalchemy import select
+from sqlalchemy import literal, select, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.config import get_settings
-from src.storage.models import Email, Project
+from src.storage.db import get_session
+from src.storage.models import Email, Person, Project
 from src.storage.raw import store_ai_conversation
 
+try:
+    import msgspec
+except ImportError:  # optional: faster JSON decoding of model responses
+    msgspec = None
+
 logger = logging.getLogger(__name__)
 
-EXTRACTION_PROMPT_VERSION = "v1.0"
+EXTRACTION_PROMPT_VERSION = "v1.1"
+
+# Seconds between status checks while a message batch is processing
+BATCH_POLL_SECONDS = 30.0
+
+# Message Batches are billed at half the standard per-token price
+BATCH_PRICE_FACTOR = 0.5
+
+# Shared async API client, created on first use. Bound to the event loop
+# and API key it was created with.
+_async_client: Optional[anthropic.AsyncAnthropic] = None
+_async_client_key: Optional[tuple] = None
+
+
+def _get_async_client(api_key: str) -> anthropic.AsyncAnthropic:
+    """Return the shared AsyncAnthropic client for the running loop and key."""
+    global _async_client, _async_client_key
+    key = (asyncio.get_running_loop(), api_key)
+    if _async_client is None or _async_client_key != key:
+        _async_client = anthropic.AsyncAnthropic(api_key=api_key)
+        _async_client_key = key
+    return _async_client
 
 EXTRACTION_SYSTEM = """You are an AI assistant that extracts structured data from emails.
 Given an email and context about known projects and people, extract actionable information.
@@ -44,12 +72,13 @@ IMPORTANT: Consider the email date vs today's date. If the email is more than 2
 Be conservative — only extract what's clearly stated. Don't infer tasks that aren't there."""
 
 
-def _build_extraction_prompt(email: Email, known_projects: list[str], known_people: list[str]) -> str:
-    """Build the extraction prompt with email content and context."""
-    sender = (email.raw_headers or {}).get("from", "unknown")
-    subject = email.subject or "(no subject)"
-    body = email.full_body or email.snippet or ""
+def _build_extraction_system(known_projects: list[str], known_people: list[str]) -> list[dict]:
+    """Build the system blocks: the static instructions, then known context.
 
+    Both blocks are marked for prompt caching. The instructions never change
+    and the known projects/people change slowly, so during a processing run
+    only the per-email user prompt is billed at the full input rate.
+    """
     context_parts = []
     if known_projects:
         context_parts.append(f"Known projects: {', '.join(known_projects)}")
@@ -58,12 +87,25 @@ def _build_extraction_prompt(email: Email, known_projects: list[str], known_peop
 
     context = "\n".join(context_parts) if context_parts else "No known context yet."
 
-    today = date.today().isoformat()
+    return [
+        {"type": "text", "text": EXTRACTION_SYSTEM, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": f"Context:\n{context}", "cache_control": {"type": "ephemeral"}},
+    ]
+
+
+def _build_extraction_prompt(email: Email, today: Optional[str] = None) -> str:
+    """Build the per-email extraction prompt.
 
-    return f"""Context:
-{context}
+    Args:
+        today: Today's ISO date; pass it in when building many prompts at once.
+    """
+    sender = (email.raw_headers or {}).get("from", "unknown")
+    subject = email.subject or "(no subject)"
+    body = email.full_body or email.snippet or ""
+    if today is None:
+        today = date.today().isoformat()
 
-Today's date: {today}
+    return f"""Today's date: {today}
 
 Email:
 From: {sender}
@@ -76,14 +118,51 @@ Body:
 Extract structured data from this email as JSON."""
 
 
+async def _load_known_context(
+    session: AsyncSession,
+    projects: bool = True,
+    people: bool = True,
+) -> tuple[list[str], list[str]]:
+    """Load the active project slugs and known people names given to the model.
+
+    Both lists come back from one UNION ALL query of tagged rows, so loading
+    them costs a single round trip (a session can't run two queries at once).
+
+    Args:
+        projects: Load the project slugs; otherwise that list is empty.
+        people: Load the people names; otherwise that list is empty.
+    """
+    known: tuple[list[str], list[str]] = ([], [])
+    parts = []
+    if projects:
+        parts.append(
+            select(literal(0).label("kind"), Project.slug.label("name"))
+            .where(Project.status == "active")
+        )
+    if people:
+        parts.append(select(literal(1).label("kind"), Person.name.label("name")).limit(100))
+    if not parts:
+        return known
+
+    result = await session.execute(union_all(*parts) if len(parts) > 1 else parts[0])
+    for kind, name in result.all():
+        known[kind].append(name)
+    return known
+
+
 async def extract_email(
     session: AsyncSession,
     email: Email,
     known_projects: Optional[list[str]] = None,
     known_people: Optional[list[str]] = None,
+    today: Optional[str] = None,
 ) -> dict:
     """Extract structured data from a human email using Claude Haiku.
 
+    Args:
+        today: Today's ISO date, computed once by callers extracting many
+            emails; defaults to the current date.
+
     Returns extraction dict with tasks, commitments, questions, etc.
     """
     settings = get_settings()
@@ -92,30 +171,26 @@ async def extract_email(
         logger.warning("No Anthropic API key configured, skipping extraction")
         return _empty_extraction()
 
-    if known_projects is None:
-        result = await session.execute(
-            select(Project.slug).where(Project.status == "active")
+    if known_projects is None or known_people is None:
+        loaded_projects, loaded_people = await _load_known_context(
+            session, projects=known_projects is None, people=known_people is None
         )
-        known_projects = [row[0] for row in result.all()]
+        known_projects = loaded_projects if known_projects is None else known_projects
+        known_people = loaded_people if known_people is None else known_people
 
-    if known_people is None:
-        from src.storage.models import Person
-
-        result = await session.execute(select(Person.name).limit(100))
-        known_people = [row[0] for row in result.all()]
-
-    user_prompt = _build_extraction_prompt(email, known_projects, known_people)
+    system = _build_extraction_system(known_projects, known_people)
+    user_prompt = _build_extraction_prompt(email, today)
 
     messages = [{"role": "user", "content": user_prompt}]
 
     start_time = time.time()
 
     try:
-        client = anthropic.Anthropic(api_key=settings.anthropic.api_key)
-        response = client.messages.create(
+        client = _get_async_client(settings.anthropic.api_key)
+        response = await client.messages.create(
             model=settings.anthropic.model,
             max_tokens=2000,
-            system=EXTRACTION_SYSTEM,
+            system=system,
             messages=messages,
         )
 
@@ -126,7 +201,8 @@ async def extract_email(
         # Track costs
         input_tokens = response.usage.input_tokens
         output_tokens = response.usage.output_tokens
-        cost_usd = (input_tokens * 0.25 + output_tokens * 1.25) / 1_000_000
+        cache_read_tokens = response.usage.cache_read_input_tokens or 0
+        cost_usd = _cost_usd(input_tokens, output_tokens, cache_read_tokens)
 
         # Log AI conversation
         if settings.raw_storage.store_ai_conversations:
@@ -136,12 +212,13 @@ async def extract_email(
                 model=settings.anthropic.model,
                 prompt_version=EXTRACTION_PROMPT_VERSION,
                 request_messages=[
-                    {"role": "system", "content": EXTRACTION_SYSTEM},
+                    *({"role": "system", "content": block["text"]} for block in system),
                     *messages,
                 ],
                 response_content={"raw": raw_text, "parsed": extraction},
                 input_tokens=input_tokens,
                 output_tokens=output_tokens,
+                cache_read_tokens=cache_read_tokens,
                 cost_usd=cost_usd,
                 latency_ms=latency_ms,
             )
@@ -160,6 +237,113 @@ async def extract_email(
         return _empty_extraction()
 
 
+async def batch_extract_emails(emails: AsyncIterable[Email]) -> dict[UUID, dict]:
+    """Extract structured data from many emails through the Message Batches API.
+
+    Batches are billed at half price but may take up to 24 hours, so this
+    is for backlog processing. Blocks (polling every BATCH_POLL_SECONDS)
+    until the batch has ended. Known projects and people are loaded once
+    for the whole batch.
+
+    Each email is only read to build its prompt as it arrives, and sessions
+    are opened just to load the known context and to log the results, so
+    no transaction sits idle while the batch runs.
+
+    Returns:
+        Extraction dicts keyed by email ID. Emails whose request failed are
+        left out, as is everything if the batch itself can't be run, so
+        callers fall back to extract_email.
+    """
+    settings = get_settings()
+
+    if not settings.anthropic.api_key:
+        return {}
+
+    today = date.today().isoformat()
+    prompts = {str(email.id): _build_extraction_prompt(email, today) async for email in emails}
+    if not prompts:
+        return {}
+
+    async with get_session() as session:
+        known_projects, known_people = await _load_known_context(session)
+    system = _build_extraction_system(known_projects, known_people)
+
+    try:
+        client = _get_async_client(settings.anthropic.api_key)
+        batch = await client.messages.batches.create(
+            requests=[
+                {
+                    "custom_id": custom_id,
+                    "params": {
+                        "model": settings.anthropic.model,
+                        "max_tokens": 2000,
+                        "system": system,
+                        "messages": [{"role": "user", "content": prompt}],
+                    },
+                }
+                for custom_id, prompt in prompts.items()
+            ]
+        )
+        while batch.processing_status != "ended":
+            await asyncio.sleep(BATCH_POLL_SECONDS)
+            batch = await client.messages.batches.retrieve(batch.id)
+
+        entries = [entry async for entry in await client.messages.batches.results(batch.id)]
+    except Exception as e:
+        logger.error("Batch extraction of %d emails failed: %s", len(prompts), e)
+        return {}
+
+    results: dict[UUID, dict] = {}
+    conversations = []
+    for entry in entries:
+        if entry.result.type != "succeeded":
+            # Left out so the pipeline extracts it with a normal API call
+            logger.warning("Batch extraction for email %s %s", entry.custom_id, entry.result.type)
+            continue
+
+        message = entry.result.message
+        raw_text = message.content[0].text
+        extraction = _parse_extraction(raw_text)
+
+        input_tokens = message.usage.input_tokens
+        output_tokens = message.usage.output_tokens
+        cache_read_tokens = message.usage.cache_read_input_tokens or 0
+        cost_usd = _cost_usd(input_tokens, output_tokens, cache_read_tokens) * BATCH_PRICE_FACTOR
+
+        conversations.append({
+            "session_type": "extraction",
+            "model": settings.anthropic.model,
+            "prompt_version": EXTRACTION_PROMPT_VERSION,
+            "request_messages": [
+                *({"role": "system", "content": block["text"]} for block in system),
+                {"role": "user", "content": prompts[entry.custom_id]},
+            ],
+            "response_content": {"raw": raw_text, "parsed": extraction, "batch_id": batch.id},
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cache_read_tokens": cache_read_tokens,
+            "cost_usd": cost_usd,
+        })
+
+        results[UUID(entry.custom_id)] = extraction
+
+    if settings.raw_storage.store_ai_conversations and conversations:
+        async with get_session() as session:
+            for conversation in conversations:
+                await store_ai_conversation(session=session, **conversation)
+
+    logger.info("Batch %s extracted %d emails", batch.id, len(results))
+    return results
+
+
+def _cost_usd(input_tokens: int, output_tokens: int, cache_read_tokens: int = 0) -> float:
+    """Estimate a call's cost; cache reads bill at a tenth of the input rate.
+
+    input_tokens counts only uncached input, as the API reports it.
+    """
+    return (input_tokens * 0.25 + cache_read_tokens * 0.025 + output_tokens * 1.25) / 1_000_000
+
+
 def _parse_extraction(raw_text: str) -> dict:
     """Parse the JSON extraction from Claude's response."""
     try:
@@ -174,7 +358,9 @@ def _parse_extraction(raw_text: str) -> dict:
 
         start = text.index("{")
         end = text.rindex("}") + 1
-        return json.loads(text[start:end])
+        # msgspec.DecodeError is a ValueError, so both paths land below on bad JSON
+        json_str = text[start:end]
+        return msgspec.json.decode(json_str) if msgspec is not None else json.loads(json_str)
     except (json.JSONDecodeError, ValueError):
         logger.warning("Failed to parse extraction JSON: %s", raw_text[:300])
         return _empty_extraction()
@@ -200,14 +386,24 @@ def _empty_extraction() -> dict:
 async def extract_and_update(
     session: AsyncSession,
     email: Email,
+    extraction: Optional[dict] = None,
+    today: Optional[str] = None,
 ) -> dict:
-    """Extract data from an email and update its database record."""
-    extraction = await extract_email(session, email)
+    """Extract data from an email and update its database record.
+
+    The changes are left pending on the session for the caller to flush.
+
+    Args:
+        extraction: A result already computed for this email (e.g. by
+            batch_extract_emails); skips extracting it again.
+        today: Today's ISO date, passed through to extract_email.
+    """
+    if extraction is None:
+        extraction = await extract_email(session, email, today=today)
 
     email.extraction_result = extraction
     email.needs_reply = extraction.get("reply_needed", False)
     email.reply_suggested = extraction.get("suggested_reply")
     email.processed_at = datetime.now(timezone.utc)
-    await session.flush()
 
     return extraction
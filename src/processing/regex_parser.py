@@ -2,6 +2,7 @@
 
 import logging
 import re
+import sys
 from datetime import datetime, timezone
 from typing import Optional
 
@@ -9,44 +10,146 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.storage.models import Email
 
+try:
+    import ahocorasick
+except ImportError:  # optional: single-pass keyword scan
+    ahocorasick = None
+
+try:
+    import hyperscan
+except ImportError:  # optional: one-pass prefilter over every field pattern
+    hyperscan = None
+
 logger = logging.getLogger(__name__)
 
-# Regex patterns for common automated email data
+# Canonical spelling of every carrier and status the patterns match, keyed
+# by the lowercased match; results reuse these strings
+_CARRIERS = {c.lower(): sys.intern(c) for c in ("UPS", "USPS", "FedEx", "DHL", "Amazon Logistics")}
+_STATUSES = {
+    s: sys.intern(s)
+    for s in (
+        "shipped", "delivered", "out for delivery", "in transit",
+        "processing", "confirmed", "cancelled", "refunded",
+    )
+}
+
+# Regex patterns for common automated email data: one compiled alternation
+# per field, so each field scans the text once. Every alternative has
+# exactly one capturing group, read back as match.group(match.lastindex).
+# Order and tracking alternations are wrapped in a lookahead so a match
+# consumes no text and cannot hide an overlapping match of another
+# alternative (e.g. "Order confirmation\nOrder number: ..." matches both
+# "confirmation" and "order number"), as when each ran as its own pattern.
+# That is only safe because every alternative there starts at a keyword or
+# word boundary; a bare date like "02/05/2026" would also match at "2/05".
 PATTERNS = {
-    "order_number": [
-        re.compile(r"order\s*#?\s*(\d[\d-]{4,})", re.IGNORECASE),
-        re.compile(r"order\s+number[:\s]*(\w[\w-]{4,})", re.IGNORECASE),
-        re.compile(r"confirmation\s*#?\s*(\w[\w-]{4,})", re.IGNORECASE),
-    ],
-    "tracking_number": [
+    "order_number": re.compile(
+        r"(?=order\s*#?\s*(\d[\d-]{4,})"
+        r"|order\s+number[:\s]*(\w[\w-]{4,})"
+        r"|confirmation\s*#?\s*(\w[\w-]{4,}))",
+        re.IGNORECASE,
+    ),
+    "tracking_number": re.compile(
         # UPS: 1Z + 16 alphanumeric
-        re.compile(r"\b(1Z[A-Z0-9]{16})\b"),
+        r"(?=\b(1Z[A-Z0-9]{16})\b"
         # USPS: starts with 9, 22-27 digits
-        re.compile(r"\b(9[0-9]{21,26})\b"),
+        r"|\b(9[0-9]{21,26})\b"
         # FedEx: only match near tracking context to avoid false positives on random digit strings
-        re.compile(r"(?:tracking|fedex|shipment)\s*(?:#|number|:)?\s*:?\s*(\d{12,15})\b", re.IGNORECASE),
+        r"|(?i:(?:tracking|fedex|shipment)\s*(?:#|number|:)?\s*:?\s*(\d{12,15})\b)"
         # Generic "tracking #" pattern
-        re.compile(r"tracking\s*#?\s*:?\s*(\w{10,30})", re.IGNORECASE),
-    ],
-    "amount": [
-        re.compile(r"\$\s*([\d,]+\.?\d{0,2})"),
-        re.compile(r"total[:\s]*\$\s*([\d,]+\.?\d{0,2})", re.IGNORECASE),
-        re.compile(r"amount[:\s]*\$\s*([\d,]+\.?\d{0,2})", re.IGNORECASE),
-        re.compile(r"charged[:\s]*\$\s*([\d,]+\.?\d{0,2})", re.IGNORECASE),
-    ],
-    "date": [
-        re.compile(r"(?:delivery|arrive|expected|estimated)\s+(?:by|on|date)[:\s]*(\w+ \d{1,2},?\s*\d{4})", re.IGNORECASE),
-        re.compile(r"(?:ship|deliver)\w*\s+(?:on|by)\s+(\w+ \d{1,2},?\s*\d{4})", re.IGNORECASE),
-        re.compile(r"(\d{1,2}/\d{1,2}/\d{2,4})"),
-    ],
-    "carrier": [
-        re.compile(r"\b(UPS|USPS|FedEx|DHL|Amazon Logistics)\b", re.IGNORECASE),
-    ],
-    "status": [
-        re.compile(r"\b(shipped|delivered|out for delivery|in transit|processing|confirmed|cancelled|refunded)\b", re.IGNORECASE),
-    ],
+        r"|(?i:tracking\s*#?\s*:?\s*(\w{10,30})))"
+    ),
+    # Labeled totals ("total: $12") capture the same digits as a bare "$12",
+    # so the bare pattern alone finds every amount
+    "amount": re.compile(r"\$\s*([\d,]+\.?\d{0,2})"),
+    "date": re.compile(
+        r"(?:delivery|arrive|expected|estimated)\s+(?:by|on|date)[:\s]*(\w+ \d{1,2},?\s*\d{4})"
+        r"|(?:ship|deliver)\w*\s+(?:on|by)\s+(\w+ \d{1,2},?\s*\d{4})"
+        r"|(\d{1,2}/\d{1,2}/\d{2,4})",
+        re.IGNORECASE,
+    ),
+    "carrier": re.compile(rf"\b({'|'.join(map(re.escape, _CARRIERS.values()))})\b", re.IGNORECASE),
+    "status": re.compile(rf"\b({'|'.join(map(re.escape, _STATUSES))})\b", re.IGNORECASE),
 }
 
+
+def _build_field_prefilter():
+    """Compile every PATTERNS entry into one Hyperscan database.
+
+    Hyperscan reports no capture groups, so it only answers which fields
+    match anywhere in the text, in one pass; fields with no hit skip their
+    re scan. A pattern wrapped whole in a lookahead matches wherever its
+    body does, so the body is compiled instead (Hyperscan has no
+    lookaround). Returns None when hyperscan is unavailable or a pattern
+    doesn't compile, leaving every field to re.
+    """
+    if hyperscan is None:
+        return None
+    expressions, flags = [], []
+    for pattern in PATTERNS.values():
+        source = pattern.pattern
+        if source.startswith("(?=") and source.endswith(")"):
+            source = source[3:-1]
+        expressions.append(source.encode())
+        # UTF8|UCP gives \w, \d and \s the Unicode meaning they have in re;
+        # PREFILTER lets Hyperscan approximate what it can't do exactly in
+        # UCP mode (\b), matching a superset, which is all a prefilter needs
+        field_flags = (
+            hyperscan.HS_FLAG_SINGLEMATCH | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP
+            | hyperscan.HS_FLAG_PREFILTER
+        )
+        if pattern.flags & re.IGNORECASE:
+            field_flags |= hyperscan.HS_FLAG_CASELESS
+        flags.append(field_flags)
+    try:
+        database = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+        database.compile(
+            expressions=expressions,
+            ids=list(range(len(expressions))),
+            elements=len(expressions),
+            flags=flags,
+        )
+    except hyperscan.error as e:
+        logger.warning("Hyperscan prefilter unavailable: %s", e)
+        return None
+    return database
+
+
+_FIELD_NAMES = list(PATTERNS)
+_FIELD_PREFILTER = _build_field_prefilter()
+
+
+def _fields_present(text: str) -> Optional[set[str]]:
+    """Names of the PATTERNS fields that match somewhere in text.
+
+    Returns None when there is no prefilter (or the text can't be encoded
+    for it), meaning every field must be scanned.
+    """
+    if _FIELD_PREFILTER is None:
+        return None
+    try:
+        data = text.encode("utf-8")
+    except UnicodeEncodeError:  # lone surrogates
+        return None
+
+    present: set[str] = set()
+
+    def on_match(field_id, start, end, flags, context):
+        present.add(_FIELD_NAMES[field_id])
+
+    _FIELD_PREFILTER.scan(data, match_event_handler=on_match)
+    return present
+
+
+# Receipts put their data near the top, while long bodies are mostly HTML
+# footers and marketing; only this much of the body is scanned
+SCAN_HEAD_CHARS = 8192
+
+# Carrier and status lines also turn up in footers, so for a body longer
+# than SCAN_HEAD_CHARS this much of its end is scanned for those fields
+SCAN_TAIL_CHARS = 2048
+_TAIL_FIELDS = frozenset({"carrier", "status"})
+
 # Sender-based categorization
 AUTOMATED_CATEGORIES = {
     "order": ["order", "purchase", "receipt", "confirmation", "invoice"],
@@ -57,14 +160,43 @@ AUTOMATED_CATEGORIES = {
 }
 
 
+def _build_category_automaton():
+    """Build an Aho-Corasick automaton mapping each keyword to its category rank.
+
+    The rank is the category's position in AUTOMATED_CATEGORIES (the first
+    one listing the keyword), so the lowest rank hit is the category the
+    keyword loop would pick. Returns None when pyahocorasick is unavailable.
+    """
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for rank, keywords in enumerate(AUTOMATED_CATEGORIES.values()):
+        for keyword in keywords:
+            if keyword not in automaton:
+                automaton.add_word(keyword, rank)
+    automaton.make_automaton()
+    return automaton
+
+
+_CATEGORY_NAMES = list(AUTOMATED_CATEGORIES)
+_CATEGORY_AUTOMATON = _build_category_automaton()
+
+
 def parse_automated_email(email: Email) -> dict:
     """Parse structured data from an automated email using regex patterns.
 
+    Only the first SCAN_HEAD_CHARS of the body are scanned (plus the last
+    SCAN_TAIL_CHARS for carriers and statuses); "truncated" in the result
+    records whether the body was longer than that.
+
     Returns dict with:
         category, order_numbers, tracking_numbers, amounts, dates,
-        carriers, statuses, raw_matches
+        carriers, statuses, raw_matches, truncated
     """
-    text = f"{email.subject or ''}\n{email.full_body or email.snippet or ''}"
+    body = email.full_body or email.snippet or ""
+    truncated = len(body) > SCAN_HEAD_CHARS
+    text = f"{email.subject or ''}\n{body[:SCAN_HEAD_CHARS]}"
+    tail = body[max(SCAN_HEAD_CHARS, len(body) - SCAN_TAIL_CHARS):] if truncated else ""
 
     result = {
         "category": _detect_category(email),
@@ -75,13 +207,22 @@ def parse_automated_email(email: Email) -> dict:
         "carriers": [],
         "statuses": [],
         "raw_matches": {},
+        "truncated": truncated,
     }
 
-    for field, patterns in PATTERNS.items():
-        matches = set()
-        for pattern in patterns:
-            for match in pattern.finditer(text):
-                matches.add(match.group(1) if match.lastindex else match.group(0))
+    present = _fields_present(text)
+    tail_present = _fields_present(tail) if tail else set()
+    for field, pattern in PATTERNS.items():
+        sources = []
+        if present is None or field in present:
+            sources.append(text)
+        if field in _TAIL_FIELDS and tail and (tail_present is None or field in tail_present):
+            sources.append(tail)
+        matches = {
+            match.group(match.lastindex) if match.lastindex else match.group(0)
+            for source in sources
+            for match in pattern.finditer(source)
+        }
 
         match_list = sorted(matches)
         result["raw_matches"][field] = match_list
@@ -95,9 +236,10 @@ def parse_automated_email(email: Email) -> dict:
         elif field == "date":
             result["dates"] = match_list
         elif field == "carrier":
-            result["carriers"] = [c.title() for c in match_list]
+            # "UPS" and "ups" are one carrier; dict.fromkeys keeps first-seen order
+            result["carriers"] = list(dict.fromkeys(_CARRIERS[c.lower()] for c in match_list))
         elif field == "status":
-            result["statuses"] = [s.lower() for s in match_list]
+            result["statuses"] = list(dict.fromkeys(_STATUSES[s.lower()] for s in match_list))
 
     return result
 
@@ -106,6 +248,16 @@ def _detect_category(email: Email) -> str:
     """Detect the category of an automated email based on subject/sender."""
     text = f"{email.subject or ''} {(email.raw_headers or {}).get('from', '')}".lower()
 
+    if _CATEGORY_AUTOMATON is not None:
+        # One pass over the text; categories keep their dict-order priority
+        best = len(_CATEGORY_NAMES)
+        for _, rank in _CATEGORY_AUTOMATON.iter(text):
+            if rank < best:
+                best = rank
+                if rank == 0:
+                    break
+        return _CATEGORY_NAMES[best] if best < len(_CATEGORY_NAMES) else "other"
+
     for category, keywords in AUTOMATED_CATEGORIES.items():
         if any(kw in text for kw in keywords):
             return category
@@ -126,12 +278,14 @@ async def parse_and_update(
     session: AsyncSession,
     email: Email,
 ) -> dict:
-    """Parse an automated email and update its database record."""
+    """Parse an automated email and update its database record.
+
+    The changes are left pending on the session for the caller to flush.
+    """
     result = parse_automated_email(email)
 
     email.extraction_result = result
     email.processed_at = datetime.now(timezone.utc)
-    await session.flush()
 
     logger.info(
         "Parsed automated email %s: category=%s, %d orders, %d amounts",
@@ -1,7 +1,9 @@
 """SQLAlchemy ORM models for Focus."""
 
+import re
 import uuid
 from datetime import date, datetime
+from functools import cached_property
 from typing import Optional
 
 from sqlalchemy import (
@@ -18,10 +20,14 @@ from sqlalchemy import (
     Text,
     UniqueConstraint,
     func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
+# Runs of characters that are unsafe in vault filenames and wiki-links
+_UNSAFE_NAME_RE = re.compile(r"[^\w-]+")
+
 
 class Base(DeclarativeBase):
     pass
@@ -49,8 +55,18 @@ class Person(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    # Read-only collections for eager loading; writes go through the child rows
+    commitments: Mapped[list["Commitment"]] = relationship(viewonly=True)
+    project_links: Mapped[list["ProjectPeople"]] = relationship(back_populates="person", viewonly=True)
+
+    @cached_property
+    def safe_name(self) -> str:
+        """Name with unsafe characters collapsed to "-", for vault filenames and links."""
+        return _UNSAFE_NAME_RE.sub("-", self.name)
+
     __table_args__ = (
         Index("idx_people_email", "email"),
+        Index("idx_people_phone", "phone"),
     )
 
 
@@ -108,6 +124,12 @@ class Project(Base):
 
     tasks: Mapped[list["Task"]] = relationship(back_populates="project")
     sprints: Mapped[list["Sprint"]] = relationship(back_populates="project")
+    people: Mapped[list["ProjectPeople"]] = relationship(back_populates="project", viewonly=True)
+
+    @cached_property
+    def safe_name(self) -> str:
+        """Name with unsafe characters collapsed to "-", for vault filenames and links."""
+        return _UNSAFE_NAME_RE.sub("-", self.name)
 
     __table_args__ = (
         Index("idx_projects_status", "status"),
@@ -187,6 +209,7 @@ class Task(Base):
     __table_args__ = (
         Index("idx_tasks_status", "status"),
         Index("idx_tasks_project", "project_id"),
+        Index("idx_tasks_project_status_completed", "project_id", "status", "completed_at"),
         Index("idx_tasks_assigned", "assigned_to"),
         Index("idx_tasks_pinned", "user_pinned", postgresql_where="user_pinned = TRUE"),
         Index("idx_tasks_due", "due_date", postgresql_where="due_date IS NOT NULL"),
@@ -259,6 +282,10 @@ class Email(Base):
     processed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     email_date: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     raw_headers: Mapped[Optional[dict]] = mapped_column(JSONB)
+    # Display name parsed from the From header at ingestion
+    sender_name: Mapped[Optional[str]] = mapped_column(Text)
+    # Lowercased address parsed from the From header at ingestion
+    from_address: Mapped[Optional[str]] = mapped_column(Text)
     extraction_result: Mapped[Optional[dict]] = mapped_column(JSONB)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
@@ -271,6 +298,12 @@ class Email(Base):
         Index("idx_emails_needs_reply", "needs_reply", postgresql_where="needs_reply = TRUE"),
         Index("idx_emails_thread", "thread_id"),
         Index("idx_emails_account", "account_id"),
+        Index("idx_emails_from_address", "from_address", "email_date"),
+        Index(
+            "idx_emails_project_links",
+            text("(extraction_result -> 'project_links') jsonb_path_ops"),
+            postgresql_using="gin",
+        ),
     )
 
 
@@ -320,6 +353,17 @@ class Document(Base):
     )
 
 
+class DriveFolder(Base):
+    __tablename__ = "drive_folders"
+
+    id: Mapped[str] = mapped_column(Text, primary_key=True)  # Drive folder ID
+    name: Mapped[str] = mapped_column(Text, nullable=False)
+    parent_id: Mapped[Optional[str]] = mapped_column(Text)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
 class ProjectPeople(Base):
     __tablename__ = "project_people"
 
@@ -331,6 +375,9 @@ class ProjectPeople(Base):
     )
     role: Mapped[Optional[str]] = mapped_column(Text)
 
+    project: Mapped["Project"] = relationship(back_populates="people", viewonly=True)
+    person: Mapped["Person"] = relationship(back_populates="project_links", viewonly=True)
+
 
 class SyncState(Base):
     __tablename__ = "sync_state"
@@ -341,6 +388,8 @@ class SyncState(Base):
     )
     last_sync: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     cursor: Mapped[Optional[str]] = mapped_column(Text)
+    # Cursor from one sync earlier, retried if the current one is rejected
+    cursor_overlap: Mapped[Optional[str]] = mapped_column(Text)
     status: Mapped[Optional[str]] = mapped_column(Text)
     error_message: Mapped[Optional[str]] = mapped_column(Text)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -386,6 +435,7 @@ class AIConversation(Base):
     response_content: Mapped[dict] = mapped_column(JSONB, nullable=False)
     input_tokens: Mapped[Optional[int]] = mapped_column(Integer)
     output_tokens: Mapped[Optional[int]] = mapped_column(Integer)
+    cache_read_tokens: Mapped[Optional[int]] = mapped_column(Integer)
     cost_usd: Mapped[Optional[float]] = mapped_column(Float)
     latency_ms: Mapped[Optional[int]] = mapped_column(Integer)
     source_interaction_id: Mapped[Optional[uuid.UUID]] = mapped_column(
@@ -404,6 +454,23 @@ class AIConversation(Base):
     )
 
 
+class DecisionCache(Base):
+    __tablename__ = "decision_cache"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    content_hash: Mapped[str] = mapped_column(Text, nullable=False)
+    model: Mapped[str] = mapped_column(Text, nullable=False)
+    prompt_version: Mapped[str] = mapped_column(Text, nullable=False)
+    decisions: Mapped[list] = mapped_column(JSONB, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("content_hash", "model", "prompt_version", name="uq_decision_cache_key"),
+        Index("idx_decision_cache_expires", "expires_at"),
+    )
+
+
 class AuditLog(Base):
     __tablename__ = "audit_log"
 
@@ -50,6 +50,57 @@ async def store_raw_interaction(
     return interaction
 
 
+async def store_raw_interactions(
+    session: AsyncSession,
+    items: list[dict],
+) -> list[RawInteraction]:
+    """Store several raw interactions with one dedup query and one flush.
+
+    Args:
+        session: Database session.
+        items: Dicts of store_raw_interaction keyword arguments
+            (source_type, raw_content, and optional source_id, account_id,
+            raw_metadata, interaction_date).
+
+    Returns:
+        Stored (or pre-existing duplicate) interactions, in input order.
+    """
+    if not items:
+        return []
+
+    hashes = [hashlib.sha256(item["raw_content"].encode()).hexdigest() for item in items]
+    existing = await session.execute(
+        select(RawInteraction).where(RawInteraction.content_hash.in_(set(hashes)))
+    )
+    by_hash = {ri.content_hash: ri for ri in existing.scalars().all()}
+
+    results = []
+    added = False
+    for item, content_hash in zip(items, hashes):
+        if found := by_hash.get(content_hash):
+            logger.debug("Duplicate raw interaction skipped: %s", content_hash[:12])
+            results.append(found)
+            continue
+
+        interaction = RawInteraction(
+            source_type=item["source_type"],
+            source_id=item.get("source_id"),
+            account_id=item.get("account_id"),
+            raw_content=item["raw_content"],
+            raw_metadata=item.get("raw_metadata") or {},
+            content_hash=content_hash,
+            interaction_date=item.get("interaction_date"),
+        )
+        session.add(interaction)
+        by_hash[content_hash] = interaction
+        results.append(interaction)
+        added = True
+
+    if added:
+        await session.flush()
+    return results
+
+
 async def store_ai_conversation(
     session: AsyncSession,
     session_type: str,
@@ -59,6 +110,7 @@ async def store_ai_conversation(
     prompt_version: Optional[str] = None,
     input_tokens: Optional[int] = None,
     output_tokens: Optional[int] = None,
+    cache_read_tokens: Optional[int] = None,
     cost_usd: Optional[float] = None,
     latency_ms: Optional[int] = None,
     source_interaction_id: Optional[UUID] = None,
@@ -73,6 +125,7 @@ async def store_ai_conversation(
         response_content=response_content,
         input_tokens=input_tokens,
         output_tokens=output_tokens,
+        cache_read_tokens=cache_read_tokens,
         cost_usd=cost_usd,
         latency_ms=latency_ms,
         source_interaction_id=source_interaction_id,
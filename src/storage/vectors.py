@@ -79,10 +79,38 @@ class VectorStore:
             metadatas=[clean_meta],
         )
 
+    def add_many(
+        self,
+        collection_name: str,
+        items: list[tuple[str, str, Optional[dict]]],
+    ) -> None:
+        """Add or update several documents in a collection with one upsert.
+
+        Embedding happens once for the whole batch rather than per document.
+
+        Args:
+            collection_name: Which collection (emails, documents, projects, raw_interactions).
+            items: (doc_id, text, metadata) tuples; blank texts are skipped.
+        """
+        items = [item for item in items if item[1] and item[1].strip()]
+        if not items:
+            return
+
+        collection = self._get_collection(collection_name)
+        collection.upsert(
+            ids=[doc_id for doc_id, _, _ in items],
+            documents=[text for _, text, _ in items],
+            metadatas=[_clean_metadata(meta) if meta else {} for _, _, meta in items],
+        )
+
     def add_email(self, email_id: str, text: str, metadata: Optional[dict] = None) -> None:
         """Add an email to the emails collection."""
         self.add(COLLECTION_EMAILS, email_id, text, metadata)
 
+    def add_emails(self, items: list[tuple[str, str, Optional[dict]]]) -> None:
+        """Add several emails to the emails collection in one batch."""
+        self.add_many(COLLECTION_EMAILS, items)
+
     def add_document(self, doc_id: str, text: str, metadata: Optional[dict] = None) -> None:
         """Add a Drive document to the documents collection."""
         self.add(COLLECTION_DOCUMENTS, doc_id, text, metadata)
@@ -1,5 +1,6 @@
 """Shared test fixtures."""
 
+import re
 import uuid
 from datetime import date, datetime, timedelta
 from unittest.mock import MagicMock
@@ -32,6 +33,7 @@ def make_email(**overrides):
             "subject": "Test Subject",
             "date": "Sat, 01 Feb 2026 12:00:00 +0000",
         },
+        "sender_name": None,
         "extraction_result": None,
         "account": None,
     }
@@ -62,6 +64,7 @@ def make_project(**overrides):
         "user_deadline_note": None,
     }
     defaults.update(overrides)
+    defaults.setdefault("safe_name", re.sub(r"[^\w-]+", "-", defaults["name"]))
     mock = MagicMock()
     for k, v in defaults.items():
         setattr(mock, k, v)
@@ -1,12 +1,38 @@
 """Tests for classifier JSON parsing and pre-classification heuristics."""
 
+import asyncio
+import json
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
 from tests.conftest import make_email
-from src.processing.classifier import _parse_classification, _default_classification, pre_classify
+from src.processing.classifier import (
+    _build_classification_prompt,
+    _default_classification,
+    _parse_classification,
+    batch_classify_emails,
+    classify_email,
+    close_client,
+    get_client,
+    pre_classify,
+)
 
 
 class TestParseClassification:
     """Test _parse_classification against every shape of LLM output we've seen."""
 
+    @pytest.mark.parametrize("raw", [
+        '{"classification": "human", "confidence": 0.94, "urgency": "urgent", "sender_type": "known"}',
+        'Sure: {"classification": "spam"',
+    ])
+    def test_stdlib_fallback_matches_msgspec(self, raw):
+        pytest.importorskip("msgspec")
+        expected = _parse_classification(raw)
+        with patch("src.processing.classifier.msgspec", None):
+            assert _parse_classification(raw) == expected
+
     def test_clean_json(self):
         raw = '{"classification": "human", "confidence": 0.94, "urgency": "normal", "sender_type": "known"}'
         result = _parse_classification(raw)
@@ -121,6 +147,31 @@ class TestDefaultClassification:
         assert d2["classification"] == "newsletter"
 
 
+class TestBuildClassificationPrompt:
+    def test_layout(self):
+        email = make_email(
+            subject="Lunch?",
+            full_body="x" * 600,
+            email_date=datetime(2026, 2, 1, 9, 30, tzinfo=timezone.utc),
+            raw_headers={"from": "Jane <jane@example.com>"},
+        )
+
+        prompt = _build_classification_prompt(email, "2026-02-10")
+
+        assert prompt == (
+            "Email:\nFrom: Jane <jane@example.com>\nDate: 2026-02-01\nSubject: Lunch?\n"
+            f"Body (first 500 chars): {'x' * 500}\n\nToday's date: 2026-02-10\n"
+        )
+
+    def test_braces_in_email_are_literal(self):
+        email = make_email(subject="{today}", full_body="{}", email_date=None, raw_headers={})
+
+        prompt = _build_classification_prompt(email, "2026-02-10")
+
+        assert "From: unknown\nDate: unknown\nSubject: {today}\n" in prompt
+        assert "Body (first 500 chars): {}\n" in prompt
+
+
 class TestPreClassify:
     """Test zero-cost heuristic pre-classification."""
 
@@ -143,10 +194,21 @@ class TestPreClassify:
         assert result is not None
         assert result["classification"] == "automated"
 
+    def test_noreply_address_after_display_name(self):
+        email = make_email(raw_headers={"from": "Acme Shop <No_Reply@acme.com>"})
+        result = pre_classify(email)
+        assert result is not None
+        assert result["classification"] == "automated"
+
+    def test_noreply_prefix_must_start_the_address(self):
+        """'info' only counts as the whole local part; prefixes mid-address don't count."""
+        for sender in ("Jane <jane.noreply@acme.com>", "information@acme.com", "Jane <info.desk@acme.com>"):
+            assert pre_classify(make_email(raw_headers={"from": sender})) is None, sender
+
     def test_list_unsubscribe_header(self):
         email = make_email(raw_headers={
             "from": "cool-person@startup.com",
-            "List-Unsubscribe": "<mailto:unsub@startup.com>",
+            "list_unsubscribe": "<mailto:unsub@startup.com>",
         })
         result = pre_classify(email)
         assert result is not None
@@ -168,6 +230,17 @@ class TestPreClassify:
         assert result is not None
         assert result["classification"] == "newsletter"
 
+    @pytest.mark.parametrize("sender,bulk", [
+        ("Acme <acme@sendgrid.net>", True),
+        ("bounce@a.b.mailchimp.com", True),
+        ("someone@notsendgrid.net", False),
+        ("someone@sendgrid.net.example.com", False),
+    ])
+    def test_bulk_domain_matches_exact_or_parent(self, sender, bulk):
+        email = make_email(raw_headers={"from": sender}, full_body="Hi")
+        result = pre_classify(email)
+        assert (result is not None and result["classification"] == "newsletter") is bulk
+
     def test_unsubscribe_in_body_tail(self):
         body = "Hey check out our product! " * 50 + "\nTo unsubscribe, manage your preferences here."
         email = make_email(raw_headers={"from": "promo@somecompany.io"}, full_body=body)
@@ -175,6 +248,21 @@ class TestPreClassify:
         assert result is not None
         assert result["classification"] == "newsletter"
 
+    def test_unsubscribe_tail_is_case_insensitive(self):
+        body = "Big savings this week! " * 50 + "\nUNSUBSCRIBE | MANAGE PREFERENCES"
+        email = make_email(raw_headers={"from": "promo@somecompany.io"}, full_body=body)
+        result = pre_classify(email)
+        assert result is not None
+        assert result["classification"] == "newsletter"
+
+    def test_header_match_does_not_lowercase_body(self):
+        class Body(str):
+            def lower(self):
+                raise AssertionError("body lowercased")
+
+        email = make_email(raw_headers={"from": "noreply@shop.com"}, full_body=Body("x" * 5000))
+        assert pre_classify(email)["classification"] == "automated"
+
     def test_real_human_returns_none(self):
         """A genuine human email should NOT be pre-classified — let the LLM decide."""
         email = make_email(
@@ -197,3 +285,148 @@ class TestPreClassify:
         result = pre_classify(email)
         assert result is not None
         assert result["classification"] == "automated"
+
+
+def _response(payload=None, text=""):
+    response = MagicMock()
+    response.json.return_value = payload
+    response.text = text
+    return response
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+def _session_ctx(inner):
+    ctx = AsyncMock()
+    ctx.__aenter__ = AsyncMock(return_value=inner)
+    ctx.__aexit__ = AsyncMock(return_value=False)
+    return ctx
+
+
+def _batch_client(results: str) -> AsyncMock:
+    client = AsyncMock()
+    client.post = AsyncMock(return_value=_response({"id": "b1", "processing_status": "in_progress"}))
+    client.get = AsyncMock(side_effect=[
+        _response({"id": "b1", "processing_status": "ended", "results_url": "https://results/b1"}),
+        _response(text=results),
+    ])
+    return client
+
+
+def _succeeded(email, text='{"classification": "human", "urgency": "urgent"}'):
+    return {"custom_id": str(email.id), "result": {"type": "succeeded", "message": {
+        "content": [{"text": text}],
+        "usage": {"input_tokens": 300, "output_tokens": 20, "cache_read_input_tokens": 900},
+    }}}
+
+
+class TestBatchClassifyEmails:
+    @pytest.mark.asyncio
+    async def test_submits_polls_and_parses_results(self):
+        ok, failed = make_email(), make_email()
+        results = "\n".join(json.dumps(entry) for entry in [
+            _succeeded(ok),
+            {"custom_id": str(failed.id), "result": {"type": "errored"}},
+        ])
+        client = _batch_client(results)
+        log_session = AsyncMock()
+
+        with patch("src.processing.classifier.get_client", return_value=client), \
+             patch("src.processing.classifier.get_session", return_value=_session_ctx(log_session)) as mock_get, \
+             patch("src.processing.classifier.asyncio.sleep", new_callable=AsyncMock), \
+             patch("src.processing.classifier.store_ai_conversation", new_callable=AsyncMock) as mock_store:
+            classified = await batch_classify_emails(_aiter([ok, failed]))
+
+        requests = client.post.await_args.kwargs["json"]["requests"]
+        assert client.post.await_args.args[0].endswith("/messages/batches")
+        assert [r["custom_id"] for r in requests] == [str(ok.id), str(failed.id)]
+        assert requests[0]["params"]["system"][0]["cache_control"] == {"type": "ephemeral"}
+        assert "Categories" not in requests[0]["params"]["messages"][0]["content"]
+        assert client.get.await_args.args[0] == "https://results/b1"
+        assert classified[ok.id]["route_to"] == "deep_analysis"
+        # Failed requests are left out so the pipeline classifies them per email
+        assert failed.id not in classified
+        # The log is written in a fresh session once the batch has ended
+        mock_get.assert_called_once()
+        mock_store.assert_awaited_once()
+        assert mock_store.await_args.kwargs["session"] is log_session
+        assert mock_store.await_args.kwargs["cache_read_tokens"] == 900
+        assert mock_store.await_args.kwargs["cost_usd"] == pytest.approx(
+            (300 * 0.25 + 900 * 0.025 + 20 * 1.25) / 1_000_000 / 2
+        )
+
+    @pytest.mark.asyncio
+    async def test_unreadable_result_lines_are_skipped(self):
+        ok = make_email()
+        results = "\n".join([
+            "not json",
+            json.dumps({"custom_id": "not-a-uuid", "result": {"type": "succeeded"}}),
+            json.dumps({"result": {"type": "succeeded"}}),
+            json.dumps(_succeeded(ok)),
+        ])
+
+        with patch("src.processing.classifier.get_client", return_value=_batch_client(results)), \
+             patch("src.processing.classifier.get_session", return_value=_session_ctx(AsyncMock())), \
+             patch("src.processing.classifier.asyncio.sleep", new_callable=AsyncMock), \
+             patch("src.processing.classifier.store_ai_conversation", new_callable=AsyncMock):
+            classified = await batch_classify_emails(_aiter([ok]))
+
+        assert list(classified) == [ok.id]
+
+    @pytest.mark.asyncio
+    async def test_submission_failure_returns_nothing(self):
+        client = AsyncMock()
+        client.post = AsyncMock(side_effect=RuntimeError("down"))
+
+        with patch("src.processing.classifier.get_client", return_value=client):
+            assert await batch_classify_emails(_aiter([make_email()])) == {}
+
+    @pytest.mark.asyncio
+    async def test_no_emails_submits_nothing(self):
+        with patch("src.processing.classifier.get_client") as mock_client:
+            assert await batch_classify_emails(_aiter([])) == {}
+        mock_client.assert_not_called()
+
+
+class TestSharedClient:
+    @pytest.mark.asyncio
+    async def test_reused_within_a_loop_until_closed(self):
+        first = get_client()
+        assert get_client() is first
+        assert first.headers["anthropic-version"] == "2023-06-01"
+
+        await close_client()
+
+        assert first.is_closed
+        second = get_client()
+        assert second is not first
+        await close_client()
+
+    def test_new_client_per_event_loop(self):
+        """Each asyncio.run gets its own client; connections don't cross loops."""
+        async def _get():
+            return get_client()
+
+        first = asyncio.run(_get())
+        second = asyncio.run(_get())
+        assert second is not first
+        asyncio.run(close_client())
+
+    @pytest.mark.asyncio
+    async def test_classify_email_posts_on_shared_client(self):
+        client = AsyncMock()
+        client.post = AsyncMock(return_value=_response({
+            "content": [{"text": '{"classification": "human"}'}],
+            "usage": {"input_tokens": 10, "output_tokens": 5},
+        }))
+
+        with patch("src.processing.classifier.get_client", return_value=client), \
+             patch("src.processing.classifier.store_ai_conversation", new_callable=AsyncMock):
+            result = await classify_email(AsyncMock(), make_email())
+
+        assert result["classification"] == "human"
+        assert client.post.await_args.args[0].endswith("/messages")
+        client.aclose.assert_not_called()
@@ -1,18 +1,30 @@
 """Tests for Claude Code session capture — parsing and decision extraction."""
 
 import json
+import os
 import tempfile
+from datetime import datetime, timezone
 from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from sqlalchemy.dialects import postgresql
 
 from src.ingestion.claude_code import (
+    SessionTurns,
+    _decode_session_line,
     _extract_text_content,
     _parse_decisions,
     _parse_timestamp,
+    _read_scan_watermarks,
+    _write_scan_watermarks,
     build_session_summary,
+    extract_decisions,
     get_session_metadata,
+    ingest_session,
+    iter_session_turns,
     parse_session_file,
+    scan_sessions,
 )
 
 
@@ -95,10 +107,10 @@ class TestParseDecisions:
         assert len(result) == 1
 
     def test_invalid_json(self):
-        assert _parse_decisions("not json at all") == []
+        assert _parse_decisions("not json at all") is None
 
     def test_json_not_array(self):
-        assert _parse_decisions('{"decision": "something"}') == []
+        assert _parse_decisions('{"decision": "something"}') is None
 
     def test_missing_decision_field(self):
         raw = json.dumps([{"context": "no decision field"}])
@@ -153,6 +165,10 @@ class TestParseTimestamp:
         result = _parse_timestamp("2025-01-15T10:30:00Z")
         assert result is not None
 
+    def test_z_suffix_with_millis_is_utc(self):
+        result = _parse_timestamp("2025-01-15T10:30:00.123Z")
+        assert result == datetime(2025, 1, 15, 10, 30, 0, 123000, tzinfo=timezone.utc)
+
     def test_none_input(self):
         assert _parse_timestamp(None) is None
 
@@ -194,8 +210,8 @@ class TestParseSessionFile:
         ])
         turns = parse_session_file(path)
         assert len(turns) == 2
-        assert turns[0]["role"] == "user"
-        assert turns[1]["role"] == "assistant"
+        assert turns.roles == ["user", "assistant"]
+        assert turns.timestamps == ["2025-01-15T10:00:00Z", "2025-01-15T10:00:05Z"]
         Path(path).unlink()
 
     def test_filters_sidechain(self):
@@ -268,6 +284,22 @@ class TestParseSessionFile:
         assert len(turns) == 1
         Path(path).unlink()
 
+    def test_prefilter_skips_decoding_non_message_lines(self):
+        path = self._write_session([
+            {"type": "progress", "data": {"status": "x" * 5000}},
+            {"type": "file-history-snapshot", "snapshot": {}},
+            {
+                "type": "user",
+                "message": {"role": "user", "content": "An actual user message that should pass"},
+            },
+        ])
+        with patch("src.ingestion.claude_code._RECORD_DECODER", None), \
+             patch("src.ingestion.claude_code.json.loads", wraps=json.loads) as loads:
+            turns = parse_session_file(path)
+        assert len(turns) == 1
+        assert loads.call_count == 1
+        Path(path).unlink()
+
     def test_handles_malformed_json_lines(self):
         tmp = tempfile.NamedTemporaryFile(suffix=".jsonl", mode="w", delete=False)
         tmp.write('{"type": "user", "message": {"role": "user", "content": "Valid message that is long enough"}}\n')
@@ -282,9 +314,22 @@ class TestParseSessionFile:
         tmp = tempfile.NamedTemporaryFile(suffix=".jsonl", mode="w", delete=False)
         tmp.close()
         turns = parse_session_file(Path(tmp.name))
-        assert turns == []
+        assert len(turns) == 0
         Path(tmp.name).unlink()
 
+    def test_iter_session_turns_yields_rows(self):
+        path = self._write_session([
+            {
+                "type": "user",
+                "timestamp": "2025-01-15T10:00:00Z",
+                "sessionId": "s1",
+                "message": {"role": "user", "content": "Long enough message here for testing"},
+            },
+        ])
+        rows = list(iter_session_turns(path))
+        assert rows == [("user", "Long enough message here for testing", "2025-01-15T10:00:00Z", "s1")]
+        Path(path).unlink()
+
     def test_preserves_session_id(self):
         path = self._write_session([
             {
@@ -294,48 +339,121 @@ class TestParseSessionFile:
             },
         ])
         turns = parse_session_file(path)
-        assert turns[0]["session_id"] == "session-uuid-123"
+        assert turns.session_ids == ["session-uuid-123"]
         Path(path).unlink()
 
 
+class TestDecodeSessionLine:
+    @pytest.fixture(params=["msgspec", "json"])
+    def decoder(self, request):
+        if request.param == "json":
+            with patch("src.ingestion.claude_code._RECORD_DECODER", None):
+                yield request.param
+        else:
+            pytest.importorskip("msgspec")
+            yield request.param
+
+    def test_accepts_message_record(self, decoder):
+        line = json.dumps({
+            "type": "user", "timestamp": "t1", "sessionId": "s1",
+            "message": {"role": "user", "content": "hi"}, "toolUseResult": {"big": "x" * 100},
+        })
+        assert _decode_session_line(line) == ({"role": "user", "content": "hi"}, "t1", "s1")
+
+    @pytest.mark.parametrize("obj", [
+        {"type": "progress", "message": {}},
+        {"type": "user", "isSidechain": True, "message": {}},
+        {"type": "assistant", "isMeta": True, "message": {}},
+        {"type": "user", "message": "not a dict"},
+        ["user"],
+    ])
+    def test_rejects_filtered_records(self, decoder, obj):
+        assert _decode_session_line(json.dumps(obj)) is None
+
+    def test_rejects_malformed_json(self, decoder):
+        assert _decode_session_line('{"type": "user"') is None
+
+    def test_missing_fields_default(self, decoder):
+        assert _decode_session_line('{"type": "user"}') == ({}, "", "")
+
+
 # --- Session summary ---
 
 
+def _turns(*rows: tuple) -> SessionTurns:
+    """Build SessionTurns from (role, content[, timestamp]) tuples."""
+    turns = SessionTurns()
+    for row in rows:
+        turns.append(*row)
+    return turns
+
+
 class TestBuildSessionSummary:
     def test_basic_summary(self):
-        turns = [
-            {"role": "user", "content": "Build a feature"},
-            {"role": "assistant", "content": "I'll help with that"},
-        ]
-        summary = build_session_summary(turns)
+        turns = _turns(
+            ("user", "Build a feature"),
+            ("assistant", "I'll help with that"),
+        )
+        summary = build_session_summary(zip(turns.roles, turns.contents))
         assert "[USER]: Build a feature" in summary
         assert "[ASSISTANT]: I'll help with that" in summary
 
     def test_truncates_long_messages(self):
-        turns = [{"role": "user", "content": "x" * 2000}]
-        summary = build_session_summary(turns)
+        turns = _turns(("user", "x" * 2000))
+        summary = build_session_summary(zip(turns.roles, turns.contents))
         assert len(summary) < 2000
         assert "..." in summary
 
     def test_respects_max_chars(self):
-        turns = [{"role": "user", "content": "Short message"} for _ in range(100)]
-        summary = build_session_summary(turns, max_chars=200)
+        turns = _turns(*[("user", "Short message")] * 100)
+        summary = build_session_summary(zip(turns.roles, turns.contents), max_chars=200)
         assert len(summary) <= 250  # Allow some margin for the last entry
 
     def test_empty_turns(self):
         assert build_session_summary([]) == ""
 
+    def test_stops_consuming_iterable_at_budget(self):
+        consumed = []
+
+        def pairs():
+            for i in range(100):
+                consumed.append(i)
+                yield "user", "m" * 50
+
+        build_session_summary(pairs(), max_chars=200)
+        assert len(consumed) < 100
+
+    def test_truncated_entry_counts_toward_budget(self):
+        turns = _turns(("user", "x" * 2000), ("assistant", "y" * 2000))
+        # One truncated entry is "[USER]: " + 1000 chars + "..." = 1011 chars
+        summary = build_session_summary(zip(turns.roles, turns.contents), max_chars=1011)
+        assert summary == "[USER]: " + "x" * 1000 + "..."
+
+    def test_stops_at_first_entry_over_budget(self):
+        turns = _turns(("user", "a" * 50), ("assistant", "b" * 500), ("user", "c" * 10))
+        summary = build_session_summary(zip(turns.roles, turns.contents), max_chars=100)
+        assert summary == "[USER]: " + "a" * 50
+
 
 # --- Session metadata ---
 
 
+class TestSessionTurns:
+    def test_keep_contents_false_drops_bodies(self):
+        turns = SessionTurns(keep_contents=False)
+        turns.append("user", "Hello there", "2025-01-15T10:00:00Z", "s1")
+        assert len(turns) == 1
+        assert turns.contents == []
+        assert turns.start_time == "2025-01-15T10:00:00Z"
+
+
 class TestGetSessionMetadata:
     def test_basic_metadata(self):
         path = Path("/home/user/.claude/projects/-home-user-myproject/abc123.jsonl")
-        turns = [
-            {"role": "user", "content": "Hello", "timestamp": "2025-01-15T10:00:00Z"},
-            {"role": "assistant", "content": "Hi", "timestamp": "2025-01-15T10:05:00Z"},
-        ]
+        turns = _turns(
+            ("user", "Hello", "2025-01-15T10:00:00Z"),
+            ("assistant", "Hi", "2025-01-15T10:05:00Z"),
+        )
         meta = get_session_metadata(path, turns)
         assert meta["session_id"] == "abc123"
         assert meta["project_dir"] == "-home-user-myproject"
@@ -347,14 +465,288 @@ class TestGetSessionMetadata:
 
     def test_no_timestamps(self):
         path = Path("/tmp/session.jsonl")
-        turns = [{"role": "user", "content": "Hi"}]
+        turns = _turns(("user", "Hi"))
         meta = get_session_metadata(path, turns)
         assert meta["start_time"] is None
         assert meta["end_time"] is None
 
+    def test_skips_empty_timestamps(self):
+        path = Path("/tmp/session.jsonl")
+        turns = _turns(
+            ("user", "Hi", ""),
+            ("assistant", "Hello", "2025-01-15T10:00:00Z"),
+            ("user", "Thanks", "2025-01-15T10:02:00Z"),
+            ("assistant", "Bye", ""),
+        )
+        meta = get_session_metadata(path, turns)
+        assert meta["start_time"] == "2025-01-15T10:00:00Z"
+        assert meta["end_time"] == "2025-01-15T10:02:00Z"
+
     def test_empty_turns(self):
         path = Path("/tmp/session.jsonl")
-        meta = get_session_metadata(path, [])
+        meta = get_session_metadata(path, SessionTurns())
         assert meta["turn_count"] == 0
         assert meta["user_turns"] == 0
         assert meta["assistant_turns"] == 0
+
+
+# --- Decision extraction cache ---
+
+
+class TestExtractDecisionsCache:
+    def _settings(self) -> MagicMock:
+        settings = MagicMock()
+        settings.anthropic.api_key = "sk-test"
+        settings.anthropic.model = "claude-haiku"
+        settings.raw_storage.store_ai_conversations = False
+        return settings
+
+    def _client(self, text: str) -> MagicMock:
+        response = MagicMock()
+        response.content = [MagicMock(text=text)]
+        client = MagicMock()
+        client.messages.create.return_value = response
+        return client
+
+    @pytest.mark.asyncio
+    async def test_cache_hit_skips_api_call(self):
+        cached = [{"decision": "Use Postgres", "context": "", "trade_off": "", "date": None, "tags": []}]
+        client = self._client("[]")
+        with patch("src.config.get_settings", return_value=self._settings()), \
+             patch("anthropic.Anthropic", return_value=client), \
+             patch("src.ingestion.claude_code._get_cached_decisions", AsyncMock(return_value=cached)), \
+             patch("src.ingestion.claude_code._store_cached_decisions", AsyncMock()) as store:
+            result = await extract_decisions(AsyncMock(), "transcript")
+
+        assert result == cached
+        client.messages.create.assert_not_called()
+        store.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_cache_miss_calls_api_and_stores(self):
+        client = self._client('[{"decision": "Use Redis"}]')
+        with patch("src.config.get_settings", return_value=self._settings()), \
+             patch("anthropic.Anthropic", return_value=client), \
+             patch("src.ingestion.claude_code._get_cached_decisions", AsyncMock(return_value=None)) as get, \
+             patch("src.ingestion.claude_code._store_cached_decisions", AsyncMock()) as store:
+            result = await extract_decisions(AsyncMock(), "transcript")
+
+        assert [d["decision"] for d in result] == ["Use Redis"]
+        client.messages.create.assert_called_once()
+        content_hash = get.await_args.args[1]
+        assert store.await_args.args[1:] == (content_hash, "claude-haiku", result)
+
+    @pytest.mark.asyncio
+    async def test_malformed_response_not_cached(self):
+        with patch("src.config.get_settings", return_value=self._settings()), \
+             patch("anthropic.Anthropic", return_value=self._client("not json")), \
+             patch("src.ingestion.claude_code._get_cached_decisions", AsyncMock(return_value=None)), \
+             patch("src.ingestion.claude_code._store_cached_decisions", AsyncMock()) as store:
+            result = await extract_decisions(AsyncMock(), "transcript")
+
+        assert result == []
+        store.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_cache_key_is_transcript_hash(self):
+        with patch("src.config.get_settings", return_value=self._settings()), \
+             patch("anthropic.Anthropic", return_value=self._client("[]")), \
+             patch("src.ingestion.claude_code._get_cached_decisions", AsyncMock(return_value=None)) as get, \
+             patch("src.ingestion.claude_code._store_cached_decisions", AsyncMock()):
+            await extract_decisions(AsyncMock(), "transcript a")
+            await extract_decisions(AsyncMock(), "transcript a")
+            await extract_decisions(AsyncMock(), "transcript b")
+
+        keys = [call.args[1] for call in get.await_args_list]
+        assert keys[0] == keys[1]
+        assert keys[0] != keys[2]
+
+
+# --- Session ingestion ---
+
+
+class TestIngestSession:
+    def _write(self, tmp_path: Path, turns: int) -> Path:
+        path = tmp_path / "sess-1.jsonl"
+        lines = []
+        for i in range(turns):
+            role = "user" if i % 2 == 0 else "assistant"
+            lines.append(json.dumps({
+                "type": role,
+                "timestamp": f"2025-01-15T10:0{i}:00Z",
+                "message": {"role": role, "content": f"Message number {i} with enough text"},
+            }))
+        path.write_text("\n".join(lines) + "\n")
+        return path
+
+    @pytest.mark.asyncio
+    async def test_batches_transcript_and_decisions(self, tmp_path):
+        path = self._write(tmp_path, 4)
+        decisions = [{"decision": "Use Postgres"}]
+        with patch("src.ingestion.claude_code.extract_decisions", AsyncMock(return_value=decisions)), \
+             patch("src.ingestion.claude_code.store_raw_interactions", AsyncMock()) as store:
+            result = await ingest_session(AsyncMock(), path)
+
+        assert result["decisions_count"] == 1
+        store.assert_awaited_once()
+        writes = store.await_args.args[1]
+        assert [w["source_type"] for w in writes] == ["claude_code_session", "claude_code_decisions"]
+        assert writes[1]["source_id"] == "sess-1_decisions"
+        assert writes[1]["raw_metadata"]["decision_count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_streamed_transcript_matches_full_parse(self, tmp_path):
+        path = self._write(tmp_path, 6)
+        with patch("src.ingestion.claude_code.store_raw_interactions", AsyncMock()) as store:
+            await ingest_session(AsyncMock(), path, extract=False)
+
+        turns = parse_session_file(path)
+        write = store.await_args.args[1][0]
+        assert write["raw_content"] == build_session_summary(zip(turns.roles, turns.contents))
+        assert write["raw_metadata"] == get_session_metadata(path, turns)
+
+    @pytest.mark.asyncio
+    async def test_no_decisions_stores_transcript_only(self, tmp_path):
+        path = self._write(tmp_path, 2)
+        with patch("src.ingestion.claude_code.extract_decisions", AsyncMock()) as extract, \
+             patch("src.ingestion.claude_code.store_raw_interactions", AsyncMock()) as store:
+            result = await ingest_session(AsyncMock(), path)
+
+        extract.assert_not_awaited()  # fewer than 3 turns
+        assert result["turns"] == 2
+        writes = store.await_args.args[1]
+        assert [w["source_type"] for w in writes] == ["claude_code_session"]
+
+
+# --- Session scanning ---
+
+
+class TestScanSessions:
+    def _setup(self, tmp_path: Path, names: list[str]) -> Path:
+        project = tmp_path / "projects" / "-home-user-myproject"
+        project.mkdir(parents=True)
+        for name in names:
+            (project / f"{name}.jsonl").write_text("{}\n")
+        return project
+
+    def _mock_session(self, existing_ids: list[str]) -> AsyncMock:
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = existing_ids
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+        return session
+
+    @pytest.fixture(autouse=True)
+    def _watermarks(self):
+        """Keep watermarks in a dict standing in for the sync_state table."""
+        self.watermarks: dict[str, int] = {}
+
+        async def read(session):
+            return dict(self.watermarks)
+
+        async def write(session, watermarks):
+            self.watermarks.update(watermarks)
+
+        with patch("src.ingestion.claude_code._read_scan_watermarks", read), \
+             patch("src.ingestion.claude_code._write_scan_watermarks", write):
+            yield
+
+    async def _scan(self, tmp_path: Path, session: AsyncMock, ingest: AsyncMock) -> dict:
+        with patch("src.ingestion.claude_code.CLAUDE_SESSIONS_DIR", tmp_path / "projects"), \
+             patch("src.ingestion.claude_code.ingest_session", ingest):
+            return await scan_sessions(session, extract=False)
+
+    @pytest.mark.asyncio
+    async def test_ingests_new_and_skips_existing_in_one_query(self, tmp_path):
+        self._setup(tmp_path, ["aaa", "bbb"])
+        session = self._mock_session(["aaa"])
+        ingest = AsyncMock(return_value={"turns": 4, "decisions_count": 1})
+
+        summary = await self._scan(tmp_path, session, ingest)
+
+        assert summary["sessions_found"] == 2
+        assert summary["sessions_ingested"] == 1
+        assert summary["sessions_skipped"] == 1
+        assert summary["total_decisions"] == 1
+        assert session.execute.await_count == 1
+        assert ingest.await_args.args[1].stem == "bbb"
+
+    @pytest.mark.asyncio
+    async def test_unchanged_files_skip_db_on_rescan(self, tmp_path):
+        self._setup(tmp_path, ["aaa"])
+        ingest = AsyncMock(return_value={"turns": 4, "decisions_count": 0})
+        await self._scan(tmp_path, self._mock_session([]), ingest)
+
+        session = self._mock_session([])
+        summary = await self._scan(tmp_path, session, ingest)
+
+        assert summary["sessions_found"] == 1
+        assert summary["sessions_skipped"] == 1
+        session.execute.assert_not_awaited()
+        assert ingest.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_file_is_retried(self, tmp_path):
+        self._setup(tmp_path, ["aaa"])
+        await self._scan(tmp_path, self._mock_session([]), AsyncMock(side_effect=RuntimeError("boom")))
+
+        ingest = AsyncMock(return_value={"turns": 4, "decisions_count": 0})
+        summary = await self._scan(tmp_path, self._mock_session([]), ingest)
+
+        assert summary["sessions_ingested"] == 1
+        ingest.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_modified_file_is_rechecked(self, tmp_path):
+        project = self._setup(tmp_path, ["aaa"])
+        ingest = AsyncMock(return_value={"turns": 4, "decisions_count": 0})
+        await self._scan(tmp_path, self._mock_session([]), ingest)
+
+        path = project / "aaa.jsonl"
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        session = self._mock_session(["aaa"])
+        summary = await self._scan(tmp_path, session, ingest)
+
+        session.execute.assert_awaited_once()
+        assert summary["sessions_skipped"] == 1
+        assert ingest.await_count == 1
+
+
+class TestScanWatermarks:
+    @staticmethod
+    def _session(rows):
+        result = MagicMock()
+        result.all.return_value = rows
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+        return session
+
+    @pytest.mark.asyncio
+    async def test_read_strips_prefix(self):
+        session = self._session([("claude_code_scan:/a", "123")])
+        assert await _read_scan_watermarks(session) == {"/a": 123}
+
+    @pytest.mark.asyncio
+    async def test_read_skips_malformed(self):
+        session = self._session([("claude_code_scan:/a", "nope"), ("claude_code_scan:/b", None)])
+        assert await _read_scan_watermarks(session) == {}
+
+    @pytest.mark.asyncio
+    async def test_write_upserts_in_session(self):
+        session = self._session([])
+        await _write_scan_watermarks(session, {"/a": 123})
+
+        stmt = session.execute.await_args.args[0]
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "INSERT INTO sync_state" in sql
+        assert "ON CONFLICT (id) DO UPDATE" in sql
+        params = stmt.compile(dialect=postgresql.dialect()).params
+        assert params["id_m0"] == "claude_code_scan:/a"
+        assert params["cursor_m0"] == "123"
+
+    @pytest.mark.asyncio
+    async def test_write_nothing_skips_db(self):
+        session = self._session([])
+        await _write_scan_watermarks(session, {})
+        session.execute.assert_not_awaited()
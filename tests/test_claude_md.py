@@ -9,6 +9,7 @@ import pytest
 from tests.conftest import make_project, make_task
 
 from src.output.claude_md import (
+    _add_deep_context_section,
     _get_pitfall_count,
     _parse_recent_decisions,
     _read_doc_file,
@@ -323,6 +324,16 @@ async def test_blockers_section_dynamic(tmp_path):
     assert "## Blockers" in content
 
 
+# --- _add_deep_context_section ---
+
+
+def test_deep_context_paths_match_vault_folder(tmp_path):
+    """Project paths use safe_name, matching the folder the vault writes."""
+    sections: list[str] = []
+    _add_deep_context_section(sections, make_project(name="Q3: Launch/Beta"), tmp_path)
+    assert "- Full task backlog: vault/Projects/Q3-Launch-Beta/KANBAN.md" in sections
+
+
 # --- generate_project_docs ---
 
 
@@ -0,0 +1,182 @@
+"""Tests for src/output/daily — daily note generation."""
+
+from datetime import date, datetime, timezone
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.output.daily import (
+    _due_this_week_section,
+    _needs_reply_section,
+    _pinned_projects_section,
+    _sprint_section,
+    generate_daily_note,
+)
+from tests.conftest import make_email, make_project, make_task
+
+
+def _session_ctx(inner):
+    ctx = AsyncMock()
+    ctx.__aenter__ = AsyncMock(return_value=inner)
+    ctx.__aexit__ = AsyncMock(return_value=False)
+    return ctx
+
+
+class TestGenerateDailyNote:
+    @pytest.mark.asyncio
+    async def test_sections_in_order_with_own_sessions(self, tmp_path: Path):
+        """Sections are assembled in order; all but the sprint section use their own session."""
+        session = AsyncMock()
+        inner_sessions = []
+
+        def mock_get_session():
+            inner = AsyncMock()
+            inner_sessions.append(inner)
+            return _session_ctx(inner)
+
+        with patch("src.output.daily.get_session", side_effect=mock_get_session), \
+             patch("src.output.daily._sprint_section", new_callable=AsyncMock,
+                   return_value=["## Sprint", ""]) as mock_sprint, \
+             patch("src.output.daily._due_this_week_section", new_callable=AsyncMock,
+                   return_value=["## Due", ""]), \
+             patch("src.output.daily._pinned_projects_section", new_callable=AsyncMock,
+                   return_value=[]), \
+             patch("src.output.daily._needs_reply_section", new_callable=AsyncMock,
+                   return_value=["## Reply", ""]) as mock_reply, \
+             patch("src.output.daily._commitments_due_section", new_callable=AsyncMock,
+                   return_value=["## Commitments", ""]):
+            await generate_daily_note(session, tmp_path, target_date=date(2026, 2, 10))
+
+        content = (tmp_path / "Daily" / "2026-02-10.md").read_text()
+        assert content.index("## Sprint") < content.index("## Due") < content.index("## Reply") \
+            < content.index("## Commitments") < content.index("## Completed Today")
+        assert mock_sprint.await_args.args[0] is session
+        session.commit.assert_awaited_once()
+        assert len(inner_sessions) == 4
+        assert mock_reply.await_args.args[0] in inner_sessions
+
+
+class TestPinnedProjectsSection:
+    @pytest.mark.asyncio
+    async def test_returns_lines(self):
+        project = make_project(name="Big Launch", description="Ship it")
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = [project]
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        lines = await _pinned_projects_section(session)
+
+        assert lines == ["## Pinned Projects", "- [[Big-Launch]] — Ship it", ""]
+
+    @pytest.mark.asyncio
+    async def test_empty_when_nothing_pinned(self):
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = []
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        assert await _pinned_projects_section(session) == []
+
+
+class TestSprintSection:
+    @pytest.mark.asyncio
+    async def test_groups_tasks_under_sprints_in_one_query(self):
+        """One joined query; sprints without open tasks still get a header."""
+        sprint_a = MagicMock(ends_at=datetime(2026, 2, 14, tzinfo=timezone.utc))
+        sprint_a.name = "Launch"
+        sprint_b = MagicMock(ends_at=datetime(2026, 2, 12, tzinfo=timezone.utc))
+        sprint_b.name = "Cleanup"
+        result = MagicMock()
+        result.all.return_value = [
+            (sprint_a, make_task(title="Write copy")),
+            (sprint_a, make_task(title="Record demo")),
+            (sprint_b, None),
+        ]
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        lines = await _sprint_section(session, date(2026, 2, 10))
+
+        session.execute.assert_awaited_once()
+        assert lines == [
+            "## Active Sprint: Launch (4 days left)",
+            "- [ ] Write copy",
+            "- [ ] Record demo",
+            "",
+            "## Active Sprint: Cleanup (2 days left)",
+            "",
+        ]
+
+
+class TestDueThisWeekSection:
+    @pytest.mark.asyncio
+    async def test_tasks_and_projects_from_one_union_query(self):
+        result = MagicMock()
+        result.all.return_value = [
+            (0, "File taxes", date(2026, 2, 11), None),
+            (1, "Big Launch", date(2026, 2, 13), "hard deadline"),
+            (1, "Side Quest", date(2026, 2, 14), None),
+        ]
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        lines = await _due_this_week_section(session, date(2026, 2, 10))
+
+        session.execute.assert_awaited_once()
+        assert "UNION ALL" in str(session.execute.await_args.args[0])
+        assert lines == [
+            "## Due This Week",
+            "- [ ] File taxes — due 2026-02-11",
+            "- [ ] **Big Launch** — due 2026-02-13 — hard deadline",
+            "- [ ] **Side Quest** — due 2026-02-14",
+            "",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_empty_when_nothing_due(self):
+        result = MagicMock()
+        result.all.return_value = []
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        assert await _due_this_week_section(session, date(2026, 2, 10)) == []
+
+
+class TestNeedsReplySection:
+    @pytest.mark.asyncio
+    async def test_uses_eager_loaded_account(self):
+        account = MagicMock()
+        account.name = "work"
+        emails = [
+            make_email(subject="Contract", urgency="urgent", email_date=None, account=account),
+            make_email(subject=None, urgency=None, email_date=None),
+        ]
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = emails
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        lines = await _needs_reply_section(session)
+
+        stmt = session.execute.await_args.args[0]
+        assert "JOIN" not in str(stmt)
+        assert lines == [
+            "## Needs Reply (by priority)",
+            "- [work] John Doe — Contract (URGENT)",
+            "- John Doe — (no subject) (NORMAL)",
+            "",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_prefers_stored_sender_name(self):
+        email = make_email(sender_name="Jane", email_date=None, urgency="low")
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = [email]
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        lines = await _needs_reply_section(session)
+
+        assert lines[1] == "- Jane — Test Subject (LOW)"
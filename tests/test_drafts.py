@@ -0,0 +1,48 @@
+"""Tests for src/output/drafts — suggested reply queue."""
+
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.output.drafts import generate_drafts
+from tests.conftest import make_email
+
+
+class TestGenerateDrafts:
+    @pytest.mark.asyncio
+    async def test_groups_by_urgency_with_account_labels(self, tmp_path: Path):
+        account = MagicMock()
+        account.name = "work"
+        emails = [
+            make_email(subject="Contract", urgency="urgent", email_date=None,
+                       reply_suggested="Signed, thanks!", account=account),
+            make_email(subject="Lunch?", urgency="normal", email_date=None,
+                       reply_suggested="Sure"),
+        ]
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = emails
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        await generate_drafts(session, tmp_path)
+
+        content = (tmp_path / "Inbox" / "EMAIL-DRAFTS.md").read_text()
+        assert "JOIN" not in str(session.execute.await_args.args[0])
+        assert content.index("## High Priority") < content.index("### [work] Reply to: John Doe — Contract")
+        assert content.index("## Normal Priority") < content.index("### Reply to: John Doe — Lunch?")
+        assert "> Signed, thanks!" in content
+        # Written as UTF-8 regardless of the locale's default encoding
+        assert "— Contract".encode("utf-8") in (tmp_path / "Inbox" / "EMAIL-DRAFTS.md").read_bytes()
+
+    @pytest.mark.asyncio
+    async def test_no_drafts(self, tmp_path: Path):
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = []
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        await generate_drafts(session, tmp_path)
+
+        content = (tmp_path / "Inbox" / "EMAIL-DRAFTS.md").read_text()
+        assert "_No suggested replies at this time._" in content
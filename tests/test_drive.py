@@ -1,22 +1,54 @@
 """Tests for Google Drive ingestion — targeting pain points."""
 
+import asyncio
 import hashlib
+from datetime import datetime, timezone
 from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
 # Import the pure functions we can test without API calls
 from src.ingestion.drive import (
+    DOWNLOAD_CHUNK_BYTES,
     EXPORT_MIME_MAP,
+    DRIVE_EXTRACT_CONCURRENCY,
+    LIST_PAGES_AHEAD,
     MAX_DOWNLOAD_BYTES,
+    PREFETCH_CHUNK,
+    REMOVE_CHUNK,
     TEXT_MIME_PREFIXES,
     _build_folder_path,
     _content_hash,
+    _download_file_text,
+    _extract_text,
+    _extract_texts,
     _is_google_workspace_type,
+    _iter_pages,
+    _list_changes,
+    _load_folder_cache,
+    _prefetch_documents,
+    _save_folder_cache,
     _should_extract_text,
+    fetch_files_incremental,
+    sync_drive,
+    remove_documents,
+    store_document,
 )
 
 
+def _http_error(status: int):
+    from googleapiclient.errors import HttpError
+
+    return HttpError(MagicMock(status=status, reason="error"), b"")
+
+
+@pytest.fixture(autouse=True)
+def _no_rate_limit():
+    with patch("src.ingestion.drive.DRIVE_RATE_LIMITER"):
+        yield
+
+
 # --- MIME type classification ---
 
 
@@ -66,6 +98,9 @@ class TestShouldExtractText:
     def test_google_form_no(self):
         assert _should_extract_text("application/vnd.google-apps.form") is False
 
+    def test_unmapped_workspace_type_no(self):
+        assert _should_extract_text("application/vnd.google-apps.script") is False
+
     def test_text_plain_yes(self):
         assert _should_extract_text("text/plain") is True
 
@@ -132,11 +167,18 @@ class TestContentHash:
     def test_different_content_different_hash(self):
         assert _content_hash("hello") != _content_hash("world")
 
-    def test_is_sha256(self):
-        result = _content_hash("test")
+    def test_sha256_without_blake3(self):
+        with patch("src.ingestion.drive.blake3", None):
+            result = _content_hash("test")
         assert len(result) == 64  # SHA-256 hex = 64 chars
         assert result == hashlib.sha256(b"test").hexdigest()
 
+    def test_blake3_when_available(self):
+        blake3 = pytest.importorskip("blake3")
+        result = _content_hash("test")
+        assert len(result) == 64
+        assert result == blake3.blake3(b"test").hexdigest()
+
     def test_empty_string(self):
         result = _content_hash("")
         assert len(result) == 64
@@ -154,6 +196,7 @@ class _MockService:
     def __init__(self, folder_tree: dict):
         """folder_tree: {id: {"name": str, "parents": [str] or []}}"""
         self._tree = folder_tree
+        self.calls = 0
 
     def files(self):
         return self
@@ -161,8 +204,9 @@ class _MockService:
     def get(self, fileId, fields=None):
         return self
 
-    def execute(self):
+    def execute(self, num_retries=0):
         # The fileId was passed via get() — we track it on the mock
+        self.calls += 1
         data = self._tree.get(self._last_id, {})
         return {
             "id": self._last_id,
@@ -214,21 +258,34 @@ class TestBuildFolderPath:
         # First call populates cache
         result1 = _build_folder_path(service, ["f2"], cache)
         assert result1 == "My Drive/Projects"
-        assert "f1" in cache
-        assert "f2" in cache
+        assert cache["f1"] == ("My Drive", None)
+        assert cache["f2"] == ("Projects", "f1")
+        assert service.calls == 2
 
-        # Second call for same parent uses cache (no API call)
+        # Second call for same parent walks the cache (no API call)
         result2 = _build_folder_path(service, ["f2"], cache)
-        assert result2 == "Projects"  # Cache hit on f2 returns just the name
+        assert result2 == "My Drive/Projects"
+        assert service.calls == 2
 
     def test_cache_hit_on_parent(self):
-        """When the parent folder is already cached, we stop traversing."""
-        cache = {"f1": "Root"}
+        """Cached ancestors are resolved without API calls."""
+        cache = {"f1": ("Root", None)}
         service = _MockService({
             "f2": {"name": "Sub", "parents": ["f1"]},
         })
         result = _build_folder_path(service, ["f2"], cache)
         assert result == "Root/Sub"
+        assert service.calls == 1
+
+    def test_fully_cached_path_no_api_calls(self):
+        cache = {"f3": ("Docs", "f2"), "f2": ("Work", "f1"), "f1": ("My Drive", None)}
+        service = _MockService({})
+        assert _build_folder_path(service, ["f3"], cache) == "My Drive/Work/Docs"
+        assert service.calls == 0
+
+    def test_parent_cycle_terminates(self):
+        cache = {"a": ("A", "b"), "b": ("B", "a")}
+        assert _build_folder_path(_MockService({}), ["a"], cache) == "B/A"
 
     def test_uses_first_parent_only(self):
         """Drive files nominally have at most one parent, but the API returns a list."""
@@ -240,6 +297,34 @@ class TestBuildFolderPath:
         assert result == "Primary"
 
 
+class TestFolderCachePersistence:
+    @pytest.mark.asyncio
+    async def test_load_folder_cache(self):
+        rows = [SimpleNamespace(id="f1", name="My Drive", parent_id=None)]
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=rows)
+        assert await _load_folder_cache(session) == {"f1": ("My Drive", None)}
+
+    @pytest.mark.asyncio
+    async def test_save_only_new_or_changed(self):
+        session = AsyncMock()
+        persisted = {"f1": ("My Drive", None), "f2": ("Old", "f1")}
+        cache = {**persisted, "f2": ("Renamed", "f1"), "f3": ("New", "f1")}
+
+        await _save_folder_cache(session, cache, persisted)
+
+        session.execute.assert_awaited_once()
+        params = session.execute.await_args.args[0].compile().params
+        assert sorted(v for k, v in params.items() if k.startswith("id")) == ["f2", "f3"]
+
+    @pytest.mark.asyncio
+    async def test_save_nothing_changed(self):
+        session = AsyncMock()
+        cache = {"f1": ("My Drive", None)}
+        await _save_folder_cache(session, cache, dict(cache))
+        session.execute.assert_not_awaited()
+
+
 # --- Edge cases and constants ---
 
 
@@ -255,3 +340,450 @@ class TestConstants:
         from src.ingestion.drive import DRIVE_SCOPES
         assert len(DRIVE_SCOPES) >= 1
         assert any("drive" in s for s in DRIVE_SCOPES)
+
+
+# --- Document storage ---
+
+
+def _doc_session(doc) -> AsyncMock:
+    """Mock session whose Document lookup (projected row and full load) returns doc."""
+    result = MagicMock()
+    result.first.return_value = doc
+    session = AsyncMock()
+    session.add = MagicMock()
+    session.execute = AsyncMock(return_value=result)
+    session.get = AsyncMock(return_value=doc)
+    return session
+
+
+class TestStoreDocument:
+    FILE = {
+        "id": "file-1",
+        "name": "Notes",
+        "mimeType": "application/vnd.google-apps.document",
+        "modifiedTime": "2026-02-01T12:00:00.000Z",
+        "parents": [],
+    }
+
+    @pytest.mark.asyncio
+    async def test_unmodified_doc_skips_export(self):
+        doc = SimpleNamespace(
+            content_hash="abc",
+            last_modified=datetime(2026, 2, 1, 12, 0, tzinfo=timezone.utc),
+        )
+        session = _doc_session(doc)
+        with patch("src.ingestion.drive._export_google_doc") as export:
+            result = await store_document(session, MagicMock(), self.FILE, MagicMock(), {})
+
+        assert result is None
+        export.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_modified_doc_is_reexported(self):
+        doc = SimpleNamespace(
+            id=1,
+            content_hash="old",
+            last_modified=datetime(2026, 1, 1, tzinfo=timezone.utc),
+            title="", mime_type="", folder_path="", extracted_text="",
+        )
+        session = _doc_session(doc)
+        with patch("src.ingestion.drive._export_google_doc", return_value="new text") as export, \
+             patch("src.ingestion.drive.store_raw_interaction", AsyncMock()):
+            result = await store_document(session, MagicMock(), self.FILE, MagicMock(), {})
+
+        export.assert_called_once()
+        assert result is doc
+        assert doc.extracted_text == "new text"
+        assert doc.content_hash == _content_hash("new text")
+
+    @pytest.mark.asyncio
+    async def test_removed_doc_with_same_mtime_is_reexported(self):
+        """A cleared (removed) doc has no hash, so an unchanged mtime must not skip it."""
+        doc = SimpleNamespace(
+            id=1,
+            content_hash=None,
+            last_modified=datetime(2026, 2, 1, 12, 0, tzinfo=timezone.utc),
+            title="", mime_type="", folder_path="", extracted_text=None,
+        )
+        session = _doc_session(doc)
+        with patch("src.ingestion.drive._export_google_doc", return_value="restored") as export, \
+             patch("src.ingestion.drive.store_raw_interaction", AsyncMock()):
+            result = await store_document(session, MagicMock(), self.FILE, MagicMock(), {})
+
+        export.assert_called_once()
+        assert result is doc
+
+    @pytest.mark.asyncio
+    async def test_same_content_updates_mtime_without_loading(self):
+        row = SimpleNamespace(
+            id=7,
+            content_hash=_content_hash("same"),
+            last_modified=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        )
+        session = _doc_session(row)
+        with patch("src.ingestion.drive._export_google_doc", return_value="same"):
+            result = await store_document(session, MagicMock(), self.FILE, MagicMock(), {})
+
+        assert result is None
+        session.get.assert_not_awaited()
+        sql = str(session.execute.await_args.args[0])
+        assert sql.startswith("UPDATE documents")
+
+    @pytest.mark.asyncio
+    async def test_pre_extracted_text_not_refetched(self):
+        session = _doc_session(None)
+        with patch("src.ingestion.drive._extract_text") as extract, \
+             patch("src.ingestion.drive.store_raw_interaction", AsyncMock()):
+            doc = await store_document(
+                session, MagicMock(), self.FILE, MagicMock(), {}, {}, {"file-1": "prefetched"},
+            )
+
+        extract.assert_not_called()
+        assert doc.extracted_text == "prefetched"
+
+    @pytest.mark.asyncio
+    async def test_batched_store_defers_raw_and_flush(self):
+        session = _doc_session(None)
+        raw_items: list[dict] = []
+        doc = await store_document(
+            session, MagicMock(), self.FILE, MagicMock(), {}, {}, {"file-1": "text"}, raw_items,
+        )
+
+        assert doc.drive_id == "file-1"
+        assert [item["source_id"] for item in raw_items] == ["file-1"]
+        session.flush.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_prefetched_docs_skip_lookup(self):
+        doc = SimpleNamespace(
+            content_hash="abc",
+            last_modified=datetime(2026, 2, 1, 12, 0, tzinfo=timezone.utc),
+        )
+        session = AsyncMock()
+        result = await store_document(
+            session, MagicMock(), self.FILE, MagicMock(), {}, {"file-1": doc},
+        )
+
+        assert result is None
+        session.execute.assert_not_awaited()
+
+
+class TestPrefetchDocuments:
+    @pytest.mark.asyncio
+    async def test_empty_ids_no_query(self):
+        session = AsyncMock()
+        assert await _prefetch_documents(session, []) == {}
+        session.execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_maps_by_drive_id_in_one_query(self):
+        docs = [SimpleNamespace(drive_id="a"), SimpleNamespace(drive_id="b")]
+        result = MagicMock()
+        result.all.return_value = docs
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        existing = await _prefetch_documents(session, ["a", "b", "c"])
+
+        assert existing == {"a": docs[0], "b": docs[1]}
+        session.execute.assert_awaited_once()
+        assert "extracted_text" not in str(session.execute.await_args.args[0])
+
+
+class _FakeDownloader:
+    """Stand-in for MediaIoBaseDownload that writes fixed-size chunks."""
+
+    instances: list = []
+
+    def __init__(self, fd, request, chunksize):
+        self.fd = fd
+        self.chunksize = chunksize
+        self.remaining = request.total
+        self.calls = 0
+        _FakeDownloader.instances.append(self)
+
+    def next_chunk(self, num_retries=0):
+        self.calls += 1
+        n = min(self.chunksize, self.remaining)
+        self.fd.write(b"x" * n)
+        self.remaining -= n
+        return None, self.remaining == 0
+
+
+class TestDownloadFileText:
+    def _service(self, total: int):
+        service = MagicMock()
+        service.files.return_value.get_media.return_value = SimpleNamespace(total=total)
+        return service
+
+    def test_small_file_decoded(self):
+        with patch("googleapiclient.http.MediaIoBaseDownload", _FakeDownloader):
+            assert _download_file_text(self._service(10), "f", 10) == "x" * 10
+
+    def test_reported_size_over_cap_not_requested(self):
+        service = self._service(10)
+        assert _download_file_text(service, "f", MAX_DOWNLOAD_BYTES + 1) == ""
+        service.files.assert_not_called()
+
+    def test_stream_aborted_past_cap(self):
+        """Unreported size: stop as soon as the buffer passes the cap."""
+        _FakeDownloader.instances.clear()
+        total = MAX_DOWNLOAD_BYTES * 2
+        with patch("googleapiclient.http.MediaIoBaseDownload", _FakeDownloader):
+            assert _download_file_text(self._service(total), "f", 0) == ""
+
+        downloader = _FakeDownloader.instances[0]
+        assert downloader.chunksize == DOWNLOAD_CHUNK_BYTES
+        assert downloader.calls == MAX_DOWNLOAD_BYTES // DOWNLOAD_CHUNK_BYTES + 1
+
+
+class TestExtractText:
+    def test_unsupported_type_not_fetched(self):
+        service = MagicMock()
+        assert _extract_text(service, {"id": "f", "mimeType": "image/png"}) == ""
+        service.files.assert_not_called()
+
+    def test_workspace_doc_exported_with_http(self):
+        http = object()
+        with patch("src.ingestion.drive._export_google_doc", return_value="text") as export:
+            result = _extract_text(
+                MagicMock(), {"id": "f", "mimeType": "application/vnd.google-apps.document"}, http,
+            )
+        assert result == "text"
+        assert export.call_args.args[3] is http
+
+
+    def test_text_file_downloaded(self):
+        with patch("src.ingestion.drive._download_file_text", return_value="body") as download:
+            result = _extract_text(MagicMock(), {"id": "f", "mimeType": "text/plain", "size": "4"})
+        assert result == "body"
+        assert download.call_args.args[1:3] == ("f", 4)
+
+
+class TestExtractTexts:
+    @pytest.mark.asyncio
+    async def test_all_files_extracted_with_per_worker_transport(self):
+        files = [{"id": f"f{i}", "mimeType": "text/plain"} for i in range(20)]
+        transports = []
+
+        def fake_http(credentials):
+            transports.append(object())
+            return transports[-1]
+
+        def fake_extract(service, file_data, http):
+            assert http in transports
+            return f"text-{file_data['id']}"
+
+        with patch("src.ingestion.drive.new_authorized_http", side_effect=fake_http), \
+             patch("src.ingestion.drive._extract_text", side_effect=fake_extract):
+            texts = await _extract_texts(MagicMock(), MagicMock(), files)
+
+        assert texts == {f["id"]: f"text-{f['id']}" for f in files}
+        assert len(transports) == DRIVE_EXTRACT_CONCURRENCY
+
+    @pytest.mark.asyncio
+    async def test_empty_list(self):
+        with patch("src.ingestion.drive.new_authorized_http") as new_http:
+            assert await _extract_texts(MagicMock(), MagicMock(), []) == {}
+        new_http.assert_not_called()
+
+
+class TestRemoveDocuments:
+    @pytest.mark.asyncio
+    async def test_empty_list_no_queries(self):
+        session = AsyncMock()
+        assert await remove_documents(session, []) == 0
+        session.execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_single_update_counts_returned_rows(self):
+        result = MagicMock()
+        result.all.return_value = [("id-1",), ("id-2",)]
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        count = await remove_documents(session, ["a", "b", "missing"])
+
+        assert count == 2
+        session.execute.assert_awaited_once()
+        sql = str(session.execute.await_args.args[0])
+        assert sql.startswith("UPDATE documents")
+        assert "RETURNING" in sql
+
+    @pytest.mark.asyncio
+    async def test_chunks_large_removals(self):
+        result = MagicMock()
+        result.all.return_value = []
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        await remove_documents(session, [f"id-{i}" for i in range(REMOVE_CHUNK + 1)])
+
+        assert session.execute.await_count == 2
+
+
+def _changes_service(responses: dict):
+    """Mock Drive service whose changes().list answers per pageToken.
+
+    A response that is an exception is raised instead of returned.
+    """
+    service = MagicMock()
+
+    def _list(**kwargs):
+        request = MagicMock()
+        response = responses[kwargs["pageToken"]]
+        if isinstance(response, Exception):
+            request.execute.side_effect = response
+        else:
+            request.execute.return_value = response
+        return request
+
+    service.changes.return_value.list.side_effect = _list
+    return service
+
+
+class TestFetchFilesIncremental:
+    FILE = {"id": "f1", "name": "Doc", "mimeType": "text/plain"}
+
+    async def _run(self, sync_state, service):
+        session = AsyncMock()
+        session.get = AsyncMock(return_value=sync_state)
+        account = MagicMock(id=1)
+        account.name = "personal"
+        with patch("src.ingestion.drive.get_oauth_token", AsyncMock(return_value={"token": "t"})), \
+             patch("src.ingestion.drive._get_drive_client", return_value=(None, service)), \
+             patch("src.ingestion.drive.fetch_files_full", AsyncMock(return_value=["full"])) as full:
+            result = await fetch_files_incremental(session, account)
+        return result, full
+
+    @pytest.mark.asyncio
+    async def test_advances_cursor_and_keeps_overlap(self):
+        state = SimpleNamespace(cursor="t1", cursor_overlap=None, last_sync=None, status=None)
+        service = _changes_service({
+            "t1": {"changes": [{"fileId": "f1", "file": self.FILE}], "newStartPageToken": "t2"},
+        })
+
+        (changed, removed), full = await self._run(state, service)
+
+        assert changed == [self.FILE] and removed == []
+        assert (state.cursor, state.cursor_overlap) == ("t2", "t1")
+        full.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_rejected_cursor_retries_from_overlap(self):
+        state = SimpleNamespace(cursor="t2", cursor_overlap="t1", last_sync=None, status=None)
+        service = _changes_service({
+            "t2": _http_error(400),
+            "t1": {"changes": [{"fileId": "gone", "removed": True}], "newStartPageToken": "t3"},
+        })
+
+        (changed, removed), full = await self._run(state, service)
+
+        assert removed == ["gone"]
+        assert (state.cursor, state.cursor_overlap) == ("t3", "t1")
+        full.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_both_rejected_falls_back_to_full(self):
+        state = SimpleNamespace(cursor="t2", cursor_overlap="t1", last_sync=None, status=None)
+        service = _changes_service({"t2": _http_error(404), "t1": _http_error(410)})
+
+        result, full = await self._run(state, service)
+
+        assert result == (["full"], [])
+        full.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_other_errors_propagate(self):
+        state = SimpleNamespace(cursor="t2", cursor_overlap="t1", last_sync=None, status=None)
+        service = _changes_service({"t2": _http_error(500)})
+
+        with pytest.raises(Exception):
+            await self._run(state, service)
+
+
+class TestListChanges:
+    @pytest.mark.asyncio
+    async def test_pages_closed_when_on_files_raises(self):
+        """The page generator (and its producer task) is closed before the error propagates."""
+        closed = []
+
+        async def pages(fetch_page, page_token):
+            try:
+                yield {"changes": [{"fileId": "f1", "file": {"id": "f1"}}], "nextPageToken": "t2"}
+                yield {"changes": [], "newStartPageToken": "t3"}
+            finally:
+                closed.append(True)
+
+        with patch("src.ingestion.drive.new_authorized_http"), \
+             patch("src.ingestion.drive._iter_pages", side_effect=pages), \
+             pytest.raises(RuntimeError):
+            await _list_changes(MagicMock(), None, "t1", on_files=AsyncMock(side_effect=RuntimeError("boom")))
+
+        assert closed == [True]
+
+
+class TestIterPages:
+    @pytest.mark.asyncio
+    async def test_yields_pages_in_order(self):
+        pages = {None: {"n": 1, "nextPageToken": "b"}, "b": {"n": 2, "nextPageToken": "c"}, "c": {"n": 3}}
+        seen = [page["n"] async for page in _iter_pages(lambda token: pages[token])]
+        assert seen == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_fetches_ahead_while_caller_works(self):
+        fetched = []
+
+        def fetch(token):
+            n = int(token or 0)
+            fetched.append(n)
+            return {"n": n, "nextPageToken": str(n + 1)} if n < 5 else {"n": n}
+
+        async for page in _iter_pages(fetch):
+            if page["n"] == 0:
+                # Give the producer time to run ahead of the consumer
+                for _ in range(20):
+                    await asyncio.sleep(0.01)
+                assert len(fetched) >= LIST_PAGES_AHEAD
+        assert fetched == [0, 1, 2, 3, 4, 5]
+
+    @pytest.mark.asyncio
+    async def test_error_propagates(self):
+        def fetch(token):
+            if token:
+                raise RuntimeError("boom")
+            return {"nextPageToken": "x"}
+
+        with pytest.raises(RuntimeError):
+            async for _ in _iter_pages(fetch):
+                pass
+
+
+class TestSyncDriveStreaming:
+    @pytest.mark.asyncio
+    async def test_chunks_stored_as_pages_arrive(self):
+        files = [{"id": f"f{i}", "mimeType": "text/plain"} for i in range(PREFETCH_CHUNK + 50)]
+        stored_before_listing_done = []
+        chunks = []
+
+        async def fake_incremental(session, account, on_files):
+            for start in range(0, len(files), 100):
+                await on_files(files[start:start + 100])
+            stored_before_listing_done.append(len(chunks))
+            return files, []
+
+        async def fake_store_chunk(session, account, service, credentials, folder_cache, chunk, summary):
+            chunks.append(len(chunk))
+
+        account = MagicMock(id=1)
+        account.name = "personal"
+        with patch("src.ingestion.drive.get_oauth_token", AsyncMock(return_value={"token": "t"})), \
+             patch("src.ingestion.drive._get_drive_client", return_value=(None, MagicMock())), \
+             patch("src.ingestion.drive._load_folder_cache", AsyncMock(return_value={})), \
+             patch("src.ingestion.drive._save_folder_cache", AsyncMock()), \
+             patch("src.ingestion.drive.fetch_files_incremental", side_effect=fake_incremental), \
+             patch("src.ingestion.drive._store_chunk", side_effect=fake_store_chunk):
+            await sync_drive(AsyncMock(), account)
+
+        assert chunks == [PREFETCH_CHUNK, 50]
+        assert stored_before_listing_done == [1]
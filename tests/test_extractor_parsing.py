@@ -1,9 +1,31 @@
 """Tests for extractor JSON parsing — Claude Haiku responses come in many shapes."""
 
-from src.processing.extractor import _parse_extraction, _empty_extraction
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.processing.extractor import (
+    _empty_extraction,
+    _get_async_client,
+    _load_known_context,
+    _parse_extraction,
+    batch_extract_emails,
+    extract_email,
+)
+from tests.conftest import make_email
 
 
 class TestParseExtraction:
+    @pytest.mark.parametrize("raw", [
+        '```json\n{"tasks": [{"text": "Send docs"}], "reply_needed": true}\n```',
+        '{"tasks": [',
+    ])
+    def test_stdlib_fallback_matches_msgspec(self, raw):
+        pytest.importorskip("msgspec")
+        expected = _parse_extraction(raw)
+        with patch("src.processing.extractor.msgspec", None):
+            assert _parse_extraction(raw) == expected
+
     def test_clean_json(self):
         raw = '{"tasks": [{"text": "Send docs", "assigned_to": "me", "deadline": null, "priority": "normal"}], "commitments": [], "questions": [], "waiting_on": [], "project_links": ["trading-bot"], "new_projects": [], "people_mentioned": ["Sarah"], "sentiment": "neutral", "reply_needed": true, "reply_urgency": "normal", "suggested_reply": "Will do."}'
         result = _parse_extraction(raw)
@@ -75,3 +97,126 @@ class TestEmptyExtraction:
         e2 = _empty_extraction()
         e1["tasks"].append("oops")
         assert e2["tasks"] == []
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+class TestBatchExtractEmails:
+    @pytest.mark.asyncio
+    async def test_one_batch_with_shared_context(self):
+        ok, failed = make_email(), make_email()
+        message = MagicMock()
+        message.content = [MagicMock(text='{"tasks": [{"text": "Send deck"}]}')]
+        message.usage.input_tokens = 1000
+        message.usage.output_tokens = 100
+        message.usage.cache_read_input_tokens = 2000
+        entries = [
+            MagicMock(custom_id=str(ok.id), result=MagicMock(type="succeeded", message=message)),
+            MagicMock(custom_id=str(failed.id), result=MagicMock(type="expired")),
+        ]
+        client = MagicMock()
+        client.messages.batches.create = AsyncMock(return_value=MagicMock(id="b1", processing_status="in_progress"))
+        client.messages.batches.retrieve = AsyncMock(return_value=MagicMock(id="b1", processing_status="ended"))
+        client.messages.batches.results = AsyncMock(return_value=_aiter(entries))
+        settings = MagicMock()
+        settings.anthropic.api_key = "key"
+        sessions = []
+
+        def mock_get_session():
+            inner = AsyncMock()
+            sessions.append(inner)
+            ctx = AsyncMock()
+            ctx.__aenter__ = AsyncMock(return_value=inner)
+            ctx.__aexit__ = AsyncMock(return_value=False)
+            return ctx
+
+        with patch("src.processing.extractor.get_settings", return_value=settings), \
+             patch("src.processing.extractor.get_session", side_effect=mock_get_session), \
+             patch("src.processing.extractor._get_async_client", return_value=client), \
+             patch("src.processing.extractor._load_known_context", new_callable=AsyncMock,
+                   return_value=(["launch"], ["Sarah"])) as mock_context, \
+             patch("src.processing.extractor.asyncio.sleep", new_callable=AsyncMock), \
+             patch("src.processing.extractor.store_ai_conversation", new_callable=AsyncMock) as mock_store:
+            extracted = await batch_extract_emails(_aiter([ok, failed]))
+
+        # One short session for the known context, a fresh one for the log
+        assert len(sessions) == 2
+        mock_context.assert_awaited_once_with(sessions[0])
+        assert mock_store.await_args.kwargs["session"] is sessions[1]
+        requests = client.messages.batches.create.await_args.kwargs["requests"]
+        assert [r["custom_id"] for r in requests] == [str(ok.id), str(failed.id)]
+        # Known context rides in a cached system block, not the per-email prompt
+        system = requests[0]["params"]["system"]
+        assert system[1]["text"] == "Context:\nKnown projects: launch\nKnown people: Sarah"
+        assert all(block["cache_control"] == {"type": "ephemeral"} for block in system)
+        assert "Known projects" not in requests[0]["params"]["messages"][0]["content"]
+        assert extracted[ok.id]["tasks"] == [{"text": "Send deck"}]
+        # Failed requests are left out so the pipeline extracts them per email
+        assert failed.id not in extracted
+        # Batch pricing is half the per-request rate; cache reads a tenth of input
+        assert mock_store.await_args.kwargs["cache_read_tokens"] == 2000
+        assert mock_store.await_args.kwargs["cost_usd"] == pytest.approx(
+            (1000 * 0.25 + 2000 * 0.025 + 100 * 1.25) / 1_000_000 / 2
+        )
+
+
+class TestExtractEmail:
+    @pytest.mark.asyncio
+    async def test_awaits_async_client(self):
+        response = MagicMock()
+        response.content = [MagicMock(text='{"tasks": [{"text": "Reply to Sam"}]}')]
+        response.usage.input_tokens = 100
+        response.usage.output_tokens = 10
+        response.usage.cache_read_input_tokens = None
+        client = MagicMock()
+        client.messages.create = AsyncMock(return_value=response)
+        settings = MagicMock()
+        settings.anthropic.api_key = "key"
+
+        with patch("src.processing.extractor.get_settings", return_value=settings), \
+             patch("src.processing.extractor._get_async_client", return_value=client), \
+             patch("src.processing.extractor.store_ai_conversation", new_callable=AsyncMock):
+            result = await extract_email(AsyncMock(), make_email(), known_projects=[], known_people=[])
+
+        client.messages.create.assert_awaited_once()
+        assert result["tasks"] == [{"text": "Reply to Sam"}]
+
+    @pytest.mark.asyncio
+    async def test_client_shared_per_key(self):
+        first = _get_async_client("key-a")
+        assert _get_async_client("key-a") is first
+        assert _get_async_client("key-b") is not first
+
+
+class TestLoadKnownContext:
+    @pytest.mark.asyncio
+    async def test_one_union_query_split_by_tag(self):
+        result = MagicMock()
+        result.all.return_value = [(0, "launch"), (1, "Sarah"), (0, "hiring"), (1, "Raj")]
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        projects, people = await _load_known_context(session)
+
+        session.execute.assert_awaited_once()
+        assert "UNION ALL" in str(session.execute.await_args.args[0])
+        assert projects == ["launch", "hiring"]
+        assert people == ["Sarah", "Raj"]
+
+    @pytest.mark.asyncio
+    async def test_only_requested_lists_queried(self):
+        result = MagicMock()
+        result.all.return_value = [(1, "Sarah")]
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        assert await _load_known_context(session, projects=False) == ([], ["Sarah"])
+        sql = str(session.execute.await_args.args[0])
+        assert "UNION" not in sql and "projects" not in sql
+
+        session.execute.reset_mock()
+        assert await _load_known_context(session, projects=False, people=False) == ([], [])
+        session.execute.assert_not_awaited()
@@ -0,0 +1,515 @@
+"""Tests for Gmail ingestion (src/ingestion/gmail.py)."""
+
+import base64
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from src.ingestion.gmail import (
+    GMAIL_BATCH_RETRIES,
+    GMAIL_BATCH_SIZE,
+    GMAIL_GET_QUOTA_UNITS,
+    GMAIL_RESYNC_OVERLAP,
+    PREFETCH_CHUNK,
+    _batch_get_messages,
+    _extract_body,
+    _fetch_messages,
+    _filter_unknown_ids,
+    _parse_email_headers,
+    _parse_internal_date,
+    _prefetch_gmail_ids,
+    fetch_emails_full,
+    fetch_emails_incremental,
+    parse_sender_address,
+    parse_sender_name,
+    store_email,
+    store_emails,
+    sync_account,
+)
+from src.ingestion.google_api import clear_client_cache
+
+
+def _http_error(status: int) -> HttpError:
+    resp = MagicMock(status=status, reason="error")
+    return HttpError(resp, b"")
+
+
+class _MockBatch:
+    """Mock BatchHttpRequest that answers each sub-request on execute()."""
+
+    def __init__(self, callback, errors: dict, log: list):
+        self._callback = callback
+        self._errors = errors
+        self._log = log
+        self._requests: list[tuple[str, str]] = []
+
+    def add(self, request, request_id=None):
+        self._requests.append((request_id, request["format"]))
+
+    def execute(self, http=None):
+        self._log.append([rid for rid, _ in self._requests])
+        for rid, fmt in self._requests:
+            pending = self._errors.get(rid)
+            if pending:
+                self._callback(rid, None, pending.pop(0))
+            else:
+                self._callback(rid, {"id": rid, "format": fmt}, None)
+
+
+def _mock_gmail_service(errors: dict = None) -> tuple[MagicMock, list]:
+    """Build a mock Gmail service whose messages().get() returns its kwargs.
+
+    errors maps message ID to a list of exceptions returned on successive attempts.
+    """
+    log: list[list[str]] = []
+    service = MagicMock()
+    service.users().messages().get.side_effect = lambda **kw: kw
+    service.new_batch_http_request.side_effect = lambda callback: _MockBatch(callback, errors or {}, log)
+    return service, log
+
+
+@pytest.fixture(autouse=True)
+def _no_backoff_sleep():
+    with patch("src.ingestion.gmail.time.sleep"), \
+         patch("src.ingestion.gmail.GMAIL_RATE_LIMITER"):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def _fresh_client_cache():
+    clear_client_cache()
+    yield
+    clear_client_cache()
+
+
+class TestBatchGetMessages:
+    """Tests for _batch_get_messages."""
+
+    def test_empty_ids_no_requests(self):
+        service, log = _mock_gmail_service()
+        assert _batch_get_messages(service, []) == []
+        assert log == []
+
+    def test_preserves_order(self):
+        service, _ = _mock_gmail_service()
+        result = _batch_get_messages(service, ["c", "a", "b"])
+        assert [m["id"] for m in result] == ["c", "a", "b"]
+        assert all(m["format"] == "full" for m in result)
+
+    def test_chunks_into_batches(self):
+        service, log = _mock_gmail_service()
+        ids = [f"m{i}" for i in range(GMAIL_BATCH_SIZE * 2 + 1)]
+        result = _batch_get_messages(service, ids)
+        assert len(result) == len(ids)
+        assert [len(batch) for batch in log] == [GMAIL_BATCH_SIZE, GMAIL_BATCH_SIZE, 1]
+
+    def test_non_retryable_failure_skipped(self):
+        service, log = _mock_gmail_service({"b": [_http_error(404)]})
+        result = _batch_get_messages(service, ["a", "b", "c"])
+        assert [m["id"] for m in result] == ["a", "c"]
+        assert len(log) == 1
+
+    def test_rate_limited_item_retried(self):
+        service, log = _mock_gmail_service({"b": [_http_error(429), _http_error(503)]})
+        result = _batch_get_messages(service, ["a", "b", "c"])
+        assert [m["id"] for m in result] == ["a", "b", "c"]
+        assert log == [["a", "b", "c"], ["b"], ["b"]]
+
+    def test_gives_up_after_max_retries(self):
+        errors = {"b": [_http_error(429)] * (GMAIL_BATCH_RETRIES + 1)}
+        service, log = _mock_gmail_service(errors)
+        result = _batch_get_messages(service, ["a", "b"])
+        assert [m["id"] for m in result] == ["a"]
+        assert len(log) == GMAIL_BATCH_RETRIES + 1
+
+    def test_retry_after_honored(self):
+        error = HttpError(httplib2.Response({"status": "429", "retry-after": "30"}), b"")
+        service, _ = _mock_gmail_service({"m1": [error]})
+        with patch("src.ingestion.gmail.time.sleep") as sleep:
+            _batch_get_messages(service, ["m1"])
+        assert sleep.call_args.args[0] >= 30
+
+    def test_batches_paced_by_quota(self):
+        service, _ = _mock_gmail_service({})
+        with patch("src.ingestion.gmail.GMAIL_RATE_LIMITER") as limiter:
+            _batch_get_messages(service, [f"m{i}" for i in range(GMAIL_BATCH_SIZE + 1)])
+        costs = [call.args[0] for call in limiter.acquire.call_args_list]
+        assert costs == [GMAIL_GET_QUOTA_UNITS * GMAIL_BATCH_SIZE, GMAIL_GET_QUOTA_UNITS]
+
+    def test_format_passed_through(self):
+        service, _ = _mock_gmail_service()
+        result = _batch_get_messages(service, ["a"], fmt="minimal")
+        assert result[0]["format"] == "minimal"
+
+
+class TestFetchMessages:
+    """Tests for _fetch_messages."""
+
+    @pytest.mark.asyncio
+    async def test_fetches_all_chunks_in_order(self):
+        service, log = _mock_gmail_service()
+        ids = [f"m{i}" for i in range(GMAIL_BATCH_SIZE * 3)]
+        with patch("src.ingestion.gmail.new_authorized_http") as new_http:
+            result = await _fetch_messages(service, MagicMock(), ids)
+
+        assert [m["id"] for m in result] == ids
+        assert len(log) == 3
+        assert new_http.call_count == 3  # one transport per worker thread
+
+    @pytest.mark.asyncio
+    async def test_empty_ids(self):
+        service, log = _mock_gmail_service()
+        with patch("src.ingestion.gmail.new_authorized_http"):
+            assert await _fetch_messages(service, MagicMock(), []) == []
+        assert log == []
+
+
+class TestPrefetchGmailIds:
+    @pytest.mark.asyncio
+    async def test_empty_ids_no_query(self):
+        session = AsyncMock()
+        assert await _prefetch_gmail_ids(session, MagicMock(), []) == set()
+        session.execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_returns_stored_ids(self):
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = ["m1"]
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        assert await _prefetch_gmail_ids(session, MagicMock(id=1), ["m1", "m2"]) == {"m1"}
+        session.execute.assert_awaited_once()
+
+
+def _message(gmail_id: str, subject: str = "Hi") -> dict:
+    return {
+        "id": gmail_id,
+        "payload": {"mimeType": "text/plain", "headers": [{"name": "Subject", "value": subject}]},
+    }
+
+
+class TestStoreEmail:
+    @pytest.mark.asyncio
+    async def test_duplicate_skips_raw_archive(self):
+        result = MagicMock()
+        result.first.return_value = None
+        session = AsyncMock()
+        session.scalars = AsyncMock(return_value=result)
+
+        with patch("src.ingestion.gmail.store_raw_interaction", AsyncMock()) as store_raw:
+            assert await store_email(session, MagicMock(id=1), _message("m1")) is None
+
+        store_raw.assert_not_awaited()
+        sql = str(session.scalars.await_args.args[0])
+        assert sql.startswith("INSERT INTO emails")
+        assert "ON CONFLICT" in sql
+
+    @pytest.mark.asyncio
+    async def test_new_email_archived(self):
+        email = SimpleNamespace(gmail_id="m1")
+        result = MagicMock()
+        result.first.return_value = email
+        session = AsyncMock()
+        session.scalars = AsyncMock(return_value=result)
+
+        with patch("src.ingestion.gmail.store_raw_interaction", AsyncMock()) as store_raw:
+            assert await store_email(session, MagicMock(id=1), _message("m1")) is email
+
+        store_raw.assert_awaited_once()
+        assert store_raw.await_args.kwargs["source_id"] == "m1"
+
+
+class TestStoreEmails:
+    @pytest.mark.asyncio
+    async def test_empty_no_query(self):
+        session = AsyncMock()
+        assert await store_emails(session, MagicMock(), []) == 0
+        session.execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_one_insert_and_only_new_archived(self):
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = ["m2"]
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        with patch("src.ingestion.gmail.store_raw_interactions", AsyncMock()) as store_raw:
+            stored = await store_emails(
+                session, MagicMock(id=1), [_message("m1"), _message("m2"), _message("m2")],
+            )
+
+        assert stored == 1
+        session.execute.assert_awaited_once()
+        assert "ON CONFLICT (account_id, gmail_id) DO NOTHING" in str(session.execute.await_args.args[0])
+        assert [item["source_id"] for item in store_raw.await_args.args[1]] == ["m2"]
+
+    @pytest.mark.asyncio
+    async def test_all_duplicates_skip_archive(self):
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = []
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        with patch("src.ingestion.gmail.store_raw_interactions", AsyncMock()) as store_raw:
+            assert await store_emails(session, MagicMock(id=1), [_message("m1")]) == 0
+
+        store_raw.assert_not_awaited()
+
+
+class TestParseSenderName:
+    @pytest.mark.parametrize("header,expected", [
+        ('"Ann Lee" <ann@example.com>', "Ann Lee"),
+        ("Bob <bob@example.com>", "Bob"),
+        ("carol@example.com", "carol@example.com"),
+        ("", ""),
+    ])
+    def test_parses_display_name(self, header, expected):
+        assert parse_sender_name(header) == expected
+
+    @pytest.mark.asyncio
+    async def test_stored_with_email_row(self):
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = []
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        msg = _message("m1")
+        msg["payload"]["headers"].append({"name": "From", "value": '"Ann Lee" <ann@example.com>'})
+        await store_emails(session, MagicMock(id=1), [msg])
+
+        params = session.execute.await_args.args[0].compile().params
+        assert params["sender_name_m0"] == "Ann Lee"
+        assert params["from_address_m0"] == "ann@example.com"
+
+
+class TestParseSenderAddress:
+    @pytest.mark.parametrize("header,expected", [
+        ('"Ann Lee" <Ann@Example.com>', "ann@example.com"),
+        ("carol@example.com", "carol@example.com"),
+        ("Undisclosed recipients", None),
+        ("", None),
+    ])
+    def test_parses_lowercased_address(self, header, expected):
+        assert parse_sender_address(header) == expected
+
+
+class TestSyncAccount:
+    @pytest.mark.asyncio
+    async def test_stores_in_chunks(self):
+        session = AsyncMock()
+        account = MagicMock(id=1)
+        account.name = "personal"
+        messages = [{"id": f"m{i}"} for i in range(PREFETCH_CHUNK + 1)]
+
+        with patch("src.ingestion.gmail.fetch_emails_incremental", AsyncMock(return_value=messages)), \
+             patch("src.ingestion.gmail.store_emails", AsyncMock(side_effect=[3, 1])) as store:
+            stored = await sync_account(session, account)
+
+        assert stored == 4
+        assert [len(call.args[2]) for call in store.await_args_list] == [PREFETCH_CHUNK, 1]
+
+    @pytest.mark.asyncio
+    async def test_sync_state_gets_new_cursor(self):
+        """The cursor written during the fetch is recorded, not the caller's stale copy."""
+        sync_state = SimpleNamespace(cursor="100", last_sync=None, status=None)
+        session = AsyncMock()
+        session.add = MagicMock()
+        session.get = AsyncMock(return_value=sync_state)
+        session.scalar = AsyncMock(return_value="200")
+        account = MagicMock(id=1, sync_cursor="100")
+        account.name = "personal"
+
+        with patch("src.ingestion.gmail.fetch_emails_incremental", AsyncMock(return_value=[])):
+            await sync_account(session, account)
+
+        assert sync_state.cursor == "200"
+        assert "email_accounts.sync_cursor" in str(session.scalar.await_args.args[0])
+
+
+def _part(mime_type: str, text: str = "", parts: list | None = None) -> dict:
+    part = {"mimeType": mime_type, "body": {}}
+    if text:
+        part["body"]["data"] = base64.urlsafe_b64encode(text.encode()).decode()
+    if parts is not None:
+        part["parts"] = parts
+    return part
+
+
+class TestExtractBody:
+    def test_plain_payload(self):
+        assert _extract_body(_part("text/plain", "hello")) == "hello"
+
+    def test_html_only(self):
+        assert _extract_body(_part("text/html", "<p>hi</p>")) == "<p>hi</p>"
+
+    def test_prefers_plain_over_earlier_html(self):
+        payload = _part("multipart/mixed", parts=[
+            _part("text/html", "<p>html</p>"),
+            _part("multipart/alternative", parts=[_part("text/plain", "plain")]),
+        ])
+        assert _extract_body(payload) == "plain"
+
+    def test_first_plain_in_document_order(self):
+        payload = _part("multipart/mixed", parts=[
+            _part("multipart/alternative", parts=[_part("text/plain", "first")]),
+            _part("text/plain", "second"),
+        ])
+        assert _extract_body(payload) == "first"
+
+    def test_first_html_fallback(self):
+        payload = _part("multipart/alternative", parts=[
+            _part("text/html", "one"),
+            _part("text/html", "two"),
+        ])
+        assert _extract_body(payload) == "one"
+
+    def test_empty_parts(self):
+        assert _extract_body(_part("multipart/mixed", parts=[_part("text/plain")])) == ""
+        assert _extract_body({}) == ""
+
+
+class TestFilterUnknownIds:
+    @pytest.mark.asyncio
+    async def test_drops_known_preserving_order(self):
+        with patch("src.ingestion.gmail._prefetch_gmail_ids", AsyncMock(return_value={"b"})):
+            assert await _filter_unknown_ids(AsyncMock(), MagicMock(), ["a", "b", "c"]) == ["a", "c"]
+
+
+class TestFetchEmailsFull:
+    @pytest.mark.asyncio
+    async def test_fetches_only_unknown_and_sets_cursor_from_profile(self):
+        service = MagicMock()
+        users = service.users.return_value
+        users.getProfile.return_value.execute.return_value = {"historyId": "900"}
+        users.messages.return_value.list.return_value.execute.return_value = {
+            "messages": [{"id": "m1"}, {"id": "m2"}],
+        }
+        fetch = AsyncMock(return_value=[{"id": "m2", "historyId": "5"}])
+        update_cursor = AsyncMock()
+
+        with patch("src.ingestion.gmail.get_oauth_token", AsyncMock(return_value={"token": "t"})), \
+             patch("src.ingestion.gmail._build_gmail_credentials"), \
+             patch("src.ingestion.gmail._build_gmail_service", return_value=service), \
+             patch("src.ingestion.gmail._prefetch_gmail_ids", AsyncMock(return_value={"m1"})), \
+             patch("src.ingestion.gmail._fetch_messages", fetch), \
+             patch("src.ingestion.gmail.update_sync_cursor", update_cursor):
+            messages = await fetch_emails_full(AsyncMock(), MagicMock(id=1))
+
+        assert messages == [{"id": "m2", "historyId": "5"}]
+        assert fetch.await_args.args[2] == ["m2"]
+        update_cursor.assert_awaited_once()
+        assert update_cursor.await_args.args[2] == "900"
+
+
+class TestParseInternalDate:
+    def test_epoch_millis(self):
+        assert _parse_internal_date("1767225600000") == datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def test_missing_or_invalid(self):
+        assert _parse_internal_date(None) is None
+        assert _parse_internal_date("") is None
+        assert _parse_internal_date("not-a-number") is None
+
+
+class TestParseEmailHeaders:
+    def test_extracts_wanted_case_insensitively(self):
+        headers = [
+            {"name": "Received", "value": "by mx"},
+            {"name": "FROM", "value": "a@example.com"},
+            {"name": "Message-ID", "value": "<1@x>"},
+            {"name": "Reply-To", "value": "r@example.com"},
+        ]
+        result = _parse_email_headers(headers)
+        assert result["from"] == "a@example.com"
+        assert result["message_id"] == "<1@x>"
+        assert result["reply_to"] == "r@example.com"
+        assert result["to"] == ""
+
+    def test_keeps_list_headers_for_pre_classification(self):
+        headers = [
+            {"name": "List-Unsubscribe", "value": "<mailto:u@x>"},
+            {"name": "Precedence", "value": "bulk"},
+        ]
+        result = _parse_email_headers(headers)
+        assert result["list_unsubscribe"] == "<mailto:u@x>"
+        assert result["precedence"] == "bulk"
+
+    def test_all_keys_present_when_empty(self):
+        assert _parse_email_headers([]) == {
+            "from": "", "to": "", "subject": "", "date": "",
+            "message_id": "", "reply_to": "", "cc": "",
+            "list_unsubscribe": "", "precedence": "",
+        }
+
+    def test_already_lowercase_names(self):
+        headers = [{"name": "subject", "value": "lower"}, {"name": "message-id", "value": "<2@x>"}]
+        result = _parse_email_headers(headers)
+        assert result["subject"] == "lower"
+        assert result["message_id"] == "<2@x>"
+
+    def test_first_occurrence_wins(self):
+        headers = [{"name": "Subject", "value": "first"}, {"name": "Subject", "value": "second"}]
+        assert _parse_email_headers(headers)["subject"] == "first"
+
+
+class TestFetchEmailsIncremental:
+    def _account(self, last_sync=None):
+        account = MagicMock(id=1, sync_cursor="100", last_sync=last_sync)
+        account.name = "personal"
+        return account
+
+    async def _run(self, account, service):
+        fetch = AsyncMock(return_value=[{"id": "m2"}])
+        full = AsyncMock(return_value=["full"])
+        with patch("src.ingestion.gmail.get_oauth_token", AsyncMock(return_value={"token": "t"})), \
+             patch("src.ingestion.gmail._get_gmail_client", return_value=(None, service)), \
+             patch("src.ingestion.gmail._filter_unknown_ids", AsyncMock(side_effect=lambda s, a, ids: sorted(ids))), \
+             patch("src.ingestion.gmail._fetch_messages", fetch), \
+             patch("src.ingestion.gmail.update_sync_cursor", AsyncMock()), \
+             patch("src.ingestion.gmail.fetch_emails_full", full):
+            result = await fetch_emails_incremental(AsyncMock(), account)
+        return result, fetch, full
+
+    @pytest.mark.asyncio
+    async def test_history_pages_followed(self):
+        service = MagicMock()
+        service.users.return_value.history.return_value.list.return_value.execute.side_effect = [
+            {"history": [{"messagesAdded": [{"message": {"id": "m1"}}]}], "nextPageToken": "p2"},
+            {"history": [{"messagesAdded": [{"message": {"id": "m2"}}]}], "historyId": "200"},
+        ]
+
+        _, fetch, full = await self._run(self._account(), service)
+
+        assert fetch.await_args.args[2] == ["m1", "m2"]
+        full.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_expired_history_resyncs_since_last_sync(self):
+        last_sync = datetime(2026, 3, 2, tzinfo=timezone.utc)
+        service = MagicMock()
+        service.users.return_value.history.return_value.list.return_value.execute.side_effect = (
+            _http_error(404)
+        )
+
+        result, _, full = await self._run(self._account(last_sync), service)
+
+        assert result == ["full"]
+        expected = int((last_sync - GMAIL_RESYNC_OVERLAP).timestamp())
+        assert full.await_args.kwargs["query"] == f"after:{expected}"
+
+    @pytest.mark.asyncio
+    async def test_expired_history_without_last_sync_full_sync(self):
+        service = MagicMock()
+        service.users.return_value.history.return_value.list.return_value.execute.side_effect = (
+            _http_error(404)
+        )
+
+        result, _, full = await self._run(self._account(), service)
+
+        assert result == ["full"]
+        assert "query" not in full.await_args.kwargs
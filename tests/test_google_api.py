@@ -0,0 +1,128 @@
+"""Tests for shared Google API helpers (src/ingestion/google_api.py)."""
+
+from unittest.mock import MagicMock, patch
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from src.ingestion.google_api import (
+    BACKOFF_BASE_SECONDS,
+    MAX_BACKOFF_SECONDS,
+    RateLimiter,
+    backoff_delay,
+    clear_client_cache,
+    get_cached_client,
+    is_retryable_error,
+    response_model,
+    retry_after_seconds,
+)
+
+
+def _http_error(status: int) -> HttpError:
+    return HttpError(MagicMock(status=status, reason="error"), b"")
+
+
+class TestIsRetryableError:
+    def test_rate_limit(self):
+        assert is_retryable_error(_http_error(429)) is True
+
+    def test_server_errors(self):
+        assert all(is_retryable_error(_http_error(s)) for s in (500, 502, 503, 504))
+
+    def test_client_errors_not_retryable(self):
+        assert is_retryable_error(_http_error(404)) is False
+        assert is_retryable_error(_http_error(403)) is False
+
+    def test_non_http_error(self):
+        assert is_retryable_error(RuntimeError("boom")) is False
+
+
+class TestBackoffDelay:
+    def test_grows_exponentially(self):
+        assert BACKOFF_BASE_SECONDS <= backoff_delay(0) <= BACKOFF_BASE_SECONDS + 1
+        assert 4 * BACKOFF_BASE_SECONDS <= backoff_delay(2) <= 4 * BACKOFF_BASE_SECONDS + 1
+
+
+class TestBackoffWithRetryAfter:
+    def test_retry_after_is_lower_bound(self):
+        assert backoff_delay(0, retry_after=20) == 20
+
+    def test_capped(self):
+        assert backoff_delay(20) == MAX_BACKOFF_SECONDS
+
+
+class TestRetryAfterSeconds:
+    def test_reads_header(self):
+        error = HttpError(httplib2.Response({"status": "429", "retry-after": "7"}), b"")
+        assert retry_after_seconds(error) == 7.0
+
+    def test_missing_or_invalid(self):
+        assert retry_after_seconds(_http_error(429)) is None
+        error = HttpError(httplib2.Response({"status": "429", "retry-after": "soon"}), b"")
+        assert retry_after_seconds(error) is None
+        assert retry_after_seconds(RuntimeError()) is None
+
+
+class TestRateLimiter:
+    def test_burst_within_capacity_does_not_wait(self):
+        limiter = RateLimiter(rate=10)
+        with patch("src.ingestion.google_api.time.sleep") as sleep:
+            for _ in range(10):
+                limiter.acquire()
+        sleep.assert_not_called()
+
+    def test_waits_when_bucket_empty(self):
+        limiter = RateLimiter(rate=10)
+        limiter.acquire(10)
+        clock = [limiter._updated]
+
+        def fake_sleep(seconds):
+            clock[0] += seconds
+
+        with patch("src.ingestion.google_api.time.monotonic", side_effect=lambda: clock[0]), \
+             patch("src.ingestion.google_api.time.sleep", side_effect=fake_sleep) as sleep:
+            limiter.acquire(5)
+
+        assert sleep.call_args.args[0] == pytest.approx(0.5)
+
+
+class TestGetCachedClient:
+    @pytest.fixture(autouse=True)
+    def _fresh_cache(self):
+        clear_client_cache()
+        yield
+        clear_client_cache()
+
+    def test_built_once_per_key(self):
+        build_credentials = MagicMock(return_value="creds")
+        build_service = MagicMock(return_value="service")
+
+        first = get_cached_client(("drive", 1, "rt"), build_credentials, build_service)
+        second = get_cached_client(("drive", 1, "rt"), build_credentials, build_service)
+
+        assert first == second == ("creds", "service")
+        build_credentials.assert_called_once()
+        build_service.assert_called_once_with("creds")
+
+    def test_new_key_builds_new_client(self):
+        build_service = MagicMock(side_effect=["s1", "s2"])
+        get_cached_client(("drive", 1, "old"), MagicMock(), build_service)
+        _, service = get_cached_client(("drive", 1, "new"), MagicMock(), build_service)
+
+        assert service == "s2"
+
+
+class TestResponseModel:
+    def test_none_without_msgspec(self):
+        with patch("src.ingestion.google_api.msgspec", None):
+            assert response_model() is None
+
+    def test_decodes_json(self):
+        pytest.importorskip("msgspec")
+        model = response_model()
+        assert model.deserialize(b'{"id": "m1", "labelIds": ["INBOX"]}') == {"id": "m1", "labelIds": ["INBOX"]}
+
+    def test_non_json_falls_back(self):
+        pytest.importorskip("msgspec")
+        assert response_model().deserialize(b"not json") == "not json"
@@ -2,7 +2,7 @@
 
 import sqlite3
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -10,9 +10,15 @@ import pytest
 
 from src.ingestion.imessage import (
     APPLE_EPOCH,
+    _connect_readonly,
+    _existing_source_ids,
+    _read_chats,
+    _resolve_senders,
+    _store_messages,
     apple_time_to_datetime,
     datetime_to_apple_time,
     is_macos,
+    iter_messages,
     read_messages,
     resolve_message_sender,
     sync_imessages,
@@ -35,6 +41,10 @@ class TestAppleTimeConversions:
         assert result.month == 1
         assert result.day == 1
 
+    def test_nanosecond_timestamp_exact(self):
+        """Nanosecond timestamps convert exactly relative to the Apple epoch."""
+        assert apple_time_to_datetime(1_000_000_000_000) == APPLE_EPOCH + timedelta(seconds=1000)
+
     def test_second_timestamp(self):
         """Older iMessage timestamps are in seconds."""
         # 86400 seconds = 1 day after epoch
@@ -115,10 +125,12 @@ class TestReadMessages:
         messages = read_messages(db_path=db_path)
         assert len(messages) == 1
         assert messages[0]["guid"] == "guid-001"
+        assert messages[0]["date"] == datetime(2026, 2, 1, 12, 0, 0, tzinfo=timezone.utc)
         assert messages[0]["text"] == "Hello there"
         assert messages[0]["is_from_me"] is False
         assert messages[0]["handle_id"] == "+15551234567"
         assert messages[0]["chat_id"] == "iMessage;+1;+15551234567"
+        assert messages[0]["chat_name"] == "Test Chat"
 
     def test_filters_by_since(self, tmp_path: Path):
         """Messages before `since` are excluded."""
@@ -154,6 +166,56 @@ class TestReadMessages:
         assert len(messages) == 1
         assert messages[0]["guid"] == "new"
 
+    def test_chat_info_stitched_per_message(self, tmp_path: Path):
+        """Chat names are looked up once and attached to each message; no chat gives None."""
+        db_path = tmp_path / "chat.db"
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("CREATE TABLE handle (ROWID INTEGER PRIMARY KEY, id TEXT)")
+        conn.execute("CREATE TABLE chat (ROWID INTEGER PRIMARY KEY, chat_identifier TEXT, display_name TEXT)")
+        conn.execute("""
+            CREATE TABLE message (
+                ROWID INTEGER PRIMARY KEY, guid TEXT, text TEXT, is_from_me INTEGER,
+                date INTEGER, handle_id INTEGER, cache_has_attachments INTEGER DEFAULT 0
+            )
+        """)
+        conn.execute("CREATE TABLE chat_message_join (chat_id INTEGER, message_id INTEGER)")
+        conn.execute("INSERT INTO chat VALUES (1, 'chat1', 'First')")
+        conn.execute("INSERT INTO chat VALUES (2, 'chat2', NULL)")
+        for rowid, chat in [(1, 1), (2, 2), (3, 1), (4, None)]:
+            conn.execute("INSERT INTO message VALUES (?, ?, 'msg', 0, ?, 0, 0)", (rowid, f"g{rowid}", 100 + rowid))
+            if chat is not None:
+                conn.execute("INSERT INTO chat_message_join VALUES (?, ?)", (chat, rowid))
+        conn.commit()
+        conn.close()
+
+        messages = read_messages(db_path=db_path)
+        assert [(m["chat_id"], m["chat_name"]) for m in messages] == [
+            ("chat1", "First"), ("chat2", None), ("chat1", "First"), (None, None),
+        ]
+
+    def test_dates_match_python_conversion(self, tmp_path: Path):
+        """SQL-side date conversion agrees with apple_time_to_datetime for both units."""
+        db_path = tmp_path / "chat.db"
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("CREATE TABLE handle (ROWID INTEGER PRIMARY KEY, id TEXT)")
+        conn.execute("CREATE TABLE chat (ROWID INTEGER PRIMARY KEY, chat_identifier TEXT, display_name TEXT)")
+        conn.execute("""
+            CREATE TABLE message (
+                ROWID INTEGER PRIMARY KEY, guid TEXT, text TEXT, is_from_me INTEGER,
+                date INTEGER, handle_id INTEGER, cache_has_attachments INTEGER DEFAULT 0
+            )
+        """)
+        conn.execute("CREATE TABLE chat_message_join (chat_id INTEGER, message_id INTEGER)")
+
+        timestamps = [86400, 500_000_000, 1_000_000_000_000, 791_640_000_123_456_789]
+        for i, ts in enumerate(timestamps, start=1):
+            conn.execute("INSERT INTO message VALUES (?, ?, 'msg', 0, ?, 0, 0)", (i, f"g{i}", ts))
+        conn.commit()
+        conn.close()
+
+        messages = read_messages(db_path=db_path)
+        assert [m["date"] for m in messages] == [apple_time_to_datetime(ts) for ts in timestamps]
+
     def test_null_text_excluded(self, tmp_path: Path):
         """Messages with NULL text are filtered out by the query."""
         db_path = tmp_path / "chat.db"
@@ -216,6 +278,21 @@ class TestResolveMessageSender:
         result = await resolve_message_sender(session, "+15559999999")
         assert result is None
 
+    @pytest.mark.asyncio
+    async def test_single_query_prefers_phone(self):
+        """Phone and email are matched in one query, ordered so a phone match wins."""
+        result_mock = MagicMock()
+        result_mock.scalar_one_or_none.return_value = None
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result_mock)
+
+        await resolve_message_sender(session, "+15551234567")
+
+        session.execute.assert_awaited_once()
+        sql = str(session.execute.await_args.args[0])
+        assert "people.phone = :phone_1 OR people.email = :email_1" in sql
+        assert "ORDER BY people.phone = :phone_2 DESC" in sql
+
 
 class TestSyncImessages:
     @pytest.mark.asyncio
@@ -250,25 +327,28 @@ class TestSyncImessages:
         conn.commit()
         conn.close()
 
-        # Mock the session: no existing message found
+        # Mock the session: no existing message found, no matching sender
         existing_result = MagicMock()
-        existing_result.scalar_one_or_none.return_value = None
+        existing_result.scalars.return_value.all.return_value = []
 
         sender_result = MagicMock()
-        sender_result.scalar_one_or_none.return_value = None
+        sender_result.scalars.return_value.all.return_value = []
+
+        insert_result = MagicMock()
+        insert_result.scalars.return_value.all.return_value = ["guid-001"]
 
         session = AsyncMock()
-        session.execute = AsyncMock(side_effect=[existing_result, sender_result, sender_result])
-        session.add = MagicMock()
-        session.flush = AsyncMock()
+        session.execute = AsyncMock(side_effect=[existing_result, sender_result, MagicMock(), insert_result])
 
         with patch("src.ingestion.imessage.is_macos", return_value=True), \
-             patch("src.ingestion.imessage.store_raw_interaction", new_callable=AsyncMock):
+             patch("src.ingestion.imessage.store_raw_interactions", new_callable=AsyncMock) as mock_raw:
             summary = await sync_imessages(session, db_path=db_path)
 
         assert summary["messages_read"] == 1
         assert summary["messages_stored"] == 1
         assert summary["errors"] == 0
+        raw_items = mock_raw.await_args.args[1]
+        assert [item["source_id"] for item in raw_items] == ["guid-001"]
 
     @pytest.mark.asyncio
     async def test_skips_duplicate_messages(self, tmp_path: Path):
@@ -291,9 +371,8 @@ class TestSyncImessages:
         conn.close()
 
         # Mock the session: message already exists
-        existing_msg = MagicMock()
         existing_result = MagicMock()
-        existing_result.scalar_one_or_none.return_value = existing_msg
+        existing_result.scalars.return_value.all.return_value = ["guid-dup"]
 
         session = AsyncMock()
         session.execute = AsyncMock(return_value=existing_result)
@@ -304,3 +383,200 @@ class TestSyncImessages:
 
         assert summary["messages_read"] == 1
         assert summary["messages_stored"] == 0
+        # Only the batched existence check ran; no per-message or sender queries
+        assert session.execute.await_count == 1
+
+
+class TestExistingSourceIds:
+    @pytest.mark.asyncio
+    async def test_empty_guids_skip_query(self):
+        session = AsyncMock()
+        assert await _existing_source_ids(session, []) == set()
+        session.execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_chunks_lookup(self):
+        first = MagicMock()
+        first.scalars.return_value.all.return_value = ["g0"]
+        second = MagicMock()
+        second.scalars.return_value.all.return_value = ["g600"]
+        session = AsyncMock()
+        session.execute = AsyncMock(side_effect=[first, second])
+
+        guids = [f"g{i}" for i in range(700)]
+        with patch("src.ingestion.imessage.LOOKUP_CHUNK", 500):
+            existing = await _existing_source_ids(session, guids)
+
+        assert existing == {"g0", "g600"}
+        assert session.execute.await_count == 2
+
+
+class TestResolveSenders:
+    @pytest.mark.asyncio
+    async def test_phone_match_wins_over_email(self):
+        by_phone = MagicMock(phone="+15551234567", email=None)
+        by_email = MagicMock(phone=None, email="+15551234567")
+        other = MagicMock(phone=None, email="bob@example.com")
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = [by_email, by_phone, other]
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+
+        senders = await _resolve_senders(
+            session, {"+15551234567", "bob@example.com", "+15550000000"}
+        )
+
+        assert senders == {"+15551234567": by_phone, "bob@example.com": other}
+        session.execute.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_no_handles_skip_query(self):
+        session = AsyncMock()
+        assert await _resolve_senders(session, set()) == {}
+        session.execute.assert_not_awaited()
+
+
+def _raw_message(guid: str, handle: str = "+15551234567", is_from_me: bool = False) -> dict:
+    return {
+        "guid": guid,
+        "text": f"text {guid}",
+        "is_from_me": is_from_me,
+        "date": datetime(2026, 2, 1, tzinfo=timezone.utc),
+        "handle_id": handle,
+        "chat_id": "chat1",
+        "chat_name": "Chat",
+        "has_attachment": False,
+    }
+
+
+class TestStoreMessages:
+    @pytest.mark.asyncio
+    async def test_one_insert_and_archives_only_inserted(self):
+        alice = MagicMock(id=uuid.uuid4())
+        insert_result = MagicMock()
+        insert_result.scalars.return_value.all.return_value = ["g1"]
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=insert_result)
+
+        messages = [_raw_message("g1"), _raw_message("g2", is_from_me=True)]
+        with patch("src.ingestion.imessage.store_raw_interactions", new_callable=AsyncMock) as mock_raw:
+            stored = await _store_messages(session, messages, {"+15551234567": alice})
+
+        assert stored == 1
+        session.execute.assert_awaited_once()
+        params = session.execute.await_args.args[0].compile().params
+        assert params["sender_id_m0"] == alice.id
+        assert params["sender_id_m1"] is None
+        raw_items = mock_raw.await_args.args[1]
+        assert [item["source_id"] for item in raw_items] == ["g1"]
+        assert raw_items[0]["source_type"] == "imessage"
+
+    @pytest.mark.asyncio
+    async def test_all_conflicting_skips_archive(self):
+        insert_result = MagicMock()
+        insert_result.scalars.return_value.all.return_value = []
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=insert_result)
+
+        with patch("src.ingestion.imessage.store_raw_interactions", new_callable=AsyncMock) as mock_raw:
+            stored = await _store_messages(session, [_raw_message("g1")], {})
+
+        assert stored == 0
+        mock_raw.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_failed_chunk_counts_errors(self, tmp_path: Path):
+        session = AsyncMock()
+        existing_result = MagicMock()
+        existing_result.scalars.return_value.all.return_value = []
+        session.execute = AsyncMock(return_value=existing_result)
+        messages = [_raw_message("g1", is_from_me=True), _raw_message("g2", is_from_me=True)]
+
+        with patch("src.ingestion.imessage.is_macos", return_value=True), \
+             patch("src.ingestion.imessage.iter_messages", return_value=iter(messages)), \
+             patch("src.ingestion.imessage._store_messages", new_callable=AsyncMock,
+                   side_effect=RuntimeError("boom")):
+            summary = await sync_imessages(session)
+
+        assert summary["messages_stored"] == 0
+        assert summary["errors"] == 2
+
+
+class TestIterMessages:
+    def test_missing_db_yields_nothing(self, tmp_path: Path):
+        assert list(iter_messages(db_path=tmp_path / "nonexistent.db")) == []
+
+    def test_streams_across_fetch_chunks(self, tmp_path: Path):
+        """Rows spanning several fetchmany() chunks all come back, with chat names."""
+        db_path = tmp_path / "chat.db"
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("CREATE TABLE handle (ROWID INTEGER PRIMARY KEY, id TEXT)")
+        conn.execute("CREATE TABLE chat (ROWID INTEGER PRIMARY KEY, chat_identifier TEXT, display_name TEXT)")
+        conn.execute("""
+            CREATE TABLE message (
+                ROWID INTEGER PRIMARY KEY, guid TEXT, text TEXT, is_from_me INTEGER,
+                date INTEGER, handle_id INTEGER, cache_has_attachments INTEGER DEFAULT 0
+            )
+        """)
+        conn.execute("CREATE TABLE chat_message_join (chat_id INTEGER, message_id INTEGER)")
+        conn.execute("INSERT INTO chat VALUES (1, 'chat1', 'First')")
+        for rowid in range(1, 8):
+            conn.execute("INSERT INTO message VALUES (?, ?, 'msg', 0, ?, 0, 0)", (rowid, f"g{rowid}", 100 + rowid))
+            conn.execute("INSERT INTO chat_message_join VALUES (1, ?)", (rowid,))
+        conn.commit()
+        conn.close()
+
+        with patch("src.ingestion.imessage.FETCH_CHUNK", 3), \
+             patch("src.ingestion.imessage._read_chats", wraps=_read_chats) as mock_chats:
+            messages = list(iter_messages(db_path=db_path))
+
+        assert [m["guid"] for m in messages] == [f"g{i}" for i in range(1, 8)]
+        assert all(m["chat_name"] == "First" for m in messages)
+        # The chat is looked up once, not once per fetch chunk
+        assert mock_chats.call_count == 1
+
+
+class TestSyncImessagesChunking:
+    @pytest.mark.asyncio
+    async def test_inserts_per_chunk_and_looks_up_handles_once(self):
+        """Messages are stored per INSERT_CHUNK; a handle is resolved only once."""
+        messages = [_raw_message(f"g{i}") for i in range(5)]
+        empty = MagicMock()
+        empty.scalars.return_value.all.return_value = []
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=empty)
+
+        with patch("src.ingestion.imessage.is_macos", return_value=True), \
+             patch("src.ingestion.imessage.iter_messages", return_value=iter(messages)), \
+             patch("src.ingestion.imessage.INSERT_CHUNK", 2), \
+             patch("src.ingestion.imessage._resolve_senders", new_callable=AsyncMock,
+                   return_value={}) as mock_resolve, \
+             patch("src.ingestion.imessage._store_messages", new_callable=AsyncMock,
+                   side_effect=lambda s, chunk, senders: len(chunk)) as mock_store:
+            summary = await sync_imessages(session)
+
+        assert summary["messages_read"] == 5
+        assert summary["messages_stored"] == 5
+        assert [len(c.args[1]) for c in mock_store.await_args_list] == [2, 2, 1]
+        # synchronous_commit relaxed once for the whole write phase
+        set_calls = [c for c in session.execute.await_args_list if "synchronous_commit" in str(c.args[0])]
+        assert len(set_calls) == 1
+        assert [c.args[1] for c in mock_resolve.await_args_list] == [{"+15551234567"}, set(), set()]
+
+
+class TestConnectReadonly:
+    def test_read_only_with_pragmas(self, tmp_path: Path):
+        db_path = tmp_path / "chat.db"
+        setup = sqlite3.connect(str(db_path))
+        setup.execute("CREATE TABLE t (x INTEGER)")
+        setup.commit()
+        setup.close()
+
+        conn = _connect_readonly(db_path)
+        try:
+            assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+            assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO t VALUES (1)")
+        finally:
+            conn.close()
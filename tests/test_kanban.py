@@ -0,0 +1,65 @@
+"""Tests for src/output/kanban — per-project Kanban boards."""
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.output.kanban import generate_kanban
+from tests.conftest import make_project, make_task
+
+
+def _session_returning(tasks):
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = tasks
+    session = AsyncMock()
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+def _task(title, status, **overrides):
+    defaults = {"source_type": None, "created_at": None, "waiting_since": None, "completed_at": None}
+    defaults.update(overrides)
+    return make_task(title=title, status=status, **defaults)
+
+
+class TestGenerateKanban:
+    @pytest.mark.asyncio
+    async def test_buckets_tasks_by_status(self, tmp_path: Path):
+        now = datetime.now(timezone.utc)
+        tasks = [
+            _task("Plan", "backlog"),
+            _task("Build", "in_progress"),
+            _task("Review", "waiting"),
+            _task("Shipped", "done", completed_at=now - timedelta(days=2)),
+            _task("Mystery", "cancelled"),
+        ]
+        project = make_project(name="Launch")
+
+        await generate_kanban(_session_returning(tasks), project, tmp_path)
+
+        content = (tmp_path / "KANBAN.md").read_text(encoding="utf-8")
+        sections = content.split("## ")
+        assert "Plan" in sections[1] and sections[1].startswith("Backlog")
+        assert "Build" in sections[2] and sections[2].startswith("In Progress")
+        assert "Review" in sections[3] and sections[3].startswith("Waiting On")
+        assert sections[4].startswith("Done (Recent)") and "Shipped" in sections[4]
+        assert "Mystery" not in content
+
+    @pytest.mark.asyncio
+    async def test_old_done_tasks_filtered_in_sql(self, tmp_path: Path):
+        session = _session_returning([])
+
+        await generate_kanban(session, make_project(name="Launch"), tmp_path)
+
+        sql = str(session.execute.await_args.args[0])
+        assert "tasks.status != :status_1 OR tasks.completed_at > :completed_at_1" in sql
+
+    @pytest.mark.asyncio
+    async def test_empty_board(self, tmp_path: Path):
+        await generate_kanban(_session_returning([]), make_project(name="Empty"), tmp_path)
+
+        content = (tmp_path / "KANBAN.md").read_text(encoding="utf-8")
+        assert "_Empty_" in content
+        assert "_No recent completions_" in content
@@ -128,6 +128,24 @@ class TestParseSessionIntoTurns:
         assert len(turns) == 1
         assert "Read" in turns[0]["tool_names"]
 
+    def test_tool_names_deduplicated_across_messages(self):
+        """Tools repeated across assistant messages appear once, in first-use order."""
+        path = _write_jsonl([
+            _msg("user", "Refactor the module"),
+            _msg("assistant", [
+                {"type": "tool_use", "name": "Grep", "input": {}},
+                {"type": "tool_use", "name": "Read", "input": {}},
+            ]),
+            _msg("assistant", [
+                {"type": "tool_use", "name": "Read", "input": {}},
+                {"type": "tool_use", "name": "Edit", "input": {}},
+            ]),
+        ])
+        turns = parse_session_into_turns(path)
+
+        assert turns[0]["tool_names"] == ["Grep", "Read", "Edit"]
+        assert "tool_names_seen" not in turns[0]
+
     def test_content_hash_deterministic(self):
         """Same file parsed twice produces same content hashes."""
         messages = [
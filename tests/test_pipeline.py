@@ -3,10 +3,11 @@
 import asyncio
 import sys
 import uuid
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from sqlalchemy.dialects import postgresql
 
 # Mock google modules so pipeline.py can be imported without google SDK
 for mod in [
@@ -36,17 +37,21 @@ def _make_session_with_emails(email_ids: list[uuid.UUID]):
 
 
 def _make_inner_session(emails_by_id: dict):
-    """Build a mock inner session for get_session() that can look up emails."""
+    """Build a mock inner session for get_session() whose batch query returns the emails."""
     inner = AsyncMock()
 
-    async def mock_get(model_cls, eid):
-        return emails_by_id.get(eid)
-
-    inner.get = mock_get
+    result_mock = MagicMock()
+    result_mock.scalars.return_value.all.return_value = list(emails_by_id.values())
+    inner.execute = AsyncMock(return_value=result_mock)
     inner.flush = AsyncMock()
     inner.commit = AsyncMock()
     inner.rollback = AsyncMock()
 
+    savepoint = MagicMock()
+    savepoint.__aenter__ = AsyncMock(return_value=None)
+    savepoint.__aexit__ = AsyncMock(return_value=False)
+    inner.begin_nested = MagicMock(return_value=savepoint)
+
     return inner
 
 
@@ -203,7 +208,7 @@ class TestProcessUnprocessedEmails:
 
     @pytest.mark.asyncio
     async def test_missing_email_counted_as_error(self):
-        """If the email is gone by the time the inner session fetches it, count as error."""
+        """If the email is gone by the time the inner session loads its batch, count as error."""
         email_id = uuid.uuid4()
         session = _make_session_with_emails([email_id])
 
@@ -223,7 +228,7 @@ class TestProcessUnprocessedEmails:
 
     @pytest.mark.asyncio
     async def test_multiple_emails_each_get_own_session(self):
-        """Regression: each email must get its own session (not shared)."""
+        """Regression: concurrent workers never share a session; small runs get one per email."""
         ids = [uuid.uuid4() for _ in range(3)]
         emails = {eid: make_email(id=eid, classification=None) for eid in ids}
         session = _make_session_with_emails(ids)
@@ -336,6 +341,34 @@ class TestProcessUnprocessedEmails:
         assert summary["deep_extracted"] == 1
         mock_resolve.assert_awaited_once()
 
+    @pytest.mark.asyncio
+    async def test_today_computed_once_for_run(self):
+        """Both stages get the same precomputed date instead of reading the clock per email."""
+        email_ids = [uuid.uuid4(), uuid.uuid4()]
+        emails = {eid: make_email(id=eid, classification=None) for eid in email_ids}
+        session = _make_session_with_emails(email_ids)
+
+        inner_session = _make_inner_session(emails)
+
+        mock_ctx = AsyncMock()
+        mock_ctx.__aenter__ = AsyncMock(return_value=inner_session)
+        mock_ctx.__aexit__ = AsyncMock(return_value=False)
+
+        classification = {"classification": "human", "route_to": "deep_analysis"}
+
+        from src.ingestion.pipeline import process_unprocessed_emails
+
+        with patch("src.ingestion.pipeline.get_session", return_value=mock_ctx), \
+             patch("src.ingestion.pipeline.classify_and_update", new_callable=AsyncMock,
+                   return_value=classification) as mock_classify, \
+             patch("src.ingestion.pipeline.extract_and_update", new_callable=AsyncMock,
+                   return_value={}) as mock_extract:
+            await process_unprocessed_emails(session, limit=10)
+
+        calls = mock_classify.await_args_list + mock_extract.await_args_list
+        assert len(calls) == 4
+        assert {c.kwargs["today"] for c in calls} == {date.today().isoformat()}
+
     @pytest.mark.asyncio
     async def test_outer_session_committed_before_inner_sessions(self):
         """Regression: outer session must commit so inner sessions can see the emails."""
@@ -380,3 +413,437 @@ class TestProcessUnprocessedEmails:
         assert "commit" in call_order
         assert "get_session" in call_order
         assert call_order.index("commit") < call_order.index("get_session")
+
+    @pytest.mark.asyncio
+    async def test_emails_batched_into_shared_sessions(self):
+        """Emails beyond MAX_CONCURRENCY share a session per batch, with a savepoint each."""
+        ids = [uuid.uuid4() for _ in range(25)]
+        emails = {eid: make_email(id=eid, classification=None) for eid in ids}
+        session = _make_session_with_emails(ids)
+
+        sessions_created = []
+
+        def mock_get_session():
+            inner = _make_inner_session(emails)
+            sessions_created.append(inner)
+            ctx = AsyncMock()
+            ctx.__aenter__ = AsyncMock(return_value=inner)
+            ctx.__aexit__ = AsyncMock(return_value=False)
+            return ctx
+
+        classification = {"classification": "spam", "route_to": "skip"}
+
+        from src.ingestion.pipeline import process_unprocessed_emails
+
+        with patch("src.ingestion.pipeline.MAX_CONCURRENCY", 2), \
+             patch("src.ingestion.pipeline.get_session", side_effect=mock_get_session), \
+             patch("src.ingestion.pipeline.classify_and_update", new_callable=AsyncMock, return_value=classification):
+            summary = await process_unprocessed_emails(session)
+
+        assert len(sessions_created) == 2
+        assert [s.begin_nested.call_count for s in sessions_created] == [13, 12]
+        assert summary["classified"] == 25
+
+    @pytest.mark.asyncio
+    async def test_failure_does_not_stop_rest_of_batch(self):
+        """One failing email is counted as an error; the others in its batch still run."""
+        ids = [uuid.uuid4() for _ in range(3)]
+        emails = {eid: make_email(id=eid, classification=None) for eid in ids}
+        session = _make_session_with_emails(ids)
+        inner_session = _make_inner_session(emails)
+
+        mock_ctx = AsyncMock()
+        mock_ctx.__aenter__ = AsyncMock(return_value=inner_session)
+        mock_ctx.__aexit__ = AsyncMock(return_value=False)
+
+        classification = {"classification": "spam", "route_to": "skip"}
+
+        from src.ingestion.pipeline import process_unprocessed_emails
+
+        with patch("src.ingestion.pipeline.MAX_CONCURRENCY", 1), \
+             patch("src.ingestion.pipeline.get_session", return_value=mock_ctx), \
+             patch("src.ingestion.pipeline.classify_and_update", new_callable=AsyncMock,
+                   side_effect=[classification, RuntimeError("boom"), classification]):
+            summary = await process_unprocessed_emails(session)
+
+        assert summary["classified"] == 2
+        assert summary["skipped"] == 2
+        assert summary["errors"] == 1
+        # Counters absent from every batch are still reported, as a plain dict
+        assert type(summary) is dict
+        assert summary["deep_extracted"] == 0
+        assert summary["regex_parsed"] == 0
+
+    @pytest.mark.asyncio
+    async def test_batch_loaded_with_one_query(self):
+        """A batch's emails are loaded with a single SELECT, not one get() per email."""
+        ids = [uuid.uuid4() for _ in range(3)]
+        emails = {eid: make_email(id=eid, classification=None) for eid in ids}
+        session = _make_session_with_emails(ids)
+        inner_session = _make_inner_session(emails)
+
+        mock_ctx = AsyncMock()
+        mock_ctx.__aenter__ = AsyncMock(return_value=inner_session)
+        mock_ctx.__aexit__ = AsyncMock(return_value=False)
+
+        classification = {"classification": "spam", "route_to": "skip"}
+
+        from src.ingestion.pipeline import process_unprocessed_emails
+
+        with patch("src.ingestion.pipeline.MAX_CONCURRENCY", 1), \
+             patch("src.ingestion.pipeline.get_session", return_value=mock_ctx), \
+             patch("src.ingestion.pipeline.classify_and_update", new_callable=AsyncMock,
+                   return_value=classification) as mock_classify:
+            summary = await process_unprocessed_emails(session)
+
+        inner_session.execute.assert_awaited_once()
+        inner_session.get.assert_not_called()
+        assert [c.args[1] for c in mock_classify.await_args_list] == [emails[eid] for eid in ids]
+        assert summary["classified"] == 3
+
+    @pytest.mark.asyncio
+    async def test_processed_emails_indexed_in_background(self):
+        """Successfully processed emails are indexed by the background worker; failed ones aren't."""
+        ids = [uuid.uuid4() for _ in range(3)]
+        emails = {eid: make_email(id=eid, classification=None) for eid in ids}
+        session = _make_session_with_emails(ids)
+        inner_session = _make_inner_session(emails)
+
+        mock_ctx = AsyncMock()
+        mock_ctx.__aenter__ = AsyncMock(return_value=inner_session)
+        mock_ctx.__aexit__ = AsyncMock(return_value=False)
+
+        classification = {"classification": "spam", "route_to": "skip"}
+        indexed = []
+
+        from src.ingestion.pipeline import process_unprocessed_emails
+
+        with patch("src.ingestion.pipeline.MAX_CONCURRENCY", 1), \
+             patch("src.ingestion.pipeline.get_session", return_value=mock_ctx), \
+             patch("src.ingestion.pipeline.classify_and_update", new_callable=AsyncMock,
+                   side_effect=[classification, RuntimeError("boom"), classification]), \
+             patch("src.ingestion.pipeline._index_emails", side_effect=indexed.extend):
+            await process_unprocessed_emails(session)
+
+        # Drained before returning
+        assert [payload[0] for payload in indexed] == [str(ids[0]), str(ids[2])]
+        assert indexed[0][1].startswith("Test Subject")
+
+    @pytest.mark.asyncio
+    async def test_nothing_indexed_when_batch_commit_fails(self):
+        """Payloads are queued only after the batch commits, so a failed commit indexes nothing."""
+        ids = [uuid.uuid4() for _ in range(2)]
+        emails = {eid: make_email(id=eid, classification=None) for eid in ids}
+        session = _make_session_with_emails(ids)
+        inner_session = _make_inner_session(emails)
+
+        mock_ctx = AsyncMock()
+        mock_ctx.__aenter__ = AsyncMock(return_value=inner_session)
+        mock_ctx.__aexit__ = AsyncMock(side_effect=RuntimeError("commit failed"))
+
+        classification = {"classification": "spam", "route_to": "skip"}
+        indexed = []
+
+        from src.ingestion.pipeline import process_unprocessed_emails
+
+        with patch("src.ingestion.pipeline.MAX_CONCURRENCY", 1), \
+             patch("src.ingestion.pipeline.get_session", return_value=mock_ctx), \
+             patch("src.ingestion.pipeline.classify_and_update", new_callable=AsyncMock,
+                   return_value=classification), \
+             patch("src.ingestion.pipeline._index_emails", side_effect=indexed.extend), \
+             pytest.raises(RuntimeError, match="commit failed"):
+            await process_unprocessed_emails(session)
+
+        assert indexed == []
+
+    @pytest.mark.asyncio
+    async def test_batch_mode_applies_precomputed_results(self):
+        """Over the threshold, batch results are handed to the per-email updates."""
+        ids = [uuid.uuid4() for _ in range(2)]
+        emails = {eid: make_email(id=eid, classification=None) for eid in ids}
+        session = _make_session_with_emails(ids)
+        inner_session = _make_inner_session(emails)
+
+        mock_ctx = AsyncMock()
+        mock_ctx.__aenter__ = AsyncMock(return_value=inner_session)
+        mock_ctx.__aexit__ = AsyncMock(return_value=False)
+
+        human = {"classification": "human", "route_to": "deep_analysis"}
+        classifications = {ids[0]: human, ids[1]: {"classification": "spam", "route_to": "skip"}}
+        extractions = {ids[0]: {"tasks": []}}
+        settings = MagicMock()
+        settings.anthropic.batch_mode = True
+        settings.anthropic.batch_threshold = 1
+
+        from src.ingestion.pipeline import process_unprocessed_emails
+
+        with patch("src.ingestion.pipeline.get_settings", return_value=settings), \
+             patch("src.ingestion.pipeline.get_session", return_value=mock_ctx), \
+             patch("src.ingestion.pipeline._run_llm_batches", new_callable=AsyncMock,
+                   return_value=(classifications, extractions)) as mock_batches, \
+             patch("src.ingestion.pipeline.classify_and_update", new_callable=AsyncMock,
+                   side_effect=lambda s, email, result, today: result) as mock_classify, \
+             patch("src.ingestion.pipeline.extract_and_update", new_callable=AsyncMock,
+                   return_value={"tasks": []}) as mock_extract:
+            summary = await process_unprocessed_emails(session)
+
+        assert mock_batches.await_args.args[0] == ids
+        assert {c.args[2]["classification"] for c in mock_classify.await_args_list} == {"human", "spam"}
+        assert mock_extract.await_args.args[1:] == (emails[ids[0]], extractions[ids[0]])
+        assert summary["deep_extracted"] == 1
+        assert summary["skipped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_below_threshold_skips_batches(self):
+        email_id = uuid.uuid4()
+        session = _make_session_with_emails([email_id])
+        inner_session = _make_inner_session({email_id: make_email(id=email_id)})
+
+        mock_ctx = AsyncMock()
+        mock_ctx.__aenter__ = AsyncMock(return_value=inner_session)
+        mock_ctx.__aexit__ = AsyncMock(return_value=False)
+
+        settings = MagicMock()
+        settings.anthropic.batch_mode = True
+        settings.anthropic.batch_threshold = 100
+
+        from src.ingestion.pipeline import process_unprocessed_emails
+
+        with patch("src.ingestion.pipeline.get_settings", return_value=settings), \
+             patch("src.ingestion.pipeline.get_session", return_value=mock_ctx), \
+             patch("src.ingestion.pipeline._run_llm_batches", new_callable=AsyncMock) as mock_batches, \
+             patch("src.ingestion.pipeline.classify_and_update", new_callable=AsyncMock,
+                   return_value={"route_to": "skip"}) as mock_classify:
+            await process_unprocessed_emails(session)
+
+        mock_batches.assert_not_awaited()
+        assert mock_classify.await_args.args[2] is None
+
+    @pytest.mark.asyncio
+    async def test_batch_failure_falls_back_to_per_email(self):
+        email_id = uuid.uuid4()
+        session = _make_session_with_emails([email_id])
+        inner_session = _make_inner_session({email_id: make_email(id=email_id)})
+
+        mock_ctx = AsyncMock()
+        mock_ctx.__aenter__ = AsyncMock(return_value=inner_session)
+        mock_ctx.__aexit__ = AsyncMock(return_value=False)
+
+        settings = MagicMock()
+        settings.anthropic.batch_mode = True
+        settings.anthropic.batch_threshold = 0
+
+        from src.ingestion.pipeline import process_unprocessed_emails
+
+        with patch("src.ingestion.pipeline.get_settings", return_value=settings), \
+             patch("src.ingestion.pipeline.get_session", return_value=mock_ctx), \
+             patch("src.ingestion.pipeline._run_llm_batches", new_callable=AsyncMock,
+                   side_effect=RuntimeError("boom")), \
+             patch("src.ingestion.pipeline.classify_and_update", new_callable=AsyncMock,
+                   return_value={"route_to": "skip"}) as mock_classify:
+            summary = await process_unprocessed_emails(session)
+
+        assert summary["classified"] == 1
+        assert mock_classify.await_args.args[2] is None
+
+
+class TestRunLlmBatches:
+    @pytest.mark.asyncio
+    async def test_heuristics_first_then_extracts_relevant_humans(self):
+        noreply = make_email(raw_headers={"from": "noreply@shop.com"})
+        human = make_email()
+        stale = make_email()
+        emails = [noreply, human, stale]
+        deep = {"classification": "human", "route_to": "deep_analysis"}
+        fed = {}
+
+        async def fake_classify(emails_iter):
+            fed["classify"] = [email async for email in emails_iter]
+            return {human.id: deep, stale.id: {**deep, "still_relevant": False}}
+
+        async def fake_extract(emails_iter):
+            fed["extract"] = [email async for email in emails_iter]
+            return {human.id: {"tasks": []}}
+
+        def fake_load(email_ids):
+            async def gen():
+                for email in emails:
+                    if email.id in email_ids:
+                        yield email
+            return gen()
+
+        from src.ingestion.pipeline import _run_llm_batches
+
+        with patch("src.ingestion.pipeline._load_emails", side_effect=fake_load), \
+             patch("src.ingestion.pipeline.batch_classify_emails", side_effect=fake_classify), \
+             patch("src.ingestion.pipeline.batch_extract_emails", side_effect=fake_extract):
+            classifications, extractions = await _run_llm_batches([e.id for e in emails])
+
+        assert fed["classify"] == [human, stale]
+        assert classifications[noreply.id]["route_to"] == "regex_parse"
+        assert fed["extract"] == [human]
+        assert extractions == {human.id: {"tasks": []}}
+
+    @pytest.mark.asyncio
+    async def test_load_emails_in_chunks_with_short_sessions(self):
+        ids = [uuid.uuid4() for _ in range(5)]
+        sessions = []
+
+        def mock_get_session():
+            inner = _make_inner_session({})
+            sessions.append(inner)
+            ctx = AsyncMock()
+            ctx.__aenter__ = AsyncMock(return_value=inner)
+            ctx.__aexit__ = AsyncMock(return_value=False)
+            return ctx
+
+        from src.ingestion.pipeline import _load_emails
+
+        with patch("src.ingestion.pipeline.LLM_BATCH_LOAD_SIZE", 2), \
+             patch("src.ingestion.pipeline.get_session", side_effect=mock_get_session):
+            loaded = [email async for email in _load_emails(ids)]
+
+        assert loaded == []
+        assert len(sessions) == 3
+        params = [
+            s.execute.await_args.args[0].compile(dialect=postgresql.dialect()).params for s in sessions
+        ]
+        assert [len(next(iter(p.values()))) for p in params] == [2, 2, 1]
+
+
+class TestEmailIndexPayload:
+    def test_builds_text_and_metadata(self):
+        from src.ingestion.pipeline import _email_index_payload
+
+        email = make_email(classification="human", needs_reply=True)
+        email_id, text, meta = _email_index_payload(email)
+
+        assert email_id == str(email.id)
+        assert text == "Test Subject\nHello, this is the full body of the test email."
+        assert meta == {"classification": "human", "needs_reply": True, "date": email.email_date.isoformat()}
+
+    def test_no_text_returns_none(self):
+        from src.ingestion.pipeline import _email_index_payload
+
+        email = make_email(subject=None, full_body=None, snippet=None)
+        assert _email_index_payload(email) is None
+
+
+# ---------------------------------------------------------------------------
+# Tests: run_full_sync
+# ---------------------------------------------------------------------------
+
+class TestRunFullSync:
+    """Tests for run_full_sync."""
+
+    @staticmethod
+    def _settings(drive: bool, imessage: bool):
+        settings = MagicMock()
+        settings.sync.drive_enabled = drive
+        settings.sync.imessage_enabled = imessage
+        return settings
+
+    @pytest.mark.asyncio
+    async def test_syncs_run_concurrently_in_own_sessions(self):
+        """Every Gmail/Drive/iMessage sync starts before any finishes, each with its own session."""
+        accounts = [MagicMock(), MagicMock()]
+        accounts[0].name, accounts[1].name = "work", "personal"
+        outer = AsyncMock()
+        sessions = []
+
+        def mock_get_session():
+            inner = AsyncMock()
+            sessions.append(inner)
+            ctx = AsyncMock()
+            ctx.__aenter__ = AsyncMock(return_value=inner)
+            ctx.__aexit__ = AsyncMock(return_value=False)
+            return ctx
+
+        started = []
+        release = asyncio.Event()
+
+        async def fake_sync(result):
+            started.append(result)
+            if len(started) == 5:
+                release.set()
+            await release.wait()
+            return result
+
+        async def fake_gmail(session, account):
+            return await fake_sync(3)
+
+        async def fake_drive(session, account):
+            return await fake_sync({"files_synced": 2})
+
+        async def fake_imessage(session):
+            return await fake_sync({"messages_stored": 7})
+
+        from src.ingestion.pipeline import run_full_sync
+
+        with patch("src.ingestion.pipeline.get_settings", return_value=self._settings(True, True)), \
+             patch("src.ingestion.pipeline.list_accounts", new_callable=AsyncMock, return_value=accounts), \
+             patch("src.ingestion.pipeline.get_session", side_effect=mock_get_session), \
+             patch("src.ingestion.pipeline.sync_account", side_effect=fake_gmail), \
+             patch("src.ingestion.pipeline.sync_drive", side_effect=fake_drive), \
+             patch("src.ingestion.pipeline.sync_imessages", side_effect=fake_imessage):
+            summary = await asyncio.wait_for(run_full_sync(outer), timeout=5)
+
+        assert len(sessions) == 5
+        assert summary["accounts"] == 2
+        assert summary["emails_fetched"] == 6
+        assert summary["drive_files_synced"] == 4
+        assert summary["messages_synced"] == 7
+
+    @pytest.mark.asyncio
+    async def test_one_failure_does_not_block_others(self):
+        account = MagicMock()
+        account.name = "work"
+
+        def mock_get_session():
+            ctx = AsyncMock()
+            ctx.__aenter__ = AsyncMock(return_value=AsyncMock())
+            ctx.__aexit__ = AsyncMock(return_value=False)
+            return ctx
+
+        from src.ingestion.pipeline import run_full_sync
+
+        with patch("src.ingestion.pipeline.get_settings", return_value=self._settings(True, False)), \
+             patch("src.ingestion.pipeline.list_accounts", new_callable=AsyncMock, return_value=[account]), \
+             patch("src.ingestion.pipeline.get_session", side_effect=mock_get_session), \
+             patch("src.ingestion.pipeline.sync_account", new_callable=AsyncMock,
+                   side_effect=RuntimeError("gmail down")), \
+             patch("src.ingestion.pipeline.sync_drive", new_callable=AsyncMock,
+                   return_value={"files_synced": 4}):
+            summary = await run_full_sync(AsyncMock())
+
+        assert summary["emails_fetched"] == 0
+        assert summary["drive_files_synced"] == 4
+        assert "messages_synced" not in summary
+
+
+class TestRunIndexer:
+    @pytest.mark.asyncio
+    async def test_batches_queued_payloads(self):
+        from src.ingestion.pipeline import _run_indexer
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for i in range(5):
+            queue.put_nowait((f"e{i}", "text", {}))
+        queue.put_nowait(None)
+
+        batches = []
+        with patch("src.ingestion.pipeline.INDEX_BATCH_SIZE", 2), \
+             patch("src.ingestion.pipeline._index_emails", side_effect=batches.append):
+            await asyncio.wait_for(_run_indexer(queue), timeout=5)
+
+        assert [[p[0] for p in batch] for batch in batches] == [["e0", "e1"], ["e2", "e3"], ["e4"]]
+
+    @pytest.mark.asyncio
+    async def test_stops_on_sentinel_with_nothing_queued(self):
+        from src.ingestion.pipeline import _run_indexer
+
+        queue: asyncio.Queue = asyncio.Queue()
+        queue.put_nowait(None)
+        with patch("src.ingestion.pipeline._index_emails") as mock_index:
+            await asyncio.wait_for(_run_indexer(queue), timeout=5)
+        mock_index.assert_not_called()
@@ -186,3 +186,52 @@ class TestTaskPriority:
         task = make_task(due_date=yesterday)
         score = await effective_priority_task(mock_session, task)
         assert score >= 90
+
+    @pytest.mark.asyncio
+    async def test_prefetched_sprints_and_accounts_skip_queries(self, mock_session):
+        from src.priority import effective_priority_task
+
+        sprint = MagicMock(priority_boost=2.0)
+        account = MagicMock(priority_weight=0.5)
+        task = make_task(source_account_id=uuid.uuid4())
+        score = await effective_priority_task(
+            mock_session, task,
+            sprints={task.project_id: sprint},
+            accounts={task.source_account_id: account},
+        )
+        # max(0, 10) * 2.0 * 0.5
+        assert score == 10.0
+        mock_session.execute.assert_not_awaited()
+        mock_session.get.assert_not_awaited()
+
+
+class TestPriorityRanking:
+    @pytest.mark.asyncio
+    async def test_sprints_fetched_once_for_all_projects(self):
+        from src.priority import get_priority_ranking
+
+        boosted = make_project(name="Boosted", mention_count=0, source_diversity=0, people_count=0)
+        plain = make_project(name="Plain", mention_count=0, source_diversity=0, people_count=0)
+        sprint = MagicMock(project_id=boosted.id, priority_boost=3.0)
+        projects_result = MagicMock()
+        projects_result.scalars.return_value.all.return_value = [plain, boosted]
+        sprints_result = MagicMock()
+        sprints_result.scalars.return_value.all.return_value = [sprint]
+        session = AsyncMock()
+        session.execute = AsyncMock(side_effect=[projects_result, sprints_result])
+
+        ranked = await get_priority_ranking(session)
+
+        assert session.execute.await_count == 2
+        assert [r["name"] for r in ranked] == ["Boosted", "Plain"]
+        assert ranked[0]["score"] == 30.0
+
+
+class TestLog1pCount:
+    @pytest.mark.parametrize("n", [0, 1, 5, 1023, 1024, 50_000])
+    def test_matches_math_log(self, n):
+        from math import log
+
+        from src.priority import _log1p_count
+
+        assert _log1p_count(n) == log(n + 1)
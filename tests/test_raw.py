@@ -0,0 +1,70 @@
+"""Tests for the raw interaction archive (src/storage/raw.py)."""
+
+import hashlib
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.storage.raw import store_raw_interactions
+
+
+def _mock_session(existing: list) -> AsyncMock:
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = existing
+    session = AsyncMock()
+    session.add = MagicMock()
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+class TestStoreRawInteractions:
+    """Tests for store_raw_interactions."""
+
+    @pytest.mark.asyncio
+    async def test_empty_items_no_queries(self):
+        session = _mock_session([])
+        assert await store_raw_interactions(session, []) == []
+        session.execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_stores_all_with_single_query_and_flush(self):
+        session = _mock_session([])
+        items = [
+            {"source_type": "a", "raw_content": "first", "source_id": "1"},
+            {"source_type": "b", "raw_content": "second", "raw_metadata": {"k": "v"}},
+        ]
+
+        stored = await store_raw_interactions(session, items)
+
+        assert [ri.source_type for ri in stored] == ["a", "b"]
+        assert stored[0].content_hash == hashlib.sha256(b"first").hexdigest()
+        assert stored[1].raw_metadata == {"k": "v"}
+        assert session.add.call_count == 2
+        session.execute.assert_awaited_once()
+        session.flush.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_returns_existing_duplicates(self):
+        existing = MagicMock(content_hash=hashlib.sha256(b"first").hexdigest())
+        session = _mock_session([existing])
+        items = [
+            {"source_type": "a", "raw_content": "first"},
+            {"source_type": "b", "raw_content": "second"},
+        ]
+
+        stored = await store_raw_interactions(session, items)
+
+        assert stored[0] is existing
+        assert stored[1].source_type == "b"
+        assert session.add.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_all_duplicates_skip_flush(self):
+        existing = MagicMock(content_hash=hashlib.sha256(b"first").hexdigest())
+        session = _mock_session([existing])
+
+        stored = await store_raw_interactions(session, [{"source_type": "a", "raw_content": "first"}])
+
+        assert stored == [existing]
+        session.add.assert_not_called()
+        session.flush.assert_not_awaited()
@@ -1,7 +1,18 @@
 """Tests for regex parser — false positives and missed matches are the main risk."""
 
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
 from tests.conftest import make_email
-from src.processing.regex_parser import parse_automated_email, _detect_category, _clean_amount
+from src.processing.regex_parser import (
+    _build_category_automaton,
+    _clean_amount,
+    _detect_category,
+    _fields_present,
+    parse_and_update,
+    parse_automated_email,
+)
 
 
 class TestOrderNumbers:
@@ -21,6 +32,13 @@ class TestOrderNumbers:
         assert "ABC12345" in result["order_numbers"]
 
 
+    def test_overlapping_alternatives_all_found(self):
+        """A 'confirmation' match spanning into 'Order number' doesn't hide it."""
+        email = make_email(subject="", full_body="Confirmation\nOrder number: AB-98765\norder #55555")
+        result = parse_automated_email(email)
+        assert {"AB-98765", "55555"} <= set(result["order_numbers"])
+
+
 class TestTrackingNumbers:
     def test_ups_tracking(self):
         email = make_email(full_body="Your UPS tracking number is 1Z999AA10123456784")
@@ -71,12 +89,17 @@ class TestAmounts:
         result = parse_automated_email(email)
         assert len(result["amounts"]) >= 2
 
+    def test_labeled_and_bare_amounts_deduplicated(self):
+        email = make_email(subject="", full_body="Total: $20.00 (charged $20.00), tip $3")
+        result = parse_automated_email(email)
+        assert result["amounts"] == [20.0, 3.0]
+
 
 class TestCarriersAndStatuses:
     def test_detect_ups(self):
         email = make_email(full_body="Shipped via UPS Ground")
         result = parse_automated_email(email)
-        assert "Ups" in result["carriers"]
+        assert "UPS" in result["carriers"]
 
     def test_detect_shipped_status(self):
         email = make_email(full_body="Your order has shipped!")
@@ -93,6 +116,12 @@ class TestCarriersAndStatuses:
         result = parse_automated_email(email)
         assert "in transit" in result["statuses"]
 
+    def test_canonical_spellings_deduplicated(self):
+        email = make_email(subject="", full_body="FEDEX: Shipped. fedex says SHIPPED via Amazon logistics")
+        result = parse_automated_email(email)
+        assert result["carriers"] == ["Amazon Logistics", "FedEx"]
+        assert result["statuses"] == ["shipped"]
+
 
 class TestCategoryDetection:
     def test_order_category(self):
@@ -119,6 +148,22 @@ class TestCategoryDetection:
         email = make_email(subject="Hello there", raw_headers={"from": "friend@example.com"})
         assert _detect_category(email) == "other"
 
+    def test_earlier_category_wins_regardless_of_position(self):
+        email = make_email(subject="Security alert about your order")
+        assert _detect_category(email) == "order"
+
+    @pytest.mark.parametrize("subject", [
+        "Your order confirmation", "Security alert about your order", "Invoice due",
+        "Package delivery notification", "Membership renewal", "Hello there",
+    ])
+    def test_automaton_matches_keyword_loop(self, subject):
+        pytest.importorskip("ahocorasick")
+        email = make_email(subject=subject)
+        with patch("src.processing.regex_parser._CATEGORY_AUTOMATON", None):
+            expected = _detect_category(email)
+        with patch("src.processing.regex_parser._CATEGORY_AUTOMATON", _build_category_automaton()):
+            assert _detect_category(email) == expected
+
 
 class TestCleanAmount:
     def test_simple(self):
@@ -135,3 +180,67 @@ class TestCleanAmount:
 
     def test_empty_returns_zero(self):
         assert _clean_amount("") == 0.0
+
+
+class TestFieldPrefilter:
+    SAMPLES = [
+        "Your order #12345678 shipped via UPS. Tracking: 1Z999AA10123456784. Total: $1,234.50",
+        "Order confirmation\nOrder number: 111-2345678-9012345, delivered on Jan 3, 2026",
+        "USPS 9400111899223344556677 in transit. FedEx tracking number: 123456789012",
+        "Order\xa0#98765 — estimated delivery 02/05/2026",
+        "Thanks for reading our newsletter!",
+    ]
+
+    def test_without_hyperscan_every_field_is_scanned(self):
+        with patch("src.processing.regex_parser._FIELD_PREFILTER", None):
+            assert _fields_present("anything") is None
+
+    @pytest.mark.parametrize("body", SAMPLES)
+    def test_prefilter_does_not_change_results(self, body):
+        pytest.importorskip("hyperscan")
+        email = make_email(subject="", full_body=body)
+        with patch("src.processing.regex_parser._FIELD_PREFILTER", None):
+            expected = parse_automated_email(email)
+        assert parse_automated_email(email) == expected
+
+    def test_reports_only_matching_fields(self):
+        pytest.importorskip("hyperscan")
+        assert _fields_present("Thanks for reading our newsletter!") == set()
+        assert _fields_present("Order #12345678, total $5") == {"order_number", "amount"}
+
+
+class TestScanLength:
+    def test_short_body_scanned_whole(self):
+        email = make_email(subject="", full_body="Order #12345678 shipped")
+        result = parse_automated_email(email)
+        assert result["truncated"] is False
+        assert result["order_numbers"] == ["12345678"]
+
+    def test_long_body_middle_skipped(self):
+        filler = "x " * 10_000
+        email = make_email(
+            subject="",
+            full_body="Order #12345678\n" + filler + "Total: $99.00\n" + filler + "Delivered by UPS",
+        )
+        result = parse_automated_email(email)
+        assert result["truncated"] is True
+        assert result["order_numbers"] == ["12345678"]
+        # Mid-body data past the head is not scanned...
+        assert result["amounts"] == []
+        # ...but carriers and statuses in the footer still are
+        assert result["carriers"] == ["UPS"]
+        assert result["statuses"] == ["delivered"]
+
+
+class TestParseAndUpdate:
+    @pytest.mark.asyncio
+    async def test_leaves_flush_to_caller(self):
+        """The pipeline's per-email savepoint writes the changes; no flush here."""
+        email = make_email(subject="Your order #12345678", full_body="Thanks!")
+        session = AsyncMock()
+
+        result = await parse_and_update(session, email)
+
+        assert email.extraction_result is result
+        assert email.processed_at is not None
+        session.flush.assert_not_awaited()
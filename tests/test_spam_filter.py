@@ -0,0 +1,153 @@
+"""Tests for the local fastText spam filter (fastText itself is mocked)."""
+
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+import src.processing.spam_filter as spam_filter
+from src.processing.classifier import pre_classify
+from src.processing.spam_filter import (
+    MIN_EXAMPLES_PER_LABEL,
+    _model_text,
+    get_spam_model,
+    spam_probability,
+    train_spam_model,
+)
+from tests.conftest import make_email
+
+
+@pytest.fixture(autouse=True)
+def _fresh_model():
+    spam_filter.reset_spam_model()
+    yield
+    spam_filter.reset_spam_model()
+
+
+def _model(label: str, prob: float) -> MagicMock:
+    model = MagicMock()
+    model.predict.return_value = ([[label]], [[prob]])
+    return model
+
+
+class TestModelText:
+    def test_single_lowercased_line(self):
+        assert _model_text("Big\nSALE", "Act  now\r\n\tfree") == "big sale act now free"
+
+    def test_body_truncated(self):
+        text = _model_text(None, "a " * 5000)
+        assert len(text) <= spam_filter.MODEL_BODY_CHARS
+
+
+class TestGetSpamModel:
+    def test_none_without_fasttext(self):
+        with patch.object(spam_filter, "fasttext", None):
+            assert get_spam_model() is None
+
+    def test_loaded_once(self, tmp_path: Path):
+        path = tmp_path / "spam.ftz"
+        path.write_bytes(b"model")
+        fasttext = MagicMock()
+        settings = MagicMock()
+        settings.general.spam_model_path = path
+
+        with patch.object(spam_filter, "fasttext", fasttext), \
+             patch("src.processing.spam_filter.get_settings", return_value=settings):
+            first = get_spam_model()
+            second = get_spam_model()
+
+        assert first is second is fasttext.load_model.return_value
+        fasttext.load_model.assert_called_once_with(str(path))
+
+    def test_none_when_untrained(self, tmp_path: Path):
+        fasttext = MagicMock()
+        settings = MagicMock()
+        settings.general.spam_model_path = tmp_path / "missing.ftz"
+
+        with patch.object(spam_filter, "fasttext", fasttext), \
+             patch("src.processing.spam_filter.get_settings", return_value=settings):
+            assert get_spam_model() is None
+
+        fasttext.load_model.assert_not_called()
+
+
+class TestSpamProbability:
+    def test_spam_label(self):
+        with patch("src.processing.spam_filter.get_spam_model", return_value=_model("__label__spam", 0.97)):
+            assert spam_probability(make_email()) == pytest.approx(0.97)
+
+    def test_ham_label_inverted(self):
+        with patch("src.processing.spam_filter.get_spam_model", return_value=_model("__label__ham", 0.8)):
+            assert spam_probability(make_email()) == pytest.approx(0.2)
+
+    def test_none_without_model(self):
+        with patch("src.processing.spam_filter.get_spam_model", return_value=None):
+            assert spam_probability(make_email()) is None
+
+
+class TestPreClassifySpam:
+    def test_confident_spam_skips_llm(self):
+        email = make_email(raw_headers={"from": "deals@example.com"}, full_body="Hi")
+        with patch("src.processing.classifier.spam_probability", return_value=0.95):
+            result = pre_classify(email)
+
+        assert result["classification"] == "spam"
+        assert result["route_to"] == "skip"
+        assert result["still_relevant"] is False
+
+    def test_below_threshold_falls_through(self):
+        email = make_email(raw_headers={"from": "jane@example.com"}, full_body="Hi")
+        with patch("src.processing.classifier.spam_probability", return_value=0.6):
+            assert pre_classify(email) is None
+
+    def test_header_rules_run_first(self):
+        email = make_email(raw_headers={"from": "noreply@shop.com"})
+        with patch("src.processing.classifier.spam_probability") as mock_prob:
+            assert pre_classify(email)["classification"] == "automated"
+        mock_prob.assert_not_called()
+
+
+class TestTrainSpamModel:
+    @staticmethod
+    def _session(rows):
+        result = MagicMock()
+        result.all.return_value = rows
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+        return session
+
+    @pytest.mark.asyncio
+    async def test_labels_from_classifications(self, tmp_path: Path):
+        n = MIN_EXAMPLES_PER_LABEL
+        rows = [("spam", "Win big", "Free\nmoney", None)] * n + [
+            ("human", "Lunch", None, "Are you free?"),
+            ("newsletter", "Digest", "This week", None),
+        ] * n + [("human", None, None, None)]
+        captured = {}
+
+        def fake_train(examples, path):
+            captured["examples"] = examples
+            captured["path"] = path
+
+        with patch.object(spam_filter, "fasttext", MagicMock()), \
+             patch("src.processing.spam_filter._train", side_effect=fake_train):
+            counts = await train_spam_model(self._session(rows), tmp_path / "spam.ftz")
+
+        assert counts == {"spam": n, "ham": 2 * n}
+        assert captured["path"] == tmp_path / "spam.ftz"
+        assert captured["examples"][0] == "__label__spam win big free money"
+        assert "__label__ham lunch are you free?" in captured["examples"]
+
+    @pytest.mark.asyncio
+    async def test_too_few_examples(self, tmp_path: Path):
+        rows = [("spam", "Win big", "Free money", None)]
+        with patch.object(spam_filter, "fasttext", MagicMock()), \
+             patch("src.processing.spam_filter._train") as mock_train, \
+             pytest.raises(ValueError, match="at least"):
+            await train_spam_model(self._session(rows), tmp_path / "spam.ftz")
+        mock_train.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_requires_fasttext(self):
+        with patch.object(spam_filter, "fasttext", None), pytest.raises(ImportError):
+            await train_spam_model(AsyncMock())
@@ -0,0 +1,569 @@
+"""Tests for src/output/vault — Obsidian vault generation."""
+
+import json
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.output.vault import (
+    VAULT_INDEX,
+    _age_str,
+    _build_person_page,
+    _build_project_page,
+    _generate_drafts,
+    _generate_inbox,
+    _generate_people,
+    _generate_projects,
+    _generate_today,
+    _pending_replies,
+    _recent_person_emails,
+    _recent_project_emails,
+    _sender_cache,
+    _sender_name,
+    _short_date,
+    _sync_files,
+    generate_vault,
+)
+from src.storage.models import Person, Project
+from tests.conftest import make_email, make_project, make_task
+
+NOW = datetime(2026, 2, 10, 12, 0, tzinfo=timezone.utc)
+
+
+def _session_ctx(inner):
+    ctx = AsyncMock()
+    ctx.__aenter__ = AsyncMock(return_value=inner)
+    ctx.__aexit__ = AsyncMock(return_value=False)
+    return ctx
+
+
+class _Stream:
+    """Stand-in for AsyncScalarResult: async-iterable, with partitions()."""
+
+    def __init__(self, items, batch_size=200):
+        self._items = list(items)
+        self._batch_size = batch_size
+
+    def __aiter__(self):
+        return self._iter(self._items)
+
+    def partitions(self):
+        batches = [
+            self._items[i:i + self._batch_size]
+            for i in range(0, len(self._items), self._batch_size)
+        ]
+        return self._iter(batches)
+
+    @staticmethod
+    async def _iter(values):
+        for value in values:
+            yield value
+
+
+class TestGenerateVault:
+    @pytest.mark.asyncio
+    async def test_sections_run_in_own_sessions(self, tmp_path: Path):
+        """TODAY.md uses the caller's session; every other section gets its own."""
+        session = AsyncMock()
+        inner_sessions = []
+
+        def mock_get_session():
+            inner = AsyncMock()
+            inner_sessions.append(inner)
+            return _session_ctx(inner)
+
+        pending = [_email_row(reply_suggested="Sure.")]
+        names = ["today", "inbox", "drafts", "projects", "people", "commitments"]
+        patches = {
+            name: patch(f"src.output.vault._generate_{name}",
+                        new_callable=MagicMock if name == "drafts" else AsyncMock,
+                        return_value=[(tmp_path / f"{name}.md", f"# {name}\n")])
+            for name in names
+        }
+        mocks = {name: p.start() for name, p in patches.items()}
+        try:
+            with patch("src.output.vault.get_session", side_effect=mock_get_session), \
+                 patch("src.output.vault._pending_replies", new_callable=AsyncMock,
+                       return_value=pending) as mock_pending:
+                await generate_vault(session, tmp_path)
+        finally:
+            for p in patches.values():
+                p.stop()
+
+        # Committed before the sections' own sessions read
+        session.commit.assert_awaited_once()
+        # The needs-reply rows are fetched once and shared by TODAY and DRAFTS
+        mock_pending.assert_awaited_once_with(session)
+        today_args = mocks["today"].await_args.args
+        assert today_args[:2] == (session, tmp_path)
+        assert today_args[3] is pending
+        # One clock reading is shared by every time-aware section
+        now = today_args[2]
+        for name in ("inbox", "projects"):
+            assert mocks[name].await_args.args[1:] == (tmp_path, now)
+        mocks["drafts"].assert_called_once_with(tmp_path, now, pending)
+        assert len(inner_sessions) == 4
+        used = [mocks[name].await_args.args[0] for name in names[1:] if name != "drafts"]
+        assert sorted(map(id, used)) == sorted(map(id, inner_sessions))
+        assert (tmp_path / "Projects").is_dir()
+        assert (tmp_path / "People").is_dir()
+        # Every section's pages are written once all sections have rendered
+        for name in names:
+            assert (tmp_path / f"{name}.md").read_text() == f"# {name}\n"
+
+
+def _result(scalars=None, rows=None):
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = scalars or []
+    result.all.return_value = rows or []
+    return result
+
+
+class TestRecentProjectEmails:
+    @pytest.mark.asyncio
+    async def test_one_ranked_query_grouped_by_project(self):
+        """All projects' emails come back from one ROW_NUMBER query, grouped by project."""
+        project_a, project_b = make_project(), make_project()
+        e1, e2, e3 = make_email(), make_email(), make_email()
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=_result(rows=[
+            (project_a.id, e1), (project_a.id, e2), (project_b.id, e3),
+        ]))
+
+        grouped = await _recent_project_emails(session, [project_a.id, project_b.id])
+
+        session.execute.assert_awaited_once()
+        sql = str(session.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "row_number() OVER (PARTITION BY projects.id" in sql
+        assert "(emails.extraction_result -> 'project_links') @>" in sql
+        assert grouped == {project_a.id: [e1, e2], project_b.id: [e3]}
+
+
+class TestGenerateProjects:
+    @pytest.mark.asyncio
+    async def test_eager_loads_and_preloads_emails(self, tmp_path: Path):
+        project_a = make_project(name="Big Launch")
+        project_b = make_project(name="Side Quest")
+        email = make_email()
+        session = AsyncMock()
+        session.stream_scalars = AsyncMock(return_value=_Stream([project_a, project_b]))
+
+        with patch("src.output.vault._recent_project_emails", new_callable=AsyncMock,
+                   return_value={project_a.id: [email]}) as mock_recent, \
+             patch("src.output.vault._build_project_page",
+                   return_value="# page\n") as mock_build:
+            files = await _generate_projects(session, tmp_path, NOW)
+
+        session.stream_scalars.assert_awaited_once()
+        stmt = session.stream_scalars.await_args.args[0]
+        assert stmt.get_execution_options()["yield_per"] == 200
+        loaded = " ".join(str(opt.path) for opt in stmt._with_options)
+        assert "Project.tasks" in loaded
+        assert "Project.people" in loaded and "ProjectPeople.person" in loaded
+        people_opt = stmt._with_options[1]
+        assert [c.strategy for c in people_opt.context] == [
+            (("lazy", "selectin"),), (("lazy", "joined"),),
+        ]
+        # Old done tasks are excluded by loader criteria, relative to the pass's now
+        (criteria,) = stmt._with_options[0].context[0]._extra_criteria
+        compiled = criteria.compile(dialect=postgresql.dialect())
+        assert "tasks.status != " in str(compiled) and "tasks.completed_at > " in str(compiled)
+        assert NOW - timedelta(days=14) in compiled.params.values()
+        mock_recent.assert_awaited_once_with(session, [project_a.id, project_b.id])
+        assert mock_build.call_args_list[0].args == (project_a, [email], NOW)
+        assert mock_build.call_args_list[1].args == (project_b, [], NOW)
+        assert files[0] == (tmp_path / "Projects" / "Big-Launch.md", "# page\n")
+
+
+    @pytest.mark.asyncio
+    async def test_emails_loaded_per_streamed_batch(self, tmp_path: Path):
+        projects = [make_project(name=f"P{i}") for i in range(3)]
+        session = AsyncMock()
+        session.stream_scalars = AsyncMock(return_value=_Stream(projects, batch_size=2))
+
+        with patch("src.output.vault._recent_project_emails", new_callable=AsyncMock,
+                   return_value={}) as mock_recent, \
+             patch("src.output.vault._build_project_page", return_value="# page\n"):
+            files = await _generate_projects(session, tmp_path, NOW)
+
+        assert [c.args[1] for c in mock_recent.await_args_list] == [
+            [projects[0].id, projects[1].id], [projects[2].id],
+        ]
+        assert [path.name for path, _ in files] == ["P0.md", "P1.md", "P2.md"]
+
+    @pytest.mark.asyncio
+    async def test_no_projects_renders_nothing(self, tmp_path: Path):
+        session = AsyncMock()
+        session.stream_scalars = AsyncMock(return_value=_Stream([]))
+
+        with patch("src.output.vault._recent_project_emails", new_callable=AsyncMock) as mock_recent:
+            files = await _generate_projects(session, tmp_path, NOW)
+
+        mock_recent.assert_not_awaited()
+        assert files == []
+
+
+class TestGeneratePeople:
+    @pytest.mark.asyncio
+    async def test_streams_people_with_batched_emails(self, tmp_path: Path):
+        jane = MagicMock(email="Jane@Example.com", safe_name="Jane-Roe")
+        bob = MagicMock(email=None, safe_name="Bob")
+        jane.name, bob.name = "Jane Roe", "Bob"
+        email = make_email()
+        session = AsyncMock()
+        session.stream_scalars = AsyncMock(return_value=_Stream([jane, bob]))
+
+        with patch("src.output.vault._recent_person_emails", new_callable=AsyncMock,
+                   return_value={"jane@example.com": [email]}) as mock_recent, \
+             patch("src.output.vault._build_person_page",
+                   side_effect=["# Jane\n", "# Bob\n"]) as mock_build:
+            files = await _generate_people(session, tmp_path)
+
+        stmt = session.stream_scalars.await_args.args[0]
+        assert stmt.get_execution_options()["yield_per"] == 200
+        mock_recent.assert_awaited_once_with(session, ["jane@example.com"])
+        assert mock_build.call_args_list[0].args == (jane, [email])
+        assert mock_build.call_args_list[1].args == (bob, [])
+        assert files == [
+            (tmp_path / "People" / "Jane-Roe.md", "# Jane\n"),
+            (tmp_path / "People" / "Bob.md", "# Bob\n"),
+        ]
+
+
+class TestRecentPersonEmails:
+    @pytest.mark.asyncio
+    async def test_one_ranked_query_grouped_by_address(self):
+        e1 = make_email(from_address="a@example.com")
+        e2 = make_email(from_address="a@example.com")
+        e3 = make_email(from_address="b@example.com")
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=_result(scalars=[e1, e2, e3]))
+
+        grouped = await _recent_person_emails(session, ["a@example.com", "b@example.com"])
+
+        session.execute.assert_awaited_once()
+        sql = str(session.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "row_number() OVER (PARTITION BY emails.from_address" in sql
+        assert grouped == {"a@example.com": [e1, e2], "b@example.com": [e3]}
+
+    @pytest.mark.asyncio
+    async def test_no_addresses_skips_query(self):
+        session = AsyncMock()
+
+        assert await _recent_person_emails(session, []) == {}
+        session.execute.assert_not_awaited()
+
+
+class TestBuildProjectPage:
+    def test_renders_eager_loaded_rows(self):
+        older = make_task(title="Scope it", status="backlog",
+                          created_at=datetime(2026, 1, 1, tzinfo=timezone.utc))
+        newer = make_task(title="Ship it", status="backlog",
+                          created_at=datetime(2026, 2, 1, tzinfo=timezone.utc))
+        person = MagicMock(safe_name="Jane-Roe")
+        person.name = "Jane Roe"
+        project = make_project(
+            name="Big Launch", tasks=[newer, older],
+            people=[MagicMock(person=person, role="lead")],
+        )
+        email = make_email(subject="Launch plan", sender_name="Jane", snippet=None)
+
+        content = _build_project_page(project, [email], NOW)
+
+        assert content.index("- [ ] Scope it") < content.index("- [ ] Ship it")
+        assert "- [[Jane-Roe]] (lead)" in content
+        assert "## Recent emails" in content
+        assert "- **Jane** Feb 01 — Launch plan" in content
+
+
+    def test_exact_layout(self):
+        project = make_project(
+            name="Big Launch", description="Ship it", status="active",
+            tasks=[make_task(title="Draft", status="in_progress", due_date=date(2026, 3, 1),
+                             created_at=datetime(2026, 1, 1, tzinfo=timezone.utc))],
+            people=[],
+        )
+
+        content = _build_project_page(project, [], NOW)
+
+        assert content == (
+            "# Big Launch\n"
+            "> Ship it\n"
+            "\n"
+            "*Active*\n"
+            "\n"
+            "## Tasks\n"
+            "- [ ] **Draft** — due 2026-03-01\n"
+            "\n"
+        )
+
+
+class TestBuildPersonPage:
+    def test_renders_eager_loaded_rows(self):
+        active = make_project(name="Big Launch", status="active")
+        paused = make_project(name="Old Thing", status="paused")
+        later = MagicMock(direction="from_me", description="Send deck", deadline=date(2026, 3, 1))
+        undated = MagicMock(direction="to_me", description="Intro", deadline=None)
+        sooner = MagicMock(direction="to_me", description="Contract", deadline=date(2026, 2, 1))
+        person = MagicMock(
+            email="Jane@Example.com", organization=None, relationship_type=None,
+            notes=None, first_contact=None, last_contact=None,
+            project_links=[
+                MagicMock(project=active, role="lead"),
+                MagicMock(project=paused, role=None),
+            ],
+            commitments=[later, undated, sooner],
+        )
+        person.name = "Jane Roe"
+        email = make_email(subject="Catch up", snippet=None)
+
+        content = _build_person_page(person, [email])
+
+        assert "- [[Big-Launch]] (lead)" in content
+        assert "Old-Thing" not in content
+        assert content.index("Contract") < content.index("Send deck") < content.index("Intro")
+        assert "- Feb 01 — Catch up" in content
+
+
+class TestGenerateToday:
+    @pytest.mark.asyncio
+    async def test_today_and_daily_archive_share_content(self, tmp_path: Path):
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=_result())
+
+        files = await _generate_today(session, tmp_path, NOW, [])
+
+        (today_path, today_content), (daily_path, daily_content) = files
+        assert today_path == tmp_path / "TODAY.md"
+        assert daily_path == tmp_path / "Daily" / f"{date.today().isoformat()}.md"
+        assert today_content is daily_content
+        assert "Nothing pressing." in today_content
+        # Rendering creates no directories; generate_vault owns that
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_lists_first_pending_replies(self, tmp_path: Path):
+        pending = [_email_row(subject=f"Question {i}") for i in range(12)]
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=_result())
+
+        ((_, content), _) = await _generate_today(session, tmp_path, NOW, pending)
+
+        assert "## Reply to" in content
+        assert "Question 9" in content and "Question 10" not in content
+        # Sprints, due/in-progress/waiting tasks and commitments; replies come pre-fetched
+        assert session.execute.await_count == 5
+
+
+class TestSyncFiles:
+    def test_writes_new_files_and_records_index(self, tmp_path: Path):
+        files = [(tmp_path / "a.md", "# A — café\n"), (tmp_path / "b.md", "# B\n")]
+
+        assert _sync_files(tmp_path, files) == 2
+
+        assert (tmp_path / "a.md").read_text(encoding="utf-8") == "# A — café\n"
+        index = json.loads((tmp_path / VAULT_INDEX).read_text())
+        assert set(index) == {"a.md", "b.md"}
+
+    def test_unchanged_content_is_not_rewritten(self, tmp_path: Path):
+        files = [(tmp_path / "a.md", "# A\n")]
+        _sync_files(tmp_path, files)
+        mtime = (tmp_path / "a.md").stat().st_mtime_ns
+
+        assert _sync_files(tmp_path, files) == 0
+        assert (tmp_path / "a.md").stat().st_mtime_ns == mtime
+
+    def test_changed_content_is_rewritten(self, tmp_path: Path):
+        _sync_files(tmp_path, [(tmp_path / "a.md", "# A\n")])
+
+        assert _sync_files(tmp_path, [(tmp_path / "a.md", "# A v2\n")]) == 1
+        assert (tmp_path / "a.md").read_text() == "# A v2\n"
+
+    def test_hand_edited_or_deleted_files_are_regenerated(self, tmp_path: Path):
+        files = [(tmp_path / "a.md", "# A\n"), (tmp_path / "b.md", "# B\n")]
+        _sync_files(tmp_path, files)
+        (tmp_path / "a.md").write_text("# edited by hand, longer\n")
+        (tmp_path / "b.md").unlink()
+
+        assert _sync_files(tmp_path, files) == 2
+        assert (tmp_path / "a.md").read_text() == "# A\n"
+        assert (tmp_path / "b.md").read_text() == "# B\n"
+
+    def test_corrupt_index_is_ignored(self, tmp_path: Path):
+        (tmp_path / VAULT_INDEX).write_text("not json")
+
+        assert _sync_files(tmp_path, [(tmp_path / "a.md", "# A\n")]) == 1
+
+
+class TestAgeStr:
+    @pytest.mark.parametrize("email_date,expected", [
+        (None, "unknown date"),
+        (NOW - timedelta(hours=3), "today"),
+        (NOW - timedelta(days=1), "yesterday"),
+        (NOW - timedelta(days=4), "4 days ago"),
+        (NOW - timedelta(days=15), "2w ago"),
+        (datetime(2025, 11, 2, tzinfo=timezone.utc), "Nov 02"),
+    ])
+    def test_relative_to_given_now(self, email_date, expected):
+        assert _age_str(email_date, NOW) == expected
+
+
+class TestBuildProjectPageDoneTasks:
+    def test_loaded_done_tasks_are_rendered(self):
+        """Done tasks arrive pre-filtered to the recent window and are all listed."""
+        done = make_task(title="Shipped", status="done", created_at=NOW - timedelta(days=30))
+        open_task = make_task(title="Next", status="backlog", created_at=NOW)
+        project = make_project(tasks=[done, open_task], people=[])
+
+        content = _build_project_page(project, [], NOW)
+
+        assert content.index("- [ ] Next") < content.index("- [x] ~~Shipped~~")
+
+
+class TestSenderName:
+    def test_memoized_per_email(self):
+        email = make_email(raw_headers={"from": '"Ann Lee" <ann@example.com>'})
+
+        assert _sender_name(email) == "Ann Lee"
+        email.raw_headers = {"from": "Someone Else <x@example.com>"}
+        assert _sender_name(email) == "Ann Lee"
+        assert _sender_cache[email.id] == "Ann Lee"
+
+    def test_prefers_stored_sender_name(self):
+        assert _sender_name(make_email(sender_name="Jane")) == "Jane"
+
+    @pytest.mark.parametrize("header", [
+        '"Ann Lee" <ann@example.com>',
+        'Ann "The Boss" Lee <ann@example.com>',
+        ' "  Ann  " <ann@example.com>',
+        'Ann" <ann@example.com>',
+        '"" <ann@example.com>',
+        "<ann@example.com>",
+        "ann@example.com",
+        "Ann\n Lee <ann@example.com>",
+        "",
+    ])
+    def test_matches_split_and_strip_parsing(self, header):
+        expected = header.split("<")[0].strip().strip('"').strip() or header
+        assert _sender_name(make_email(raw_headers={"from": header})) == expected
+
+    def test_falls_back_to_raw_header(self):
+        assert _sender_name(make_email(raw_headers={"from": "x@example.com"})) == "x@example.com"
+
+    @pytest.mark.asyncio
+    async def test_cleared_per_generation(self, tmp_path: Path):
+        _sender_cache[uuid.uuid4()] = "stale"
+        with patch("src.output.vault.asyncio.gather", new_callable=AsyncMock, return_value=[]), \
+             patch("src.output.vault._pending_replies", new_callable=AsyncMock,
+                   return_value=[]), \
+             patch("src.output.vault._generate_today", new=MagicMock()), \
+             patch("src.output.vault._in_own_session", new=MagicMock()):
+            await generate_vault(AsyncMock(), tmp_path)
+
+        assert _sender_cache == {}
+
+
+class TestShortDate:
+    @pytest.mark.parametrize("value,expected", [
+        (datetime(2026, 2, 1, tzinfo=timezone.utc), "Feb 01"),
+        (datetime(2025, 12, 31, 23, 59), "Dec 31"),
+        (datetime(2026, 1, 9), "Jan 09"),
+    ])
+    def test_matches_strftime_b_d(self, value, expected):
+        assert _short_date(value) == expected == value.strftime("%b %d")
+
+
+def _email_row(**overrides):
+    """A row with the columns the inbox and drafts queries select."""
+    defaults = {
+        "id": uuid.uuid4(), "sender_name": "Ann Lee", "raw_headers": None,
+        "subject": "Hello", "snippet": None, "email_date": NOW - timedelta(days=1),
+        "urgency": "normal", "needs_reply": False, "reply_sent": False,
+        "reply_suggested": None, "extraction_result": {},
+    }
+    defaults.update(overrides)
+    return MagicMock(**defaults)
+
+
+class TestGenerateInbox:
+    @pytest.mark.asyncio
+    async def test_renders_plain_rows(self, tmp_path: Path):
+        rows = [
+            _email_row(subject="Contract", needs_reply=True, urgency="urgent",
+                       extraction_result={"tasks": [{"text": "Sign it"}]}),
+            _email_row(subject="FYI", sender_name=None,
+                       raw_headers={"from": "Bob <bob@example.com>"}),
+        ]
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=_result(rows=rows))
+
+        files = await _generate_inbox(session, tmp_path, NOW)
+
+        sql = str(session.execute.await_args.args[0])
+        assert "emails.full_body" not in sql and "emails.subject" in sql
+        ((path, content),) = files
+        assert path == tmp_path / "INBOX.md"
+        assert "## Needs reply\n### Ann Lee — Contract **URGENT**\n*yesterday*" in content
+        assert "- [ ] Sign it" in content
+        assert "## Recent\n### Bob — FYI" in content
+
+    @pytest.mark.asyncio
+    async def test_empty_inbox_renders_nothing(self, tmp_path: Path):
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=_result(rows=[]))
+
+        assert await _generate_inbox(session, tmp_path, NOW) == []
+
+
+class TestPendingReplies:
+    @pytest.mark.asyncio
+    async def test_selects_plain_columns_in_one_query(self):
+        rows = [_email_row()]
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=_result(rows=rows))
+
+        assert await _pending_replies(session) == rows
+
+        session.execute.assert_awaited_once()
+        sql = str(session.execute.await_args.args[0])
+        assert "emails.snippet" not in sql and "emails.reply_suggested" in sql
+        assert "LIMIT" not in sql
+
+
+class TestGenerateDrafts:
+    def test_renders_rows_with_suggestions(self, tmp_path: Path):
+        pending = [
+            _email_row(subject="Lunch?", reply_suggested="Sure, Tuesday works."),
+            _email_row(subject="No draft yet"),
+        ]
+
+        ((path, content),) = _generate_drafts(tmp_path, NOW, pending)
+
+        assert path == tmp_path / "DRAFTS.md"
+        assert content == (
+            "# Drafts\n\n"
+            "### Re: Lunch?\n"
+            "To: Ann Lee (yesterday)\n\n"
+            "> Sure, Tuesday works.\n\n"
+            "---\n\n"
+        )
+
+
+class TestSafeName:
+    @pytest.mark.parametrize("name,expected", [
+        ("Big Launch", "Big-Launch"),
+        ("Q3 / Q4 plan: draft?", "Q3-Q4-plan-draft-"),
+        ("already-safe_name", "already-safe_name"),
+    ])
+    def test_collapses_unsafe_runs(self, name, expected):
+        assert Project(name=name).safe_name == expected
+        assert Person(name=name).safe_name == expected
+
+    def test_computed_once_per_instance(self):
+        project = Project(name="Big Launch")
+        assert project.safe_name is project.safe_name
+        assert "safe_name" in vars(project)
@@ -210,6 +210,29 @@ class TestVectorStoreWithMock:
         store.add_email("e1", "Email content")
         assert store.collection_count("emails") == 1
 
+    def test_add_emails_bulk(self):
+        store = self._make_store()
+        calls = []
+        collection = store._get_collection("emails")
+        original = collection.upsert
+        collection.upsert = lambda **kw: (calls.append(kw), original(**kw))
+
+        store.add_emails([
+            ("e1", "First", {"tags": ["a", "b"], "skip": None}),
+            ("e2", "   ", None),
+            ("e3", "Third", None),
+        ])
+
+        assert len(calls) == 1
+        assert calls[0]["ids"] == ["e1", "e3"]
+        assert calls[0]["metadatas"] == [{"tags": "a, b"}, {}]
+        assert store.collection_count("emails") == 2
+
+    def test_add_many_all_blank_skips_upsert(self):
+        store = self._make_store()
+        store.add_many("emails", [("e1", "", None)])
+        assert "emails" not in store._collections
+
     def test_add_document_helper(self):
         store = self._make_store()
         store.add_document("d1", "Doc content")